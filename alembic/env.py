@@ -15,8 +15,8 @@ from src.models.database import Base, DATABASE_URL
 # access to the values within the .ini file in use.
 config = context.config
 
-# Set the database URL
-config.set_main_option("sqlalchemy.url", DATABASE_URL)
+# Set the database URL (GENZSMART_DATABASE_URL); "%" would start an ini interpolation
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -0,0 +1,25 @@
+"""Add content hash to files
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('content_hash', sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,44 @@
+"""Add content-addressed file blobs
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'file_blobs',
+        sa.Column('content_hash', sa.String(64), primary_key=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('storage_path', sa.String(500), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('extracted_text', sa.Text(), nullable=True),
+        sa.Column('word_count', sa.Integer(), nullable=True),
+        sa.Column('metadata', sa.JSON(), nullable=True),
+        sa.Column('parsed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.current_timestamp())
+    )
+    op.create_index('idx_files_content_hash', 'files', ['content_hash'])
+    # Named as Postgres names the constraint create_all() makes from the model
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.create_foreign_key(
+            'files_content_hash_fkey', 'file_blobs', ['content_hash'], ['content_hash']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_constraint('files_content_hash_fkey', type_='foreignkey')
+    op.drop_index('idx_files_content_hash', 'files')
+    op.drop_table('file_blobs')
@@ -0,0 +1,37 @@
+"""Add retrieval chunks of extracted file text
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'file_chunks',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('content_hash', sa.String(64), sa.ForeignKey('file_blobs.content_hash', ondelete='CASCADE'), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('start_offset', sa.Integer(), nullable=False),
+        sa.Column('end_offset', sa.Integer(), nullable=False),
+        sa.Column('heading', sa.String(255), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('token_count', sa.Integer(), nullable=False),
+        sa.Column('embedding', sa.LargeBinary(), nullable=True)
+    )
+    op.create_index('ix_file_chunks_content_hash', 'file_chunks', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_file_chunks_content_hash', 'file_chunks')
+    op.drop_table('file_chunks')
@@ -0,0 +1,49 @@
+"""Composite indexes for the hot access paths
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+# Created here; the application may already have added them at startup
+NEW_INDEXES = [
+    ('idx_files_status_created', 'files', ['status', 'created_at']),
+    ('idx_file_chunks_position', 'file_chunks', ['content_hash', 'position']),
+    ('idx_memory_active_confidence', 'memory_facts', ['is_active', 'confidence']),
+    ('idx_memory_conversation', 'memory_facts', ['conversation_id']),
+    ('idx_conversation_files_file', 'conversation_files', ['file_id']),
+    ('idx_message_attachments_file', 'message_attachments', ['file_id']),
+]
+
+# Superseded by the indexes above or by unique constraints
+REPLACED_INDEXES = [
+    ('idx_files_status', 'files', ['status']),
+    ('ix_file_chunks_content_hash', 'file_chunks', ['content_hash']),
+    ('idx_memory_confidence', 'memory_facts', ['confidence']),
+    ('idx_settings_key', 'user_settings', ['key']),
+    ('idx_search_hash', 'search_cache', ['query_hash']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in NEW_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in REPLACED_INDEXES:
+        op.drop_index(name, table, if_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, columns in REPLACED_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in NEW_INDEXES:
+        op.drop_index(name, table, if_exists=True)
@@ -0,0 +1,77 @@
+"""Time-ordered ids: keyset message index, native uuid ids on Postgres
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+Existing ids are kept as they are. New rows get UUIDv7 ids from the
+application. Messages are ordered by (created_at, id); the id only breaks
+ties between rows with the same timestamp, deterministically but not in
+insert order when an existing random uuid4 id is involved.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+# Id columns and the foreign keys to them
+ID_COLUMNS = [
+    ('conversations', 'id'),
+    ('messages', 'id'),
+    ('messages', 'conversation_id'),
+    ('files', 'id'),
+    ('conversation_files', 'conversation_id'),
+    ('conversation_files', 'file_id'),
+    ('message_attachments', 'message_id'),
+    ('message_attachments', 'file_id'),
+    ('memory_facts', 'id'),
+    ('memory_facts', 'conversation_id'),
+    ('search_cache', 'id'),
+]
+
+
+def _convert_ids(type_, using: str) -> None:
+    """Change every id column's type, lifting the foreign keys between them meanwhile"""
+    inspector = sa.inspect(op.get_bind())
+    id_tables = {table for table, _ in ID_COLUMNS}
+    foreign_keys = [
+        (table, fk)
+        for table in sorted(id_tables)
+        for fk in inspector.get_foreign_keys(table)
+        if fk['referred_table'] in id_tables
+    ]
+    for table, fk in foreign_keys:
+        op.drop_constraint(fk['name'], table, type_='foreignkey')
+    for table, column in ID_COLUMNS:
+        op.alter_column(table, column, type_=type_, postgresql_using=f'{column}::{using}')
+    for table, fk in foreign_keys:
+        op.create_foreign_key(
+            fk['name'], table, fk['referred_table'], fk['constrained_columns'], fk['referred_columns'],
+            ondelete=fk.get('options', {}).get('ondelete')
+        )
+
+
+def upgrade() -> None:
+    # Messages in (created_at, id) order: history, export and delete-after
+    op.drop_index('idx_messages_conversation', 'messages', if_exists=True)
+    op.create_index('idx_messages_conversation', 'messages', ['conversation_id', 'created_at', 'id'])
+
+    # 16-byte keys instead of 36-character text; SQLite keeps the text
+    if op.get_bind().dialect.name == 'postgresql':
+        _convert_ids(postgresql.UUID(as_uuid=False), 'uuid')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _convert_ids(sa.String(36), 'text')
+
+    op.drop_index('idx_messages_conversation', 'messages', if_exists=True)
+    op.create_index('idx_messages_conversation', 'messages', ['conversation_id', 'created_at'])
@@ -0,0 +1,27 @@
+"""Worker claims on files being parsed
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('claimed_by', sa.String(64), nullable=True))
+    op.add_column('files', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,139 @@
+"""
+Benchmark: DOCX extraction
+
+Compares the streaming zip + iterparse extractor with python-docx on a
+generated contract-style document (headings, numbered clauses, tables)
+of about 300 pages. Each extractor runs in a fresh interpreter so peak
+resident memory (ru_maxrss, Linux) is measured per run; python-docx is
+skipped when it is not installed.
+
+Run from the repository root:
+    python benchmarks/bench_docx_parser.py [pages]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+PARAGRAPHS_PER_PAGE = 8
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+  <Default Extension="xml" ContentType="application/xml"/>
+  <Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+  <Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+RELS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+STYLES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:styles xmlns:w="{W_NS}">
+  <w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+  <w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>
+</w:styles>"""
+
+CLAUSE = (
+    "The Supplier shall deliver the Goods to the Delivery Address on the Delivery Date "
+    "in accordance with the Specification, and risk in the Goods shall pass on completion of delivery."
+)
+
+# Each measurement runs in its own interpreter; the output is one JSON line
+RUNNER = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+mode, path = sys.argv[1], sys.argv[2]
+# Every mode imports the application package so peak RSS compares like with like
+from src.services.files.parsers.docx import extract_docx
+if mode == "python-docx":
+    from docx import Document
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if mode == "streaming":
+    chars = len(extract_docx(path)["text"])
+elif mode == "python-docx":
+    doc = Document(path)
+    chars = len("\\n\\n".join(p.text for p in doc.paragraphs if p.text.strip()))
+else:
+    chars = 0
+elapsed = time.perf_counter() - start
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "peak_kb": after, "growth_kb": after - before, "chars": chars}}))
+"""
+
+
+def paragraph(text, style=None):
+    props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{props}<w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def build_document(path, pages):
+    """Write a contract-like .docx, streaming the body so the generator stays small too"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", RELS)
+        archive.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+        archive.writestr("word/styles.xml", STYLES)
+        with archive.open("word/document.xml", "w") as part:
+            part.write(f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{W_NS}"><w:body>'.encode())
+            for page in range(pages):
+                chunk = [paragraph(f"Section {page + 1}", "Heading1")]
+                for clause in range(PARAGRAPHS_PER_PAGE):
+                    chunk.append(paragraph(f"{page + 1}.{clause + 1} {CLAUSE}"))
+                if page % 10 == 0:
+                    rows = "".join(
+                        f"<w:tr><w:tc>{paragraph(f'Item {i}')}</w:tc><w:tc>{paragraph(str(i * 10))}</w:tc></w:tr>"
+                        for i in range(10)
+                    )
+                    chunk.append(f"<w:tbl>{rows}</w:tbl>")
+                part.write("".join(chunk).encode())
+            part.write(b"<w:sectPr/></w:body></w:document>")
+
+
+def measure(mode, path):
+    completed = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(root=ROOT), mode, path],
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "contract.docx")
+        build_document(path, pages)
+        with zipfile.ZipFile(path) as archive:
+            xml_size = archive.getinfo("word/document.xml").file_size
+        print(f"{pages} pages, {os.path.getsize(path) / 1024:.0f} KB on disk, document.xml {xml_size / 1024 / 1024:.1f} MB")
+        
+        baseline = measure("baseline", path)
+        print(f"{'extractor':<14}{'seconds':>10}{'peak RSS MB':>14}{'RSS growth MB':>16}{'chars':>12}")
+        for mode in ("streaming", "python-docx"):
+            result = measure(mode, path)
+            if result is None:
+                print(f"{mode:<14}{'not installed / failed':>52}")
+                continue
+            print(
+                f"{mode:<14}{result['seconds']:>10.2f}{result['peak_kb'] / 1024:>14.1f}"
+                f"{result['growth_kb'] / 1024:>16.1f}{result['chars']:>12}"
+            )
+        if baseline:
+            print(f"(baseline after imports, no parsing: peak RSS {baseline['peak_kb'] / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: DuckDuckGo result extraction
+
+Compares the tokenizer-based extractor with the regexes it replaced on the
+saved result pages in tests/fixtures/duckduckgo, on a large page built by
+repeating them, and on a page of result blocks that never complete (the
+worst case for the old DOTALL patterns).
+
+Run from the repository root:
+    python benchmarks/bench_duckduckgo_parser.py
+"""
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.search.html_results import parse_duckduckgo_results
+
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures" / "duckduckgo"
+REPEATS = 20
+
+# Patterns previously used by DuckDuckGoSearchProvider and DuckDuckGoLiteProvider
+LEGACY_HTML_PATTERN = r'<div class="result[^"]*"[^>]*>.*?<h[^>]*class="result__a"[^>]*href="([^"]*)">([^<]*)</[^>]*>.*?<a[^>]*class="result__snippet"[^>]*>(.*?)</a>.*?</div>'
+LEGACY_LITE_PATTERN = r'<a[^>]*class="[^"]*result-link[^"]*"[^>]*href="([^"]*)">([^<]*)</a>.*?<td[^>]*class="[^"]*result-snippet[^"]*"[^>]*>(.*?)</td>'
+
+
+def legacy_parse(html: str):
+    """URLs found by the old HTML pattern, falling back to the Lite one"""
+    matches = re.findall(LEGACY_HTML_PATTERN, html, re.DOTALL | re.IGNORECASE)
+    if not matches:
+        matches = re.findall(LEGACY_LITE_PATTERN, html, re.DOTALL | re.IGNORECASE)
+    return [url for url, _, _ in matches]
+
+
+def tokenizer_parse(html: str):
+    return [r.url for r in parse_duckduckgo_results(html)]
+
+
+def recall(found, expected):
+    if not expected:
+        return 1.0
+    return len(set(found) & set(expected)) / len(expected)
+
+
+def timed(fn, html, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        found = fn(html)
+    return (time.perf_counter() - start) / rounds * 1000, found
+
+
+def main():
+    expected = json.loads((FIXTURES / "expected.json").read_text())
+    pages = {name: ((FIXTURES / name).read_text(), urls) for name, urls in expected.items()}
+    
+    html_page, html_urls = pages["html_results.html"]
+    pages[f"html_results.html x{REPEATS}"] = (html_page * REPEATS, html_urls)
+    
+    # Result blocks without titles force the old pattern to rescan to the end of the page
+    unterminated = '<div class="result results_links">' + "<span>filler text</span>" * 20
+    pages["unterminated blocks"] = ("<html><body>" + unterminated * 400 + "</body></html>", [])
+    
+    print(f"{'page':<32}{'bytes':>10}{'regex ms':>12}{'regex recall':>14}{'tokenizer ms':>14}{'tokenizer recall':>18}")
+    for name, (html, urls) in pages.items():
+        rounds = 3 if len(html) > 100_000 else 20
+        legacy_ms, legacy_found = timed(legacy_parse, html, rounds)
+        new_ms, new_found = timed(tokenizer_parse, html, rounds)
+        print(
+            f"{name:<32}{len(html):>10}{legacy_ms:>12.2f}{recall(legacy_found, urls):>14.0%}"
+            f"{new_ms:>14.2f}{recall(new_found, urls):>18.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
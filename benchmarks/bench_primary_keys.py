@@ -0,0 +1,93 @@
+"""
+Benchmark: random (uuid4) versus time-ordered (UUIDv7) primary keys
+
+Appends messages in committed batches to a fresh messages table for each
+id strategy and reports insert throughput over the whole run and over its
+last tenth (when the table is largest), plus the on-disk size of the
+table and its indexes. Random keys split pages all over the primary key
+index; time-ordered keys append at its right-hand edge.
+
+SQLite by default; pass a database URL to run against a server instead
+(the tables are dropped and recreated there).
+
+Run from the repository root:
+    python benchmarks/bench_primary_keys.py [rows] [batch] [database_url]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import text
+
+from src.core.engines import create_database_engine
+from src.core.ids import new_id
+from src.models.database import Base, Conversation, Message
+
+STRATEGIES = {
+    "uuid4": lambda: str(uuid.uuid4()),
+    "uuid7": new_id,
+}
+MESSAGE_TEXT = "The quick brown fox jumps over the lazy dog. " * 4
+
+
+def storage_size(engine):
+    """Bytes used by the messages table and its indexes"""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+            return page_size * conn.execute(text("PRAGMA page_count")).scalar()
+        if engine.dialect.name == "postgresql":
+            return conn.execute(text("SELECT pg_total_relation_size('messages')")).scalar()
+    return 0
+
+
+def run(url, make_id, rows, batch):
+    engine = create_database_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    conversation_id = make_id()
+    with engine.begin() as conn:
+        conn.execute(Conversation.__table__.insert().values(
+            id=conversation_id, title="Benchmark", provider="openai", model="gpt-4o"
+        ))
+    
+    timings = []
+    for _ in range(rows // batch):
+        now = datetime.utcnow()
+        values = [
+            {"id": make_id(), "conversation_id": conversation_id, "role": "user", "content": MESSAGE_TEXT, "created_at": now}
+            for _ in range(batch)
+        ]
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(Message.__table__.insert(), values)
+        timings.append(time.perf_counter() - start)
+    
+    size = storage_size(engine)
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+    tail = timings[-max(1, len(timings) // 10):]
+    return batch * len(timings) / sum(timings), batch * len(tail) / sum(tail), size
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    url = sys.argv[3] if len(sys.argv) > 3 else None
+    print(f"{rows} rows in batches of {batch}, {url.split('://')[0] if url else 'sqlite'}")
+    print(f"{'ids':<8}{'rows/s':>10}{'last 10% rows/s':>17}{'size MB':>10}")
+    for name, make_id in STRATEGIES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            inserts, tail, size = run(url or f"sqlite:///{os.path.join(directory, 'bench.db')}", make_id, rows, batch)
+        print(f"{name:<8}{inserts:>10.0f}{tail:>17.0f}{size / 1024 / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: SQLite read/write throughput under contention
+
+Runs reader threads (load a conversation with its messages) against
+writer threads (append a message, which also bumps the conversation's
+message count) on a fresh database file for each storage profile, and
+reports operations per second, p95 latency and "database is locked"
+failures.
+
+Run from the repository root:
+    python benchmarks/bench_sqlite_contention.py [seconds] [readers] [writers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, selectinload, undefer
+
+from src.core.sqlite import SQLITE_PROFILES, configure_sqlite
+from src.models.database import Base, Conversation, Message
+
+CONVERSATIONS = 20
+MESSAGES_PER_CONVERSATION = 50
+MESSAGE_TEXT = "The quick brown fox jumps over the lazy dog. " * 20
+
+
+def seed(engine):
+    with Session(bind=engine) as db:
+        for index in range(CONVERSATIONS):
+            conversation = Conversation(id=f"conv-{index}", title=f"Conversation {index}", provider="openai", model="gpt-4o")
+            db.add(conversation)
+            for _ in range(MESSAGES_PER_CONVERSATION):
+                db.add(Message(id=str(uuid.uuid4()), conversation_id=conversation.id, role="user", content=MESSAGE_TEXT))
+        db.commit()
+
+
+def read(engine, index):
+    with Session(bind=engine) as db:
+        conversation = db.query(Conversation).options(
+            selectinload(Conversation.messages).options(undefer(Message.content))
+        ).filter(Conversation.id == f"conv-{index % CONVERSATIONS}").one()
+        return len(conversation.messages)
+
+
+def write(engine, index):
+    with Session(bind=engine) as db:
+        db.add(Message(
+            id=str(uuid.uuid4()),
+            conversation_id=f"conv-{index % CONVERSATIONS}",
+            role="assistant",
+            content=MESSAGE_TEXT
+        ))
+        db.commit()
+
+
+def worker(engine, operation, deadline, results):
+    index = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            operation(engine, index)
+            results["latencies"].append(time.perf_counter() - start)
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            results["locked"] += 1
+        index += 1
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(profile, seconds, readers, writers):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=readers + writers
+        )
+        configure_sqlite(engine, profile)
+        Base.metadata.create_all(engine)
+        seed(engine)
+        
+        reads = {"latencies": [], "locked": 0}
+        writes = {"latencies": [], "locked": 0}
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=worker, args=(engine, read, deadline, reads)) for _ in range(readers)]
+        threads += [threading.Thread(target=worker, args=(engine, write, deadline, writes)) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    return reads, writes
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    print(f"{readers} readers, {writers} writers, {seconds:.0f}s per profile")
+    print(f"{'profile':<10}{'reads/s':>10}{'read p95 ms':>13}{'writes/s':>10}{'write p95 ms':>14}{'locked':>8}")
+    for name, profile in SQLITE_PROFILES.items():
+        reads, writes = run(profile, seconds, readers, writers)
+        print(
+            f"{name:<10}{len(reads['latencies']) / seconds:>10.0f}"
+            f"{percentile(reads['latencies'], 0.95) * 1000:>13.1f}"
+            f"{len(writes['latencies']) / seconds:>10.0f}"
+            f"{percentile(writes['latencies'], 0.95) * 1000:>14.1f}"
+            f"{reads['locked'] + writes['locked']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
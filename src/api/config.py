@@ -20,6 +20,16 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./data/genzsmart.db"
+    DATABASE_READ_URL: Optional[str] = None  # Replica for list, search and export queries (None = DATABASE_URL)
+    DATABASE_POOL_SIZE: int = 5  # Connections kept open per engine
+    DATABASE_MAX_OVERFLOW: int = 10  # Extra connections under load
+    DATABASE_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DATABASE_POOL_RECYCLE: int = 1800  # Seconds before a server connection is replaced
+    DATABASE_STATEMENT_TIMEOUT: int = 30000  # Milliseconds per statement on Postgres/MySQL (0 = none)
+    DATABASE_EXPORT_BATCH_SIZE: int = 500  # Rows fetched per server-side cursor round trip
+    DATABASE_SQLITE_PROFILE: str = "balanced"  # legacy, balanced (WAL) or durable (WAL + fsync per commit)
+    DATABASE_CHECKPOINT_INTERVAL: float = 60.0  # Seconds between passive WAL checkpoints
+    DATABASE_WAL_TRUNCATE_BYTES: int = 64 * 1024 * 1024  # WAL size that triggers a truncating checkpoint
     
     # Security
     ENCRYPTION_KEY: Optional[str] = None
@@ -31,12 +41,38 @@ class Settings(BaseSettings):
         "text/plain",
         "text/markdown",
         "text/csv",
+        "text/tab-separated-values",
         "application/json",
+        "application/x-ndjson",
         "application/pdf",
         "image/png",
         "image/jpeg",
     ]
     
+    # File Processing
+    FILE_PROCESS_WORKERS: int = 2  # Worker processes for CPU-bound parsers (0 = threads only)
+    FILE_THREAD_WORKERS: int = 4  # Threads for I/O-bound parsers
+    FILE_JOB_CONCURRENCY: int = 4  # Files processed at once
+    FILE_JOB_TIMEOUT: float = 120.0  # Seconds per attempt
+    FILE_JOB_RETRIES: int = 2  # Extra attempts after a failure or timeout
+    FILE_EMBEDDING_MODEL: Optional[str] = None  # sentence-transformers model for hybrid chunk retrieval (None = BM25 only)
+    
+    # Bulk upload
+    BATCH_MAX_FILES: int = 100  # Files per multi-file upload request
+    ARCHIVE_MAX_SIZE: int = 100 * 1024 * 1024  # 100MB compressed .zip/.tar.gz upload
+    ARCHIVE_MAX_MEMBERS: int = 500  # Files taken from one archive
+    ARCHIVE_MAX_TOTAL_SIZE: int = 200 * 1024 * 1024  # Uncompressed bytes taken from one archive
+    
+    # Downloads
+    DOWNLOAD_CACHE_MAX_AGE: int = 365 * 24 * 3600  # Seconds browsers may reuse a content-addressed download
+    DOWNLOAD_SENDFILE_HEADER: Optional[str] = None  # "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache) to hand file bodies to the proxy
+    DOWNLOAD_SENDFILE_PREFIX: str = "/protected-uploads"  # Internal nginx location aliased to UPLOAD_DIR
+    
+    # Previews
+    RENDITION_CACHE_DIR: str = "./data/renditions"
+    RENDITION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB of thumbnails and page rasters, LRU-evicted
+    RENDITION_PROCESS_WORKERS: int = 2  # Worker processes for image and PDF rendering (0 = threads)
+    
     # CORS - Restrict origins for security
     CORS_ORIGINS: list = ["http://localhost:3000", "http://localhost:5173", "http://127.0.0.1:5173"]
     
@@ -58,3 +94,4 @@ def ensure_directories() -> None:
     """Ensure required directories exist"""
     os.makedirs("./data", exist_ok=True)
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(settings.RENDITION_CACHE_DIR, exist_ok=True)
@@ -2,10 +2,11 @@
 FastAPI dependencies
 """
 from typing import Generator
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
-from src.core.database import get_db as get_db_session
+from src.core.database import get_db as get_db_session, get_read_db as get_read_db_session
+from src.core.ids import is_id
 from src.models.database import ProviderConfig
 from src.services.ai import get_provider_class, BaseAIProvider
 from src.core.exceptions import ProviderNotConfiguredError
@@ -16,6 +17,42 @@ def get_db() -> Generator[Session, None, None]:
     yield from get_db_session()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """Get read-only database session dependency (routed to the replica when configured)"""
+    yield from get_read_db_session()
+
+
+# Request parameters naming rows, and what to call the row in a 404
+ROW_ID_PARAMS = {
+    "conversation_id": "Conversation",
+    "message_id": "Message",
+    "file_id": "File",
+    "fact_id": "Memory fact",
+}
+
+
+def check_row_ids(request: Request, db: Session = Depends(get_read_db)) -> None:
+    """
+    Answer 404 for row ids the database cannot hold
+    
+    Postgres stores ids as uuid, where any other value fails the bind
+    instead of matching no rows, so such ids never reach a query.
+    
+    Raises:
+        HTTPException: If a path or query id is not a UUID on Postgres
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for name, label in ROW_ID_PARAMS.items():
+        for params in (request.path_params, request.query_params):
+            value = params.get(name)
+            if value is not None and not is_id(value):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"{label} not found: {value}"
+                )
+
+
 async def get_provider(
     provider_id: str,
     db: Session = Depends(get_db)
@@ -26,10 +63,10 @@ async def get_provider(
     Args:
         provider_id: Provider identifier
         db: Database session
-        
+    
     Returns:
         Configured provider instance
-        
+    
     Raises:
         HTTPException: If provider not found or not configured
     """
@@ -19,8 +19,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.api.config import settings, ensure_directories
 from src.api.routes import router as api_router
-from src.core.database import initialize_database
+from src.core.database import initialize_database, get_db_session, close_database
 from src.core.exceptions import GenZSmartException
+from src.core.sqlite import get_wal_checkpointer
+from src.services.search import get_search_cache
+from src.services.search.http import close_http_client
+from src.services.files.blobs import BlobStore
+from src.services.files.worker import get_file_queue
+from src.services.files.parsers.image import get_ocr_executor
+from src.services.files.renditions import get_rendition_service
 
 
 @asynccontextmanager
@@ -38,12 +45,34 @@ async def lifespan(app: FastAPI):
     
     # Initialize database
     initialize_database()
-    print("Database initialized")
+    print(f"Database initialized (SQLite profile: {settings.DATABASE_SQLITE_PROFILE})")
+    
+    # Drop upload blobs no file refers to any more
+    with get_db_session() as db:
+        removed = BlobStore(db, settings.UPLOAD_DIR).collect_garbage()
+    if removed:
+        print(f"Removed {len(removed)} orphaned upload blobs")
+    
+    # Start background expiry of cached search results
+    get_search_cache().start_sweeper()
+    
+    # Start background text extraction (requeues files left in processing)
+    get_file_queue().start()
+    
+    # Keep the SQLite write-ahead log short
+    get_wal_checkpointer().start()
     
     yield
     
     # Shutdown
     print("GenZ Smart API shutting down...")
+    await get_search_cache().stop_sweeper()
+    await get_file_queue().stop()
+    get_ocr_executor().shutdown()
+    get_rendition_service().shutdown()
+    await close_http_client()
+    await get_wal_checkpointer().stop()
+    close_database()
 
 
 # Create FastAPI app
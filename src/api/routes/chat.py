@@ -1,27 +1,129 @@
 """
 Chat API Routes
 """
-import uuid
+import asyncio
+import json
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.orm import Session, defaultload, undefer
+from sqlalchemy import and_, or_, select, text
 
-from src.api.dependencies import get_db, get_provider, get_provider_manager, ProviderManager
-from src.models.database import Conversation, Message, ProviderConfig
+from src.api.config import settings
+
+from src.api.dependencies import check_row_ids, get_db, get_read_db, get_provider, get_provider_manager, ProviderManager
+from src.models.database import Conversation, Message, ProviderConfig, File, message_attachments
 from src.models.schemas import (
     ConversationCreate, ConversationUpdate, ConversationResponse,
     MessageCreate, MessageResponse, StreamRequest,
     ConversationListResponse, ConversationDetailResponse,
     BaseResponse
 )
-from src.services.ai import Message as AIMessage, MessageRole, ChatCompletionRequest
+from src.services.ai import (
+    Message as AIMessage, MessageRole, ChatCompletionRequest, BaseAIProvider, ImageAttachment
+)
+from src.services.ai.vision import is_image_file
+from src.services.agent import AgentContext, create_agent
 from src.core.exceptions import ProviderError, NotFoundError
+from src.core.ids import new_id
+
+router = APIRouter(prefix="/api/v1", tags=["chat"], dependencies=[Depends(check_row_ids)])
+
+# Message.content is deferred; queries that render or replay the history
+# load it with the messages instead of one query per message
+WITH_MESSAGE_CONTENT = defaultload(Conversation.messages).undefer(Message.content)
+
+# Images sent per request; older ones reach the model only as extracted text
+MAX_REQUEST_IMAGES = 8
+
+
+def attach_files(
+    db: Session,
+    conversation: Conversation,
+    message: Message,
+    file_ids: Optional[List[str]]
+) -> List[File]:
+    """Link files sent with a message to it and to its conversation, so later turns can retrieve from them"""
+    if not file_ids:
+        return []
+    files = db.query(File).filter(File.id.in_(file_ids)).all()
+    message.attachments.extend(files)
+    for file in files:
+        if file not in conversation.files:
+            conversation.files.append(file)
+    return files
+
+
+def image_attachments(files: List[File]) -> List[ImageAttachment]:
+    """Attached files that can be sent to vision models as images"""
+    return [
+        ImageAttachment(
+            path=file.storage_path,
+            mime_type=file.mime_type,
+            content_hash=file.content_hash,
+            name=file.original_name
+        )
+        for file in files
+        if is_image_file(file.mime_type, file.original_name)
+    ][:MAX_REQUEST_IMAGES]
 
-router = APIRouter(prefix="/api/v1", tags=["chat"])
+
+async def build_history(
+    db: Session,
+    provider: BaseAIProvider,
+    model: Optional[str],
+    messages: List[Message]
+) -> List[AIMessage]:
+    """
+    Provider messages for stored turns, with the images of the latest ones
+    
+    For models that take images, the attachments of every turn are loaded
+    with one query and the newest MAX_REQUEST_IMAGES images are sent with
+    the turns they belong to. Each image is encoded once per provider
+    profile, so repeating it on later turns costs a cache lookup.
+    
+    Args:
+        db: Database session
+        provider: Target provider
+        model: Target model
+        messages: Stored messages, oldest first
+    
+    Returns:
+        Messages for a ChatCompletionRequest
+    """
+    images = {}
+    if provider.supports_vision(model):
+        user_ids = [msg.id for msg in messages if msg.role == "user"]
+        files_by_message = {}
+        if user_ids:
+            rows = db.query(message_attachments.c.message_id, File).join(
+                File, File.id == message_attachments.c.file_id
+            ).filter(message_attachments.c.message_id.in_(user_ids)).all()
+            for message_id, file in rows:
+                files_by_message.setdefault(message_id, []).append(file)
+        
+        # Spend the image budget on the newest turns first
+        pending = []
+        remaining = MAX_REQUEST_IMAGES
+        for msg in reversed(messages):
+            if remaining <= 0:
+                break
+            attachments = image_attachments(files_by_message.get(msg.id, []))[:remaining]
+            if attachments:
+                pending.append((msg.id, attachments))
+                remaining -= len(attachments)
+        prepared = await asyncio.gather(
+            *(provider.prepare_images(attachments, model) for _, attachments in pending)
+        )
+        images = {message_id: parts for (message_id, _), parts in zip(pending, prepared) if parts}
+    
+    history = []
+    for msg in messages:
+        role = MessageRole(msg.role) if msg.role in [r.value for r in MessageRole] else MessageRole.USER
+        history.append(AIMessage(role=role, content=msg.content, images=images.get(msg.id)))
+    return history
 
 
 @router.get("/conversations", response_model=ConversationListResponse)
@@ -29,7 +131,7 @@ async def list_conversations(
     page: int = 1,
     limit: int = 20,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List all conversations"""
     query = db.query(Conversation)
@@ -82,7 +184,7 @@ async def create_conversation(
             )
     
     conversation = Conversation(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         title=request.title or "New Conversation",
         provider=request.provider,
         model=request.model or provider_class.default_model,
@@ -96,7 +198,7 @@ async def create_conversation(
     # Add system message if system prompt provided
     if request.system_prompt:
         system_message = Message(
-            id=str(uuid.uuid4()),
+            id=new_id(),
             conversation_id=conversation.id,
             role="system",
             content=request.system_prompt
@@ -116,7 +218,7 @@ async def get_conversation(
     db: Session = Depends(get_db)
 ):
     """Get a specific conversation with messages"""
-    conversation = db.query(Conversation).filter(
+    conversation = db.query(Conversation).options(WITH_MESSAGE_CONTENT).filter(
         Conversation.id == conversation_id
     ).first()
     
@@ -131,6 +233,55 @@ async def get_conversation(
     )
 
 
+@router.get("/conversations/{conversation_id}/export")
+async def export_conversation(
+    conversation_id: str,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Export a conversation as NDJSON: the conversation, then one line per message
+    
+    Messages are streamed from a server-side cursor (on Postgres) in
+    batches of DATABASE_EXPORT_BATCH_SIZE, so long histories are never
+    held in memory.
+    """
+    conversation = db.query(Conversation).filter(
+        Conversation.id == conversation_id
+    ).first()
+    
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Conversation not found: {conversation_id}"
+        )
+    
+    header = conversation.to_dict()
+    
+    # Runs in the threadpool; the session stays usable after the
+    # dependency closes it and is closed again once the stream ends
+    def lines():
+        try:
+            yield json.dumps({"conversation": header}) + "\n"
+            result = db.execute(
+                select(Message)
+                .options(undefer(Message.content))
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.created_at, Message.id)
+                .execution_options(yield_per=settings.DATABASE_EXPORT_BATCH_SIZE)
+            )
+            for message in result.scalars():
+                yield json.dumps({"message": message.to_dict()}) + "\n"
+                db.expunge(message)
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="conversation-{conversation_id}.ndjson"'}
+    )
+
+
 @router.patch("/conversations/{conversation_id}", response_model=ConversationDetailResponse)
 async def update_conversation(
     conversation_id: str,
@@ -138,7 +289,7 @@ async def update_conversation(
     db: Session = Depends(get_db)
 ):
     """Update conversation metadata"""
-    conversation = db.query(Conversation).filter(
+    conversation = db.query(Conversation).options(WITH_MESSAGE_CONTENT).filter(
         Conversation.id == conversation_id
     ).first()
     
@@ -192,7 +343,7 @@ async def send_message(
     provider_manager: ProviderManager = Depends(get_provider_manager)
 ):
     """Send a message and get a response (non-streaming)"""
-    conversation = db.query(Conversation).filter(
+    conversation = db.query(Conversation).options(WITH_MESSAGE_CONTENT).filter(
         Conversation.id == conversation_id
     ).first()
     
@@ -217,19 +368,17 @@ async def send_message(
     
     # Save user message
     user_message = Message(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         conversation_id=conversation_id,
         role="user",
         content=request.content
     )
+    attached = attach_files(db, conversation, user_message, request.file_ids)
     db.add(user_message)
     db.commit()
     
     # Build message history
-    messages = []
-    for msg in conversation.messages:
-        role = MessageRole(msg.role) if msg.role in [r.value for r in MessageRole] else MessageRole.USER
-        messages.append(AIMessage(role=role, content=msg.content))
+    messages = await build_history(db, provider, model, conversation.messages)
     
     # Add current message
     messages.append(AIMessage(role=MessageRole.USER, content=request.content))
@@ -246,11 +395,11 @@ async def send_message(
     
     try:
         # Get response from provider
-        response = await provider.chat_complete(completion_request)
+        response = await provider.chat_complete_coalesced(completion_request)
         
         # Save assistant message
         assistant_message = Message(
-            id=str(uuid.uuid4()),
+            id=new_id(),
             conversation_id=conversation_id,
             role="assistant",
             content=response.content,
@@ -277,7 +426,7 @@ async def send_message(
                 }
             }
         )
-        
+    
     except ProviderError as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -293,7 +442,7 @@ async def stream_message(
     provider_manager: ProviderManager = Depends(get_provider_manager)
 ):
     """Send a message and stream the response (SSE)"""
-    conversation = db.query(Conversation).filter(
+    conversation = db.query(Conversation).options(WITH_MESSAGE_CONTENT).filter(
         Conversation.id == conversation_id
     ).first()
     
@@ -318,19 +467,17 @@ async def stream_message(
     
     # Save user message
     user_message = Message(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         conversation_id=conversation_id,
         role="user",
         content=request.content
     )
+    attached = attach_files(db, conversation, user_message, request.file_ids)
     db.add(user_message)
     db.commit()
     
     # Build message history
-    messages = []
-    for msg in conversation.messages:
-        role = MessageRole(msg.role) if msg.role in [r.value for r in MessageRole] else MessageRole.USER
-        messages.append(AIMessage(role=role, content=msg.content))
+    messages = await build_history(db, provider, model, conversation.messages)
     
     # Create completion request
     completion_request = ChatCompletionRequest(
@@ -344,7 +491,7 @@ async def stream_message(
     
     async def event_generator():
         """Generate SSE events"""
-        message_id = str(uuid.uuid4())
+        message_id = new_id()
         full_content = ""
         
         # Send start event
@@ -375,7 +522,7 @@ async def stream_message(
                     db.commit()
                     
                     yield f"event: done\ndata: {{\"finish_reason\": \"{chunk.finish_reason or 'stop'}\"}}\n\n"
-                    
+        
         except Exception as e:
             # Log the actual error but send sanitized message to client
             import logging
@@ -383,8 +530,72 @@ async def stream_message(
             logger.error(f"Stream error for conversation {conversation_id}: {str(e)}")
             yield f"event: error\ndata: {{\"error\": \"An error occurred while processing your request\", \"code\": \"STREAM_ERROR\"}}\n\n"
     
+    async def agent_event_generator():
+        """Generate SSE events from the streaming agent pipeline"""
+        message_id = new_id()
+        
+        # Send start event
+        yield f"event: start\ndata: {{\"message_id\": \"{message_id}\", \"timestamp\": \"{datetime.utcnow().isoformat()}\"}}\n\n"
+        
+        history = [
+            {"role": msg.role, "content": msg.content}
+            for msg in conversation.messages
+            if msg.id != user_message.id and msg.role in ("user", "assistant")
+        ]
+        agent = create_agent(provider, db)
+        
+        try:
+            context = AgentContext(
+                conversation_id=conversation_id,
+                user_message=request.content,
+                system_prompt=conversation.system_prompt or "",
+                enable_search=request.enable_search,
+                attached_files=request.file_ids or [],
+                images=await provider.prepare_images(image_attachments(attached), model),
+                model=model,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens
+            )
+            index = 0
+            async for event in agent.stream_events(context, history):
+                if event.type == "token":
+                    yield f"event: token\ndata: {{\"token\": {json.dumps(event.data['token'])}, \"index\": {index}}}\n\n"
+                    index += 1
+                
+                elif event.type in ("tool_start", "tool_result"):
+                    yield f"event: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+                
+                elif event.type == "done":
+                    # Save assistant message
+                    assistant_message = Message(
+                        id=message_id,
+                        conversation_id=conversation_id,
+                        role="assistant",
+                        content=event.data["content"],
+                        meta_data={
+                            "provider": provider_id,
+                            "model": model,
+                            "finish_reason": event.data["finish_reason"],
+                            "tool_calls": [
+                                {"tool": call["tool"], "arguments": call["arguments"], "executed": call["executed"]}
+                                for call in event.data["tool_calls"]
+                            ],
+                            "timings": event.data["timings"]
+                        }
+                    )
+                    db.add(assistant_message)
+                    db.commit()
+                    
+                    yield f"event: done\ndata: {json.dumps({'finish_reason': event.data['finish_reason'], 'timings': event.data['timings']})}\n\n"
+        
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Agent stream error for conversation {conversation_id}: {str(e)}")
+            yield f"event: error\ndata: {{\"error\": \"An error occurred while processing your request\", \"code\": \"STREAM_ERROR\"}}\n\n"
+    
     return StreamingResponse(
-        event_generator(),
+        agent_event_generator() if request.use_agent else event_generator(),
         media_type="text/event-stream"
     )
 
@@ -407,10 +618,14 @@ async def delete_message(
             detail=f"Message not found: {message_id}"
         )
     
-    # Delete this message and all subsequent messages
+    # Delete this message and all subsequent messages, in (created_at, id)
+    # order so a message sharing the timestamp but written earlier survives
     db.query(Message).filter(
         Message.conversation_id == conversation_id,
-        Message.created_at >= message.created_at
+        or_(
+            Message.created_at > message.created_at,
+            and_(Message.created_at == message.created_at, Message.id >= message.id)
+        )
     ).delete()
     
     db.commit()
@@ -1,24 +1,44 @@
 """
 File API Routes
 """
+import asyncio
+import json
 import os
 import uuid
 import shutil
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File as FastAPIFile
+from fastapi.responses import FileResponse as DiskFileResponse, StreamingResponse
+from starlette.datastructures import Headers
+from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer
 
-from src.api.dependencies import get_db
+from src.api.dependencies import check_row_ids, get_db, get_read_db
 from src.api.config import settings
+from src.core.ids import new_id
+from src.core.exceptions import FileError
 from src.models.database import File as FileModel, Conversation
 from src.models.schemas import (
     FileUploadResponse, FileListResponse,
     FileResponse, BaseResponse
 )
+from src.services.files.blobs import BlobStore, apply_blob_parse
+from src.services.files.ingest import (
+    StagedFile, archive_kind, guess_mime_type, register_files, stage_archive
+)
+from src.services.files.parsers import is_file_supported
+from src.services.files.parsers.pdf import PDFParser, parse_page_spec
+from src.services.files.renditions import RenditionSpec, get_rendition_service, rendition_source_kind
+from src.services.files.storage import save_upload
+from src.services.files.worker import get_file_queue
+
+router = APIRouter(prefix="/api/v1/files", tags=["files"], dependencies=[Depends(check_row_ids)])
 
-router = APIRouter(prefix="/api/v1/files", tags=["files"])
+# Seconds between batch progress snapshots on the event stream
+BATCH_PROGRESS_INTERVAL = 0.5
 
 
 def get_file_extension(filename: str) -> str:
@@ -31,6 +51,39 @@ def is_allowed_file(content_type: str) -> bool:
     return content_type in settings.ALLOWED_FILE_TYPES
 
 
+def is_not_modified(request_headers: Headers, etag: str, last_modified: float) -> bool:
+    """
+    Evaluate If-None-Match and If-Modified-Since for a GET or HEAD
+    
+    If-None-Match takes precedence when present (RFC 9110, section 13.2.2)
+    and uses weak comparison, so a W/ prefix from a proxy still matches.
+    
+    Args:
+        request_headers: Incoming request headers
+        etag: Quoted entity tag of the current representation
+        last_modified: Modification time of the file (Unix seconds)
+    
+    Returns:
+        True when a 304 Not Modified can be sent instead of the body
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+    
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= since.timestamp()
+    return False
+
+
 @router.post("/upload", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_file(
     file: UploadFile = FastAPIFile(...),
@@ -45,59 +98,73 @@ async def upload_file(
             detail=f"File type '{file.content_type}' not allowed"
         )
     
-    # Read file content
-    content = await file.read()
-    
-    # Validate file size
-    if len(content) > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Max size: {settings.MAX_FILE_SIZE} bytes"
-        )
-    
     # Generate unique filename
-    file_id = str(uuid.uuid4())
+    file_id = new_id()
     extension = get_file_extension(file.filename or "")
     filename = f"{file_id}{extension}"
     storage_path = os.path.join(settings.UPLOAD_DIR, filename)
     
-    # Save file
+    # Stream to disk in chunks, enforcing the size limit as bytes arrive
     try:
-        with open(storage_path, "wb") as f:
-            f.write(content)
+        stored = await save_upload(file, storage_path, settings.MAX_FILE_SIZE)
+    except FileError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file: {str(e)}"
         )
     
-    # Create database record
-    file_record = FileModel(
-        id=file_id,
-        filename=filename,
-        original_name=file.filename or "unnamed",
-        mime_type=file.content_type or "application/octet-stream",
-        size=len(content),
-        status="processing",
-        storage_path=storage_path
-    )
-    
-    # Associate with conversation if provided
-    if conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id
-        ).first()
-        if conversation:
-            file_record.conversations.append(conversation)
-    
-    db.add(file_record)
-    db.commit()
-    db.refresh(file_record)
+    # Store identical bytes once, shared by every file that has them
+    blob_store = BlobStore(db, settings.UPLOAD_DIR)
+    blob = None
+    try:
+        blob = blob_store.add(stored, extension)
+        
+        # Create database record
+        file_record = FileModel(
+            id=file_id,
+            filename=filename,
+            original_name=file.filename or "unnamed",
+            mime_type=file.content_type or "application/octet-stream",
+            size=blob.size,
+            status="processing",
+            storage_path=blob.storage_path,
+            content_hash=blob.content_hash
+        )
+        
+        # Reuse the text extracted from an earlier upload of the same bytes
+        apply_blob_parse(file_record, blob)
+        
+        # Associate with conversation if provided
+        if conversation_id:
+            conversation = db.query(Conversation).filter(
+                Conversation.id == conversation_id
+            ).first()
+            if conversation:
+                file_record.conversations.append(conversation)
+        
+        db.add(file_record)
+        db.commit()
+        db.refresh(file_record)
+    except Exception as e:
+        db.rollback()
+        if os.path.exists(stored.path):
+            os.remove(stored.path)
+        if blob is not None:
+            # Give back the reference taken for the row that was never created
+            blob_store.release(blob.content_hash)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store file: {str(e)}"
+        )
     
-    # TODO: Trigger async file processing (text extraction, etc.)
-    # For now, mark as ready
-    file_record.status = "ready"
-    db.commit()
+    # Extract text in the background; the client polls /{file_id}/status
+    if file_record.status != "ready":
+        get_file_queue().enqueue(file_record.id, file_record.storage_path)
     
     return FileUploadResponse(
         data={
@@ -107,18 +174,152 @@ async def upload_file(
             "mime_type": file_record.mime_type,
             "size": file_record.size,
             "status": file_record.status,
+            "content_hash": file_record.content_hash,
             "created_at": file_record.created_at.isoformat() if file_record.created_at else None
         }
     )
 
 
+@router.post("/batch", response_model=BaseResponse, status_code=status.HTTP_201_CREATED)
+async def upload_batch(
+    files: List[UploadFile] = FastAPIFile(...),
+    conversation_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Upload several files, or .zip/.tar.gz archives of them, in one request
+    
+    Archive members are streamed into storage without extracting the
+    archive; hidden, unsupported and oversized members are skipped and
+    reported. All files are registered in one transaction and parsed by
+    the background workers; follow /batches/{batch_id}/events for progress.
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. Max per request: {settings.BATCH_MAX_FILES}"
+        )
+    
+    staged: List[StagedFile] = []
+    skipped = []
+    try:
+        for upload in files:
+            name = upload.filename or "unnamed"
+            extension = get_file_extension(name)
+            
+            if archive_kind(name):
+                archive_path = os.path.join(settings.UPLOAD_DIR, f".archive-{uuid.uuid4()}{extension}")
+                try:
+                    await save_upload(upload, archive_path, settings.ARCHIVE_MAX_SIZE)
+                    result = await asyncio.to_thread(
+                        stage_archive,
+                        archive_path,
+                        settings.UPLOAD_DIR,
+                        settings.MAX_FILE_SIZE,
+                        settings.ARCHIVE_MAX_MEMBERS,
+                        settings.ARCHIVE_MAX_TOTAL_SIZE
+                    )
+                except FileError as e:
+                    skipped.append({"name": name, "reason": e.message})
+                    continue
+                finally:
+                    if os.path.exists(archive_path):
+                        os.remove(archive_path)
+                staged.extend(result.files)
+                skipped.extend(result.skipped)
+                continue
+            
+            if not (is_allowed_file(upload.content_type or "") or is_file_supported(name)):
+                skipped.append({"name": name, "reason": "unsupported file type"})
+                continue
+            try:
+                stored = await save_upload(
+                    upload,
+                    os.path.join(settings.UPLOAD_DIR, f".upload-{uuid.uuid4()}{extension}"),
+                    settings.MAX_FILE_SIZE
+                )
+            except FileError as e:
+                skipped.append({"name": name, "reason": e.message})
+                continue
+            staged.append(StagedFile(
+                name=name,
+                stored=stored,
+                extension=extension,
+                mime_type=upload.content_type or guess_mime_type(name)
+            ))
+        
+        records = register_files(db, settings.UPLOAD_DIR, staged, conversation_id)
+    except Exception as e:
+        for item in staged:
+            if os.path.exists(item.stored.path):
+                os.remove(item.stored.path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store files: {str(e)}"
+        )
+    
+    queue = get_file_queue()
+    batch_id = queue.enqueue_batch(
+        [(r.id, r.storage_path) for r in records if r.status != "ready"],
+        ready=[r.id for r in records if r.status == "ready"]
+    )
+    
+    return BaseResponse(data={
+        "batch_id": batch_id,
+        "files": [r.to_dict() for r in records],
+        "skipped": skipped,
+        "progress": queue.get_batch(batch_id)
+    })
+
+
+@router.get("/batches/{batch_id}", response_model=BaseResponse)
+async def get_batch_progress(batch_id: str):
+    """Get aggregate processing progress of an upload batch"""
+    progress = get_file_queue().get_batch(batch_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch not found: {batch_id}"
+        )
+    return BaseResponse(data=progress)
+
+
+@router.get("/batches/{batch_id}/events")
+async def stream_batch_progress(batch_id: str):
+    """Stream aggregate progress of an upload batch as server-sent events"""
+    queue = get_file_queue()
+    if queue.get_batch(batch_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch not found: {batch_id}"
+        )
+    
+    async def event_generator():
+        last = None
+        while True:
+            progress = queue.get_batch(batch_id)
+            if progress is None:
+                yield f"event: error\ndata: {{\"error\": \"Batch expired\", \"batch_id\": \"{batch_id}\"}}\n\n"
+                return
+            snapshot = json.dumps(progress)
+            if snapshot != last:
+                yield f"event: progress\ndata: {snapshot}\n\n"
+                last = snapshot
+            if progress["finished"]:
+                yield f"event: done\ndata: {json.dumps({k: v for k, v in progress.items() if k != 'files'})}\n\n"
+                return
+            await asyncio.sleep(BATCH_PROGRESS_INTERVAL)
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
 @router.get("", response_model=FileListResponse)
 async def list_files(
     conversation_id: Optional[str] = None,
     status: Optional[str] = None,
     page: int = 1,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List uploaded files"""
     query = db.query(FileModel)
@@ -131,7 +332,8 @@ async def list_files(
     if status:
         query = query.filter(FileModel.status == status)
     
-    total = query.count()
+    # Count over the id alone; Query.count() would wrap the full row
+    total = query.with_entities(func.count(FileModel.id)).scalar()
     files = query.order_by(FileModel.created_at.desc()).offset(
         (page - 1) * limit
     ).limit(limit).all()
@@ -155,7 +357,7 @@ async def get_file(
     db: Session = Depends(get_db)
 ):
     """Get file metadata"""
-    file_record = db.query(FileModel).filter(
+    file_record = db.query(FileModel).options(undefer(FileModel.extracted_text)).filter(
         FileModel.id == file_id
     ).first()
     
@@ -171,15 +373,91 @@ async def get_file(
     return BaseResponse(data=data)
 
 
-@router.get("/{file_id}/download")
-async def download_file(
+@router.get("/{file_id}/status", response_model=BaseResponse)
+async def get_file_status(
     file_id: str,
     db: Session = Depends(get_db)
 ):
-    """Download the original file"""
-    from fastapi.responses import FileResponse
-    import os
+    """Get processing status and progress of a file"""
+    file_record = db.query(FileModel).filter(
+        FileModel.id == file_id
+    ).first()
+    
+    if not file_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File not found: {file_id}"
+        )
     
+    queue = get_file_queue()
+    job = queue.get_job(file_id)
+    
+    return BaseResponse(data={
+        "id": file_record.id,
+        "status": file_record.status,
+        "word_count": file_record.word_count,
+        "error_message": file_record.error_message,
+        "job": job.to_dict() if job else None,
+        "queue": queue.stats()
+    })
+
+
+@router.get("/{file_id}/pages", response_model=BaseResponse)
+async def get_file_pages(
+    file_id: str,
+    pages: str = "1",
+    db: Session = Depends(get_db)
+):
+    """Extract selected pages of a PDF, e.g. ?pages=40 or ?pages=1-5,9"""
+    file_record = db.query(FileModel).filter(
+        FileModel.id == file_id
+    ).first()
+    
+    if not file_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File not found: {file_id}"
+        )
+    
+    if get_file_extension(file_record.storage_path) != ".pdf":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Page selection is only supported for PDF files"
+        )
+    
+    parser = PDFParser()
+    try:
+        info = await asyncio.to_thread(parser.get_document_info, file_record.storage_path)
+        numbers = parse_page_spec(pages, info["pages"])
+        selected = await asyncio.to_thread(
+            lambda: list(parser.iter_pages(file_record.storage_path, numbers))
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to parse PDF: {str(e)}"
+        )
+    
+    return BaseResponse(data={
+        "id": file_record.id,
+        "page_count": info["pages"],
+        "pages": [page.to_dict() for page in selected]
+    })
+
+
+def get_stored_file(db: Session, file_id: str) -> FileModel:
+    """
+    Look up a file whose bytes may be served
+    
+    Raises:
+        HTTPException: 404 for unknown files, 403 when the stored path
+            lies outside the upload directory
+    """
     file_record = db.query(FileModel).filter(
         FileModel.id == file_id
     ).first()
@@ -195,23 +473,153 @@ async def download_file(
     upload_dir = os.path.abspath(settings.UPLOAD_DIR)
     
     # Ensure the file is within the allowed upload directory
-    if not storage_path.startswith(upload_dir):
+    if not storage_path.startswith(upload_dir + os.sep):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access to this file is denied"
         )
+    return file_record
+
+
+@router.api_route("/{file_id}/download", methods=["GET", "HEAD"])
+async def download_file(
+    file_id: str,
+    request: Request,
+    inline: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Download the original file
     
-    if not os.path.exists(storage_path):
+    Files with a content hash get a strong ETag and a long-lived immutable
+    Cache-Control, since their bytes can never change; older files fall back
+    to a stat-based ETag and revalidation. Conditional requests are answered
+    with 304, and Range/If-Range requests with partial content (by
+    Starlette's FileResponse, hence fastapi>=0.115.2), so PDF viewers can
+    seek without fetching the whole file. Bodies go out through
+    ASGI pathsend when the server supports it, or through the reverse proxy
+    when DOWNLOAD_SENDFILE_HEADER is configured.
+    
+    Args:
+        inline: Serve with Content-Disposition inline, for in-browser previews
+    """
+    file_record = get_stored_file(db, file_id)
+    storage_path = os.path.abspath(file_record.storage_path)
+    upload_dir = os.path.abspath(settings.UPLOAD_DIR)
+    
+    try:
+        stat_result = os.stat(storage_path)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found on disk"
         )
     
-    return FileResponse(
+    headers = {}
+    if file_record.content_hash:
+        headers["etag"] = f'"{file_record.content_hash}"'
+        headers["cache-control"] = f"private, max-age={settings.DOWNLOAD_CACHE_MAX_AGE}, immutable"
+    else:
+        headers["cache-control"] = "private, no-cache"
+    
+    response = DiskFileResponse(
         path=storage_path,
         filename=file_record.original_name,
-        media_type=file_record.mime_type
+        media_type=file_record.mime_type,
+        headers=headers,
+        stat_result=stat_result,
+        content_disposition_type="inline" if inline else "attachment"
     )
+    validators = {
+        key: response.headers[key]
+        for key in ("etag", "last-modified", "cache-control")
+    }
+    
+    if is_not_modified(request.headers, validators["etag"], stat_result.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    
+    if settings.DOWNLOAD_SENDFILE_HEADER:
+        # The proxy sends the body (and serves ranges) with sendfile(2)
+        if settings.DOWNLOAD_SENDFILE_HEADER.lower() == "x-accel-redirect":
+            relative = os.path.relpath(storage_path, upload_dir).replace(os.sep, "/")
+            target = f"{settings.DOWNLOAD_SENDFILE_PREFIX.rstrip('/')}/{relative}"
+        else:
+            target = storage_path
+        return Response(
+            media_type=response.media_type,
+            headers={
+                **validators,
+                "content-disposition": response.headers["content-disposition"],
+                settings.DOWNLOAD_SENDFILE_HEADER: target
+            }
+        )
+    
+    return response
+
+
+@router.api_route("/{file_id}/renditions/{preset}", methods=["GET", "HEAD"])
+async def get_file_rendition(
+    file_id: str,
+    preset: str,
+    request: Request,
+    format: Optional[str] = None,
+    page: int = 1,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a downscaled preview of an image or a page of a PDF
+    
+    Renditions are rendered once per (content, preset, format, page) in
+    worker processes and served from a disk cache, so attachment lists
+    load thumbnails of a few kilobytes instead of the originals. Without
+    an explicit format, WebP is sent to clients that accept it.
+    
+    Args:
+        preset: "thumb" (256px) or "preview" (1024px) bounding box
+        format: "webp" or "jpeg"
+        page: PDF page to render (1-based)
+    """
+    file_record = get_stored_file(db, file_id)
+    kind = rendition_source_kind(file_record.mime_type, file_record.original_name)
+    if kind is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"No preview available for {file_record.mime_type}"
+        )
+    
+    if format is None:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    try:
+        spec = RenditionSpec.preset(preset, format, page)
+    except FileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    
+    # Legacy rows without a hash are keyed by id; stored uploads never change either way
+    source_key = file_record.content_hash or file_record.id
+    headers = {
+        "etag": f'"{source_key}-{spec.key}"',
+        "cache-control": f"private, max-age={settings.DOWNLOAD_CACHE_MAX_AGE}, immutable",
+        "vary": "Accept"
+    }
+    
+    # Answered before rendering, so revalidation never touches the image.
+    # A rendition never changes, so any copy the client holds is current.
+    if is_not_modified(request.headers, headers["etag"], last_modified=0):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    storage_path = os.path.abspath(file_record.storage_path)
+    if not os.path.exists(storage_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found on disk"
+        )
+    
+    try:
+        path = await get_rendition_service().get(source_key, storage_path, kind, spec)
+    except FileError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.message)
+    
+    return DiskFileResponse(path=path, media_type=spec.media_type, headers=headers)
 
 
 @router.delete("/{file_id}", response_model=BaseResponse)
@@ -230,16 +638,23 @@ async def delete_file(
             detail=f"File not found: {file_id}"
         )
     
-    # Delete from disk
-    try:
-        if os.path.exists(file_record.storage_path):
-            os.remove(file_record.storage_path)
-    except Exception as e:
-        # Log error but continue with DB deletion
-        print(f"Failed to delete file from disk: {e}")
+    content_hash = file_record.content_hash
+    storage_path = file_record.storage_path
     
     # Delete from database
     db.delete(file_record)
     db.commit()
     
+    if content_hash:
+        # Shared contents are removed with the last file that references them
+        BlobStore(db, settings.UPLOAD_DIR).release(content_hash)
+    else:
+        # Delete from disk
+        try:
+            if os.path.exists(storage_path):
+                os.remove(storage_path)
+        except Exception as e:
+            # Log error but continue
+            print(f"Failed to delete file from disk: {e}")
+    
     return BaseResponse(message="File deleted successfully")
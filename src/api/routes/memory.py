@@ -5,23 +5,27 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from src.api.dependencies import get_db
+from src.api.dependencies import check_row_ids, get_db, get_read_db
+from src.core.ids import new_id
 from src.models.database import MemoryFact, Conversation
 from src.models.schemas import (
     MemoryListResponse, MemorySearchRequest, MemorySearchResponse,
     BaseResponse
 )
 
-router = APIRouter(prefix="/api/v1/memory", tags=["memory"])
+router = APIRouter(prefix="/api/v1/memory", tags=["memory"], dependencies=[Depends(check_row_ids)])
+
+SEARCH_PREVIEW_CHARS = 200  # Message text returned per search hit
 
 
 @router.get("/facts", response_model=MemoryListResponse)
 async def list_memory_facts(
     category: Optional[str] = None,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get learned facts/preferences about the user"""
     query = db.query(MemoryFact).filter(MemoryFact.is_active == True)
@@ -56,9 +60,8 @@ async def create_memory_fact(
                 detail=f"Conversation not found: {conversation_id}"
             )
     
-    import uuid
     fact = MemoryFact(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         conversation_id=conversation_id,
         category=category,
         content=content,
@@ -97,27 +100,36 @@ async def delete_memory_fact(
 @router.post("/search", response_model=MemorySearchResponse)
 async def search_memory(
     request: MemorySearchRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Search through conversation history"""
     # Simple text-based search (in production, use vector search)
     from src.models.database import Message
     
-    # Search in messages
-    messages = db.query(Message).filter(
+    # Search in messages, reading only a preview of each match and the
+    # conversation title in one query
+    rows = db.query(
+        Message.id,
+        Message.conversation_id,
+        Message.created_at,
+        func.substr(Message.content, 1, SEARCH_PREVIEW_CHARS + 1).label("preview"),
+        Conversation.title
+    ).join(
+        Conversation, Conversation.id == Message.conversation_id
+    ).filter(
         Message.content.ilike(f"%{request.query}%")
     ).limit(request.limit).all()
     
     results = []
-    for msg in messages:
-        if msg.conversation:
-            results.append({
-                "conversation_id": msg.conversation_id,
-                "conversation_title": msg.conversation.title,
-                "message_id": msg.id,
-                "content": msg.content[:200] + "..." if len(msg.content) > 200 else msg.content,
-                "similarity": 0.8,  # Placeholder
-                "created_at": msg.created_at.isoformat() if msg.created_at else None
-            })
+    for row in rows:
+        preview = row.preview or ""
+        results.append({
+            "conversation_id": row.conversation_id,
+            "conversation_title": row.title,
+            "message_id": row.id,
+            "content": preview[:SEARCH_PREVIEW_CHARS] + "..." if len(preview) > SEARCH_PREVIEW_CHARS else preview,
+            "similarity": 0.8,  # Placeholder
+            "created_at": row.created_at.isoformat() if row.created_at else None
+        })
     
     return MemorySearchResponse(data={"results": results})
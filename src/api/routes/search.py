@@ -18,7 +18,7 @@ router = APIRouter(prefix="/api/v1/search", tags=["search"])
 @router.post("", response_model=BaseResponse)
 async def perform_search(
     query: str,
-    provider: Optional[str] = Query(None, description="Search provider (serpapi, brave, duckduckgo)"),
+    provider: Optional[str] = Query(None, description="Search provider (serpapi, brave, duckduckgo, federated)"),
     num_results: int = Query(10, ge=1, le=50, description="Number of results"),
     search_type: Literal["general", "news", "images"] = Query("general", description="Type of search"),
     use_cache: bool = Query(True, description="Use cached results if available")
@@ -108,7 +108,7 @@ async def get_search_history(
 @router.post("/cache/clear", response_model=BaseResponse)
 async def clear_cache():
     """Clear the search cache"""
-    clear_search_cache()
+    await clear_search_cache()
     return BaseResponse(
         message="Search cache cleared successfully"
     )
@@ -5,22 +5,27 @@ import os
 from contextlib import contextmanager
 from typing import Generator
 
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 
+from src.core.sqlite import checkpoint, optimize
 from src.models.database import (
-    engine, init_db, get_db, Conversation, Message, File,
+    Base, engine, read_engine, init_db, get_db, get_read_db, Conversation, Message, File, FileBlob,
     UserSetting, ProviderConfig, MemoryFact, SearchCache
 )
 
 
 __all__ = [
     'engine',
+    'read_engine',
     'init_db',
     'get_db',
+    'get_read_db',
     'get_db_session',
     'Conversation',
     'Message',
     'File',
+    'FileBlob',
     'UserSetting',
     'ProviderConfig',
     'MemoryFact',
@@ -48,7 +53,72 @@ def ensure_data_directory() -> None:
     os.makedirs(data_dir, exist_ok=True)
 
 
+def add_missing_columns() -> None:
+    """
+    Add nullable model columns missing from existing tables
+    
+    Databases created with create_all() before a column was introduced do
+    not get it from create_all() again; alembic migrations remain the
+    reference for deployments that use them.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def add_missing_indexes() -> None:
+    """
+    Create model indexes missing from existing tables
+    
+    create_all() skips tables that already exist, so databases created
+    before an index was declared never get it. An index counts as present
+    when one with the same name or the same leading columns exists, which
+    covers indexes created under other names by migrations or index=True.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = inspector.get_indexes(table.name) + inspector.get_unique_constraints(table.name)
+            names = {index['name'] for index in present}
+            column_lists = [tuple(index['column_names']) for index in present]
+            for index in table.indexes:
+                columns = tuple(column.name for column in index.columns)
+                if index.name in names or any(existing[:len(columns)] == columns for existing in column_lists):
+                    continue
+                index.create(conn)
+
+
 def initialize_database() -> None:
-    """Initialize the database (create tables)"""
+    """Initialize the database (create tables and indexes)"""
     ensure_data_directory()
     init_db()
+    add_missing_columns()
+    add_missing_indexes()
+
+
+def close_database() -> None:
+    """
+    Shutdown maintenance: refresh the planner's statistics with
+    PRAGMA optimize, fold the WAL back into the database file and close
+    pooled connections
+    """
+    try:
+        optimize(engine)
+        checkpoint(engine, "TRUNCATE")
+    except Exception as e:
+        print(f"Database shutdown maintenance failed: {e}")
+    engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
@@ -0,0 +1,90 @@
+"""
+Database engine factory for GenZ Smart
+Builds engines from the configured URLs with per-dialect pooling and timeouts
+"""
+from typing import Dict, Any, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import StaticPool
+
+from src.api.config import settings
+from src.core.sqlite import configure_sqlite, get_sqlite_profile
+
+
+def engine_options(url: str, read_only: bool = False) -> Dict[str, Any]:
+    """
+    create_engine() keyword arguments for a database URL
+    
+    SQLite files get a thread-shared QueuePool and in-memory databases a
+    single static connection. Server databases get a bounded pool that
+    checks connections before use (pre-ping) and replaces them before
+    the server or a proxy drops them (recycle), plus a server-side
+    statement timeout.
+    
+    Args:
+        url: SQLAlchemy database URL
+        read_only: Options for a replica; Postgres sessions start read-only
+    
+    Returns:
+        Keyword arguments for create_engine
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options: Dict[str, Any] = {"echo": False}
+    connect_args: Dict[str, Any] = {}
+    
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+        if parsed.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+        else:
+            options["pool_size"] = settings.DATABASE_POOL_SIZE
+            options["max_overflow"] = settings.DATABASE_MAX_OVERFLOW
+            options["pool_timeout"] = settings.DATABASE_POOL_TIMEOUT
+    else:
+        options["pool_size"] = settings.DATABASE_POOL_SIZE
+        options["max_overflow"] = settings.DATABASE_MAX_OVERFLOW
+        options["pool_timeout"] = settings.DATABASE_POOL_TIMEOUT
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = settings.DATABASE_POOL_RECYCLE
+        timeout = settings.DATABASE_STATEMENT_TIMEOUT
+        if backend == "postgresql":
+            server_options = []
+            if timeout:
+                server_options.append(f"-c statement_timeout={timeout}")
+            if read_only:
+                server_options.append("-c default_transaction_read_only=on")
+            if server_options:
+                connect_args["options"] = " ".join(server_options)
+        elif backend == "mysql" and timeout:
+            connect_args["init_command"] = f"SET SESSION max_execution_time={timeout}"
+    
+    options["connect_args"] = connect_args
+    return options
+
+
+def create_database_engine(url: str, read_only: bool = False) -> Engine:
+    """
+    Create an engine for a configured database URL
+    
+    SQLite engines also get the storage profile from
+    DATABASE_SQLITE_PROFILE applied to every connection.
+    
+    Args:
+        url: SQLAlchemy database URL
+        read_only: Engine for a read replica
+    
+    Returns:
+        Engine
+    """
+    engine = create_engine(url, **engine_options(url, read_only=read_only))
+    configure_sqlite(engine, get_sqlite_profile(settings.DATABASE_SQLITE_PROFILE))
+    return engine
+
+
+def create_read_engine(write_engine: Engine, url: Optional[str] = None) -> Engine:
+    """Engine for list and search queries: the replica when one is configured, else the primary"""
+    if not url or url == write_engine.url.render_as_string(hide_password=False):
+        return write_engine
+    return create_database_engine(url, read_only=True)
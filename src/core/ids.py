@@ -0,0 +1,82 @@
+"""
+Time-ordered identifiers for GenZ Smart
+UUIDv7 (RFC 9562): a 48-bit Unix millisecond timestamp followed by random bits
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+
+_RANDOM_BITS = 74  # 12 bits of rand_a + 62 bits of rand_b
+_RANDOM_MASK = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a UUIDv7
+    
+    IDs from one process are strictly increasing: within the same
+    millisecond (or if the clock steps back) the random part of the
+    previous ID is incremented instead of drawn again. Their canonical
+    text form sorts in the same order, so ids stored as strings keep
+    inserts at the right-hand edge of the primary key index.
+    
+    Returns:
+        uuid.UUID with version 7
+    """
+    global _last_ms, _last_random
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            random = int.from_bytes(os.urandom(10), "big") & _RANDOM_MASK
+            random >>= 1  # Leave headroom for increments within the millisecond
+        else:
+            ms = _last_ms
+            random = _last_random + 1
+            if random > _RANDOM_MASK:
+                ms += 1
+                random = 0
+        _last_ms, _last_random = ms, random
+    
+    rand_a = random >> 62
+    rand_b = random & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+
+def new_id() -> str:
+    """Primary key for a new row: a UUIDv7 in canonical text form"""
+    return str(uuid7())
+
+
+def is_id(value: str) -> bool:
+    """Whether value is a UUID (the only ids a Postgres database can store)"""
+    try:
+        uuid.UUID(value)
+    except (ValueError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def id_timestamp(value: str) -> Optional[datetime]:
+    """
+    Creation time encoded in a UUIDv7 id
+    
+    Returns:
+        Naive UTC datetime (like the created_at columns), or None for ids that are not UUIDv7 (such as uuid4
+        ids created before time-ordered ids were introduced)
+    """
+    try:
+        parsed = uuid.UUID(value)
+    except (ValueError, AttributeError, TypeError):
+        return None
+    if parsed.version != 7:
+        return None
+    return datetime.fromtimestamp((parsed.int >> 80) / 1000, tz=timezone.utc).replace(tzinfo=None)
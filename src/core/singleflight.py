@@ -0,0 +1,82 @@
+"""
+Single-flight request coalescing for GenZ Smart
+Concurrent calls with the same key share one in-flight execution
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """In-flight execution and the number of callers awaiting it"""
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one execution
+    
+    The shared work runs in its own task, so a caller that is cancelled does
+    not cancel it for the others. When the last waiting caller is cancelled
+    the shared task is cancelled too.
+    """
+    
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[str, _Call] = {}
+        self._stats = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "errors": 0,
+        }
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once for all concurrent callers using the same key
+        
+        Args:
+            key: Coalescing key (callers with equal keys share a result)
+            fn: Zero-argument coroutine function performing the work
+        
+        Returns:
+            The shared result (or raises the shared exception)
+        """
+        self._stats["calls"] += 1
+        call = self._inflight.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._inflight[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self._stats["executions"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+    
+    def in_flight(self) -> int:
+        """Number of keys currently executing"""
+        return len(self._inflight)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        return {"in_flight": len(self._inflight), **self._stats}
+    
+    def _finish(self, key: str, call: _Call) -> None:
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
+        if not call.task.cancelled() and call.task.exception() is not None:
+            # Marks the exception as retrieved even if every caller went away
+            self._stats["errors"] += 1
@@ -0,0 +1,250 @@
+"""
+SQLite storage profiles for GenZ Smart
+Connection pragmas, WAL checkpointing and shutdown maintenance
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from src.api.config import settings
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """
+    Pragmas applied to every new SQLite connection
+    
+    None leaves SQLite's built-in default. Only busy_timeout, cache_size,
+    mmap_size, synchronous and temp_store are per connection; journal_mode
+    WAL is stored in the database file and persists once set.
+    """
+    name: str
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    cache_size: Optional[int] = None  # Pages, or KiB when negative
+    mmap_size: Optional[int] = None  # Bytes of the file memory-mapped for reads
+    temp_store: Optional[str] = None
+    busy_timeout: Optional[int] = None  # Milliseconds to wait on a lock before "database is locked"
+    journal_size_limit: Optional[int] = None  # Bytes the WAL is truncated to after a checkpoint
+    
+    def pragmas(self) -> List[Tuple[str, Any]]:
+        """(pragma, value) pairs in the order they must be applied"""
+        values = [
+            ("busy_timeout", self.busy_timeout),  # First, so the others wait for locks too
+            ("journal_mode", self.journal_mode),
+            ("synchronous", self.synchronous),
+            ("journal_size_limit", self.journal_size_limit),
+            ("cache_size", self.cache_size),
+            ("mmap_size", self.mmap_size),
+            ("temp_store", self.temp_store),
+        ]
+        return [(name, value) for name, value in values if value is not None]
+    
+    @property
+    def uses_wal(self) -> bool:
+        return (self.journal_mode or "").upper() == "WAL"
+
+
+SQLITE_PROFILES: Dict[str, SQLiteProfile] = {
+    # SQLite defaults: rollback journal, writers block readers
+    "legacy": SQLiteProfile("legacy", busy_timeout=5000),
+    # WAL with synchronous=NORMAL: readers never block the writer, and a
+    # power loss can only drop the last transactions, never corrupt the file
+    "balanced": SQLiteProfile(
+        "balanced",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-64000,  # ~64MB
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=5000,
+        journal_size_limit=settings.DATABASE_WAL_TRUNCATE_BYTES
+    ),
+    # As balanced, but fsync on every commit
+    "durable": SQLiteProfile(
+        "durable",
+        journal_mode="WAL",
+        synchronous="FULL",
+        cache_size=-64000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=10000,
+        journal_size_limit=settings.DATABASE_WAL_TRUNCATE_BYTES
+    ),
+}
+
+
+def get_sqlite_profile(name: str) -> SQLiteProfile:
+    """
+    Look up a storage profile by name
+    
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    try:
+        return SQLITE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile: {name}. Available profiles: {', '.join(SQLITE_PROFILES)}")
+
+
+def is_sqlite(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def configure_sqlite(engine: Engine, profile: SQLiteProfile) -> None:
+    """
+    Apply a profile to every connection the engine opens
+    
+    Does nothing for other databases, so it can be called unconditionally.
+    
+    Args:
+        engine: Engine whose connections are configured
+        profile: Pragmas to apply
+    """
+    if not is_sqlite(engine):
+        return
+    statements = [f"PRAGMA {name}={value}" for name, value in profile.pragmas()]
+    
+    @event.listens_for(engine, "connect")
+    def apply_profile(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def database_path(engine: Engine) -> Optional[str]:
+    """File behind a SQLite engine, or None for in-memory databases"""
+    database = engine.url.database
+    if not is_sqlite(engine) or not database or database == ":memory:" or database.startswith("file:"):
+        return None
+    return os.path.abspath(database)
+
+
+def wal_size(engine: Engine) -> int:
+    """Current size of the database's write-ahead log in bytes"""
+    path = database_path(engine)
+    if path is None:
+        return 0
+    try:
+        return os.path.getsize(f"{path}-wal")
+    except OSError:
+        return 0
+
+
+def checkpoint(engine: Engine, mode: str = "PASSIVE") -> Optional[Tuple[int, int, int]]:
+    """
+    Copy committed WAL frames back into the database file
+    
+    PASSIVE never waits for readers or writers; TRUNCATE waits for them and
+    then resets the WAL file to zero bytes.
+    
+    Args:
+        engine: SQLite engine
+        mode: PASSIVE, FULL, RESTART or TRUNCATE
+    
+    Returns:
+        (busy, WAL frames, frames checkpointed), or None when not in WAL mode
+    """
+    if database_path(engine) is None:
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(text(f"PRAGMA wal_checkpoint({mode})")).fetchone()
+    if row is None or row[1] < 0:
+        return None
+    return tuple(row)
+
+
+def optimize(engine: Engine) -> None:
+    """Run PRAGMA optimize so the query planner has fresh statistics (cheap; meant for shutdown)"""
+    if not is_sqlite(engine):
+        return
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA optimize"))
+
+
+class WALCheckpointer:
+    """
+    Background task that keeps the write-ahead log short
+    
+    SQLite checkpoints automatically only at commit time and never while a
+    reader holds an old snapshot, so under steady read traffic the WAL
+    keeps growing and every read scans more of it. A passive checkpoint
+    runs every interval; once the WAL passes truncate_bytes a TRUNCATE
+    checkpoint resets it.
+    """
+    
+    def __init__(
+        self,
+        engine: Engine,
+        interval: float = settings.DATABASE_CHECKPOINT_INTERVAL,
+        truncate_bytes: int = settings.DATABASE_WAL_TRUNCATE_BYTES
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.truncate_bytes = truncate_bytes
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"passive": 0, "truncate": 0, "busy": 0, "errors": 0}
+    
+    def run_once(self) -> Optional[Tuple[int, int, int]]:
+        """Run one checkpoint (blocking); returns the pragma's result row"""
+        mode = "TRUNCATE" if wal_size(self.engine) > self.truncate_bytes else "PASSIVE"
+        try:
+            result = checkpoint(self.engine, mode)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"WAL checkpoint failed: {e}")
+            return None
+        if result is not None:
+            self._stats[mode.lower()] += 1
+            if result[0]:
+                self._stats["busy"] += 1
+        return result
+    
+    def start(self) -> None:
+        """Start checkpointing on the running event loop (no-op unless the database uses WAL)"""
+        if database_path(self.engine) is None:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self) -> None:
+        """Stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"wal_bytes": wal_size(self.engine), **self._stats}
+    
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.run_once)
+
+
+# Global checkpointer instance
+_wal_checkpointer: Optional[WALCheckpointer] = None
+
+
+def get_wal_checkpointer() -> WALCheckpointer:
+    """Get or create the checkpointer for the application database"""
+    global _wal_checkpointer
+    if _wal_checkpointer is None:
+        from src.models.database import engine  # The models module imports this one
+        _wal_checkpointer = WALCheckpointer(
+            engine,
+            interval=settings.DATABASE_CHECKPOINT_INTERVAL,
+            truncate_bytes=settings.DATABASE_WAL_TRUNCATE_BYTES
+        )
+    return _wal_checkpointer
@@ -7,30 +7,64 @@ from typing import List, Optional, Dict, Any
 
 from sqlalchemy import (
     create_engine, Column, String, Text, Integer, Boolean, 
-    DateTime, Float, ForeignKey, JSON, Table, event
+    DateTime, Float, ForeignKey, JSON, LargeBinary, Table, Index, event, TypeDecorator
 )
-from sqlalchemy.orm import declarative_base, relationship, Session
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import declarative_base, relationship, deferred, Session
 from sqlalchemy.sql import func
 
+from src.api.config import settings
 from src.core.security import encryption_manager
+from src.core.engines import create_database_engine, create_read_engine
+from src.core.ids import new_id
 
 Base = declarative_base()
 
+
+class IdType(TypeDecorator):
+    """
+    Row ids (UUIDv7, see src.core.ids) and the foreign keys to them
+    
+    Stored as canonical text, or as a native 16-byte uuid on Postgres.
+    Values are always strings in Python.
+    
+    Raises:
+        ValueError: On Postgres, when binding a value that is not a UUID
+    """
+    impl = String(36)
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(String(36))
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "postgresql":
+            return value
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            raise ValueError(f"Not a valid id: {value!r}")
+
+
 # ========== Association Tables ==========
 
 conversation_files = Table(
     'conversation_files',
     Base.metadata,
-    Column('conversation_id', String(36), ForeignKey('conversations.id', ondelete='CASCADE'), primary_key=True),
-    Column('file_id', String(36), ForeignKey('files.id', ondelete='CASCADE'), primary_key=True),
-    Column('attached_at', DateTime, default=datetime.utcnow)
+    Column('conversation_id', IdType(), ForeignKey('conversations.id', ondelete='CASCADE'), primary_key=True),
+    Column('file_id', IdType(), ForeignKey('files.id', ondelete='CASCADE'), primary_key=True),
+    Column('attached_at', DateTime, default=datetime.utcnow),
+    Index('idx_conversation_files_file', 'file_id')  # Conversations of a file; the key covers the reverse
 )
 
 message_attachments = Table(
     'message_attachments',
     Base.metadata,
-    Column('message_id', String(36), ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True),
-    Column('file_id', String(36), ForeignKey('files.id', ondelete='CASCADE'), primary_key=True)
+    Column('message_id', IdType(), ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True),
+    Column('file_id', IdType(), ForeignKey('files.id', ondelete='CASCADE'), primary_key=True),
+    Index('idx_message_attachments_file', 'file_id')
 )
 
 
@@ -39,8 +73,12 @@ message_attachments = Table(
 class Conversation(Base):
     """Chat conversation"""
     __tablename__ = 'conversations'
+    __table_args__ = (
+        Index('idx_conversations_updated', 'updated_at'),  # Conversation list, newest first
+        Index('idx_conversations_pinned', 'is_pinned', 'updated_at'),
+    )
     
-    id: str = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: str = Column(IdType(), primary_key=True, default=new_id)
     title: str = Column(String(255), nullable=False, default='New Conversation')
     provider: str = Column(String(50), nullable=False)
     model: str = Column(String(100), nullable=False)
@@ -51,7 +89,7 @@ class Conversation(Base):
     updated_at: datetime = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", order_by="Message.created_at")
+    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", order_by="[Message.created_at, Message.id]")
     files = relationship("File", secondary=conversation_files, back_populates="conversations")
     memory_facts = relationship("MemoryFact", back_populates="conversation")
     
@@ -75,11 +113,15 @@ class Conversation(Base):
 class Message(Base):
     """Chat message"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        Index('idx_messages_conversation', 'conversation_id', 'created_at', 'id'),  # History in (created_at, id) keyset order
+        Index('idx_messages_created', 'created_at'),
+    )
     
-    id: str = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    conversation_id: str = Column(String(36), ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
+    id: str = Column(IdType(), primary_key=True, default=new_id)
+    conversation_id: str = Column(IdType(), ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
     role: str = Column(String(20), nullable=False)  # system, user, assistant, tool
-    content: str = Column(Text, nullable=False)
+    content = deferred(Column(Text, nullable=False))  # Loaded on access; undefer where read in bulk
     meta_data: Optional[Dict[str, Any]] = Column("metadata", JSON, nullable=True)  # provider, model, usage, etc.
     tokens: Optional[int] = Column(Integer, nullable=True)
     created_at: datetime = Column(DateTime, default=datetime.utcnow)
@@ -100,25 +142,59 @@ class Message(Base):
         }
 
 
+class FileBlob(Base):
+    """Content-addressed file contents shared by identical uploads"""
+    __tablename__ = 'file_blobs'
+    
+    content_hash: str = Column(String(64), primary_key=True)  # SHA-256 hex digest
+    size: int = Column(Integer, nullable=False)
+    storage_path: str = Column(String(500), nullable=False)
+    ref_count: int = Column(Integer, nullable=False, default=1)
+    extracted_text = deferred(Column(Text, nullable=True))  # From the first successful parse
+    word_count: Optional[int] = Column(Integer, nullable=True)
+    meta_data: Optional[Dict[str, Any]] = Column("metadata", JSON, nullable=True)
+    parsed_at: Optional[datetime] = Column(DateTime, nullable=True)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'content_hash': self.content_hash,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'parsed': self.parsed_at is not None,
+            'created_at': self.created_at.isoformat() if self.created_at is not None else None,
+        }
+
+
 class File(Base):
     """Uploaded file"""
     __tablename__ = 'files'
+    __table_args__ = (
+        Index('idx_files_status_created', 'status', 'created_at'),  # Listing by status; requeue of "processing" files
+        Index('idx_files_created', 'created_at'),
+        Index('idx_files_content_hash', 'content_hash'),  # References to a blob
+    )
     
-    id: str = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: str = Column(IdType(), primary_key=True, default=new_id)
     filename: str = Column(String(255), nullable=False)
     original_name: str = Column(String(255), nullable=False)
     mime_type: str = Column(String(100), nullable=False)
     size: int = Column(Integer, nullable=False)
     status: str = Column(String(20), default='uploading')  # uploading, processing, ready, error
-    extracted_text: Optional[str] = Column(Text, nullable=True)
+    extracted_text = deferred(Column(Text, nullable=True))  # Loaded on access; can be megabytes
     word_count: Optional[int] = Column(Integer, nullable=True)
     storage_path: str = Column(String(500), nullable=False)
+    content_hash: Optional[str] = Column(String(64), ForeignKey('file_blobs.content_hash'), nullable=True)  # SHA-256 of the stored bytes
     error_message: Optional[str] = Column(Text, nullable=True)
+    claimed_by: Optional[str] = Column(String(64), nullable=True)  # Worker parsing the file
+    claimed_at: Optional[datetime] = Column(DateTime, nullable=True)
     created_at: datetime = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     conversations = relationship("Conversation", secondary=conversation_files, back_populates="files")
     messages = relationship("Message", secondary=message_attachments, back_populates="attachments")
+    blob = relationship("FileBlob")
     
     def to_dict(self, include_text: bool = False) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -129,6 +205,7 @@ class File(Base):
             'mime_type': self.mime_type,
             'size': self.size,
             'status': self.status,
+            'content_hash': self.content_hash,
             'word_count': self.word_count,
             'created_at': self.created_at.isoformat() if self.created_at is not None else None,
         }
@@ -139,6 +216,35 @@ class File(Base):
         return data
 
 
+class FileChunk(Base):
+    """Retrieval chunk of a blob's extracted text"""
+    __tablename__ = 'file_chunks'
+    __table_args__ = (
+        Index('idx_file_chunks_position', 'content_hash', 'position'),  # A blob's chunks in order
+    )
+    
+    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    content_hash: str = Column(String(64), ForeignKey('file_blobs.content_hash', ondelete='CASCADE'), nullable=False)
+    position: int = Column(Integer, nullable=False)  # Order within the text
+    start_offset: int = Column(Integer, nullable=False)  # Character span in the full extracted text
+    end_offset: int = Column(Integer, nullable=False)
+    heading: Optional[str] = Column(String(255), nullable=True)  # Section or page the chunk starts in
+    text: str = Column(Text, nullable=False)
+    token_count: int = Column(Integer, nullable=False)
+    embedding: Optional[bytes] = Column(LargeBinary, nullable=True)  # float32 vector when embeddings are enabled
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'position': self.position,
+            'start': self.start_offset,
+            'end': self.end_offset,
+            'heading': self.heading,
+            'text': self.text,
+            'tokens': self.token_count,
+        }
+
+
 class UserSetting(Base):
     """User settings"""
     __tablename__ = 'user_settings'
@@ -205,9 +311,14 @@ class ProviderConfig(Base):
 class MemoryFact(Base):
     """Learned facts about the user"""
     __tablename__ = 'memory_facts'
+    __table_args__ = (
+        Index('idx_memory_active_confidence', 'is_active', 'confidence'),  # Active facts, most confident first
+        Index('idx_memory_category', 'category', 'is_active'),
+        Index('idx_memory_conversation', 'conversation_id'),  # SET NULL when a conversation is deleted
+    )
     
-    id: str = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    conversation_id: Optional[str] = Column(String(36), ForeignKey('conversations.id', ondelete='SET NULL'), nullable=True)
+    id: str = Column(IdType(), primary_key=True, default=new_id)
+    conversation_id: Optional[str] = Column(IdType(), ForeignKey('conversations.id', ondelete='SET NULL'), nullable=True)
     category: str = Column(String(50), nullable=False)  # preference, fact, skill, goal
     content: str = Column(Text, nullable=False)
     confidence: float = Column(Float, default=1.0)
@@ -232,8 +343,11 @@ class MemoryFact(Base):
 class SearchCache(Base):
     """Cached web search results"""
     __tablename__ = 'search_cache'
+    __table_args__ = (
+        Index('idx_search_expires', 'expires_at'),  # Purge of expired entries; query_hash is unique already
+    )
     
-    id: str = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: str = Column(IdType(), primary_key=True, default=new_id)
     query_hash: str = Column(String(64), unique=True, nullable=False)
     query_text: str = Column(Text, nullable=False)
     results: Dict[str, Any] = Column(JSON, nullable=False)
@@ -254,13 +368,10 @@ class SearchCache(Base):
 
 # ========== Database Engine & Session ==========
 
-DATABASE_URL = "sqlite:///./data/genzsmart.db"
+DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-    echo=False
-)
+engine = create_database_engine(DATABASE_URL)
+read_engine = create_read_engine(engine, settings.DATABASE_READ_URL)
 
 
 def init_db() -> None:
@@ -277,6 +388,15 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Get database session for read-only queries (replica when configured)"""
+    db = Session(bind=read_engine)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 # ========== Event Listeners ==========
 
 @event.listens_for(Conversation, 'before_update')
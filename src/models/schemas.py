@@ -126,6 +126,9 @@ class StreamRequest(BaseModel):
     temperature: float = Field(0.7, ge=0, le=2)
     max_tokens: Optional[int] = None
     conversation_id: Optional[str] = None
+    use_agent: bool = False  # Stream through the tool-augmented agent pipeline
+    enable_search: bool = False
+    file_ids: Optional[List[str]] = None
 
 
 class StreamStartEvent(BaseModel):
@@ -146,6 +149,18 @@ class StreamDoneEvent(BaseModel):
     usage: Optional[TokenUsage] = None
 
 
+class StreamToolStartEvent(BaseModel):
+    """SSE tool start event (agent mode)"""
+    tool: str
+    arguments: Dict[str, Any]
+
+
+class StreamToolResultEvent(BaseModel):
+    """SSE tool result event (agent mode)"""
+    tool: str
+    result: Dict[str, Any]
+
+
 class StreamErrorEvent(BaseModel):
     """SSE stream error event"""
     error: str
@@ -207,6 +222,7 @@ class FileResponse(BaseModel):
     mime_type: str
     size: int
     status: Literal["uploading", "processing", "ready", "error"]
+    content_hash: Optional[str] = None
     extracted_text: Optional[str] = None
     word_count: Optional[int] = None
     error_message: Optional[str] = None
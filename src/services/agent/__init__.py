@@ -6,6 +6,7 @@ from src.services.agent.orchestrator import (
     AgentOrchestrator,
     AgentContext,
     AgentResponse,
+    AgentEvent,
     create_agent
 )
 from src.services.agent.tools import (
@@ -27,6 +28,7 @@ __all__ = [
     "AgentOrchestrator",
     "AgentContext",
     "AgentResponse",
+    "AgentEvent",
     "create_agent",
     # Tools
     "BaseTool",
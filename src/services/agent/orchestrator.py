@@ -2,25 +2,61 @@
 Agent orchestrator for GenZ Smart
 Coordinates AI interactions with tools, memory, and context
 """
-from typing import List, Dict, Any, Optional, AsyncIterator
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable
 from dataclasses import dataclass, field
 from datetime import datetime
+import asyncio
 import json
+import time
 
 from src.services.ai import (
     BaseAIProvider,
     ChatCompletionRequest,
     ChatCompletionResponse,
+    ImagePart,
     Message,
     MessageRole,
     StreamChunk
 )
 from src.services.agent.tools import get_tool_registry, ToolRegistry, BaseTool
-from src.services.memory import ConversationMemoryManager
+from src.services.memory import ConversationMemoryManager, MemoryContextBuilder
 from src.services.search import search_web
+from src.services.search.pages import PageFetcher, get_page_fetcher, select_passages
+from src.services.files.chunks import ChunkStore, merge_excerpts
 from sqlalchemy.orm import Session
 
 
+# Latency budgets (seconds) for the context prefetch stages. A stage that
+# misses its deadline is dropped so it never holds up the model call. The
+# search budget covers the whole web stage; page fetching gets at most its
+# own budget out of whatever the search left over.
+DEFAULT_STAGE_BUDGETS: Dict[str, float] = {
+    "search": 5.0,
+    "pages": 3.0,
+    "memory": 0.5,
+    "files": 1.0,
+}
+
+# Excerpts of attached files retrieved per turn, and their token budget
+MAX_FILE_CHUNKS = 8
+MAX_FILE_CONTEXT_TOKENS = 2000
+
+# Top search results fetched for readable text, and the excerpt budget
+MAX_FETCHED_PAGES = 3
+MAX_PAGE_CONTEXT_CHARS = 6000
+
+# Streaming tool calls are written inline as [[tool:name {"arg": "value"}]]
+TOOL_CALL_OPEN = "[[tool:"
+TOOL_CALL_CLOSE = "]]"
+MAX_TOOL_ROUNDS = 3
+
+TOOL_CALL_INSTRUCTIONS = f"""To use a tool, write exactly one call on its own and stop:
+{TOOL_CALL_OPEN}web_search {{"query": "..."}}{TOOL_CALL_CLOSE}
+{TOOL_CALL_OPEN}calculate {{"expression": "..."}}{TOOL_CALL_CLOSE}
+{TOOL_CALL_OPEN}get_datetime {{}}{TOOL_CALL_CLOSE}
+The tool result will be provided and you can then continue your answer."""
+
+
 @dataclass
 class AgentContext:
     """Context for agent execution"""
@@ -30,6 +66,10 @@ class AgentContext:
     enable_search: bool = False
     enable_memory: bool = True
     attached_files: List[str] = field(default_factory=list)
+    images: List[ImagePart] = field(default_factory=list)  # Encoded images sent with the user message
+    model: Optional[str] = None
+    temperature: float = 0.7
+    max_tokens: Optional[int] = 2000
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
@@ -41,9 +81,77 @@ class AgentResponse:
     search_results: Optional[Dict[str, Any]] = None
     memory_used: bool = False
     files_processed: List[str] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)  # Per-stage milliseconds
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class AgentEvent:
+    """Event emitted by the streaming agent pipeline"""
+    type: str  # token, tool_start, tool_result, done
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PrefetchedContext:
+    """Context gathered concurrently before the model call"""
+    search_results: Optional[Dict[str, Any]] = None
+    memory_context: str = ""
+    file_contexts: List[Dict[str, str]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    dropped: List[str] = field(default_factory=list)
+
+
+class _ToolCallScanner:
+    """
+    Incrementally splits streamed text into plain text and inline tool calls
+    
+    Text that might be the beginning of a tool call marker is held back until
+    it can be decided, so partial markers are never emitted as tokens.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+    
+    def feed(self, text: str) -> tuple:
+        """
+        Add streamed text
+        
+        Returns:
+            (text safe to emit, tool call body or None)
+        """
+        self._buffer += text
+        
+        start = self._buffer.find(TOOL_CALL_OPEN)
+        if start == -1:
+            hold = self._partial_marker_length()
+            emit = self._buffer[:len(self._buffer) - hold]
+            self._buffer = self._buffer[len(self._buffer) - hold:]
+            return emit, None
+        
+        end = self._buffer.find(TOOL_CALL_CLOSE, start + len(TOOL_CALL_OPEN))
+        emit = self._buffer[:start]
+        if end == -1:
+            self._buffer = self._buffer[start:]
+            return emit, None
+        
+        call = self._buffer[start + len(TOOL_CALL_OPEN):end]
+        self._buffer = self._buffer[end + len(TOOL_CALL_CLOSE):]
+        return emit, call
+    
+    def flush(self) -> str:
+        """Return any held-back text once the stream has ended"""
+        rest, self._buffer = self._buffer, ""
+        return rest
+    
+    def _partial_marker_length(self) -> int:
+        """Length of the buffer suffix that is a prefix of the open marker"""
+        for length in range(min(len(TOOL_CALL_OPEN) - 1, len(self._buffer)), 0, -1):
+            if self._buffer.endswith(TOOL_CALL_OPEN[:length]):
+                return length
+        return 0
+
+
 class AgentOrchestrator:
     """
     Main agent orchestrator that coordinates:
@@ -56,29 +164,28 @@ class AgentOrchestrator:
         self,
         provider: BaseAIProvider,
         db: Optional[Session] = None,
-        enable_tools: bool = True
+        enable_tools: bool = True,
+        stage_budgets: Optional[Dict[str, float]] = None,
+        page_fetcher: Optional[PageFetcher] = None
     ):
         self.provider = provider
         self.db = db
         self.enable_tools = enable_tools
+        self.stage_budgets = {**DEFAULT_STAGE_BUDGETS, **(stage_budgets or {})}
+        self.page_fetcher = page_fetcher or get_page_fetcher()
         self.tool_registry = get_tool_registry() if enable_tools else None
         self.memory_manager = None
         
         if db:
             self.memory_manager = ConversationMemoryManager(db)
     
-    def _build_system_prompt(self, context: AgentContext) -> str:
+    def _build_system_prompt(self, context: AgentContext, memory_context: str = "") -> str:
         """Build enhanced system prompt with memory and capabilities"""
         base_prompt = context.system_prompt or "You are a helpful AI assistant."
         
-        # Add memory context if enabled
-        if self.memory_manager and context.enable_memory:
-            memory_context = self.memory_manager.context_builder.build_memory_context(
-                query=context.user_message,
-                max_facts=5
-            )
-            if memory_context:
-                base_prompt += f"\n\n{memory_context}"
+        # Add prefetched memory context
+        if memory_context:
+            base_prompt += f"\n\n{memory_context}"
         
         # Add tool capabilities
         if self.enable_tools and self.tool_registry:
@@ -90,7 +197,7 @@ You have access to the following tools:
 - get_datetime: Get current date and time
 
 When you need to use a tool, indicate it clearly in your response."""
-        
+
         return base_prompt
     
     async def _perform_search(self, query: str) -> Optional[Dict[str, Any]]:
@@ -113,44 +220,179 @@ When you need to use a tool, indicate it clearly in your response."""
         message_lower = message.lower()
         return any(keyword in message_lower for keyword in search_keywords)
     
-    async def process_message(
+    async def _fetch_page_passages(
         self,
-        context: AgentContext,
-        history: Optional[List[Dict[str, str]]] = None
-    ) -> AgentResponse:
+        query: str,
+        search_results: Dict[str, Any]
+    ) -> List[Dict[str, str]]:
+        """Fetch the top result pages and pick the excerpts most relevant to the query"""
+        urls = [r["url"] for r in search_results.get("results", []) if r.get("url")]
+        if not urls:
+            return []
+        pages = await self.page_fetcher.fetch_pages(urls[:MAX_FETCHED_PAGES])
+        return select_passages(pages, query, MAX_PAGE_CONTEXT_CHARS)
+    
+    async def _search_with_pages(self, query: str, prefetched: PrefetchedContext) -> Optional[Dict[str, Any]]:
+        """Search, then ground the results with page text, both within the search budget"""
+        deadline = time.perf_counter() + self.stage_budgets["search"]
+        search_results = await self._run_stage("search", self._perform_search(query), prefetched)
+        if search_results and search_results.get("results"):
+            passages = await self._run_stage(
+                "pages",
+                self._fetch_page_passages(query, search_results),
+                prefetched,
+                timeout=min(self.stage_budgets["pages"], deadline - time.perf_counter())
+            )
+            if passages:
+                search_results["pages"] = passages
+        return search_results
+    
+    def _load_memory_context(self, query: str) -> str:
+        """Query memory facts on a private session (runs in a worker thread)"""
+        with Session(bind=self.db.get_bind()) as session:
+            return MemoryContextBuilder(session).build_memory_context(
+                query=query,
+                max_facts=5
+            )
+    
+    def _load_file_contexts(
+        self,
+        conversation_id: Optional[str],
+        file_ids: List[str],
+        query: str
+    ) -> List[Dict[str, str]]:
         """
-        Process a user message through the agent pipeline
+        Retrieve the excerpts of in-scope files relevant to the query (runs in a worker thread)
+        
+        Files attached to this turn, the conversation and its earlier
+        messages are searched; only the best chunks within the token budget
+        are returned, merged where they overlap.
+        """
+        with Session(bind=self.db.get_bind()) as session:
+            store = ChunkStore(session)
+            scope = store.resolve_file_ids(conversation_id, file_ids)
+            retrieved = store.retrieve(scope, query, MAX_FILE_CHUNKS, MAX_FILE_CONTEXT_TOKENS)
+        
+        contexts: Dict[str, Dict[str, Any]] = {}
+        for item in retrieved:
+            entry = contexts.setdefault(item.file_id, {"id": item.file_id, "name": item.file_name, "chunks": []})
+            entry["chunks"].append(item.chunk)
+        return [
+            {
+                "id": entry["id"],
+                "name": entry["name"],
+                "text": "\n[...]\n".join(
+                    f"[{chunk.heading}]\n{chunk.text}" if chunk.heading else chunk.text
+                    for chunk in merge_excerpts(entry["chunks"])
+                )
+            }
+            for entry in contexts.values()
+        ]
+    
+    async def _run_stage(
+        self,
+        name: str,
+        coro: Awaitable[Any],
+        prefetched: PrefetchedContext,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Await a prefetch stage within its latency budget (or timeout), dropping it on timeout"""
+        start = time.perf_counter()
+        if timeout is None:
+            timeout = self.stage_budgets[name]
+        try:
+            return await asyncio.wait_for(coro, timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            prefetched.dropped.append(name)
+        except Exception as e:
+            print(f"{name} prefetch failed: {e}")
+        finally:
+            prefetched.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+        return None
+    
+    async def _prefetch_context(self, context: AgentContext) -> PrefetchedContext:
+        """
+        Start web search, memory retrieval and file loading concurrently
+        
+        Each stage runs under its own deadline, so the wait is bounded by the
+        slowest budget rather than the sum of all stages. Page fetching
+        follows the search it depends on.
         
         Args:
             context: Agent context
-            history: Previous conversation history
-            
+        
         Returns:
-            Agent response
+            Whatever context finished in time, plus per-stage timings
         """
-        # Initialize response
-        agent_response = AgentResponse(content="")
+        prefetched = PrefetchedContext()
+        stages: Dict[str, Awaitable[Any]] = {}
         
-        # Check if search is needed
-        search_results = None
         if context.enable_search or self._detect_search_need(context.user_message):
-            search_results = await self._perform_search(context.user_message)
-            agent_response.search_results = search_results
+            stages["search"] = self._search_with_pages(context.user_message, prefetched)
+        if self.db is not None and context.enable_memory:
+            stages["memory"] = self._run_stage(
+                "memory",
+                asyncio.to_thread(self._load_memory_context, context.user_message),
+                prefetched
+            )
+        if self.db is not None and (context.attached_files or context.conversation_id):
+            stages["files"] = self._run_stage(
+                "files",
+                asyncio.to_thread(
+                    self._load_file_contexts,
+                    context.conversation_id,
+                    context.attached_files,
+                    context.user_message
+                ),
+                prefetched
+            )
         
-        # Build messages for AI
+        if not stages:
+            return prefetched
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*stages.values())
+        prefetched.timings["prefetch"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        outcome = dict(zip(stages.keys(), results))
+        prefetched.search_results = outcome.get("search")
+        prefetched.memory_context = outcome.get("memory") or ""
+        prefetched.file_contexts = outcome.get("files") or []
+        return prefetched
+    
+    def _build_messages(
+        self,
+        context: AgentContext,
+        prefetched: PrefetchedContext,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Message]:
+        """Assemble the model input from the prompt, prefetched context and history"""
         messages = []
         
         # Add system prompt
-        system_prompt = self._build_system_prompt(context)
+        system_prompt = self._build_system_prompt(context, prefetched.memory_context)
         messages.append(Message(role=MessageRole.SYSTEM, content=system_prompt))
         
         # Add search results as context if available
+        search_results = prefetched.search_results
         if search_results and search_results.get("results"):
             search_context = self._format_search_context(search_results)
             messages.append(Message(
                 role=MessageRole.SYSTEM,
                 content=f"Recent web search results:\n{search_context}"
             ))
+            if search_results.get("pages"):
+                messages.append(Message(
+                    role=MessageRole.SYSTEM,
+                    content=f"Excerpts from the top result pages:\n{self._format_page_context(search_results['pages'])}"
+                ))
+        
+        # Add attached file content
+        for file_context in prefetched.file_contexts:
+            messages.append(Message(
+                role=MessageRole.SYSTEM,
+                content=f"Excerpts from attached file {file_context['name']}:\n{file_context['text']}"
+            ))
         
         # Add conversation history
         if history:
@@ -159,24 +401,59 @@ When you need to use a tool, indicate it clearly in your response."""
                 messages.append(Message(role=role, content=msg.get("content", "")))
         
         # Add current user message
-        messages.append(Message(role=MessageRole.USER, content=context.user_message))
+        messages.append(Message(role=MessageRole.USER, content=context.user_message, images=context.images or None))
+        
+        return messages
+    
+    async def process_message(
+        self,
+        context: AgentContext,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> AgentResponse:
+        """
+        Process a user message through the agent pipeline
+        
+        Args:
+            context: Agent context
+            history: Previous conversation history
+        
+        Returns:
+            Agent response
+        """
+        # Initialize response
+        total_start = time.perf_counter()
+        agent_response = AgentResponse(content="")
+        
+        # Gather search, memory and file context concurrently
+        prefetched = await self._prefetch_context(context)
+        agent_response.search_results = prefetched.search_results
+        agent_response.files_processed = [f["id"] for f in prefetched.file_contexts]
+        agent_response.timings.update(prefetched.timings)
+        if prefetched.dropped:
+            agent_response.metadata["dropped_stages"] = prefetched.dropped
+        
+        # Build messages for AI
+        messages = self._build_messages(context, prefetched, history)
         
         # Create completion request
         request = ChatCompletionRequest(
             messages=messages,
-            model=self.provider.default_model,
-            temperature=0.7,
-            max_tokens=2000,
+            model=context.model or self.provider.default_model,
+            temperature=context.temperature,
+            max_tokens=context.max_tokens,
             stream=False
         )
         
         # Get AI response
         try:
-            completion = await self.provider.chat_complete(request)
+            stage_start = time.perf_counter()
+            completion = await self.provider.chat_complete_coalesced(request)
             agent_response.content = completion.content
+            agent_response.timings["completion"] = round((time.perf_counter() - stage_start) * 1000, 2)
             
             # Extract and execute any tool calls from response
             if self.enable_tools:
+                stage_start = time.perf_counter()
                 tool_results = await self._process_tool_calls(completion.content)
                 if tool_results:
                     agent_response.tool_calls = tool_results
@@ -187,14 +464,15 @@ When you need to use a tool, indicate it clearly in your response."""
                             context, messages, tool_results
                         )
                         agent_response.content = final_content
-            
+                    agent_response.timings["tools"] = round((time.perf_counter() - stage_start) * 1000, 2)
+        
         except Exception as e:
             agent_response.content = f"I apologize, but I encountered an error: {str(e)}"
         
         # Extract memories from user message
         if self.memory_manager:
             try:
-                facts = self.memory_manager.extract_and_store(
+                facts = await self.memory_manager.extract_and_store_async(
                     context.user_message,
                     role="user"
                 )
@@ -203,6 +481,7 @@ When you need to use a tool, indicate it clearly in your response."""
             except Exception as e:
                 print(f"Memory extraction failed: {e}")
         
+        agent_response.timings["total"] = round((time.perf_counter() - total_start) * 1000, 2)
         return agent_response
     
     def _format_search_context(self, search_results: Dict[str, Any]) -> str:
@@ -218,6 +497,15 @@ When you need to use a tool, indicate it clearly in your response."""
         
         return "\n".join(lines)
     
+    def _format_page_context(self, passages: List[Dict[str, str]]) -> str:
+        """Format fetched page excerpts for AI context"""
+        lines = []
+        for passage in passages:
+            lines.append(f"[{passage.get('title') or passage['url']}]({passage['url']})")
+            lines.append(passage["text"])
+            lines.append("")
+        return "\n".join(lines)
+    
     async def _process_tool_calls(self, content: str) -> List[Dict[str, Any]]:
         """Process and execute tool calls from AI response"""
         results = []
@@ -285,73 +573,179 @@ When you need to use a tool, indicate it clearly in your response."""
         # Get final response
         request = ChatCompletionRequest(
             messages=messages,
-            model=self.provider.default_model,
-            temperature=0.7,
-            max_tokens=2000
+            model=context.model or self.provider.default_model,
+            temperature=context.temperature,
+            max_tokens=context.max_tokens
         )
         
-        completion = await self.provider.chat_complete(request)
+        completion = await self.provider.chat_complete_coalesced(request)
         return completion.content
     
-    async def stream_message(
+    def _parse_tool_call(self, call: str) -> tuple:
+        """Split an inline tool call body into (name, arguments)"""
+        name, _, raw_args = call.strip().partition(" ")
+        try:
+            arguments = json.loads(raw_args) if raw_args.strip() else {}
+        except json.JSONDecodeError:
+            arguments = {}
+        if not isinstance(arguments, dict):
+            arguments = {}
+        return name, arguments
+    
+    async def stream_events(
         self,
         context: AgentContext,
         history: Optional[List[Dict[str, str]]] = None
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[AgentEvent]:
         """
-        Stream a response from the agent
+        Stream a tool-augmented response from the agent
+        
+        Tokens are forwarded as they arrive. When the model writes an inline
+        tool call, the stream is closed, the tool runs, its result is added to
+        the conversation and generation resumes in a new stream.
         
         Args:
             context: Agent context
             history: Previous conversation history
-            
+        
         Yields:
-            Response chunks
+            token, tool_start, tool_result and a final done event
         """
-        # For streaming, we do a simpler version without tool execution
-        messages = []
-        
-        # Add system prompt
-        system_prompt = self._build_system_prompt(context)
-        messages.append(Message(role=MessageRole.SYSTEM, content=system_prompt))
-        
-        # Add search results if available
-        if context.enable_search:
-            search_results = await self._perform_search(context.user_message)
-            if search_results:
-                search_context = self._format_search_context(search_results)
-                messages.append(Message(
-                    role=MessageRole.SYSTEM,
-                    content=f"Recent web search results:\n{search_context}"
-                ))
+        total_start = time.perf_counter()
+        prefetched = await self._prefetch_context(context)
+        timings = dict(prefetched.timings)
+        messages = self._build_messages(context, prefetched, history)
+        
+        tools_enabled = self.enable_tools and self.tool_registry is not None
+        if tools_enabled:
+            messages.insert(1, Message(role=MessageRole.SYSTEM, content=TOOL_CALL_INSTRUCTIONS))
+        
+        full_content = ""
+        tool_calls: List[Dict[str, Any]] = []
+        finish_reason = "stop"
+        
+        for round_index in range(MAX_TOOL_ROUNDS + 1):
+            allow_tool_call = tools_enabled and round_index < MAX_TOOL_ROUNDS
+            request = ChatCompletionRequest(
+                messages=messages,
+                model=context.model or self.provider.default_model,
+                temperature=context.temperature,
+                max_tokens=context.max_tokens,
+                stream=True
+            )
+            
+            scanner = _ToolCallScanner()
+            round_content = ""
+            tool_call = None
+            stream = self.provider.chat_complete_stream(request)
+            try:
+                async for chunk in stream:
+                    if chunk.content:
+                        text, call = scanner.feed(chunk.content)
+                        if call is not None and not allow_tool_call:
+                            # No rounds left: keep the call as plain text rather than dropping it
+                            text += f"{TOOL_CALL_OPEN}{call}{TOOL_CALL_CLOSE}"
+                            call = None
+                        if text:
+                            if "first_token" not in timings:
+                                timings["first_token"] = round((time.perf_counter() - total_start) * 1000, 2)
+                            round_content += text
+                            yield AgentEvent("token", {"token": text})
+                        if call is not None:
+                            tool_call = call
+                            break
+                    if chunk.is_finished:
+                        finish_reason = chunk.finish_reason or "stop"
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose:
+                    await aclose()
+            
+            full_content += round_content
+            if tool_call is None:
+                rest = scanner.flush()
+                if rest:
+                    full_content += rest
+                    yield AgentEvent("token", {"token": rest})
+                break
+            
+            # Run the tool while generation is paused
+            name, arguments = self._parse_tool_call(tool_call)
+            yield AgentEvent("tool_start", {"tool": name, "arguments": arguments})
+            stage_start = time.perf_counter()
+            try:
+                result = await self.tool_registry.execute_tool(name, **arguments)
+            except TypeError as e:
+                result = {"success": False, "error": f"Invalid arguments for {name}: {e}"}
+            except Exception as e:
+                result = {"success": False, "error": f"Tool {name} failed: {e}"}
+            timings[f"tool_{len(tool_calls) + 1}"] = round((time.perf_counter() - stage_start) * 1000, 2)
+            yield AgentEvent("tool_result", {"tool": name, "result": result})
+            tool_calls.append({
+                "tool": name,
+                "arguments": arguments,
+                "result": result,
+                "executed": result.get("success", False)
+            })
+            
+            # Resume generation with the tool result in context
+            messages.append(Message(
+                role=MessageRole.ASSISTANT,
+                content=f"{round_content}{TOOL_CALL_OPEN}{tool_call}{TOOL_CALL_CLOSE}"
+            ))
+            messages.append(Message(
+                role=MessageRole.SYSTEM,
+                content=f"Result of {name}:\n{json.dumps(result, default=str)}\n\nContinue your response to the user."
+            ))
         
-        # Add history
-        if history:
-            for msg in history[-10:]:
-                role = MessageRole.USER if msg.get("role") == "user" else MessageRole.ASSISTANT
-                messages.append(Message(role=role, content=msg.get("content", "")))
+        # Extract memories from user message
+        memory_used = False
+        if self.memory_manager:
+            try:
+                facts = await self.memory_manager.extract_and_store_async(
+                    context.user_message,
+                    role="user"
+                )
+                memory_used = bool(facts)
+            except Exception as e:
+                print(f"Memory extraction failed: {e}")
         
-        # Add user message
-        messages.append(Message(role=MessageRole.USER, content=context.user_message))
+        timings["total"] = round((time.perf_counter() - total_start) * 1000, 2)
+        yield AgentEvent("done", {
+            "finish_reason": finish_reason,
+            "content": full_content,
+            "tool_calls": tool_calls,
+            "search_results": prefetched.search_results,
+            "memory_used": memory_used,
+            "timings": timings
+        })
+    
+    async def stream_message(
+        self,
+        context: AgentContext,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from the agent
         
-        # Stream response
-        request = ChatCompletionRequest(
-            messages=messages,
-            model=self.provider.default_model,
-            temperature=0.7,
-            max_tokens=2000,
-            stream=True
-        )
+        Args:
+            context: Agent context
+            history: Previous conversation history
         
-        stream = await self.provider.chat_complete_stream(request)
-        async for chunk in stream:
-            yield chunk.content
+        Yields:
+            Response chunks
+        """
+        async for event in self.stream_events(context, history):
+            if event.type == "token":
+                yield event.data["token"]
 
 
 def create_agent(
     provider: BaseAIProvider,
     db: Optional[Session] = None,
-    enable_tools: bool = True
+    enable_tools: bool = True,
+    stage_budgets: Optional[Dict[str, float]] = None,
+    page_fetcher: Optional[PageFetcher] = None
 ) -> AgentOrchestrator:
     """Factory function to create an agent orchestrator"""
-    return AgentOrchestrator(provider, db, enable_tools)
+    return AgentOrchestrator(provider, db, enable_tools, stage_budgets, page_fetcher)
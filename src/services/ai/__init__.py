@@ -9,7 +9,9 @@ from src.services.ai.base import (
     ProviderModel,
     Message,
     MessageRole,
+    get_completion_coalescing_stats,
 )
+from src.services.ai.vision import ImageAttachment, ImagePart, VisionProfile
 from src.services.ai.openai import OpenAIProvider
 from src.services.ai.claude import ClaudeProvider
 from src.services.ai.deepseek import DeepSeekProvider
@@ -25,6 +27,10 @@ __all__ = [
     "ProviderModel",
     "Message",
     "MessageRole",
+    "get_completion_coalescing_stats",
+    "ImageAttachment",
+    "ImagePart",
+    "VisionProfile",
     "OpenAIProvider",
     "ClaudeProvider",
     "DeepSeekProvider",
@@ -3,9 +3,18 @@ Base AI Provider Interface
 Defines the contract that all AI provider adapters must implement
 """
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
+import hashlib
+import json
+
+from src.core.singleflight import SingleFlight
+from src.services.ai.vision import ImageAttachment, ImagePart, VisionProfile, prepare_image_parts
+
+
+# Identical concurrent deterministic completions share one provider call
+_completion_flight = SingleFlight("chat_complete")
 
 
 class MessageRole(str, Enum):
@@ -21,6 +30,7 @@ class Message:
     role: MessageRole
     content: str
     metadata: Optional[Dict[str, Any]] = None
+    images: Optional[List[ImagePart]] = None  # Encoded by BaseAIProvider.prepare_images
 
 
 @dataclass
@@ -94,6 +104,40 @@ class BaseAIProvider(ABC):
         """Get list of available models"""
         pass
     
+    @property
+    def vision_profile(self) -> Optional[VisionProfile]:
+        """Image size and format limits; None if the provider takes no images"""
+        return None
+    
+    def supports_vision(self, model: Optional[str] = None) -> bool:
+        """Check whether a model accepts image inputs"""
+        if self.vision_profile is None:
+            return False
+        model = model or self.default_model
+        return any(m.id == model and m.supports_vision for m in self.get_models())
+    
+    async def prepare_images(
+        self,
+        attachments: List[ImageAttachment],
+        model: Optional[str] = None
+    ) -> List[ImagePart]:
+        """
+        Encode image attachments for this provider's vision models
+        
+        Images are resized to the provider's limits and re-encoded once
+        per (image, provider profile); later turns reuse the cached parts.
+        
+        Args:
+            attachments: Image files attached to a message
+            model: Target model
+        
+        Returns:
+            Image parts, empty when the model takes no images
+        """
+        if not attachments or not self.supports_vision(model):
+            return []
+        return await prepare_image_parts(attachments, self.vision_profile)
+    
     @abstractmethod
     async def chat_complete(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
         """
@@ -107,6 +151,43 @@ class BaseAIProvider(ABC):
         """
         pass
     
+    async def chat_complete_coalesced(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
+        """
+        Send a chat completion request, sharing identical in-flight calls
+        
+        Only deterministic requests (temperature 0) are coalesced; anything
+        else goes straight to chat_complete.
+        
+        Args:
+            request: Chat completion request
+            
+        Returns:
+            Chat completion response
+        """
+        if request.temperature != 0 or request.stream:
+            return await self.chat_complete(request)
+        
+        return await _completion_flight.do(
+            self._completion_key(request),
+            lambda: self.chat_complete(request)
+        )
+    
+    def _completion_key(self, request: ChatCompletionRequest) -> str:
+        """Key identifying a completion request for this provider and credentials"""
+        key_data = json.dumps({
+            "provider": self.provider_id,
+            "base_url": self.base_url,
+            "api_key": hashlib.sha256((self.api_key or "").encode()).hexdigest(),
+            "model": request.model,
+            "max_tokens": request.max_tokens,
+            "system_prompt": request.system_prompt,
+            "messages": [
+                [msg.role.value, msg.content, [part.digest for part in msg.images or []]]
+                for msg in request.messages
+            ],
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode()).hexdigest()
+    
     @abstractmethod
     async def chat_complete_stream(
         self, 
@@ -133,7 +214,7 @@ class BaseAIProvider(ABC):
         """
         pass
     
-    def format_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
+    def format_messages(self, messages: List[Message]) -> List[Dict[str, Any]]:
         """
         Format messages for the provider's API
         Override in subclass if provider needs special formatting
@@ -145,10 +226,30 @@ class BaseAIProvider(ABC):
             Formatted messages
         """
         return [
-            {"role": msg.role.value, "content": msg.content}
+            {"role": msg.role.value, "content": self.format_content(msg)}
             for msg in messages
         ]
     
+    def format_content(self, msg: Message) -> Union[str, List[Dict[str, Any]]]:
+        """
+        Message content in the OpenAI chat format
+        
+        Plain text stays a string; messages with images become a list of
+        text and image_url parts with inline data URLs.
+        
+        Args:
+            msg: Message
+        
+        Returns:
+            Content string or list of content parts
+        """
+        if not msg.images:
+            return msg.content
+        parts: List[Dict[str, Any]] = [{"type": "text", "text": msg.content}]
+        for image in msg.images:
+            parts.append({"type": "image_url", "image_url": {"url": image.data_url}})
+        return parts
+    
     def handle_error(self, error: Exception) -> Dict[str, Any]:
         """
         Handle provider-specific errors
@@ -164,3 +265,8 @@ class BaseAIProvider(ABC):
             "error": str(error),
             "type": type(error).__name__,
         }
+
+
+def get_completion_coalescing_stats() -> Dict[str, Any]:
+    """Get statistics for coalesced chat completions"""
+    return _completion_flight.stats()
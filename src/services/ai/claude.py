@@ -10,6 +10,7 @@ from src.services.ai.base import (
     BaseAIProvider, ChatCompletionRequest, ChatCompletionResponse,
     StreamChunk, ProviderModel, Message, MessageRole
 )
+from src.services.ai.vision import VisionProfile, CLAUDE_VISION
 from src.core.exceptions import ProviderError, RateLimitError
 
 
@@ -60,6 +61,24 @@ class ClaudeProvider(BaseAIProvider):
             ),
         ]
     
+    @property
+    def vision_profile(self) -> Optional[VisionProfile]:
+        return CLAUDE_VISION
+    
+    def _convert_content(self, msg: Message) -> Any:
+        """Text, or image blocks followed by the text (Claude reads images best first)"""
+        if not msg.images:
+            return msg.content
+        blocks: List[Dict[str, Any]] = [
+            {
+                "type": "image",
+                "source": {"type": "base64", "media_type": image.media_type, "data": image.data}
+            }
+            for image in msg.images
+        ]
+        blocks.append({"type": "text", "text": msg.content})
+        return blocks
+    
     def _convert_messages(self, messages: List[Message]) -> tuple:
         """
         Convert messages to Claude format
@@ -74,7 +93,7 @@ class ClaudeProvider(BaseAIProvider):
             elif msg.role == MessageRole.USER:
                 claude_messages.append({
                     "role": "user",
-                    "content": msg.content
+                    "content": self._convert_content(msg)
                 })
             elif msg.role == MessageRole.ASSISTANT:
                 claude_messages.append({
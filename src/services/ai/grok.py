@@ -9,6 +9,7 @@ from src.services.ai.base import (
     BaseAIProvider, ChatCompletionRequest, ChatCompletionResponse,
     StreamChunk, ProviderModel, Message, MessageRole
 )
+from src.services.ai.vision import VisionProfile, GROK_VISION
 from src.core.exceptions import ProviderError, RateLimitError
 
 
@@ -53,13 +54,17 @@ class GrokProvider(BaseAIProvider):
             ),
         ]
     
-    def format_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
+    @property
+    def vision_profile(self) -> Optional[VisionProfile]:
+        return GROK_VISION
+    
+    def format_messages(self, messages: List[Message]) -> List[Dict[str, Any]]:
         """Format messages for Grok API"""
         formatted = []
         for msg in messages:
             formatted.append({
                 "role": msg.role.value,
-                "content": msg.content
+                "content": self.format_content(msg)
             })
         return formatted
     
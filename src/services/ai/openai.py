@@ -10,6 +10,7 @@ from src.services.ai.base import (
     BaseAIProvider, ChatCompletionRequest, ChatCompletionResponse,
     StreamChunk, ProviderModel, Message, MessageRole
 )
+from src.services.ai.vision import VisionProfile, OPENAI_VISION
 from src.core.exceptions import ProviderError, RateLimitError
 
 
@@ -60,13 +61,17 @@ class OpenAIProvider(BaseAIProvider):
             ),
         ]
     
-    def format_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
+    @property
+    def vision_profile(self) -> Optional[VisionProfile]:
+        return OPENAI_VISION
+    
+    def format_messages(self, messages: List[Message]) -> List[Dict[str, Any]]:
         """Format messages for OpenAI API"""
         formatted = []
         for msg in messages:
             formatted.append({
                 "role": msg.role.value,
-                "content": msg.content
+                "content": self.format_content(msg)
             })
         return formatted
     
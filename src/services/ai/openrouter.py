@@ -10,6 +10,7 @@ from src.services.ai.base import (
     BaseAIProvider, ChatCompletionRequest, ChatCompletionResponse,
     StreamChunk, ProviderModel, Message, MessageRole
 )
+from src.services.ai.vision import VisionProfile, ROUTED_VISION
 from src.core.exceptions import ProviderError, RateLimitError
 
 
@@ -77,13 +78,17 @@ class OpenRouterProvider(BaseAIProvider):
             ),
         ]
     
-    def format_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
+    @property
+    def vision_profile(self) -> Optional[VisionProfile]:
+        return ROUTED_VISION
+    
+    def format_messages(self, messages: List[Message]) -> List[Dict[str, Any]]:
         """Format messages for OpenRouter API"""
         formatted = []
         for msg in messages:
             formatted.append({
                 "role": msg.role.value,
-                "content": msg.content
+                "content": self.format_content(msg)
             })
         return formatted
     
@@ -0,0 +1,294 @@
+"""
+Image inputs for vision models
+Resizes and re-encodes attached images to each provider's limits and
+caches the result per (image, provider profile)
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.core.exceptions import FileError
+
+
+IMAGE_PART_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Encoded images kept in memory
+REENCODE_QUALITIES = (85, 70, 55)  # Tried in order until an image fits max_bytes
+EXIF_ORIENTATION = 0x0112
+
+
+@dataclass(frozen=True)
+class VisionProfile:
+    """
+    Image limits of a provider's vision models
+    
+    Images are scaled down (never up) until every limit holds. Larger
+    images cost more tokens and upload time without adding detail the
+    model can see, since the provider downscales them anyway.
+    """
+    name: str
+    max_long_side: int
+    max_short_side: Optional[int] = None
+    max_pixels: Optional[int] = None
+    formats: Tuple[str, ...] = ("webp", "jpeg", "png")  # Preferred first
+    max_bytes: int = 5 * 1024 * 1024
+    
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.max_long_side}:{self.max_short_side}:{self.max_pixels}:{','.join(self.formats)}:{self.max_bytes}"
+
+
+# OpenAI high detail: fit within 2048x2048, then shortest side to 768 (512px tiles)
+OPENAI_VISION = VisionProfile("openai", max_long_side=2048, max_short_side=768, max_bytes=20 * 1024 * 1024)
+# Anthropic: long edge above 1568px or more than ~1.15 megapixels is downscaled by the API
+CLAUDE_VISION = VisionProfile("claude", max_long_side=1568, max_pixels=1_150_000)
+# xAI: OpenAI-style tiling, JPEG and PNG only
+GROK_VISION = VisionProfile("grok", max_long_side=2048, max_short_side=768, formats=("jpeg", "png"), max_bytes=10 * 1024 * 1024)
+# Routed to several vendors: within every limit above
+ROUTED_VISION = VisionProfile("routed", max_long_side=1568, max_short_side=768, max_pixels=1_150_000)
+
+
+@dataclass
+class ImageAttachment:
+    """An image file to send with a message"""
+    path: str
+    mime_type: str
+    content_hash: Optional[str] = None
+    name: Optional[str] = None
+
+
+@dataclass
+class ImagePart:
+    """An encoded image ready to send to one provider"""
+    media_type: str
+    data: str  # Base64
+    width: int
+    height: int
+    digest: str = field(default="")  # SHA-256 of the encoded bytes
+    
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.media_type};base64,{self.data}"
+    
+    @property
+    def size(self) -> int:
+        return len(self.data) * 3 // 4
+
+
+def is_image_file(mime_type: Optional[str], filename: str = "") -> bool:
+    """Check whether a file can be sent as an image part"""
+    if mime_type and mime_type.startswith("image/"):
+        return True
+    return os.path.splitext(filename)[1].lower() in (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp")
+
+
+def fit_dimensions(width: int, height: int, profile: VisionProfile) -> Tuple[int, int]:
+    """
+    Largest size within the profile's limits with the same aspect ratio
+    
+    Args:
+        width: Source width in pixels
+        height: Source height in pixels
+        profile: Provider limits
+    
+    Returns:
+        (width, height), unchanged if the image already fits
+    """
+    scale = min(1.0, profile.max_long_side / max(width, height))
+    if profile.max_short_side:
+        scale = min(scale, profile.max_short_side / min(width, height))
+    if profile.max_pixels:
+        scale = min(scale, math.sqrt(profile.max_pixels / (width * height)))
+    if scale >= 1.0:
+        return width, height
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def _make_part(data: bytes, format: str, width: int, height: int) -> ImagePart:
+    return ImagePart(
+        media_type=f"image/{format}",
+        data=base64.b64encode(data).decode("ascii"),
+        width=width,
+        height=height,
+        digest=hashlib.sha256(data).hexdigest()
+    )
+
+
+def encode_image(path: str, profile: VisionProfile) -> ImagePart:
+    """
+    Resize and re-encode an image for a provider (blocking)
+    
+    Originals that already fit, in an accepted format and without an EXIF
+    rotation, are sent as they are. Everything else is downscaled with
+    Lanczos and encoded in the profile's preferred format, lowering quality
+    until it fits max_bytes.
+    
+    Args:
+        path: Image file
+        profile: Provider limits
+    
+    Returns:
+        ImagePart
+    
+    Raises:
+        FileError: If Pillow is missing or the image cannot be encoded
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise FileError("Image inputs need Pillow. Install with: pip install Pillow")
+    
+    try:
+        with Image.open(path) as image:
+            source_format = (image.format or "").lower()
+            width, height = image.size
+            target = fit_dimensions(width, height, profile)
+            rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+            
+            if target == (width, height) and source_format in profile.formats and not rotated:
+                with open(path, "rb") as f:
+                    original = f.read()
+                if len(original) <= profile.max_bytes:
+                    return _make_part(original, source_format, width, height)
+            
+            # JPEG only: decode at reduced scale when shrinking a lot
+            image.draft("RGB", target)
+            image = ImageOps.exif_transpose(image)
+            size = fit_dimensions(*image.size, profile)
+            if size != image.size:
+                image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+            
+            format = profile.formats[0]
+            if format == "jpeg" and has_alpha:
+                format = "png" if "png" in profile.formats else "jpeg"
+            if format == "jpeg" and image.mode == "RGBA":
+                background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+                image = Image.alpha_composite(background, image).convert("RGB")
+            
+            data = b""
+            for quality in REENCODE_QUALITIES:
+                output = io.BytesIO()
+                if format == "webp":
+                    image.save(output, "WEBP", quality=quality, method=4)
+                elif format == "jpeg":
+                    image.save(output, "JPEG", quality=quality, optimize=True)
+                else:
+                    image.save(output, "PNG", optimize=True)
+                data = output.getvalue()
+                if len(data) <= profile.max_bytes or format == "png":
+                    break
+            if len(data) > profile.max_bytes:
+                raise FileError(f"Image still larger than {profile.max_bytes} bytes after re-encoding")
+            return _make_part(data, format, *image.size)
+    except FileError:
+        raise
+    except Exception as e:
+        raise FileError(f"Failed to encode image: {str(e)}", os.path.basename(path))
+
+
+class ImagePartCache:
+    """LRU of encoded images keyed by (image bytes, profile), bounded in bytes"""
+    
+    def __init__(self, max_bytes: int = IMAGE_PART_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, ImagePart]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+    
+    def get(self, key: str) -> Optional[ImagePart]:
+        with self._lock:
+            part = self._entries.get(key)
+            if part is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return part
+    
+    def set(self, key: str, part: ImagePart) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total -= previous.size
+            self._entries[key] = part
+            self._total += part.size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= evicted.size
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes, **self._stats}
+
+
+def _cache_key(attachment: ImageAttachment, profile: VisionProfile) -> str:
+    if attachment.content_hash:
+        source = attachment.content_hash
+    else:
+        # Files stored before hashing: identify by path and modification time
+        stat_result = os.stat(attachment.path)
+        source = f"{attachment.path}:{stat_result.st_mtime_ns}:{stat_result.st_size}"
+    return f"{source}|{profile.key}"
+
+
+async def prepare_image_parts(
+    attachments: List[ImageAttachment],
+    profile: VisionProfile,
+    cache: Optional["ImagePartCache"] = None
+) -> List[ImagePart]:
+    """
+    Encode attachments for a provider, reusing earlier encodings
+    
+    Encoding runs in worker threads (Pillow releases the GIL while
+    resampling and compressing). Images that cannot be encoded are left
+    out; their OCR text still reaches the model through file context.
+    
+    Args:
+        attachments: Images to send
+        profile: Provider limits
+        cache: Cache to use (defaults to the global one)
+    
+    Returns:
+        Image parts in attachment order
+    """
+    cache = cache if cache is not None else get_image_part_cache()
+    
+    async def prepare(attachment: ImageAttachment) -> Optional[ImagePart]:
+        try:
+            key = _cache_key(attachment, profile)
+            part = cache.get(key)
+            if part is None:
+                part = await asyncio.to_thread(encode_image, attachment.path, profile)
+                cache.set(key, part)
+            return part
+        except (FileError, OSError) as e:
+            print(f"Skipping image {attachment.name or attachment.path}: {getattr(e, 'message', e)}")
+            return None
+    
+    parts = await asyncio.gather(*(prepare(attachment) for attachment in attachments))
+    return [part for part in parts if part is not None]
+
+
+# Global cache instance
+_image_part_cache: Optional[ImagePartCache] = None
+
+
+def get_image_part_cache() -> ImagePartCache:
+    """Get or create global encoded image cache"""
+    global _image_part_cache
+    if _image_part_cache is None:
+        _image_part_cache = ImagePartCache()
+    return _image_part_cache
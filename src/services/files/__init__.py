@@ -2,7 +2,13 @@
 File services module for GenZ Smart
 Provides file processing, parsing, and content extraction
 """
-from src.services.files.processor import FileProcessor, get_file_processor
+from src.services.files.processor import FileProcessor, get_file_processor, parse_file
+from src.services.files.storage import StoredUpload, save_upload, store_stream
+from src.services.files.blobs import BlobStore, apply_blob_parse
+from src.services.files.chunks import ChunkStore, TextChunk, RetrievedChunk, split_into_chunks
+from src.services.files.ingest import StagedFile, StagingResult, stage_archive, register_files
+from src.services.files.renditions import RenditionSpec, RenditionCache, RenditionService, get_rendition_service
+from src.services.files.worker import FileJob, FileProcessingQueue, get_file_queue
 from src.services.files.parsers import (
     PDFParser,
     DocxParser,
@@ -16,6 +22,27 @@ from src.services.files.parsers import (
 __all__ = [
     "FileProcessor",
     "get_file_processor",
+    "parse_file",
+    "StoredUpload",
+    "save_upload",
+    "store_stream",
+    "BlobStore",
+    "apply_blob_parse",
+    "ChunkStore",
+    "TextChunk",
+    "RetrievedChunk",
+    "split_into_chunks",
+    "StagedFile",
+    "StagingResult",
+    "stage_archive",
+    "register_files",
+    "RenditionSpec",
+    "RenditionCache",
+    "RenditionService",
+    "get_rendition_service",
+    "FileJob",
+    "FileProcessingQueue",
+    "get_file_queue",
     "PDFParser",
     "DocxParser",
     "ImageParser",
@@ -0,0 +1,363 @@
+"""
+Content-addressed blob storage for GenZ Smart
+Identical uploads share one file on disk and one parse result
+"""
+import os
+import shutil
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from sqlalchemy import update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, undefer
+
+from src.models.database import File, FileBlob, FileChunk
+from src.services.files.storage import StoredUpload
+
+
+BLOB_DIR_NAME = "blobs"
+GC_GRACE_SECONDS = 60 * 60  # Newer blobs may belong to an upload another worker has not committed yet
+
+
+def blob_path(root: str, content_hash: str, extension: str = "") -> str:
+    """Location of a blob: <root>/blobs/<first two hex chars>/<hash><ext>"""
+    return os.path.join(root, BLOB_DIR_NAME, content_hash[:2], f"{content_hash}{extension}")
+
+
+def file_extension(file: File) -> str:
+    """The extension a File was uploaded with, which selects its parser"""
+    return os.path.splitext(file.filename or file.original_name or "")[1].lower()
+
+
+def matches_blob(file: File, blob: FileBlob) -> bool:
+    """
+    Whether a File has the extension its blob was stored under
+    
+    The blob keeps the first upload's extension, so a later upload of the
+    same bytes under another extension needs its own parser and cannot
+    share the blob's parse.
+    """
+    return os.path.splitext(blob.storage_path)[1].lower() == file_extension(file)
+
+
+def link_with_extension(path: str, extension: str, directory: str) -> str:
+    """
+    Give a blob the extension its parser dispatches on
+    
+    Hard-links (or, across filesystems, copies) the blob into directory
+    under a unique name ending in extension. The caller removes it.
+    """
+    alias = os.path.join(directory, f".parse-{uuid.uuid4().hex}{extension}")
+    try:
+        os.link(path, alias)
+    except OSError:
+        shutil.copyfile(path, alias)
+    return alias
+
+
+class BlobStore:
+    """
+    Reference-counted blob storage on top of the upload directory
+    
+    Each distinct SHA-256 is stored once. File rows point at their blob
+    through File.content_hash, and the blob is deleted from disk when the
+    last File referencing it goes away. Reference counts are changed with
+    single UPDATE statements so concurrent requests do not lose updates.
+    """
+    
+    def __init__(self, db: Session, root: str):
+        self.db = db
+        self.root = root
+    
+    def add(self, stored: StoredUpload, extension: str = "") -> FileBlob:
+        """
+        Take ownership of a freshly written upload
+        
+        If a blob with the same hash exists its reference count is bumped
+        and the new copy is removed; otherwise the upload is moved into the
+        blob directory.
+        
+        Args:
+            stored: Upload written by save_upload
+            extension: File extension kept on the blob (parsers dispatch on it)
+        
+        Returns:
+            The FileBlob, with one reference taken for the caller
+        """
+        content_hash = stored.sha256
+        
+        blob = self._acquire(content_hash)
+        if blob is not None:
+            _remove_quietly(stored.path)
+            return blob
+        
+        path = blob_path(self.root, content_hash, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(stored.path, path)
+        
+        blob = FileBlob(
+            content_hash=content_hash,
+            size=stored.size,
+            storage_path=path,
+            ref_count=1
+        )
+        self.db.add(blob)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same bytes created the row first;
+            # both wrote identical bytes to the same path, so just share it
+            self.db.rollback()
+            blob = self._acquire(content_hash)
+            if blob is None:
+                raise
+        return blob
+    
+    def add_many(self, uploads: List[Tuple[StoredUpload, str]]) -> Dict[str, FileBlob]:
+        """
+        Take ownership of several uploads in one transaction
+        
+        Existing blobs get one reference-count UPDATE per distinct hash and
+        new blobs are inserted together, instead of a commit per upload.
+        
+        Args:
+            uploads: (stored upload, extension) pairs; hashes may repeat
+        
+        Returns:
+            FileBlob per content hash, with one reference taken per upload
+        """
+        if not uploads:
+            return {}
+        counts = Counter(stored.sha256 for stored, _ in uploads)
+        existing = {
+            blob.content_hash: blob
+            for blob in self.db.query(FileBlob).filter(FileBlob.content_hash.in_(list(counts)))
+        }
+        
+        created: Dict[str, FileBlob] = {}
+        for stored, extension in uploads:
+            content_hash = stored.sha256
+            if content_hash in existing or content_hash in created:
+                _remove_quietly(stored.path)
+                continue
+            path = blob_path(self.root, content_hash, extension)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(stored.path, path)
+            created[content_hash] = FileBlob(
+                content_hash=content_hash,
+                size=stored.size,
+                storage_path=path,
+                ref_count=counts[content_hash]
+            )
+        
+        for content_hash in existing:
+            self.db.execute(
+                update(FileBlob)
+                .where(FileBlob.content_hash == content_hash)
+                .values(ref_count=FileBlob.ref_count + counts[content_hash])
+                .execution_options(synchronize_session=False)
+            )
+        self.db.add_all(created.values())
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent upload created one of the rows first; fall back
+            # to taking the references hash by hash
+            self.db.rollback()
+            return {
+                content_hash: self._acquire(content_hash, counts[content_hash])
+                or self._insert(created.get(content_hash) or existing[content_hash], counts[content_hash])
+                for content_hash in counts
+            }
+        
+        # One query reloads every row expired by the commit, with the stored
+        # parse that apply_blob_parse copies onto the new files
+        return {
+            blob.content_hash: blob
+            for blob in self.db.query(FileBlob)
+            .options(undefer(FileBlob.extracted_text))
+            .filter(FileBlob.content_hash.in_(list(counts)))
+        }
+    
+    def release(self, content_hash: Optional[str]) -> bool:
+        """
+        Drop one reference to a blob, deleting it once unreferenced
+        
+        The file is moved aside while the row delete still holds its lock,
+        so a concurrent upload of the same bytes, which waits for that lock
+        and then writes a new blob to the same path, never loses its file.
+        
+        Returns:
+            True if the blob was deleted
+        """
+        if not content_hash:
+            return False
+        self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.content_hash == content_hash)
+            .values(ref_count=FileBlob.ref_count - 1)
+        )
+        blob = self.db.get(FileBlob, content_hash)
+        path = blob.storage_path if blob is not None else None
+        result = self.db.execute(
+            delete(FileBlob)
+            .where(FileBlob.content_hash == content_hash, FileBlob.ref_count <= 0)
+            .execution_options(synchronize_session="fetch")
+        )
+        doomed = None
+        if result.rowcount:
+            self.db.execute(delete(FileChunk).where(FileChunk.content_hash == content_hash))
+            doomed = _move_aside(path)
+        try:
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            if doomed:
+                os.replace(doomed, path)
+            raise
+        
+        if result.rowcount:
+            _remove_quietly(doomed)
+            return True
+        return False
+    
+    def record_parse(
+        self,
+        content_hash: str,
+        text: str,
+        word_count: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store the first successful parse so later uploads can reuse it"""
+        self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.content_hash == content_hash, FileBlob.parsed_at.is_(None))
+            .values(
+                extracted_text=text,
+                word_count=word_count,
+                meta_data=metadata,
+                parsed_at=datetime.utcnow()
+            )
+        )
+        self.db.commit()
+    
+    def collect_garbage(self, grace_seconds: float = GC_GRACE_SECONDS) -> List[str]:
+        """
+        Reconcile blobs with the File rows that reference them
+        
+        Fixes drifted reference counts, deletes unreferenced blobs and
+        removes files in the blob directory that have no row. Blobs and
+        files younger than grace_seconds are left alone: with several
+        workers, an upload elsewhere may have moved its blob in without
+        committing the File that references it yet.
+        
+        Args:
+            grace_seconds: Minimum age of anything deleted
+        
+        Returns:
+            Hashes of the deleted blobs
+        """
+        removed = []
+        known_paths = set()
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        references = dict(
+            self.db.query(File.content_hash, func.count(File.id))
+            .filter(File.content_hash.isnot(None))
+            .group_by(File.content_hash)
+            .all()
+        )
+        
+        for blob in self.db.query(FileBlob).all():
+            known_paths.add(os.path.abspath(blob.storage_path))
+            if blob.created_at is not None and blob.created_at > cutoff:
+                continue
+            count = references.get(blob.content_hash, 0)
+            if count == 0:
+                removed.append(blob.content_hash)
+                _remove_quietly(blob.storage_path)
+                self.db.execute(delete(FileChunk).where(FileChunk.content_hash == blob.content_hash))
+                self.db.delete(blob)
+                known_paths.discard(os.path.abspath(blob.storage_path))
+                continue
+            blob.ref_count = count
+        self.db.commit()
+        
+        blob_root = os.path.join(self.root, BLOB_DIR_NAME)
+        stale = time.time() - grace_seconds
+        for directory, _, filenames in os.walk(blob_root):
+            for filename in filenames:
+                path = os.path.abspath(os.path.join(directory, filename))
+                if path not in known_paths and _modified_before(path, stale):
+                    _remove_quietly(path)
+        return removed
+    
+    def _insert(self, blob: FileBlob, count: int) -> FileBlob:
+        blob = FileBlob(
+            content_hash=blob.content_hash,
+            size=blob.size,
+            storage_path=blob.storage_path,
+            ref_count=count
+        )
+        self.db.add(blob)
+        self.db.commit()
+        return blob
+    
+    def _acquire(self, content_hash: str, count: int = 1) -> Optional[FileBlob]:
+        result = self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.content_hash == content_hash)
+            .values(ref_count=FileBlob.ref_count + count)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            return None
+        self.db.commit()
+        blob = self.db.get(FileBlob, content_hash)
+        self.db.refresh(blob)
+        return blob
+
+
+def apply_blob_parse(file: File, blob: FileBlob) -> bool:
+    """
+    Copy a blob's stored parse result onto a File row
+    
+    Returns:
+        True if the blob had been parsed (under the file's extension) and
+        the file is now ready
+    """
+    if blob.parsed_at is None or not matches_blob(file, blob):
+        return False
+    file.extracted_text = blob.extracted_text
+    file.word_count = blob.word_count
+    file.status = "ready"
+    return True
+
+
+def _modified_before(path: str, timestamp: float) -> bool:
+    try:
+        return os.path.getmtime(path) < timestamp
+    except OSError:
+        return False
+
+
+def _move_aside(path: Optional[str]) -> Optional[str]:
+    """Rename a blob file to a unique name next to it; None if it is missing"""
+    if not path:
+        return None
+    doomed = f"{path}.deleted-{uuid.uuid4().hex}"
+    try:
+        os.replace(path, doomed)
+    except FileNotFoundError:
+        return None
+    return doomed
+
+
+def _remove_quietly(path: Optional[str]) -> None:
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"Failed to delete blob file {path}: {e}")
@@ -0,0 +1,626 @@
+"""
+Chunk store for GenZ Smart
+Splits extracted file text into overlapping chunks and retrieves the ones
+relevant to a question with BM25 (optionally fused with local embeddings)
+"""
+import math
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from src.api.config import settings
+from src.models.database import File, FileBlob, FileChunk, Message, conversation_files, message_attachments
+
+
+# Chunk sizes, in estimated tokens
+CHUNK_TARGET_TOKENS = 300
+CHUNK_OVERLAP_TOKENS = 50
+CHUNK_MIN_TOKENS = 60  # A section boundary only closes a chunk at least this large
+CHARS_PER_TOKEN = 4  # Rough estimate that holds for English prose and code
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal rank fusion constant for hybrid ranking
+
+# Retrieval defaults
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 2000
+INDEX_CACHE_MAX_ENTRIES = 64  # Per-blob indexes kept in memory
+
+TERM_PATTERN = re.compile(r"\w+")
+BLOCK_SEPARATOR_PATTERN = re.compile(r"\n[ \t]*\n+")
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+|\n")
+HEADING_PATTERN = re.compile(r"^(?:#{1,6}\s+(.+)|---\s*(Page \d+)\s*---)$")  # Markdown headings, PDF page markers
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were what when where which who why will with how do does".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase index terms of a text, without stop words"""
+    return [t for t in TERM_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+@dataclass
+class TextChunk:
+    """A span of a document's text"""
+    position: int
+    start: int
+    end: int
+    text: str
+    heading: Optional[str] = None
+    tokens: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "position": self.position,
+            "start": self.start,
+            "end": self.end,
+            "heading": self.heading,
+            "text": self.text,
+            "tokens": self.tokens,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TextChunk":
+        return cls(
+            position=data["position"],
+            start=data["start"],
+            end=data["end"],
+            text=data["text"],
+            heading=data.get("heading"),
+            tokens=data.get("tokens") or estimate_tokens(data["text"])
+        )
+
+
+def _heading_of(block: str) -> Optional[str]:
+    first_line = block.split("\n", 1)[0].strip()
+    match = HEADING_PATTERN.match(first_line)
+    if not match:
+        return None
+    return next(group for group in match.groups() if group)[:255]
+
+
+def _sentences(text: str, start: int, end: int, max_tokens: int) -> Iterable[Tuple[int, int]]:
+    """Spans of the sentences in text[start:end], none longer than max_tokens"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    position = start
+    for match in SENTENCE_END_PATTERN.finditer(text, start, end):
+        if match.start() > position:
+            yield from _hard_split(text, position, match.start(), max_chars)
+        position = match.end()
+    if position < end:
+        yield from _hard_split(text, position, end, max_chars)
+
+
+def _hard_split(text: str, start: int, end: int, max_chars: int) -> Iterable[Tuple[int, int]]:
+    """Split on whitespace (or anywhere, for unbroken runs) into max_chars spans"""
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield start, end
+
+
+def split_into_chunks(
+    text: str,
+    target_tokens: int = CHUNK_TARGET_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> List[TextChunk]:
+    """
+    Split text into overlapping chunks that follow its structure
+    
+    Sentences are packed into chunks of about target_tokens. Headings and
+    page markers start a new chunk and are recorded on the chunks that
+    follow them. Consecutive chunks within a section share up to
+    overlap_tokens of trailing sentences.
+    
+    Args:
+        text: Full extracted text
+        target_tokens: Preferred chunk size
+        overlap_tokens: Text repeated from the end of the previous chunk
+    
+    Returns:
+        Chunks in document order, with character offsets into text
+    """
+    chunks: List[TextChunk] = []
+    current: List[Tuple[int, int]] = []
+    current_tokens = 0
+    heading: Optional[str] = None
+    chunk_heading: Optional[str] = None
+    
+    def flush(keep_overlap: bool) -> None:
+        nonlocal current, current_tokens
+        if not current:
+            return
+        start, end = current[0][0], current[-1][1]
+        body = text[start:end]
+        chunks.append(TextChunk(
+            position=len(chunks),
+            start=start,
+            end=end,
+            text=body,
+            heading=chunk_heading,
+            tokens=estimate_tokens(body)
+        ))
+        kept: List[Tuple[int, int]] = []
+        kept_tokens = 0
+        if keep_overlap:
+            for span in reversed(current[1:]):
+                span_tokens = estimate_tokens(text[span[0]:span[1]])
+                if kept_tokens + span_tokens > overlap_tokens:
+                    break
+                kept.insert(0, span)
+                kept_tokens += span_tokens
+        current, current_tokens = kept, kept_tokens
+    
+    block_start = 0
+    separators = [m.span() for m in BLOCK_SEPARATOR_PATTERN.finditer(text)]
+    for block_end, next_start in separators + [(len(text), len(text))]:
+        block = text[block_start:block_end]
+        start, end = block_start, block_end
+        block_start = next_start
+        if not block.strip():
+            continue
+        
+        block_heading = _heading_of(block)
+        if block_heading is not None:
+            if current_tokens >= CHUNK_MIN_TOKENS:
+                flush(keep_overlap=False)
+            heading = block_heading
+        
+        for piece_start, piece_end in _sentences(text, start, end, target_tokens):
+            piece_tokens = estimate_tokens(text[piece_start:piece_end])
+            if current and current_tokens + piece_tokens > target_tokens:
+                flush(keep_overlap=True)
+            if not current:
+                chunk_heading = heading
+            current.append((piece_start, piece_end))
+            current_tokens += piece_tokens
+    
+    flush(keep_overlap=False)
+    return chunks
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class ChunkIndex:
+    """
+    BM25 index over one document's chunks
+    
+    Postings are built once, so scoring a question only touches the
+    chunks that contain its terms. Collection statistics (document
+    frequency, average length) are passed in by the caller so scores
+    are comparable across several documents searched together.
+    """
+    
+    def __init__(self, chunks: List[TextChunk], vectors: Optional[List[Optional[List[float]]]] = None):
+        self.chunks = chunks
+        self.vectors = vectors if vectors and all(v is not None for v in vectors) else None
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for i, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk.text))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((i, frequency))
+        self.total_length = sum(self.lengths)
+    
+    def document_frequency(self, term: str) -> int:
+        return len(self.postings.get(term, ()))
+    
+    def score(self, idf: Dict[str, float], average_length: float) -> Dict[int, float]:
+        """BM25 score of every chunk containing at least one query term"""
+        scores: Dict[int, float] = {}
+        for term, weight in idf.items():
+            for i, frequency in self.postings.get(term, ()):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / average_length)
+                scores[i] = scores.get(i, 0.0) + weight * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return scores
+    
+    def similarities(self, query_vector: List[float]) -> Dict[int, float]:
+        """Cosine similarity of each chunk to the query (vectors are normalized)"""
+        if self.vectors is None:
+            return {}
+        return {
+            i: sum(a * b for a, b in zip(vector, query_vector))
+            for i, vector in enumerate(self.vectors)
+        }
+
+
+@dataclass
+class RetrievedChunk:
+    """A chunk selected for a question"""
+    file_id: str
+    file_name: str
+    chunk: TextChunk
+    score: float
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {"file_id": self.file_id, "file_name": self.file_name, "score": self.score, **self.chunk.to_dict()}
+
+
+def rank_chunks(
+    indexes: List[Tuple[Any, ChunkIndex]],
+    query: str,
+    query_vector: Optional[List[float]] = None
+) -> List[Tuple[float, Any, TextChunk]]:
+    """
+    Rank the chunks of several documents against a question
+    
+    BM25 statistics are pooled across the documents. When a query vector is
+    given, documents with embeddings are ranked by reciprocal rank fusion
+    of their BM25 and cosine rankings.
+    
+    Args:
+        indexes: (key, index) per document
+        query: Question text
+        query_vector: Normalized query embedding, if enabled
+    
+    Returns:
+        (score, key, chunk) for every matching chunk, best first
+    """
+    terms = set(tokenize(query))
+    total_chunks = sum(len(index.chunks) for _, index in indexes)
+    if total_chunks == 0:
+        return []
+    average_length = max(1.0, sum(index.total_length for _, index in indexes) / total_chunks)
+    idf = {}
+    for term in terms:
+        frequency = sum(index.document_frequency(term) for _, index in indexes)
+        if frequency:
+            idf[term] = math.log(1 + (total_chunks - frequency + 0.5) / (frequency + 0.5))
+    
+    lexical = []
+    for order, (key, index) in enumerate(indexes):
+        for i, score in index.score(idf, average_length).items():
+            lexical.append((score, order, i))
+    lexical.sort(key=lambda item: (-item[0], item[1], item[2]))
+    
+    if query_vector is None or not any(index.vectors for _, index in indexes):
+        return [(score, indexes[order][0], indexes[order][1].chunks[i]) for score, order, i in lexical]
+    
+    semantic = []
+    for order, (key, index) in enumerate(indexes):
+        for i, similarity in index.similarities(query_vector).items():
+            semantic.append((similarity, order, i))
+    semantic.sort(key=lambda item: (-item[0], item[1], item[2]))
+    
+    fused: Dict[Tuple[int, int], float] = {}
+    for ranking in (lexical, semantic):
+        for rank, (_, order, i) in enumerate(ranking):
+            fused[(order, i)] = fused.get((order, i), 0.0) + 1 / (RRF_K + rank + 1)
+    ordered = sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+    return [(score, indexes[order][0], indexes[order][1].chunks[i]) for (order, i), score in ordered]
+
+
+def select_within_budget(
+    ranked: List[Tuple[float, Any, TextChunk]],
+    top_k: int = DEFAULT_TOP_K,
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+) -> List[Tuple[float, Any, TextChunk]]:
+    """
+    Take the best chunks that fit the token budget
+    
+    Chunks too large for the remaining budget are skipped in favour of
+    smaller ones further down.
+    """
+    selected = []
+    used = 0
+    for item in ranked:
+        if len(selected) >= top_k:
+            break
+        if used + item[2].tokens > token_budget:
+            continue
+        selected.append(item)
+        used += item[2].tokens
+    return selected
+
+
+def merge_excerpts(chunks: List[TextChunk]) -> List[TextChunk]:
+    """Join chunks of one document that overlap or touch, dropping repeated text"""
+    merged: List[TextChunk] = []
+    for chunk in sorted(chunks, key=lambda c: c.start):
+        last = merged[-1] if merged else None
+        if last is not None and chunk.start <= last.end:
+            if chunk.end > last.end:
+                extra = chunk.text[last.end - chunk.start:]
+                last.text += extra
+                last.end = chunk.end
+                last.tokens = estimate_tokens(last.text)
+            continue
+        merged.append(TextChunk(**chunk.__dict__))
+    return merged
+
+
+class LocalEmbedder:
+    """Sentence embeddings computed locally with sentence-transformers"""
+    
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self._lock = threading.Lock()
+    
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """Normalized embedding per text"""
+        with self._lock:
+            vectors = self.model.encode(texts, normalize_embeddings=True)
+        return [list(map(float, vector)) for vector in vectors]
+
+
+_embedder: Optional[LocalEmbedder] = None
+_embedder_loaded = False
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Optional[LocalEmbedder]:
+    """Embedder for FILE_EMBEDDING_MODEL, or None when disabled or unavailable"""
+    global _embedder, _embedder_loaded
+    with _embedder_lock:
+        if not _embedder_loaded:
+            _embedder_loaded = True
+            if settings.FILE_EMBEDDING_MODEL:
+                try:
+                    _embedder = LocalEmbedder(settings.FILE_EMBEDDING_MODEL)
+                except ImportError:
+                    print("sentence-transformers not installed; file retrieval uses BM25 only")
+                except Exception as e:
+                    print(f"Failed to load embedding model: {e}")
+        return _embedder
+
+
+class _IndexCache:
+    """LRU of chunk indexes, each stored with the stamp it was built for"""
+    
+    def __init__(self, max_entries: int = INDEX_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Tuple[Any, ChunkIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any, stamp: Any) -> Optional[ChunkIndex]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def set(self, key: Any, stamp: Any, index: ChunkIndex) -> None:
+        with self._lock:
+            self._entries[key] = (stamp, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_index_cache = _IndexCache()
+
+
+class ChunkStore:
+    """
+    Persistent chunks of extracted text, keyed by blob content hash
+    
+    Chunks are written once per distinct upload, so identical files share
+    them just like they share the parse. Retrieval loads a blob's chunks
+    into an in-memory BM25 index the first time it is searched and reuses
+    it until the chunks change, so the per-question cost depends on the
+    question and the selected excerpts rather than the document size.
+    """
+    
+    def __init__(self, db: Session, embedder: Optional[LocalEmbedder] = None):
+        self.db = db
+        self.embedder = embedder if embedder is not None else get_embedder()
+    
+    def has_chunks(self, content_hash: str) -> bool:
+        return self.db.execute(
+            select(FileChunk.id).where(FileChunk.content_hash == content_hash).limit(1)
+        ).first() is not None
+    
+    def store(self, content_hash: str, chunks: List[TextChunk]) -> int:
+        """
+        Replace the chunks of a blob
+        
+        Returns:
+            Number of chunks written
+        """
+        vectors: List[Optional[List[float]]] = [None] * len(chunks)
+        if self.embedder is not None and chunks:
+            try:
+                vectors = self.embedder.encode([chunk.text for chunk in chunks])
+            except Exception as e:
+                print(f"Chunk embedding failed: {e}")
+        
+        self.db.execute(delete(FileChunk).where(FileChunk.content_hash == content_hash))
+        self.db.add_all([
+            FileChunk(
+                content_hash=content_hash,
+                position=chunk.position,
+                start_offset=chunk.start,
+                end_offset=chunk.end,
+                heading=chunk.heading,
+                text=chunk.text,
+                token_count=chunk.tokens,
+                embedding=pack_vector(vector) if vector is not None else None
+            )
+            for chunk, vector in zip(chunks, vectors)
+        ])
+        self.db.commit()
+        return len(chunks)
+    
+    def index_text(self, content_hash: str, text: str) -> int:
+        """Chunk and store a blob's text"""
+        return self.store(content_hash, split_into_chunks(text))
+    
+    def delete(self, content_hash: str) -> None:
+        """Remove a blob's chunks (the caller commits)"""
+        self.db.execute(delete(FileChunk).where(FileChunk.content_hash == content_hash))
+    
+    def resolve_file_ids(self, conversation_id: Optional[str], file_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Files in scope for a turn
+        
+        The turn's own attachments come first, then files attached to the
+        conversation and to its earlier messages.
+        """
+        resolved = list(dict.fromkeys(file_ids or []))
+        if conversation_id:
+            linked = self.db.execute(
+                select(conversation_files.c.file_id)
+                .where(conversation_files.c.conversation_id == conversation_id)
+                .union(
+                    select(message_attachments.c.file_id)
+                    .join(Message, Message.id == message_attachments.c.message_id)
+                    .where(Message.conversation_id == conversation_id)
+                )
+            ).scalars().all()
+            resolved.extend(file_id for file_id in linked if file_id not in resolved)
+        return resolved
+    
+    def retrieve(
+        self,
+        file_ids: List[str],
+        query: str,
+        top_k: int = DEFAULT_TOP_K,
+        token_budget: int = DEFAULT_TOKEN_BUDGET
+    ) -> List[RetrievedChunk]:
+        """
+        Select the chunks of the given files most relevant to a question
+        
+        When nothing matches (e.g. "summarize this"), the opening chunks of
+        each file are returned instead.
+        
+        Args:
+            file_ids: Files to search, in priority order
+            query: Question text
+            top_k: Max chunks returned
+            token_budget: Max estimated tokens across the returned chunks
+        
+        Returns:
+            Retrieved chunks in file and document order
+        """
+        if not file_ids:
+            return []
+        rows = self.db.execute(
+            select(File.id, File.original_name, File.content_hash)
+            .where(File.id.in_(file_ids), File.status == "ready")
+        ).all()
+        by_id = {row.id: row for row in rows}
+        files = [by_id[file_id] for file_id in file_ids if file_id in by_id]
+        
+        indexes: List[Tuple[Any, ChunkIndex]] = []
+        names: Dict[Any, Tuple[str, str]] = {}
+        seen = set()
+        for file in files:
+            key = file.content_hash or f"file:{file.id}"
+            if key in seen:
+                continue
+            seen.add(key)
+            index = self._load_index(file.id, file.content_hash)
+            if index is not None and index.chunks:
+                indexes.append((key, index))
+                names[key] = (file.id, file.original_name)
+        if not indexes:
+            return []
+        
+        query_vector = None
+        if self.embedder is not None and any(index.vectors for _, index in indexes):
+            try:
+                query_vector = self.embedder.encode([query])[0]
+            except Exception as e:
+                print(f"Query embedding failed: {e}")
+        
+        ranked = rank_chunks(indexes, query, query_vector)
+        if not ranked:
+            ranked = [(0.0, key, chunk) for key, index in indexes for chunk in index.chunks]
+        
+        selected = select_within_budget(ranked, top_k, token_budget)
+        order = {key: n for n, (key, _) in enumerate(indexes)}
+        selected.sort(key=lambda item: (order[item[1]], item[2].position))
+        return [
+            RetrievedChunk(file_id=names[key][0], file_name=names[key][1], chunk=chunk, score=score)
+            for score, key, chunk in selected
+        ]
+    
+    def _load_index(self, file_id: str, content_hash: Optional[str]) -> Optional[ChunkIndex]:
+        if content_hash is None:
+            # Files stored before content addressing: index the text in memory
+            text = self.db.execute(select(File.extracted_text).where(File.id == file_id)).scalar()
+            if not text:
+                return None
+            stamp = len(text)
+            index = _index_cache.get(f"file:{file_id}", stamp)
+            if index is None:
+                index = ChunkIndex(split_into_chunks(text))
+                _index_cache.set(f"file:{file_id}", stamp, index)
+            return index
+        
+        stamp = tuple(self.db.execute(
+            select(func.max(FileChunk.id), func.count(FileChunk.id))
+            .where(FileChunk.content_hash == content_hash)
+        ).one())
+        if not stamp[1]:
+            # Parsed before chunking existed; chunk the stored parse once
+            text = self.db.execute(
+                select(FileBlob.extracted_text).where(FileBlob.content_hash == content_hash)
+            ).scalar()
+            if text is None:
+                text = self.db.execute(select(File.extracted_text).where(File.id == file_id)).scalar()
+            chunks = split_into_chunks(text) if text else []
+            if not chunks:
+                return None  # Empty or whitespace-only text (e.g. a blank scan)
+            self.store(content_hash, chunks)
+            return ChunkIndex(chunks)
+        
+        index = _index_cache.get(content_hash, stamp)
+        if index is None:
+            rows = self.db.execute(
+                select(FileChunk).where(FileChunk.content_hash == content_hash).order_by(FileChunk.position)
+            ).scalars().all()
+            chunks = [
+                TextChunk(
+                    position=row.position,
+                    start=row.start_offset,
+                    end=row.end_offset,
+                    text=row.text,
+                    heading=row.heading,
+                    tokens=row.token_count
+                )
+                for row in rows
+            ]
+            vectors = [unpack_vector(row.embedding) if row.embedding else None for row in rows]
+            index = ChunkIndex(chunks, vectors)
+            _index_cache.set(content_hash, stamp, index)
+        return index
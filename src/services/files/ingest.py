@@ -0,0 +1,218 @@
+"""
+Bulk ingestion for GenZ Smart
+Streams multi-file uploads and archive members into blob storage and
+registers them with one transaction
+"""
+import mimetypes
+import os
+import posixpath
+import tarfile
+import zipfile
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Iterator, BinaryIO, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.core.exceptions import FileError
+from src.core.ids import new_id
+from src.models.database import File, Conversation
+from src.services.files.blobs import BlobStore, apply_blob_parse
+from src.services.files.parsers import is_file_supported
+from src.services.files.storage import StoredUpload, store_stream
+
+
+MAX_NAME_LENGTH = 255
+
+
+@dataclass
+class StagedFile:
+    """A file written to the upload directory, not yet registered"""
+    name: str  # Path within the archive, or the uploaded filename
+    stored: StoredUpload
+    extension: str
+    mime_type: str
+
+
+@dataclass
+class StagingResult:
+    """Files staged from an upload, and the members that were skipped"""
+    files: List[StagedFile] = field(default_factory=list)
+    skipped: List[Dict[str, str]] = field(default_factory=list)
+    total_bytes: int = 0
+    
+    def skip(self, name: str, reason: str) -> None:
+        self.skipped.append({"name": name, "reason": reason})
+    
+    def discard(self) -> None:
+        """Remove staged files that will not be registered"""
+        for staged in self.files:
+            if os.path.exists(staged.stored.path):
+                os.remove(staged.stored.path)
+        self.files = []
+
+
+def archive_kind(filename: str) -> Optional[str]:
+    """'zip' or 'tar' for archive filenames, else None"""
+    name = filename.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar", ".tar.gz", ".tgz")):
+        return "tar"
+    return None
+
+
+def file_extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower()
+
+
+def guess_mime_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def _is_hidden(name: str) -> bool:
+    """OS metadata and dotfiles, e.g. __MACOSX/ or .DS_Store"""
+    return any(part.startswith(".") or part == "__MACOSX" for part in name.split("/") if part)
+
+
+def iter_archive(path: str, kind: str) -> Iterator[Tuple[str, int, Optional[BinaryIO]]]:
+    """
+    Stream the regular-file members of an archive without extracting it
+    
+    Tar archives are read sequentially ("r|*"), so gzip members are
+    decompressed once, front to back. Each member's stream is only valid
+    until the next item is requested.
+    
+    Yields:
+        (member name, declared size, stream) per member; stream is None for
+        members that are not regular files
+    """
+    if kind == "zip":
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as stream:
+                    yield info.filename, info.file_size, stream
+        return
+    
+    with tarfile.open(path, mode="r|*") as archive:
+        for member in archive:
+            if member.isdir():
+                continue
+            stream = archive.extractfile(member) if member.isfile() else None
+            yield member.name, member.size, stream
+
+
+def stage_archive(
+    path: str,
+    directory: str,
+    max_file_size: int,
+    max_members: int,
+    max_total_size: int
+) -> StagingResult:
+    """
+    Write the supported members of an archive into directory
+    
+    Members are skipped before any bytes are read when they are hidden,
+    unsupported, or declare a size over the limit. The member count and
+    total uncompressed size are capped, and the size limit is enforced
+    again while copying, so a lying header cannot exhaust the disk.
+    
+    Args:
+        path: Archive on disk
+        directory: Upload directory for the staged files
+        max_file_size: Per-member size limit in bytes
+        max_members: Members staged at most
+        max_total_size: Uncompressed bytes staged at most
+    
+    Returns:
+        StagingResult with staged files and skip reasons
+    """
+    result = StagingResult()
+    kind = archive_kind(path)
+    try:
+        for name, size, stream in iter_archive(path, kind):
+            name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+            if stream is None:
+                result.skip(name, "not a regular file")
+            elif _is_hidden(name):
+                continue
+            elif not is_file_supported(name):
+                result.skip(name, "unsupported file type")
+            elif size > max_file_size:
+                result.skip(name, f"larger than {max_file_size} bytes")
+            elif len(result.files) >= max_members:
+                result.skip(name, f"archive member limit ({max_members}) reached")
+            elif result.total_bytes + size > max_total_size:
+                result.skip(name, f"archive size limit ({max_total_size} bytes) reached")
+            else:
+                try:
+                    stored = store_stream(stream, directory, max_file_size, name)
+                except FileError as e:
+                    result.skip(name, e.message)
+                    continue
+                result.total_bytes += stored.size
+                result.files.append(StagedFile(
+                    name=name,
+                    stored=stored,
+                    extension=file_extension(name),
+                    mime_type=guess_mime_type(name)
+                ))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        result.discard()
+        raise FileError(f"Could not read archive: {e}", os.path.basename(path))
+    return result
+
+
+def register_files(
+    db: Session,
+    upload_dir: str,
+    staged: List[StagedFile],
+    conversation_id: Optional[str] = None
+) -> List[File]:
+    """
+    Create the File rows for staged files in one transaction
+    
+    Blobs are taken in bulk (BlobStore.add_many) and the rows are inserted
+    together. Files whose contents were parsed before are ready at once.
+    
+    Args:
+        db: Database session
+        upload_dir: Upload root for blob storage
+        staged: Staged files
+        conversation_id: Conversation to attach the files to
+    
+    Returns:
+        The new File rows, in staging order
+    """
+    if not staged:
+        return []
+    blobs = BlobStore(db, upload_dir).add_many([(s.stored, s.extension) for s in staged])
+    
+    records = []
+    for item in staged:
+        blob = blobs[item.stored.sha256]
+        file_id = new_id()
+        record = File(
+            id=file_id,
+            filename=f"{file_id}{item.extension}",
+            original_name=item.name[-MAX_NAME_LENGTH:],
+            mime_type=item.mime_type,
+            size=blob.size,
+            status="processing",
+            storage_path=blob.storage_path,
+            content_hash=blob.content_hash
+        )
+        apply_blob_parse(record, blob)
+        records.append(record)
+    
+    if conversation_id:
+        conversation = db.get(Conversation, conversation_id)
+        if conversation is not None:
+            conversation.files.extend(records)
+    
+    db.add_all(records)
+    db.commit()
+    # Reload the committed rows with one query rather than one per row
+    loaded = {f.id: f for f in db.query(File).filter(File.id.in_([r.id for r in records]))}
+    return [loaded[record.id] for record in records]
@@ -6,10 +6,12 @@ from typing import Dict, Type, Optional, Any
 from pathlib import Path
 
 # Import parsers
-from src.services.files.parsers.pdf import PDFParser
+from src.services.files.parsers.document import ParsedDocument, DocumentCache, get_document_cache
+from src.services.files.parsers.pdf import PDFParser, PDFPage, parse_page_spec
 from src.services.files.parsers.docx import DocxParser
-from src.services.files.parsers.image import ImageParser
+from src.services.files.parsers.image import ImageParser, OCRExecutor, get_ocr_executor
 from src.services.files.parsers.code import CodeParser
+from src.services.files.parsers.tabular import TabularParser
 
 # Registry of file parsers
 PARSERS: Dict[str, Type] = {
@@ -30,11 +32,15 @@ PARSERS: Dict[str, Type] = {
     ".tsx": CodeParser,
     ".html": CodeParser,
     ".css": CodeParser,
-    ".json": CodeParser,
+    ".json": TabularParser,
+    ".jsonl": TabularParser,
+    ".ndjson": TabularParser,
     ".xml": CodeParser,
     ".yaml": CodeParser,
     ".yml": CodeParser,
-    ".csv": CodeParser,
+    ".csv": TabularParser,
+    ".tsv": TabularParser,
+    ".log": TabularParser,
     ".java": CodeParser,
     ".cpp": CodeParser,
     ".c": CodeParser,
@@ -87,10 +93,18 @@ def get_supported_extensions() -> list:
 
 
 __all__ = [
+    "ParsedDocument",
+    "DocumentCache",
+    "get_document_cache",
     "PDFParser",
+    "PDFPage",
+    "parse_page_spec",
     "DocxParser", 
     "ImageParser",
+    "OCRExecutor",
+    "get_ocr_executor",
     "CodeParser",
+    "TabularParser",
     "get_parser_for_file",
     "is_file_supported",
     "get_supported_extensions"
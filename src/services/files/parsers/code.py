@@ -4,7 +4,9 @@ Handles plain text and code files
 """
 from typing import Dict, Any, Optional
 from pathlib import Path
-import json
+import re
+
+from src.services.files.parsers.document import DocumentCache, ParsedDocument, get_document_cache
 
 
 class CodeParser:
@@ -53,8 +55,9 @@ class CodeParser:
         ".toml": "TOML"
     }
     
-    def __init__(self):
+    def __init__(self, cache: Optional[DocumentCache] = None):
         self.name = "Code/Text Parser"
+        self.cache = cache
     
     def parse(self, file_path: str) -> Dict[str, Any]:
         """
@@ -62,10 +65,18 @@ class CodeParser:
         
         Args:
             file_path: Path to file
-            
+        
         Returns:
             Dictionary with content and metadata
         """
+        return self.document(file_path).to_result()
+    
+    def document(self, file_path: str) -> ParsedDocument:
+        """Get the file's parsed document, parsing it only if it changed"""
+        cache = self.cache if self.cache is not None else get_document_cache()
+        return cache.get(file_path, self._parse, namespace=self.name)
+    
+    def _parse(self, file_path: str) -> ParsedDocument:
         result = {
             "text": "",
             "metadata": {},
@@ -90,9 +101,11 @@ class CodeParser:
                     content = f.read()
             
             result["text"] = content
+            document = ParsedDocument(file_path, result)
             
-            # Calculate metrics
-            lines = content.split('\n')
+            # Calculate metrics (the line split is kept for later views).
+            # CSV and JSON are analyzed by TabularParser.
+            lines = document.lines
             result["metadata"] = {
                 "lines": len(lines),
                 "characters": len(content),
@@ -101,27 +114,11 @@ class CodeParser:
                 "extension": ext
             }
             
-            # Special handling for specific formats
-            if ext == '.json':
-                try:
-                    parsed = json.loads(content)
-                    result["metadata"]["json_keys"] = list(parsed.keys()) if isinstance(parsed, dict) else []
-                    result["metadata"]["json_type"] = type(parsed).__name__
-                except json.JSONDecodeError:
-                    pass
-            
-            elif ext == '.csv':
-                lines_count = len([l for l in lines if l.strip()])
-                if lines_count > 0:
-                    first_line = lines[0]
-                    columns = first_line.split(',')
-                    result["metadata"]["csv_rows"] = lines_count
-                    result["metadata"]["csv_columns"] = len(columns)
-            
         except Exception as e:
             result["error"] = f"Failed to parse file: {str(e)}"
+            return ParsedDocument(file_path, result)
         
-        return result
+        return document
     
     def get_preview(self, file_path: str, max_lines: int = 50) -> str:
         """
@@ -130,22 +127,24 @@ class CodeParser:
         Args:
             file_path: Path to file
             max_lines: Maximum lines to return
-            
+        
         Returns:
             Preview text
         """
-        result = self.parse(file_path)
+        document = self.document(file_path)
         
-        if result["error"]:
-            return f"Error: {result['error']}"
+        if document.error:
+            return f"Error: {document.error}"
         
-        lines = result["text"].split('\n')
-        if len(lines) > max_lines:
-            preview_lines = lines[:max_lines]
-            preview_lines.append(f"\n... ({len(lines) - max_lines} more lines)")
-            return '\n'.join(preview_lines)
+        def build() -> str:
+            lines = document.lines
+            if len(lines) > max_lines:
+                preview_lines = lines[:max_lines]
+                preview_lines.append(f"\n... ({len(lines) - max_lines} more lines)")
+                return '\n'.join(preview_lines)
+            return document.text
         
-        return result["text"]
+        return document.view(f"preview_lines:{max_lines}", build)
     
     def get_language(self, file_path: str) -> str:
         """Get programming language for a file"""
@@ -164,20 +163,22 @@ class CodeParser:
         
         Args:
             file_path: Path to code file
-            
+        
         Returns:
             List of import statements
         """
-        result = self.parse(file_path)
+        document = self.document(file_path)
         
-        if result["error"] or not result["text"]:
+        if document.error or not document.text:
             return []
         
-        content = result["text"]
-        language = result["language"]
+        return list(document.view("imports", lambda: self._find_imports(document)))
+    
+    def _find_imports(self, document: ParsedDocument) -> list:
+        language = document.result["language"]
         imports = []
         
-        lines = content.split('\n')
+        lines = document.lines
         
         if language == "Python":
             for line in lines:
@@ -218,21 +219,22 @@ class CodeParser:
         
         Args:
             file_path: Path to code file
-            
+        
         Returns:
             List of function/class names
         """
-        result = self.parse(file_path)
+        document = self.document(file_path)
         
-        if result["error"] or not result["text"]:
+        if document.error or not document.text:
             return []
         
-        content = result["text"]
-        language = result["language"]
+        return list(document.view("symbols", lambda: self._find_functions(document)))
+    
+    def _find_functions(self, document: ParsedDocument) -> list:
+        content = document.text
+        language = document.result["language"]
         definitions = []
         
-        import re
-        
         if language == "Python":
             # Match function and class definitions
             pattern = r'^(?:async\s+)?def\s+(\w+)|^class\s+(\w+)'
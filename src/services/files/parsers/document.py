@@ -0,0 +1,241 @@
+"""
+Parsed document cache for GenZ Smart
+Keeps one parse per file and content hash with memoized derived views
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable
+
+
+DOCUMENT_CACHE_MAX_ENTRIES = 128
+DOCUMENT_CACHE_MAX_CHARS = 64 * 1024 * 1024  # Total extracted text held
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ParsedDocument:
+    """
+    The result of parsing a file once
+    
+    Derived views (lines, preview, imports, symbols, tables, headers, ...)
+    are computed on first use and memoized on the document, so repeated
+    operations on an unchanged file do no further work.
+    """
+    
+    def __init__(self, path: str, result: Dict[str, Any], content_hash: Optional[str] = None):
+        self.path = path
+        self.result = result
+        self.content_hash = content_hash
+        self._views: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def text(self) -> str:
+        return self.result.get("text") or ""
+    
+    @property
+    def error(self) -> Optional[str]:
+        return self.result.get("error")
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.result.get("metadata") or {}
+    
+    @property
+    def lines(self) -> List[str]:
+        """Text split into lines, computed once"""
+        return self.view("lines", lambda: self.text.split('\n'))
+    
+    def view(self, name: str, compute: Callable[[], Any]) -> Any:
+        """
+        Get a memoized view, computing it on first use
+        
+        Args:
+            name: View name, including any parameters that change its value
+            compute: Builds the view from the document
+        
+        Returns:
+            The view value
+        """
+        with self._lock:
+            if name in self._views:
+                return self._views[name]
+        value = compute()
+        with self._lock:
+            return self._views.setdefault(name, value)
+    
+    def set_view(self, name: str, value: Any) -> None:
+        """Store a view produced during the parse itself"""
+        with self._lock:
+            self._views[name] = value
+    
+    def preview(self, max_chars: int = 1000) -> str:
+        """First max_chars characters of the text"""
+        def build() -> str:
+            if self.error:
+                return f"Error: {self.error}"
+            text = self.text
+            return text[:max_chars] + "..." if len(text) > max_chars else text
+        return self.view(f"preview:{max_chars}", build)
+    
+    def to_result(self) -> Dict[str, Any]:
+        """Copy of the parse result that callers may modify"""
+        result = dict(self.result)
+        if isinstance(result.get("metadata"), dict):
+            result["metadata"] = dict(result["metadata"])
+        return result
+
+
+class DocumentCache:
+    """
+    LRU of parsed documents
+    
+    Entries are found by path while the file's size and modification time
+    are unchanged. On a miss the file is hashed, so identical bytes stored
+    at another path reuse the earlier parse. A changed file is reparsed
+    and its stale entry dropped. Failed parses are not cached.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = DOCUMENT_CACHE_MAX_ENTRIES,
+        max_chars: int = DOCUMENT_CACHE_MAX_CHARS
+    ):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._by_hash: "OrderedDict[tuple, ParsedDocument]" = OrderedDict()
+        self._by_path: Dict[tuple, tuple] = {}  # (namespace, path) -> (stat key, hash key)
+        self._chars = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "hash_hits": 0, "misses": 0}
+    
+    def get(
+        self,
+        file_path: str,
+        parse: Callable[[str], ParsedDocument],
+        namespace: str = ""
+    ) -> ParsedDocument:
+        """
+        Get the parsed document for a file, parsing it at most once
+        
+        Args:
+            file_path: Path to the file
+            parse: Produces a ParsedDocument from the path
+            namespace: Separates parsers that read the same file differently
+        
+        Returns:
+            The cached or freshly parsed document
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Let the parser report the missing file in its own words
+            return parse(file_path)
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        path_key = (namespace, path)
+        
+        with self._lock:
+            known = self._by_path.get(path_key)
+            if known is not None and known[0] == stat_key and known[1] in self._by_hash:
+                self._by_hash.move_to_end(known[1])
+                self._stats["hits"] += 1
+                return self._by_hash[known[1]]
+        
+        content_hash = hash_file(path)
+        hash_key = (namespace, content_hash)
+        
+        with self._lock:
+            document = self._by_hash.get(hash_key)
+            if document is not None:
+                self._by_hash.move_to_end(hash_key)
+                self._link(path_key, stat_key, hash_key)
+                self._stats["hash_hits"] += 1
+                return document
+            self._stats["misses"] += 1
+        
+        document = parse(file_path)
+        document.content_hash = content_hash
+        if document.error:
+            return document
+        
+        with self._lock:
+            if hash_key not in self._by_hash:
+                self._by_hash[hash_key] = document
+                self._chars += len(document.text)
+            self._link(path_key, stat_key, hash_key)
+            document = self._by_hash[hash_key]
+            self._evict()
+            return document
+    
+    def invalidate(self, file_path: str) -> None:
+        """Forget every parse of a path"""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            for path_key in [k for k in self._by_path if k[1] == path]:
+                _, hash_key = self._by_path.pop(path_key)
+                document = self._by_hash.pop(hash_key, None)
+                if document is not None:
+                    self._chars -= len(document.text)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._by_hash.clear()
+            self._by_path.clear()
+            self._chars = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._by_hash),
+                "chars": self._chars,
+                "max_entries": self.max_entries,
+                **self._stats
+            }
+    
+    def __len__(self) -> int:
+        return len(self._by_hash)
+    
+    def _link(self, path_key: tuple, stat_key: tuple, hash_key: tuple) -> None:
+        previous = self._by_path.get(path_key)
+        self._by_path[path_key] = (stat_key, hash_key)
+        if previous is None or previous[1] == hash_key:
+            return
+        # The file changed; drop its old parse unless another path shares it
+        if not any(v[1] == previous[1] for v in self._by_path.values()):
+            document = self._by_hash.pop(previous[1], None)
+            if document is not None:
+                self._chars -= len(document.text)
+    
+    def _evict(self) -> None:
+        while self._by_hash and (
+            len(self._by_hash) > self.max_entries or self._chars > self.max_chars
+        ):
+            hash_key, document = self._by_hash.popitem(last=False)
+            self._chars -= len(document.text)
+            for path_key in [k for k, v in self._by_path.items() if v[1] == hash_key]:
+                del self._by_path[path_key]
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Global cache instance
+_document_cache: Optional[DocumentCache] = None
+_document_cache_lock = threading.Lock()
+
+
+def get_document_cache() -> DocumentCache:
+    """Get or create global document cache"""
+    global _document_cache
+    with _document_cache_lock:
+        if _document_cache is None:
+            _document_cache = DocumentCache()
+        return _document_cache
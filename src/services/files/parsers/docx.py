@@ -1,17 +1,375 @@
 """
 DOCX parser for GenZ Smart
-Extracts text from Word documents
+Extracts text from Word documents by streaming their XML parts
 """
-from typing import Dict, Any, Optional
-from pathlib import Path
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+from xml.etree.ElementTree import Element, iterparse, parse
+
+from src.services.files.parsers.document import DocumentCache, ParsedDocument, get_document_cache
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{W_NS}}}"
+CORE_NAMESPACES = {
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "cp": "http://schemas.openxmlformats.org/package/2006/metadata/core-properties",
+    "dcterms": "http://purl.org/dc/terms/",
+}
+
+DOCUMENT_PART = "word/document.xml"
+NOTE_PARTS = (("word/footnotes.xml", "footnote"), ("word/endnotes.xml", "endnote"))
+HEADER_FOOTER_PATTERN = re.compile(r"^word/(header|footer)\d*\.xml$")
+HEADING_STYLE_PATTERN = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+MAX_HEADING_LEVEL = 6
+BULLET_FORMATS = {"bullet", "none"}
+
+# Run content that carries text; deleted revisions and field codes are skipped
+TEXT_TAGS = {W + "t"}
+BREAK_TAGS = {W + "br", W + "cr"}
+TAB_TAGS = {W + "tab", W + "ptab"}
+
+
+@dataclass
+class DocxBlock:
+    """A paragraph, heading, list item or table, in document order"""
+    kind: str  # paragraph, heading, list_item, table
+    text: str
+    level: int = 0  # Heading level, or list nesting depth
+    rows: Optional[List[List[str]]] = None  # Table cells
+    
+    def render(self) -> str:
+        """Plain-text rendering: markdown headings, indented list items, pipe tables"""
+        if self.kind == "heading":
+            return f"{'#' * self.level} {self.text}"
+        if self.kind == "list_item":
+            return f"{'  ' * self.level}{self.text}"
+        if self.kind == "table":
+            return "\n".join(" | ".join(row) for row in self.rows or [])
+        return self.text
+
+
+def read_styles(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """Heading level per paragraph style id, from style names and outline levels"""
+    levels: Dict[str, int] = {}
+    if "word/styles.xml" not in archive.namelist():
+        return levels
+    with archive.open("word/styles.xml") as part:
+        for _, element in iterparse(part):
+            if element.tag != W + "style" or element.get(W + "type") != "paragraph":
+                continue
+            style_id = element.get(W + "styleId") or ""
+            name_element = element.find(W + "name")
+            name = name_element.get(W + "val", "") if name_element is not None else ""
+            outline = element.find(f"{W}pPr/{W}outlineLvl")
+            match = HEADING_STYLE_PATTERN.match(name) or HEADING_STYLE_PATTERN.match(style_id)
+            if match:
+                levels[style_id] = int(match.group(1))
+            elif name.lower() == "title":
+                levels[style_id] = 1
+            elif outline is not None and outline.get(W + "val", "").isdigit():
+                levels[style_id] = int(outline.get(W + "val")) + 1
+            element.clear()
+    return levels
+
+
+def read_numbering(archive: zipfile.ZipFile) -> Dict[Tuple[str, int], str]:
+    """Number format (bullet, decimal, ...) per (numId, level)"""
+    if "word/numbering.xml" not in archive.namelist():
+        return {}
+    abstract_formats: Dict[str, Dict[int, str]] = {}
+    num_to_abstract: Dict[str, str] = {}
+    with archive.open("word/numbering.xml") as part:
+        for _, element in iterparse(part):
+            if element.tag == W + "abstractNum":
+                formats = {}
+                for level in element.findall(W + "lvl"):
+                    fmt = level.find(W + "numFmt")
+                    formats[int(level.get(W + "ilvl", "0"))] = fmt.get(W + "val", "decimal") if fmt is not None else "decimal"
+                abstract_formats[element.get(W + "abstractNumId", "")] = formats
+                element.clear()
+            elif element.tag == W + "num":
+                abstract = element.find(W + "abstractNumId")
+                if abstract is not None:
+                    num_to_abstract[element.get(W + "numId", "")] = abstract.get(W + "val", "")
+                element.clear()
+    return {
+        (num_id, level): fmt
+        for num_id, abstract_id in num_to_abstract.items()
+        for level, fmt in abstract_formats.get(abstract_id, {}).items()
+    }
+
+
+def read_core_properties(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Title, author, subject and dates from docProps/core.xml"""
+    fields = {
+        "title": "dc:title",
+        "author": "dc:creator",
+        "subject": "dc:subject",
+        "created": "dcterms:created",
+        "modified": "dcterms:modified",
+    }
+    properties = {key: "" for key in fields}
+    if "docProps/core.xml" not in archive.namelist():
+        return properties
+    with archive.open("docProps/core.xml") as part:
+        root = parse(part).getroot()
+    for key, path in fields.items():
+        element = root.find(path, CORE_NAMESPACES)
+        if element is not None and element.text:
+            properties[key] = element.text.strip()
+    return properties
+
+
+def _paragraph_text(paragraph: Element, notes: Optional[Dict[str, int]] = None) -> str:
+    """Text of a paragraph's runs, including hyperlinks and inserted revisions"""
+    parts = []
+    for element in paragraph.iter():
+        tag = element.tag
+        if tag in TEXT_TAGS:
+            parts.append(element.text or "")
+        elif tag in TAB_TAGS:
+            parts.append("\t")
+        elif tag in BREAK_TAGS:
+            parts.append("\n")
+        elif tag == W + "noBreakHyphen":
+            parts.append("-")
+        elif tag in (W + "footnoteReference", W + "endnoteReference") and notes is not None:
+            key = f"{tag[len(W):-len('Reference')]}:{element.get(W + 'id')}"
+            parts.append(f"[{notes.setdefault(key, len(notes) + 1)}]")
+    return "".join(parts).strip()
+
+
+class _ParagraphInfo:
+    """Style and numbering of a paragraph, read from its properties"""
+    
+    def __init__(self, paragraph: Element):
+        properties = paragraph.find(W + "pPr")
+        self.style = ""
+        self.outline: Optional[int] = None
+        self.num_id: Optional[str] = None
+        self.list_level = 0
+        if properties is None:
+            return
+        style = properties.find(W + "pStyle")
+        if style is not None:
+            self.style = style.get(W + "val", "")
+        outline = properties.find(W + "outlineLvl")
+        if outline is not None and outline.get(W + "val", "").isdigit():
+            self.outline = int(outline.get(W + "val")) + 1
+        numbering = properties.find(W + "numPr")
+        if numbering is not None:
+            num_id = numbering.find(W + "numId")
+            level = numbering.find(W + "ilvl")
+            if num_id is not None and num_id.get(W + "val", "0") != "0":
+                self.num_id = num_id.get(W + "val")
+                self.list_level = int(level.get(W + "val", "0")) if level is not None else 0
+
+
+def iter_blocks(
+    part,
+    styles: Optional[Dict[str, int]] = None,
+    numbering: Optional[Dict[Tuple[str, int], str]] = None,
+    notes: Optional[Dict[str, int]] = None
+) -> Iterator[DocxBlock]:
+    """
+    Stream the blocks of a WordprocessingML part
+    
+    Each top-level paragraph or table is emitted as soon as its end tag is
+    read and then detached from the tree, so memory stays bounded by the
+    largest single block rather than the document. Nested tables are
+    flattened into their parent cell.
+    
+    Args:
+        part: File object for the XML part
+        styles: Heading level per style id (read_styles)
+        numbering: Number format per (numId, level) (read_numbering)
+        notes: Footnote/endnote reference numbers, filled in as they are seen
+    
+    Yields:
+        DocxBlock per paragraph, heading, list item and table
+    """
+    styles = styles or {}
+    numbering = numbering or {}
+    counters: Dict[Tuple[str, int], int] = {}
+    stack: List[Element] = []
+    table_depth = 0
+    rows: List[List[str]] = []
+    row: Optional[List[str]] = None
+    cell: List[str] = []
+    
+    for event, element in iterparse(part, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            stack.append(element)
+            if tag == W + "tbl":
+                table_depth += 1
+            elif tag == W + "tr" and table_depth == 1:
+                row = []
+            elif tag == W + "tc" and table_depth == 1:
+                cell = []
+            continue
+        
+        stack.pop()
+        parent = stack[-1] if stack else None
+        
+        if tag == W + "p":
+            if table_depth:
+                text = _paragraph_text(element, notes)
+                if text:
+                    cell.append(text)
+                continue
+            block = _paragraph_block(element, styles, numbering, counters, notes)
+            if parent is not None:
+                parent.remove(element)  # Detach so finished blocks are freed
+            if block is not None:
+                yield block
+        elif tag == W + "tc" and table_depth == 1 and row is not None:
+            row.append(" ".join(cell))
+        elif tag == W + "tr" and table_depth == 1 and row is not None:
+            if any(row):
+                rows.append(row)
+            row = None
+        elif tag == W + "tbl":
+            table_depth -= 1
+            if table_depth == 0:
+                if parent is not None:
+                    parent.remove(element)
+                if rows:
+                    yield DocxBlock(kind="table", text="", rows=rows)
+                rows = []
+        elif parent is not None and parent.tag == W + "body":
+            parent.remove(element)
+
+
+def _paragraph_block(
+    paragraph: Element,
+    styles: Dict[str, int],
+    numbering: Dict[Tuple[str, int], str],
+    counters: Dict[Tuple[str, int], int],
+    notes: Optional[Dict[str, int]]
+) -> Optional[DocxBlock]:
+    text = _paragraph_text(paragraph, notes)
+    if not text:
+        return None
+    info = _ParagraphInfo(paragraph)
+    
+    level = styles.get(info.style) or info.outline
+    if level:
+        return DocxBlock(kind="heading", text=text, level=min(level, MAX_HEADING_LEVEL))
+    
+    if info.num_id is not None:
+        fmt = numbering.get((info.num_id, info.list_level), "bullet")
+        if fmt in BULLET_FORMATS:
+            marker = "-"
+        else:
+            key = (info.num_id, info.list_level)
+            counters[key] = counters.get(key, 0) + 1
+            # Restart deeper levels when a shallower item follows
+            for deeper in [k for k in counters if k[0] == info.num_id and k[1] > info.list_level]:
+                del counters[deeper]
+            marker = f"{counters[key]}."
+        return DocxBlock(kind="list_item", text=f"{marker} {text}", level=info.list_level)
+    
+    return DocxBlock(kind="paragraph", text=text)
+
+
+def _note_texts(archive: zipfile.ZipFile, part_name: str, kind: str) -> Dict[str, str]:
+    """Text of each footnote or endnote, keyed like the body's references"""
+    texts: Dict[str, str] = {}
+    if part_name not in archive.namelist():
+        return texts
+    with archive.open(part_name) as part:
+        for _, element in iterparse(part):
+            if element.tag == W + kind:
+                text = " ".join(
+                    t for t in (_paragraph_text(p) for p in element.iter(W + "p")) if t
+                )
+                if text:
+                    texts[f"{kind}:{element.get(W + 'id')}"] = text
+                element.clear()
+    return texts
+
+
+def extract_docx(file_path: str) -> Dict[str, Any]:
+    """
+    Extract a .docx in one streaming pass over its parts
+    
+    Returns:
+        Dictionary with text, metadata, headings and block counts
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        if DOCUMENT_PART not in archive.namelist():
+            raise ValueError("Not a Word document (word/document.xml missing)")
+        styles = read_styles(archive)
+        numbering = read_numbering(archive)
+        notes: Dict[str, int] = {}
+        counts = {"paragraph": 0, "heading": 0, "list_item": 0, "table": 0}
+        headings: List[str] = []
+        text_parts: List[str] = []
+        word_count = 0
+        
+        with archive.open(DOCUMENT_PART) as part:
+            for block in iter_blocks(part, styles, numbering, notes):
+                counts[block.kind] += 1
+                if block.kind == "heading":
+                    headings.append(block.text)
+                rendered = block.render()
+                # Counted per block: splitting the joined text would hold every word at once
+                word_count += len(rendered.split())
+                text_parts.append(rendered)
+        
+        if notes:
+            note_texts: Dict[str, str] = {}
+            for part_name, kind in NOTE_PARTS:
+                note_texts.update(_note_texts(archive, part_name, kind))
+            lines = [
+                f"[{number}] {note_texts[key]}"
+                for key, number in sorted(notes.items(), key=lambda item: item[1])
+                if key in note_texts
+            ]
+            if lines:
+                text_parts.append("Notes:\n" + "\n".join(lines))
+                word_count += sum(len(line.split()) for line in lines)
+        
+        header_lines: List[str] = []
+        for name in sorted(n for n in archive.namelist() if HEADER_FOOTER_PATTERN.match(n)):
+            with archive.open(name) as part:
+                for block in iter_blocks(part, styles, numbering):
+                    rendered = block.render()
+                    if rendered not in header_lines:
+                        header_lines.append(rendered)
+        if header_lines:
+            text_parts.append("Headers and footers:\n" + "\n".join(header_lines))
+            word_count += sum(len(line.split()) for line in header_lines)
+        
+        metadata: Dict[str, Any] = read_core_properties(archive)
+    
+    metadata.update({
+        "paragraphs": counts["paragraph"] + counts["heading"] + counts["list_item"],
+        "headings": counts["heading"],
+        "list_items": counts["list_item"],
+        "tables": counts["table"],
+    })
+    return {
+        "text": "\n\n".join(text_parts),
+        "metadata": metadata,
+        "headings": headings,
+        "paragraphs": metadata["paragraphs"],
+        "word_count": word_count,
+    }
 
 
 class DocxParser:
     """Parser for Word documents"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[DocumentCache] = None):
         self.name = "DOCX Parser"
         self.supported_extensions = [".docx"]
+        self.cache = cache
     
     def parse(self, file_path: str) -> Dict[str, Any]:
         """
@@ -19,49 +377,38 @@ class DocxParser:
         
         Args:
             file_path: Path to DOCX file
-            
+        
         Returns:
             Dictionary with extracted text and metadata
         """
+        return self.document(file_path).to_result()
+    
+    def document(self, file_path: str) -> ParsedDocument:
+        """Get the file's parsed document, parsing it only if it changed"""
+        cache = self.cache if self.cache is not None else get_document_cache()
+        return cache.get(file_path, self._parse, namespace=self.name)
+    
+    def _parse(self, file_path: str) -> ParsedDocument:
         result = {
             "text": "",
             "metadata": {},
             "paragraphs": 0,
             "error": None
         }
+        headers = []
         
         try:
-            from docx import Document
-            
-            doc = Document(file_path)
-            
-            # Extract metadata
-            core_props = doc.core_properties
-            result["metadata"] = {
-                "title": core_props.title or "",
-                "author": core_props.author or "",
-                "subject": core_props.subject or "",
-                "created": str(core_props.created) if core_props.created else "",
-                "modified": str(core_props.modified) if core_props.modified else "",
-                "paragraphs": len(doc.paragraphs)
-            }
-            
-            # Extract text from paragraphs
-            text_parts = []
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
-            
-            result["paragraphs"] = len(text_parts)
-            result["text"] = "\n\n".join(text_parts)
-            result["word_count"] = len(result["text"].split())
-            
-        except ImportError:
-            result["error"] = "python-docx not installed. Install with: pip install python-docx"
+            extracted = extract_docx(file_path)
+            headers = extracted.pop("headings")
+            result.update(extracted)
+        except zipfile.BadZipFile:
+            result["error"] = "Failed to parse DOCX: file is not a valid .docx archive"
         except Exception as e:
             result["error"] = f"Failed to parse DOCX: {str(e)}"
         
-        return result
+        document = ParsedDocument(file_path, result)
+        document.set_view("headers", headers)
+        return document
     
     def get_preview(self, file_path: str, max_chars: int = 1000) -> str:
         """
@@ -70,20 +417,11 @@ class DocxParser:
         Args:
             file_path: Path to DOCX file
             max_chars: Maximum characters to return
-            
+        
         Returns:
             Preview text
         """
-        result = self.parse(file_path)
-        
-        if result["error"]:
-            return f"Error: {result['error']}"
-        
-        text = result["text"]
-        if len(text) > max_chars:
-            text = text[:max_chars] + "..."
-        
-        return text
+        return self.document(file_path).preview(max_chars)
     
     def extract_headers(self, file_path: str) -> list:
         """
@@ -91,23 +429,11 @@ class DocxParser:
         
         Args:
             file_path: Path to DOCX file
-            
+        
         Returns:
             List of header texts
         """
-        headers = []
-        
-        try:
-            from docx import Document
-            
-            doc = Document(file_path)
-            
-            for para in doc.paragraphs:
-                # Check if paragraph is a heading
-                if para.style and para.style.name and para.style.name.startswith('Heading'):
-                    headers.append(para.text)
-                    
-        except ImportError:
-            pass
-        
-        return headers
+        document = self.document(file_path)
+        if document.error:
+            return []
+        return list(document.view("headers", list))
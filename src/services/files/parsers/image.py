@@ -2,16 +2,364 @@
 Image parser for GenZ Smart
 Extracts text from images using OCR
 """
-from typing import Dict, Any, Optional
-from pathlib import Path
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+
+# Preprocessing
+OCR_MAX_SIDE = 2000  # Longer images are downscaled; Tesseract gains little above this
+OCR_MIN_SIDE = 32  # Too small to hold readable text
+MIN_REGION_CONFIDENCE = 60
+
+# Executor
+OCR_PROCESS_WORKERS = 2
+OCR_MAX_CONCURRENCY = 4  # Images decoded or queued at once
+OCR_CACHE_MAX_ENTRIES = 512
+OCR_LANGUAGE = "eng"
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """
+    Pick the grey level that best separates dark text from background
+    
+    Args:
+        histogram: 256 pixel counts of a greyscale image
+    
+    Returns:
+        Threshold in 0-255
+    """
+    total = sum(histogram)
+    if not total:
+        return 127
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    
+    best_threshold = 127
+    best_variance = -1.0
+    background = 0
+    weighted_background = 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = level
+    return best_threshold
+
+
+def assemble_ocr_data(
+    data: Dict[str, list],
+    scale: float = 1.0,
+    min_confidence: int = MIN_REGION_CONFIDENCE
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Build text and word regions from one image_to_data result
+    
+    Words are joined into lines, lines into paragraphs and paragraphs into
+    blocks, following Tesseract's layout numbering. Region boxes are mapped
+    back to the original image size.
+    
+    Args:
+        data: pytesseract.image_to_data output as a dict of columns
+        scale: Factor the image was resized by before OCR
+        min_confidence: Minimum confidence for a word to become a region
+    
+    Returns:
+        (text, regions)
+    """
+    lines: "OrderedDict[tuple, List[str]]" = OrderedDict()
+    regions = []
+    
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        if not word:
+            continue
+        try:
+            confidence = float(data["conf"][i])
+        except (TypeError, ValueError):
+            confidence = -1.0
+        if confidence < 0:
+            continue
+        
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        
+        if confidence > min_confidence:
+            regions.append({
+                'text': word,
+                'x': round(data['left'][i] / scale),
+                'y': round(data['top'][i] / scale),
+                'width': round(data['width'][i] / scale),
+                'height': round(data['height'][i] / scale),
+                'confidence': confidence
+            })
+    
+    parts = []
+    previous = None
+    for key, words in lines.items():
+        if previous is not None:
+            parts.append("\n" if key[:2] == previous[:2] else "\n\n")
+        parts.append(" ".join(words))
+        previous = key
+    return "".join(parts), regions
+
+
+def prepare_for_ocr(image: Any, max_side: int = OCR_MAX_SIDE) -> Tuple[Any, float]:
+    """
+    Downscale, greyscale and binarize a decoded PIL image
+    
+    Args:
+        image: PIL image
+        max_side: Longest side after downscaling
+    
+    Returns:
+        (prepared image, scale factor applied)
+    """
+    from PIL import Image, ImageOps
+    
+    if getattr(image, "is_animated", False):
+        image.seek(0)
+    
+    original_width, original_height = image.size
+    longest = max(original_width, original_height)
+    if longest > max_side:
+        target = (
+            max(1, original_width * max_side // longest),
+            max(1, original_height * max_side // longest)
+        )
+        # JPEG can decode straight at a reduced size; a no-op for other formats
+        image.draft("L", target)
+        if image.size != target:
+            image = image.resize(target, Image.Resampling.LANCZOS)
+    scale = image.size[0] / original_width
+    
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        # Transparent pixels are usually black underneath; put text on white
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    
+    grey = ImageOps.autocontrast(image.convert("L"))
+    threshold = otsu_threshold(grey.histogram())
+    binary = grey.point(lambda value: 255 if value > threshold else 0, mode="1")
+    return binary, scale
+
+
+def ocr_image(image: Any, language: str = OCR_LANGUAGE) -> Dict[str, Any]:
+    """
+    OCR a decoded PIL image with a single image_to_data pass
+    
+    Returns:
+        Dictionary with "text", "regions" and "error"
+    """
+    result = {"text": "", "regions": [], "error": None}
+    try:
+        import pytesseract
+    except ImportError:
+        result["error"] = "pytesseract not installed"
+        return result
+    
+    if min(image.size) < OCR_MIN_SIDE:
+        return result
+    
+    try:
+        prepared, scale = prepare_for_ocr(image)
+        data = pytesseract.image_to_data(
+            prepared, lang=language, output_type=pytesseract.Output.DICT
+        )
+        result["text"], result["regions"] = assemble_ocr_data(data, scale)
+    except Exception as e:
+        result["error"] = f"OCR failed: {str(e)}"
+    return result
+
+
+def ocr_image_bytes(content: bytes, language: str = OCR_LANGUAGE) -> Dict[str, Any]:
+    """
+    Decode an image once and OCR it
+    
+    Module-level so it can run in a worker process.
+    
+    Args:
+        content: Encoded image bytes
+        language: Tesseract language
+    
+    Returns:
+        Dictionary with "metadata", "text", "regions" and "error"
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return {
+            "metadata": {},
+            "text": "",
+            "regions": [],
+            "error": "Pillow not installed. Install with: pip install Pillow"
+        }
+    
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            metadata = {
+                "format": image.format,
+                "mode": image.mode,
+                "size": image.size,
+                "width": image.width,
+                "height": image.height
+            }
+            result = ocr_image(image, language)
+    except Exception as e:
+        return {"metadata": {}, "text": "", "regions": [], "error": f"Failed to parse image: {str(e)}"}
+    
+    result["metadata"] = metadata
+    return result
+
+
+class OCRCache:
+    """LRU of OCR results keyed by the SHA-256 of the image bytes"""
+    
+    def __init__(self, max_entries: int = OCR_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return result
+    
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, **self._stats}
+
+
+class OCRExecutor:
+    """
+    Runs OCR in a process pool with a cap on images in flight
+    
+    Each image is read once, hashed, and looked up in the cache before
+    any decoding. Identical screenshots are recognised once.
+    """
+    
+    def __init__(
+        self,
+        process_workers: int = OCR_PROCESS_WORKERS,
+        max_concurrency: int = OCR_MAX_CONCURRENCY,
+        cache: Optional[OCRCache] = None,
+        language: str = OCR_LANGUAGE,
+        ocr_fn: Callable[[bytes, str], Dict[str, Any]] = ocr_image_bytes
+    ):
+        self.process_workers = process_workers
+        self.max_concurrency = max_concurrency
+        self.cache = cache if cache is not None else OCRCache()
+        self.language = language
+        self.ocr_fn = ocr_fn
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    def recognize_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        OCR an image file, reusing the cached result for identical bytes
+        
+        Args:
+            file_path: Path to image file
+        
+        Returns:
+            Dictionary with "metadata", "text", "regions" and "error"
+        """
+        with open(file_path, "rb") as file:
+            content = file.read()
+        return self.recognize(content)
+    
+    def recognize(self, content: bytes) -> Dict[str, Any]:
+        """OCR encoded image bytes"""
+        key = f"{self.language}:{hashlib.sha256(content).hexdigest()}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        with self._slots:
+            pool = self._get_pool()
+            if pool is None:
+                result = self.ocr_fn(content, self.language)
+            else:
+                result = pool.submit(self.ocr_fn, content, self.language).result()
+        
+        if result.get("error") is None:
+            self.cache.set(key, result)
+        return result
+    
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+    
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+
+# Global executor instance
+_ocr_executor: Optional[OCRExecutor] = None
+_ocr_executor_lock = threading.Lock()
+
+
+def get_ocr_executor() -> OCRExecutor:
+    """Get or create global OCR executor"""
+    global _ocr_executor
+    with _ocr_executor_lock:
+        if _ocr_executor is None:
+            _ocr_executor = OCRExecutor(
+                process_workers=min(OCR_PROCESS_WORKERS, os.cpu_count() or 1)
+            )
+        return _ocr_executor
 
 
 class ImageParser:
     """Parser for images with OCR support"""
     
-    def __init__(self):
+    def __init__(self, executor: Optional[OCRExecutor] = None):
         self.name = "Image OCR Parser"
         self.supported_extensions = [".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"]
+        self.executor = executor
     
     def parse(self, file_path: str) -> Dict[str, Any]:
         """
@@ -19,7 +367,7 @@ class ImageParser:
         
         Args:
             file_path: Path to image file
-            
+        
         Returns:
             Dictionary with extracted text and metadata
         """
@@ -29,65 +377,21 @@ class ImageParser:
             "error": None
         }
         
-        try:
-            from PIL import Image
-            
-            # Open image and get metadata
-            with Image.open(file_path) as img:
-                result["metadata"] = {
-                    "format": img.format,
-                    "mode": img.mode,
-                    "size": img.size,
-                    "width": img.width,
-                    "height": img.height
-                }
-                
-                # Try OCR if available
-                ocr_text = self._perform_ocr(file_path)
-                if ocr_text:
-                    result["text"] = ocr_text
-                    result["word_count"] = len(ocr_text.split())
-                else:
-                    result["text"] = f"[Image: {img.format} {img.size[0]}x{img.size[1]}]"
-                    
-        except ImportError:
-            result["error"] = "Pillow not installed. Install with: pip install Pillow"
-        except Exception as e:
-            result["error"] = f"Failed to parse image: {str(e)}"
+        ocr = self._recognize(file_path)
+        result["metadata"] = ocr.get("metadata", {})
+        if not result["metadata"]:
+            # The image itself could not be decoded
+            result["error"] = ocr.get("error") or "Failed to parse image"
+            return result
         
-        return result
-    
-    def _perform_ocr(self, file_path: str) -> Optional[str]:
-        """
-        Perform OCR on image
+        if ocr.get("text"):
+            result["text"] = ocr["text"]
+            result["word_count"] = len(ocr["text"].split())
+        else:
+            metadata = result["metadata"]
+            result["text"] = f"[Image: {metadata['format']} {metadata['width']}x{metadata['height']}]"
         
-        Args:
-            file_path: Path to image file
-            
-        Returns:
-            Extracted text or None if OCR not available
-        """
-        try:
-            import pytesseract
-            from PIL import Image
-            
-            # Perform OCR
-            image = Image.open(file_path)
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            text = pytesseract.image_to_string(image)
-            
-            return text.strip() if text.strip() else None
-            
-        except ImportError:
-            # pytesseract not installed
-            return None
-        except Exception as e:
-            print(f"OCR failed: {e}")
-            return None
+        return result
     
     def get_preview(self, file_path: str, max_chars: int = 1000) -> str:
         """
@@ -96,7 +400,7 @@ class ImageParser:
         Args:
             file_path: Path to image file
             max_chars: Maximum characters to return
-            
+        
         Returns:
             Preview text or image description
         """
@@ -115,51 +419,29 @@ class ImageParser:
         """
         Extract text regions with bounding boxes
         
+        Regions come from the same OCR pass as the text, so calling this
+        after parse() does not run OCR again.
+        
         Args:
             file_path: Path to image file
-            
+        
         Returns:
             List of text regions with coordinates
         """
-        regions = []
-        
-        try:
-            import pytesseract
-            from PIL import Image
-            
-            image = Image.open(file_path)
-            
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Get data including bounding boxes
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-            
-            n_boxes = len(data['text'])
-            for i in range(n_boxes):
-                if int(data['conf'][i]) > 60:  # Confidence threshold
-                    text = data['text'][i].strip()
-                    if text:
-                        regions.append({
-                            'text': text,
-                            'x': data['left'][i],
-                            'y': data['top'][i],
-                            'width': data['width'][i],
-                            'height': data['height'][i],
-                            'confidence': data['conf'][i]
-                        })
-                        
-        except ImportError:
-            pass
-        except Exception as e:
-            print(f"Text region extraction failed: {e}")
-        
-        return regions
+        return list(self._recognize(file_path).get("regions", []))
     
     def is_ocr_available(self) -> bool:
         """Check if OCR is available"""
         try:
             import pytesseract
+            from PIL import Image
             return True
         except ImportError:
             return False
+    
+    def _recognize(self, file_path: str) -> Dict[str, Any]:
+        try:
+            return (self.executor or get_ocr_executor()).recognize_file(file_path)
+        except Exception as e:
+            print(f"OCR failed: {e}")
+            return {"metadata": {}, "text": "", "regions": [], "error": f"Failed to parse image: {str(e)}"}
@@ -1,135 +1,576 @@
 """
 PDF parser for GenZ Smart
-Extracts text from PDF files
+Extracts text from PDF files page by page, in parallel for large documents
 """
-from typing import Optional, Dict, Any
-from pathlib import Path
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from src.services.files.parsers.document import DocumentCache, ParsedDocument, get_document_cache
+
+
+# Parallel extraction
+PARALLEL_MIN_PAGES = 24  # Smaller documents are parsed in the calling process
+MAX_PAGE_WORKERS = 4
+MIN_RANGE_PAGES = 4  # Pages per worker task
+MAX_RANGE_PAGES = 32
+
+# A page with fewer visible characters than this has no usable text layer
+MIN_TEXT_CHARS = 16
+
+# Per-page result cache
+PAGE_CACHE_MAX_PAGES = 4096
+
+DRAW_XOBJECT_PATTERN = re.compile(rb"/([^\s/\[\]()<>{}%]+)\s+Do\b")
+PAGE_SPEC_PATTERN = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d*)\s*)?$")
+
+
+@dataclass
+class PDFPage:
+    """Extraction result for one page"""
+    number: int  # 1-based
+    text: str = ""
+    tables: List[list] = field(default_factory=list)
+    image_count: int = 0
+    has_text_layer: bool = True
+    ocr: bool = False  # Text came from OCR of the page images
+    
+    @property
+    def is_scanned(self) -> bool:
+        """Images but no text layer"""
+        return not self.has_text_layer and self.image_count > 0
+    
+    @property
+    def needs_ocr(self) -> bool:
+        """Scanned page whose images have not been OCR'd yet"""
+        return self.is_scanned and not self.ocr
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "number": self.number,
+            "text": self.text,
+            "tables": self.tables,
+            "image_count": self.image_count,
+            "has_text_layer": self.has_text_layer,
+            "ocr": self.ocr,
+        }
+
+
+def parse_page_spec(spec: str, page_count: int) -> List[int]:
+    """
+    Parse a page selection such as "40", "1-5,9" or "10-"
+    
+    Args:
+        spec: Comma-separated page numbers and ranges (1-based, inclusive)
+        page_count: Pages in the document
+    
+    Returns:
+        Sorted unique page numbers
+    
+    Raises:
+        ValueError: If the spec is malformed or out of range
+    """
+    pages = set()
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        match = PAGE_SPEC_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Invalid page range: {part.strip()}")
+        start = int(match.group(1))
+        if match.group(2) is None:
+            end = start
+        else:
+            end = int(match.group(2)) if match.group(2) else page_count
+        if start < 1 or end > page_count or start > end:
+            raise ValueError(f"Page range {part.strip()} outside 1-{page_count}")
+        pages.update(range(start, end + 1))
+    if not pages:
+        raise ValueError("No pages selected")
+    return sorted(pages)
+
+
+def split_ranges(numbers: List[int], size: int) -> List[Tuple[int, int]]:
+    """Group page numbers into contiguous (first, last) ranges of at most size pages"""
+    if not numbers:
+        return []
+    ranges = []
+    first = previous = numbers[0]
+    for number in numbers[1:]:
+        if number != previous + 1 or number - first >= size:
+            ranges.append((first, previous))
+            first = number
+        previous = number
+    ranges.append((first, previous))
+    return ranges
+
+
+def range_size(page_count: int, workers: int) -> int:
+    """
+    Pages per worker task
+    
+    Small enough that each worker gets several ranges, so early pages can
+    be streamed while later ones are still being parsed.
+    """
+    size = -(-page_count // max(1, workers * 2))
+    return max(MIN_RANGE_PAGES, min(MAX_RANGE_PAGES, size))
+
+
+def extract_page_range(file_path: str, first: int, last: int, ocr: bool = False) -> List[PDFPage]:
+    """
+    Extract text, tables and image counts for pages first..last
+    
+    Module-level so it can run in a worker process. The document is opened
+    once per range and every page is visited a single time.
+    
+    Args:
+        file_path: Path to PDF file
+        first: First page number (1-based)
+        last: Last page number (inclusive)
+        ocr: OCR the images of pages without a text layer
+    
+    Returns:
+        One PDFPage per page in the range
+    """
+    try:
+        import pdfplumber
+    except ImportError:
+        pdfplumber = None
+    
+    pages = []
+    if pdfplumber is not None:
+        with pdfplumber.open(file_path) as pdf:
+            for number in range(first, last + 1):
+                page = pdf.pages[number - 1]
+                pages.append(_build_page(
+                    number,
+                    page.extract_text() or "",
+                    tables=page.extract_tables() or [],
+                    image_count=len(page.images)
+                ))
+                # pdfplumber caches layout objects on the page; drop them as we go
+                page.flush_cache()
+    else:
+        import PyPDF2
+        
+        with open(file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            for number in range(first, last + 1):
+                page = reader.pages[number - 1]
+                pages.append(_build_page(
+                    number,
+                    page.extract_text() or "",
+                    image_count=_count_images(page)
+                ))
+    
+    if ocr and any(p.needs_ocr for p in pages):
+        _ocr_pages(file_path, [p for p in pages if p.needs_ocr])
+    return pages
+
+
+def _build_page(number: int, text: str, tables: Optional[list] = None, image_count: int = 0) -> PDFPage:
+    visible = sum(1 for ch in text if not ch.isspace())
+    return PDFPage(
+        number=number,
+        text=text.strip(),
+        tables=tables or [],
+        image_count=image_count,
+        has_text_layer=visible >= MIN_TEXT_CHARS
+    )
+
+
+def _count_images(page: Any) -> int:
+    """Count images drawn by a PyPDF2 page without decoding them"""
+    try:
+        resources = page.get("/Resources")
+        resources = resources.get_object() if resources is not None else {}
+        xobjects = resources.get("/XObject")
+        if xobjects is None:
+            return 0
+        images = {
+            name.lstrip("/") for name, ref in xobjects.get_object().items()
+            if ref.get_object().get("/Subtype") == "/Image"
+        }
+        if not images:
+            return 0
+        # Resources may be shared between pages, so count what this page draws
+        contents = page.get_contents()
+        data = contents.get_data() if contents is not None else b""
+        return sum(
+            1 for name in DRAW_XOBJECT_PATTERN.findall(data)
+            if name.decode("latin-1") in images
+        )
+    except Exception:
+        return 0
+
+
+def _ocr_pages(file_path: str, pages: List[PDFPage]) -> None:
+    """OCR the embedded images of scanned pages, when OCR is installed"""
+    import PyPDF2
+    from src.services.files.parsers.image import ocr_image_bytes
+    
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in pages:
+            texts = []
+            try:
+                for image_file in reader.pages[page.number - 1].images:
+                    ocr = ocr_image_bytes(image_file.data)
+                    if ocr["error"] and not ocr["metadata"]:
+                        # Pillow is missing or the image cannot be decoded
+                        break
+                    if ocr["text"]:
+                        texts.append(ocr["text"])
+            except Exception as e:
+                print(f"OCR failed for page {page.number}: {e}")
+                continue
+            if texts:
+                page.text = "\n".join(texts)
+                page.ocr = True
+
+
+class PageCache:
+    """
+    LRU of extracted pages
+    
+    Keyed by the document's path, size and modification time plus the page
+    number, so an edited file is never served stale pages.
+    """
+    
+    def __init__(self, max_pages: int = PAGE_CACHE_MAX_PAGES):
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[tuple, PDFPage]" = OrderedDict()
+        self._documents: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, doc_key: tuple, number: int) -> Optional[PDFPage]:
+        with self._lock:
+            page = self._pages.get((doc_key, number))
+            if page is not None:
+                self._pages.move_to_end((doc_key, number))
+            return page
+    
+    def set(self, doc_key: tuple, page: PDFPage) -> None:
+        with self._lock:
+            self._pages[(doc_key, page.number)] = page
+            self._pages.move_to_end((doc_key, page.number))
+            while len(self._pages) > self.max_pages:
+                (evicted_doc, _), _ = self._pages.popitem(last=False)
+                if not any(key[0] == evicted_doc for key in self._pages):
+                    self._documents.pop(evicted_doc, None)
+    
+    def get_document(self, doc_key: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._documents.get(doc_key)
+    
+    def set_document(self, doc_key: tuple, info: Dict[str, Any]) -> None:
+        with self._lock:
+            self._documents[doc_key] = info
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._documents.clear()
+    
+    def __len__(self) -> int:
+        return len(self._pages)
+
+
+# Shared by every parser in this process
+_page_cache = PageCache()
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # spawn: the parser may itself run in a threaded or pooled process
+            _page_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
 
 
 class PDFParser:
-    """Parser for PDF files"""
+    """
+    Parser for PDF files
     
-    def __init__(self):
+    Pages are extracted in a single pass that collects text, tables and
+    image counts, and each page result is cached. Any subset of pages can
+    be parsed on demand. Large selections are split into page ranges that
+    run in a process pool and are yielded in page order as they complete.
+    """
+    
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        parallel_min_pages: int = PARALLEL_MIN_PAGES,
+        cache: Optional[PageCache] = None,
+        ocr: bool = True,
+        documents: Optional[DocumentCache] = None
+    ):
         self.name = "PDF Parser"
         self.supported_extensions = [".pdf"]
+        self.max_workers = max_workers or min(MAX_PAGE_WORKERS, os.cpu_count() or 1)
+        self.parallel_min_pages = parallel_min_pages
+        self.cache = cache if cache is not None else _page_cache
+        self.ocr = ocr
+        self.documents = documents
     
-    def parse(self, file_path: str) -> Dict[str, Any]:
+    def parse(self, file_path: str, pages: Optional[str] = None) -> Dict[str, Any]:
         """
         Parse PDF file and extract text
         
         Args:
             file_path: Path to PDF file
-            
+            pages: Optional page selection such as "40" or "1-5,9"
+        
         Returns:
             Dictionary with extracted text and metadata
         """
+        if pages is None:
+            return self.document(file_path).to_result()
+        return self._parse_selection(file_path, pages)
+    
+    def document(self, file_path: str) -> ParsedDocument:
+        """Get the whole file's parsed document, parsing it only if it changed"""
+        namespace = f"{self.name}:ocr" if self.ocr else self.name
+        documents = self.documents if self.documents is not None else get_document_cache()
+        return documents.get(
+            file_path,
+            lambda path: ParsedDocument(path, self._parse_selection(path, None)),
+            namespace=namespace
+        )
+    
+    def _parse_selection(self, file_path: str, pages: Optional[str]) -> Dict[str, Any]:
         result = {
             "text": "",
             "metadata": {},
             "pages": 0,
+            "parsed_pages": [],
+            "scanned_pages": [],
             "error": None
         }
         
         try:
-            # Try using pdfplumber first (better for complex PDFs)
-            try:
-                import pdfplumber
-                
-                with pdfplumber.open(file_path) as pdf:
-                    result["pages"] = len(pdf.pages)
-                    
-                    # Extract metadata
-                    if pdf.metadata:
-                        result["metadata"] = {
-                            k: str(v) for k, v in pdf.metadata.items()
-                            if v is not None
-                        }
-                    
-                    # Extract text from all pages
-                    text_parts = []
-                    for i, page in enumerate(pdf.pages):
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(f"--- Page {i + 1} ---\n{page_text}")
-                    
-                    result["text"] = "\n\n".join(text_parts)
-                    
-            except ImportError:
-                # Fallback to PyPDF2
-                import PyPDF2
-                
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    result["pages"] = len(pdf_reader.pages)
-                    
-                    # Extract metadata
-                    if pdf_reader.metadata:
-                        result["metadata"] = {
-                            k: str(v) for k, v in pdf_reader.metadata.items()
-                            if v is not None
-                        }
-                    
-                    # Extract text from all pages
-                    text_parts = []
-                    for i, page in enumerate(pdf_reader.pages):
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(f"--- Page {i + 1} ---\n{page_text}")
-                    
-                    result["text"] = "\n\n".join(text_parts)
+            info = self.get_document_info(file_path)
+            result["pages"] = info["pages"]
+            result["metadata"] = info["metadata"]
+            
+            numbers = parse_page_spec(pages, info["pages"]) if pages else None
+            
+            text_parts = []
+            for page in self.iter_pages(file_path, numbers):
+                result["parsed_pages"].append(page.number)
+                if page.is_scanned:
+                    result["scanned_pages"].append(page.number)
+                if page.text:
+                    text_parts.append(f"--- Page {page.number} ---\n{page.text}")
+            
+            result["text"] = "\n\n".join(text_parts)
             
             # Calculate word count
             result["word_count"] = len(result["text"].split())
-            
+        
+        except ValueError as e:
+            result["error"] = str(e)
         except Exception as e:
             result["error"] = "Failed to parse PDF file. Please ensure the file is a valid PDF."
         
         return result
     
+    def get_document_info(self, file_path: str) -> Dict[str, Any]:
+        """
+        Get page count and metadata without extracting any page
+        
+        Args:
+            file_path: Path to PDF file
+        
+        Returns:
+            Dictionary with "pages" and "metadata"
+        """
+        doc_key = _document_key(file_path)
+        info = self.cache.get_document(doc_key)
+        if info is not None:
+            return info
+        
+        import PyPDF2
+        
+        with open(file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            metadata = {}
+            if reader.metadata:
+                metadata = {
+                    k: str(v) for k, v in reader.metadata.items()
+                    if v is not None
+                }
+            info = {"pages": len(reader.pages), "metadata": metadata}
+        
+        self.cache.set_document(doc_key, info)
+        return info
+    
+    def iter_pages(self, file_path: str, numbers: Optional[List[int]] = None) -> Iterator[PDFPage]:
+        """
+        Yield extracted pages in page order as they become available
+        
+        Cached pages are yielded immediately; the rest are extracted in
+        ranges, in parallel when enough pages are missing.
+        
+        Args:
+            file_path: Path to PDF file
+            numbers: Page numbers to extract (default: all pages)
+        
+        Yields:
+            PDFPage for each requested page
+        """
+        doc_key = _document_key(file_path)
+        if numbers is None:
+            numbers = list(range(1, self.get_document_info(file_path)["pages"] + 1))
+        
+        missing = [n for n in numbers if self.cache.get(doc_key, n) is None]
+        pending = self._submit(file_path, missing)
+        
+        try:
+            for number in numbers:
+                page = self.cache.get(doc_key, number)
+                if page is None:
+                    page = self._collect(doc_key, pending, number)
+                yield page
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+    
+    def parse_pages(self, file_path: str, pages: str) -> List[PDFPage]:
+        """
+        Parse only the selected pages
+        
+        Args:
+            file_path: Path to PDF file
+            pages: Page selection such as "40" or "1-5,9"
+        
+        Returns:
+            The selected pages
+        """
+        info = self.get_document_info(file_path)
+        return list(self.iter_pages(file_path, parse_page_spec(pages, info["pages"])))
+    
     def get_preview(self, file_path: str, max_chars: int = 1000) -> str:
         """
         Get a preview of the PDF content
         
+        Only the leading pages needed to fill the preview are parsed.
+        
         Args:
             file_path: Path to PDF file
             max_chars: Maximum characters to return
-            
+        
         Returns:
             Preview text
         """
-        result = self.parse(file_path)
-        
-        if result["error"]:
-            return f"Error: {result['error']}"
-        
-        text = result["text"]
-        if len(text) > max_chars:
-            text = text[:max_chars] + "..."
+        try:
+            page_count = self.get_document_info(file_path)["pages"]
+        except Exception:
+            return "Error: Failed to parse PDF file. Please ensure the file is a valid PDF."
         
+        text = ""
+        for number in range(1, page_count + 1):
+            page = next(self.iter_pages(file_path, [number]))
+            if page.text:
+                text = f"{text}\n\n{page.text}" if text else page.text
+            if len(text) > max_chars:
+                return text[:max_chars] + "..."
         return text
     
     def extract_tables(self, file_path: str) -> list:
         """
         Extract tables from PDF (requires pdfplumber)
         
+        Tables are collected in the same pass as the text, so this reuses
+        cached pages from an earlier parse.
+        
         Args:
             file_path: Path to PDF file
-            
+        
         Returns:
             List of tables as lists of lists
         """
-        tables = []
+        document = self.document(file_path)
+        if document.error:
+            return []
         
-        try:
-            import pdfplumber
-            
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        tables.extend(page_tables)
-                        
-        except ImportError:
-            pass
-        
-        return tables
+        def build() -> list:
+            tables = []
+            try:
+                for page in self.iter_pages(file_path):
+                    tables.extend(page.tables)
+            except Exception as e:
+                print(f"Table extraction failed: {e}")
+            return tables
+        
+        return list(document.view("tables", build))
+    
+    def _submit(self, file_path: str, numbers: List[int]) -> List[Tuple[Tuple[int, int], Optional[Future]]]:
+        """Schedule extraction of the missing pages by range"""
+        if not numbers:
+            return []
+        # Inside a worker process (e.g. the file queue's pool) the CPUs are
+        # already shared out, so a nested page pool would only oversubscribe them
+        parallel = (
+            self.max_workers > 1
+            and len(numbers) >= self.parallel_min_pages
+            and multiprocessing.parent_process() is None
+        )
+        if not parallel:
+            # Extracted lazily in this process when each range is first needed
+            return [(r, None) for r in split_ranges(numbers, MAX_RANGE_PAGES)]
+        
+        pool = _get_page_pool(self.max_workers)
+        return [
+            ((first, last), pool.submit(extract_page_range, file_path, first, last, self.ocr))
+            for first, last in split_ranges(numbers, range_size(len(numbers), self.max_workers))
+        ]
+    
+    def _collect(
+        self,
+        doc_key: tuple,
+        pending: List[Tuple[Tuple[int, int], Optional[Future]]],
+        number: int
+    ) -> PDFPage:
+        """Get the range holding a page and cache all of its pages"""
+        for (first, last), future in pending:
+            if first <= number <= last:
+                break
+        else:
+            raise KeyError(number)
+        
+        if future is None:
+            extracted = extract_page_range(doc_key[0], first, last, self.ocr)
+        else:
+            extracted = future.result()
+        
+        page = None
+        for result in extracted:
+            self.cache.set(doc_key, result)
+            if result.number == number:
+                page = result
+        return page
+
+
+def _document_key(file_path: str) -> tuple:
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def clear_page_cache() -> None:
+    """Drop every cached page"""
+    _page_cache.clear()
@@ -0,0 +1,881 @@
+"""
+Tabular and structured text parser for GenZ Smart
+Streams CSV, JSON and log files to compute statistics and representative samples
+"""
+import csv
+import io
+import json
+import mmap
+import random
+import re
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+from src.services.files.parsers.document import DocumentCache, ParsedDocument, get_document_cache
+
+try:
+    import numpy as np
+except ImportError:  # Optional: vectorizes numeric conversion and reductions
+    np = None
+
+
+# Files this small are included verbatim after their summary
+INLINE_MAX_BYTES = 32 * 1024
+
+# Sampling
+HEAD_ROWS = 5
+SAMPLE_ROWS = 20
+SAMPLE_SEED = 0  # Fixed so the same file always gives the same prompt
+MAX_SAMPLE_CHARS = 12000
+MAX_CELL_CHARS = 200
+
+# Statistics
+NUMERIC_BATCH_SIZE = 4096  # Values converted per vectorized step
+MAX_DISTINCT_TRACKED = 1000
+TOP_VALUES = 5
+MAX_COLUMNS = 200
+MISSING_VALUES = {"", "na", "n/a", "null", "none", "nan", "-"}
+BOOL_VALUES = {"true", "false", "yes", "no"}
+
+# CSV sniffing
+SNIFF_SAMPLE_SIZES = (16 * 1024, 64 * 1024, 256 * 1024)
+CSV_FIELD_SIZE_LIMIT = 16 * 1024 * 1024  # Long text cells; the csv default of 128KB rejects them
+csv.field_size_limit(max(csv.field_size_limit(), CSV_FIELD_SIZE_LIMIT))
+
+# Logs
+LOG_LEVEL_PATTERN = re.compile(r"\b(TRACE|DEBUG|INFO|NOTICE|WARN(?:ING)?|ERROR|CRITICAL|FATAL)\b", re.IGNORECASE)
+LOG_TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+LOG_VARIABLE_PATTERN = re.compile(r"0x[0-9a-fA-F]+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|\d+(?:\.\d+)*")
+MAX_LOG_TEMPLATES = 5000
+
+INT_PATTERN = re.compile(r"^[+-]?\d+$")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?$")
+
+# Top-level JSON tokens: strings (with escapes) and structural characters
+JSON_TOKEN_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\],:]')
+JSON_VALUE_TYPES = {
+    ord("{"): "object", ord("["): "array", ord('"'): "string",
+    ord("t"): "boolean", ord("f"): "boolean", ord("n"): "null",
+}
+
+
+@contextmanager
+def open_mapped(file_path: str) -> Iterator[Any]:
+    """Memory-map a file read-only (empty files yield empty bytes)"""
+    with open(file_path, "rb") as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap cannot map a zero-length file
+            yield b""
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def iter_lines(data: Any, start: int = 0) -> Iterator[str]:
+    """
+    Decode lines from a mapped buffer one at a time
+    
+    UTF-8 is assumed until a line fails to decode, after which the rest of
+    the file is read as Latin-1.
+    """
+    encoding = "utf-8"
+    position = start
+    if data[:3] == b"\xef\xbb\xbf":
+        position = max(position, 3)
+    size = len(data)
+    while position < size:
+        end = data.find(b"\n", position)
+        end = size if end == -1 else end + 1
+        raw = data[position:end]
+        position = end
+        try:
+            yield raw.decode(encoding)
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+            yield raw.decode(encoding)
+
+
+class RowSampler:
+    """Keeps the first rows plus a uniform reservoir sample of the rest"""
+    
+    def __init__(self, head: int = HEAD_ROWS, size: int = SAMPLE_ROWS, seed: int = SAMPLE_SEED):
+        self.head_size = head
+        self.size = size
+        self.head: List[Tuple[int, Any]] = []
+        self.reservoir: List[Tuple[int, Any]] = []
+        self.seen = 0
+        self._random = random.Random(seed)
+    
+    def add(self, row: Any) -> None:
+        index = self.seen
+        self.seen += 1
+        if len(self.head) < self.head_size:
+            self.head.append((index, row))
+            return
+        # Algorithm R over the rows after the head
+        position = index - self.head_size
+        if len(self.reservoir) < self.size:
+            self.reservoir.append((index, row))
+        else:
+            slot = self._random.randint(0, position)
+            if slot < self.size:
+                self.reservoir[slot] = (index, row)
+    
+    def rows(self) -> List[Tuple[int, Any]]:
+        """Sampled (index, row) pairs in file order"""
+        return self.head + sorted(self.reservoir, key=lambda item: item[0])
+
+
+class ColumnStats:
+    """Single-pass type inference and summary statistics for one column"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.missing = 0
+        self.types: Counter = Counter()
+        self.values: Counter = Counter()
+        self.distinct_capped = False
+        self.min_length: Optional[int] = None
+        self.max_length = 0
+        self.numeric_count = 0
+        self.numeric_sum = 0.0
+        self.numeric_sum_squares = 0.0
+        self.numeric_min: Optional[float] = None
+        self.numeric_max: Optional[float] = None
+        self._batch: List[str] = []
+    
+    def add(self, value: Any) -> None:
+        self.count += 1
+        if value is None:
+            self.missing += 1
+            return
+        if isinstance(value, bool):
+            self._add_distinct(str(value).lower())
+            self.types["boolean"] += 1
+            return
+        if isinstance(value, (int, float)):
+            self._add_number(float(value), "integer" if isinstance(value, int) else "float")
+            return
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+            self.types["nested"] += 1
+            self._add_text(value)
+            return
+        
+        text = value.strip()
+        if text.lower() in MISSING_VALUES:
+            self.missing += 1
+            return
+        self._add_text(text)
+        self._batch.append(text)
+        if len(self._batch) >= NUMERIC_BATCH_SIZE:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Classify buffered string values, vectorized when NumPy is installed"""
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        
+        numbers = _to_floats(batch)
+        if numbers is not None:
+            integral = all(INT_PATTERN.match(v) for v in batch)
+            self._add_numbers(numbers, "integer" if integral else "float")
+            return
+        
+        for text in batch:
+            lower = text.lower()
+            if INT_PATTERN.match(text):
+                self._add_number(float(text), "integer")
+            elif lower in BOOL_VALUES:
+                self.types["boolean"] += 1
+            elif DATE_PATTERN.match(text):
+                self.types["date"] += 1
+            else:
+                number = _to_floats([text])
+                if number is None:
+                    self.types["string"] += 1
+                else:
+                    self._add_numbers(number, "float")
+    
+    @property
+    def inferred_type(self) -> str:
+        if not self.types:
+            return "empty"
+        if set(self.types) <= {"integer", "float"}:
+            return "float" if self.types["float"] else "integer"
+        kind, count = self.types.most_common(1)[0]
+        present = self.count - self.missing
+        return kind if count == present else "mixed"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        self.flush()
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "type": self.inferred_type,
+            "count": self.count,
+            "missing": self.missing,
+            "distinct": len(self.values),
+            "distinct_capped": self.distinct_capped,
+        }
+        if len(self.types) > 1:
+            data["type_counts"] = dict(self.types)
+        if self.numeric_count:
+            mean = self.numeric_sum / self.numeric_count
+            variance = max(0.0, self.numeric_sum_squares / self.numeric_count - mean * mean)
+            data.update({
+                "min": self.numeric_min,
+                "max": self.numeric_max,
+                "mean": mean,
+                "std": variance ** 0.5,
+            })
+        if data["type"] not in ("integer", "float"):
+            data["min_length"] = self.min_length
+            data["max_length"] = self.max_length
+            data["top_values"] = [
+                {"value": value, "count": count}
+                for value, count in self.values.most_common(TOP_VALUES)
+            ]
+        return data
+    
+    def _add_text(self, text: str) -> None:
+        length = len(text)
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+        self.max_length = max(self.max_length, length)
+        self._add_distinct(text[:MAX_CELL_CHARS])
+    
+    def _add_distinct(self, value: str) -> None:
+        if value in self.values:
+            self.values[value] += 1
+        elif len(self.values) < MAX_DISTINCT_TRACKED:
+            self.values[value] = 1
+        else:
+            self.distinct_capped = True
+    
+    def _add_number(self, number: float, kind: str) -> None:
+        self._add_numbers([number], kind)
+    
+    def _add_numbers(self, numbers: Any, kind: str) -> None:
+        count, total, squares, low, high = _reduce(numbers)
+        self.types[kind] += count
+        self.numeric_count += count
+        self.numeric_sum += total
+        self.numeric_sum_squares += squares
+        self.numeric_min = low if self.numeric_min is None else min(self.numeric_min, low)
+        self.numeric_max = high if self.numeric_max is None else max(self.numeric_max, high)
+
+
+def _to_floats(batch: List[str]) -> Optional[Any]:
+    """Convert a whole batch of strings to floats, or None if any is not numeric"""
+    if np is not None:
+        try:
+            numbers = np.asarray(batch, dtype=np.float64)
+        except ValueError:
+            return None
+        # Words like "nan" or "infinity" parse as floats but are text here
+        return numbers if np.isfinite(numbers).all() else None
+    
+    numbers = []
+    for text in batch:
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        if number != number or number in (float("inf"), float("-inf")):
+            return None
+        numbers.append(number)
+    return numbers
+
+
+def _reduce(numbers: Any) -> Tuple[int, float, float, float, float]:
+    """Count, sum, sum of squares, min and max of a batch"""
+    if hasattr(numbers, "dtype"):
+        return (
+            int(numbers.size),
+            float(numbers.sum()),
+            float((numbers * numbers).sum()),
+            float(numbers.min()),
+            float(numbers.max()),
+        )
+    return (
+        len(numbers),
+        float(sum(numbers)),
+        float(sum(n * n for n in numbers)),
+        min(numbers),
+        max(numbers),
+    )
+
+
+def sniff_dialect(data: Any, extension: str = "") -> Tuple[Any, bool]:
+    """
+    Detect the CSV dialect and header from growing samples of the file
+    
+    Starts with a small sample and only reads more when the sniffer cannot
+    decide, so most files are sniffed from their first 16KB.
+    
+    Returns:
+        (dialect, has_header)
+    """
+    sniffer = csv.Sniffer()
+    for size in SNIFF_SAMPLE_SIZES:
+        sample = bytes(data[:size])
+        if len(sample) == size:
+            # Do not cut a row in half
+            sample = sample[:sample.rfind(b"\n") + 1] or sample
+        text = sample.decode("utf-8", errors="replace").lstrip("\ufeff")
+        try:
+            dialect = sniffer.sniff(text, delimiters=",;\t|")
+        except csv.Error:
+            if len(sample) < size:
+                break
+            continue
+        try:
+            has_header = sniffer.has_header(text)
+        except csv.Error:
+            has_header = True
+        return dialect, has_header
+    
+    dialect = csv.excel_tab if extension == ".tsv" else csv.excel
+    return dialect, True
+
+
+def analyze_csv(data: Any, extension: str = ".csv") -> Dict[str, Any]:
+    """
+    Stream a delimited file once, collecting column stats and sample rows
+    
+    Args:
+        data: File contents (mapped or bytes)
+        extension: File extension, used when sniffing fails
+    
+    Returns:
+        Analysis with "dialect", "columns", "rows" and "sample"
+    """
+    dialect, has_header = sniff_dialect(data, extension)
+    reader = csv.reader(iter_lines(data), dialect)
+    
+    header: Optional[List[str]] = None
+    columns: List[ColumnStats] = []
+    sampler = RowSampler()
+    rows = 0
+    ragged = 0
+    
+    for row in reader:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if header is None:
+            # The sniffer's header test is unreliable on short samples;
+            # most uploads have one, so accept any plausible header row
+            has_header = has_header or _plausible_header(row)
+            if has_header:
+                header = [cell.strip() or f"column_{i + 1}" for i, cell in enumerate(row)]
+                continue
+            header = [f"column_{i + 1}" for i in range(len(row))]
+        if len(row) != len(header):
+            ragged += 1
+        while len(columns) < min(len(row), MAX_COLUMNS):
+            index = len(columns)
+            columns.append(ColumnStats(header[index] if index < len(header) else f"column_{index + 1}"))
+        for stats, cell in zip(columns, row):
+            stats.add(cell)
+        rows += 1
+        sampler.add(row)
+    
+    delimiter = getattr(dialect, "delimiter", ",")
+    return {
+        "format": "csv",
+        "dialect": {
+            "delimiter": delimiter,
+            "quotechar": getattr(dialect, "quotechar", '"'),
+            "has_header": has_header,
+        },
+        "header": header or [],
+        "rows": rows,
+        "ragged_rows": ragged,
+        "columns": [c.to_dict() for c in columns],
+        "sample": sampler.rows(),
+    }
+
+
+def _plausible_header(row: List[str]) -> bool:
+    names = [cell.strip() for cell in row]
+    return (
+        all(names)
+        and len(set(names)) == len(names)
+        and not any(_to_floats([name]) is not None or DATE_PATTERN.match(name) for name in names)
+    )
+
+
+def scan_json(data: Any) -> Dict[str, Any]:
+    """
+    Describe a JSON document's top-level structure without loading it whole
+    
+    Top-level object keys and array elements are located with a tokenizer
+    that skips over nested values. Array elements are decoded one at a time,
+    so arrays of records get per-field statistics in bounded memory.
+    
+    Args:
+        data: File contents (mapped or bytes)
+    
+    Returns:
+        Analysis with the top-level "type" plus "keys" or "items"
+    """
+    start = _skip_whitespace(data, 3 if data[:3] == b"\xef\xbb\xbf" else 0)
+    if start >= len(data):
+        return {"format": "json", "type": "empty"}
+    opener = data[start]
+    
+    if opener not in (ord("{"), ord("[")):
+        value = json.loads(bytes(data[start:]).decode("utf-8", errors="replace"))
+        return {"format": "json", "type": type(value).__name__, "value": _truncate(json.dumps(value))}
+    
+    keys: List[Dict[str, Any]] = []
+    sampler = RowSampler()
+    records: Dict[str, ColumnStats] = {}
+    element_types: Counter = Counter()
+    depth = 0
+    end = len(data)
+    pending_key: Optional[str] = None
+    element_start: Optional[int] = None
+    
+    for match in JSON_TOKEN_PATTERN.finditer(data, start):
+        token = match.group()
+        first = token[0]
+        if first == ord('"'):
+            if depth == 1 and opener == ord("{") and pending_key is None:
+                pending_key = json.loads(token.decode("utf-8", errors="replace"))
+            continue
+        if token in (b"{", b"["):
+            depth += 1
+            if depth == 1:
+                element_start = match.end()
+            continue
+        if token in (b"}", b"]"):
+            depth -= 1
+            if depth == 0:
+                _finish_element(data, element_start, match.start(), opener, pending_key,
+                                keys, sampler, records, element_types)
+                end = match.end()
+                break
+            continue
+        if depth != 1:
+            continue
+        if token == b":":
+            element_start = match.end()
+        elif token == b",":
+            _finish_element(data, element_start, match.start(), opener, pending_key,
+                            keys, sampler, records, element_types)
+            pending_key = None
+            element_start = match.end()
+    
+    if _skip_whitespace(data, end) < len(data):
+        # More values follow the first one, as in JSON Lines
+        raise json.JSONDecodeError("Extra data", "", end)
+    
+    if opener == ord("{"):
+        return {"format": "json", "type": "object", "keys": keys}
+    return {
+        "format": "json",
+        "type": "array",
+        "items": sampler.seen,
+        "item_types": dict(element_types),
+        "columns": [stats.to_dict() for stats in records.values()],
+        "sample": sampler.rows(),
+    }
+
+
+def analyze_json_lines(data: Any) -> Dict[str, Any]:
+    """Stream newline-delimited JSON records"""
+    sampler = RowSampler()
+    records: Dict[str, ColumnStats] = {}
+    element_types: Counter = Counter()
+    invalid = 0
+    for line in iter_lines(data):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            invalid += 1
+            continue
+        _add_record(value, sampler, records, element_types)
+    return {
+        "format": "jsonl",
+        "type": "array",
+        "items": sampler.seen,
+        "invalid_lines": invalid,
+        "item_types": dict(element_types),
+        "columns": [stats.to_dict() for stats in records.values()],
+        "sample": sampler.rows(),
+    }
+
+
+def analyze_log(data: Any) -> Dict[str, Any]:
+    """
+    Stream a log file once: levels, time span, repeated messages and samples
+    
+    Messages are grouped into templates by masking numbers, hex values and
+    UUIDs, so "took 31ms" and "took 42ms" count as the same message.
+    """
+    levels: Counter = Counter()
+    templates: Counter = Counter()
+    first_timestamp = last_timestamp = None
+    sampler = RowSampler()
+    problems = RowSampler(head=5, size=15, seed=SAMPLE_SEED + 1)
+    tail: deque = deque(maxlen=HEAD_ROWS)
+    lines = 0
+    
+    for line in iter_lines(data):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        lines += 1
+        level_match = LOG_LEVEL_PATTERN.search(line)
+        level = level_match.group(1).upper() if level_match else None
+        if level == "WARNING":
+            level = "WARN"
+        levels[level or "NONE"] += 1
+        
+        timestamp = LOG_TIMESTAMP_PATTERN.search(line)
+        if timestamp:
+            first_timestamp = first_timestamp or timestamp.group()
+            last_timestamp = timestamp.group()
+            message = line[timestamp.end():]
+        else:
+            message = line
+        template = LOG_VARIABLE_PATTERN.sub("#", message).strip()[:MAX_CELL_CHARS]
+        if template in templates or len(templates) < MAX_LOG_TEMPLATES:
+            templates[template] += 1
+        
+        # Keep line numbers so the samples can be merged in file order
+        numbered = (lines - 1, line)
+        sampler.add(numbered)
+        if level in ("ERROR", "CRITICAL", "FATAL", "WARN"):
+            problems.add(numbered)
+        tail.append(numbered)
+    
+    return {
+        "format": "log",
+        "lines": lines,
+        "levels": dict(levels),
+        "first_timestamp": first_timestamp,
+        "last_timestamp": last_timestamp,
+        "top_messages": [
+            {"template": template, "count": count}
+            for template, count in templates.most_common(TOP_VALUES * 2)
+            if count > 1
+        ],
+        "sample": [row for _, row in sampler.rows()],
+        "problems": [row for _, row in problems.rows()],
+        "tail": list(tail),
+    }
+
+
+def _skip_whitespace(data: Any, position: int) -> int:
+    size = len(data)
+    while position < size and data[position] in b" \t\r\n":
+        position += 1
+    return position
+
+
+def _finish_element(
+    data: Any,
+    start: Optional[int],
+    end: int,
+    opener: int,
+    key: Optional[str],
+    keys: List[Dict[str, Any]],
+    sampler: RowSampler,
+    records: Dict[str, ColumnStats],
+    element_types: Counter
+) -> None:
+    if start is None:
+        return
+    value_start = _skip_whitespace(data, start)
+    if value_start >= end:
+        return  # Empty container
+    if opener == ord("{"):
+        if key is not None:
+            keys.append({"key": key, "type": _json_type(data[value_start]), "bytes": end - value_start})
+        return
+    value = json.loads(bytes(data[value_start:end]).decode("utf-8", errors="replace"))
+    _add_record(value, sampler, records, element_types)
+
+
+def _add_record(
+    value: Any,
+    sampler: RowSampler,
+    records: Dict[str, ColumnStats],
+    element_types: Counter
+) -> None:
+    element_types[_python_json_type(value)] += 1
+    sampler.add(value)
+    if not isinstance(value, dict):
+        return
+    for field_name, field_value in value.items():
+        stats = records.get(field_name)
+        if stats is None:
+            if len(records) >= MAX_COLUMNS:
+                continue
+            stats = records[field_name] = ColumnStats(field_name)
+            # Records seen before this field appeared were missing it
+            stats.count = stats.missing = sampler.seen - 1
+        stats.add(field_value)
+    for field_name, stats in records.items():
+        if field_name not in value:
+            stats.add(None)
+
+
+def _json_type(first_byte: int) -> str:
+    return JSON_VALUE_TYPES.get(first_byte, "number")
+
+
+def _python_json_type(value: Any) -> str:
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if value is None:
+        return "null"
+    return "string"
+
+
+def _truncate(text: str, limit: int = MAX_CELL_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _format_number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return f"{int(value):,}"
+    if abs(value) >= 1:
+        return f"{value:,.2f}".rstrip("0").rstrip(".")
+    return f"{value:.4g}"
+
+
+def describe_columns(columns: List[Dict[str, Any]]) -> List[str]:
+    """One summary line per column"""
+    lines = []
+    for column in columns:
+        parts = [f"{column['count'] - column['missing']:,} values"]
+        if column["missing"]:
+            parts.append(f"{column['missing']:,} missing")
+        if "mean" in column:
+            parts.append(
+                f"min {_format_number(column['min'])}, max {_format_number(column['max'])}, "
+                f"mean {_format_number(column['mean'])}, std {_format_number(column['std'])}"
+            )
+        else:
+            distinct = f"{column['distinct']:,}{'+' if column['distinct_capped'] else ''}"
+            parts.append(f"{distinct} distinct")
+            top = ", ".join(
+                f"{_truncate(str(v['value']), 40)} ({v['count']:,})"
+                for v in column.get("top_values", [])
+            )
+            if top:
+                parts.append(f"top: {top}")
+        lines.append(f"- {column['name']} ({column['type']}): " + "; ".join(parts))
+    return lines
+
+
+def render_analysis(
+    analysis: Dict[str, Any],
+    max_sample_chars: int = MAX_SAMPLE_CHARS,
+    include_samples: bool = True
+) -> str:
+    """
+    Render an analysis as prompt text: summary, column stats, then samples
+    
+    The sample section stops at max_sample_chars so the result stays
+    bounded regardless of the file size.
+    
+    Args:
+        analysis: Result of one of the analyze functions
+        max_sample_chars: Character budget for sampled rows
+        include_samples: False to render only the summary
+    
+    Returns:
+        Prompt text
+    """
+    lines: List[str] = []
+    sample_lines: List[str] = []
+    kind = analysis["format"]
+    
+    if kind == "csv":
+        dialect = analysis["dialect"]
+        delimiter = {"\t": "tab", ",": "comma", ";": "semicolon", "|": "pipe"}.get(
+            dialect["delimiter"], repr(dialect["delimiter"])
+        )
+        lines.append(
+            f"CSV data: {analysis['rows']:,} rows x {len(analysis['header'])} columns "
+            f"({delimiter}-delimited, {'header row' if dialect['has_header'] else 'no header'})"
+        )
+        if analysis["ragged_rows"]:
+            lines.append(f"{analysis['ragged_rows']:,} rows have a different number of fields than the header")
+        lines.append("Columns:")
+        lines.extend(describe_columns(analysis["columns"]))
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(analysis["header"])
+        for _, row in analysis["sample"]:
+            writer.writerow([_truncate(cell) for cell in row])
+        sample_lines = buffer.getvalue().splitlines()
+        sample_title = f"Sample rows ({len(analysis['sample'])} of {analysis['rows']:,}, first rows then random):"
+    
+    elif kind in ("json", "jsonl"):
+        if analysis["type"] == "object":
+            lines.append(f"JSON object with {len(analysis['keys']):,} top-level keys:")
+            lines.extend(
+                f"- {k['key']} ({k['type']}, {k['bytes']:,} bytes)" for k in analysis["keys"][:MAX_COLUMNS]
+            )
+            return "\n".join(lines)
+        if analysis["type"] != "array":
+            return f"JSON {analysis['type']}: {analysis.get('value', '')}"
+        types = ", ".join(f"{count:,} {name}" for name, count in analysis["item_types"].items())
+        label = "JSON Lines" if kind == "jsonl" else "JSON array"
+        lines.append(f"{label} with {analysis['items']:,} items ({types})")
+        if analysis.get("invalid_lines"):
+            lines.append(f"{analysis['invalid_lines']:,} lines are not valid JSON")
+        if analysis["columns"]:
+            lines.append("Fields:")
+            lines.extend(describe_columns(analysis["columns"]))
+        sample_lines = [_truncate(json.dumps(item, ensure_ascii=False), 1000) for _, item in analysis["sample"]]
+        sample_title = f"Sample items ({len(analysis['sample'])} of {analysis['items']:,}, first items then random):"
+    
+    else:
+        levels = ", ".join(f"{name} {count:,}" for name, count in sorted(analysis["levels"].items()))
+        lines.append(f"Log file: {analysis['lines']:,} lines ({levels})")
+        if analysis["first_timestamp"]:
+            lines.append(f"Time span: {analysis['first_timestamp']} to {analysis['last_timestamp']}")
+        if analysis["top_messages"]:
+            lines.append("Most repeated messages (numbers masked as #):")
+            lines.extend(f"- {m['count']:,}x {m['template']}" for m in analysis["top_messages"])
+        seen = set()
+        for group in ("problems", "sample", "tail"):
+            for index, line in analysis[group]:
+                if index not in seen:
+                    seen.add(index)
+                    sample_lines.append((index, _truncate(line, 500)))
+        sample_lines = [line for _, line in sorted(sample_lines)]
+        sample_title = "Sample lines (warnings and errors, first, random and last lines):"
+    
+    if not include_samples:
+        return "\n".join(lines)
+    lines.append("")
+    lines.append(sample_title)
+    used = 0
+    for line in sample_lines:
+        if used + len(line) > max_sample_chars:
+            lines.append("[More samples omitted]")
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+
+def analysis_metadata(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Analysis without the sampled rows, for storing as file metadata"""
+    return {k: v for k, v in analysis.items() if k not in ("sample", "problems", "tail")}
+
+
+class TabularParser:
+    """Parser for CSV, JSON and log files that streams instead of loading"""
+    
+    FORMATS = {
+        ".csv": "csv",
+        ".tsv": "csv",
+        ".json": "json",
+        ".jsonl": "jsonl",
+        ".ndjson": "jsonl",
+        ".log": "log",
+    }
+    
+    def __init__(self, cache: Optional[DocumentCache] = None):
+        self.name = "Tabular Data Parser"
+        self.supported_extensions = list(self.FORMATS)
+        self.cache = cache
+    
+    def parse(self, file_path: str) -> Dict[str, Any]:
+        """
+        Analyze a file and describe it with statistics and samples
+        
+        Small files are included in full after the summary; larger ones are
+        represented by the summary and a bounded sample.
+        
+        Args:
+            file_path: Path to file
+        
+        Returns:
+            Dictionary with prompt text and analysis metadata
+        """
+        return self.document(file_path).to_result()
+    
+    def document(self, file_path: str) -> ParsedDocument:
+        """Get the file's parsed document, parsing it only if it changed"""
+        cache = self.cache if self.cache is not None else get_document_cache()
+        return cache.get(file_path, self._parse, namespace=self.name)
+    
+    def analyze(self, file_path: str) -> Dict[str, Any]:
+        """Stream the file once and return its full analysis, samples included"""
+        extension = Path(file_path).suffix.lower()
+        kind = self.FORMATS.get(extension, "log")
+        with open_mapped(file_path) as data:
+            if kind == "csv":
+                return analyze_csv(data, extension)
+            if kind == "jsonl":
+                return analyze_json_lines(data)
+            if kind == "json":
+                try:
+                    return scan_json(data)
+                except json.JSONDecodeError:
+                    # Many ".json" exports are really one record per line
+                    return analyze_json_lines(data)
+            return analyze_log(data)
+    
+    def _parse(self, file_path: str) -> ParsedDocument:
+        result = {
+            "text": "",
+            "metadata": {},
+            "language": "Text",
+            "error": None
+        }
+        analysis = None
+        
+        try:
+            path = Path(file_path)
+            analysis = self.analyze(file_path)
+            summary = render_analysis(analysis)
+            
+            size = path.stat().st_size
+            if size <= INLINE_MAX_BYTES:
+                with open(file_path, "rb") as file:
+                    content = file.read().decode("utf-8", errors="replace").lstrip("\ufeff")
+                result["text"] = f"{summary.split(chr(10) + chr(10))[0]}\n\nContent:\n{content}"
+            else:
+                result["text"] = summary
+            
+            result["language"] = {"csv": "CSV", "json": "JSON", "jsonl": "JSON", "log": "Log"}[analysis["format"]]
+            result["metadata"] = {
+                "language": result["language"],
+                "extension": path.suffix.lower(),
+                "size": size,
+                "analysis": analysis_metadata(analysis),
+            }
+            result["word_count"] = len(result["text"].split())
+        except Exception as e:
+            result["error"] = f"Failed to analyze file: {str(e)}"
+        
+        document = ParsedDocument(file_path, result)
+        if analysis is not None:
+            document.set_view("analysis", analysis)
+        return document
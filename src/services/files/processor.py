@@ -6,15 +6,78 @@ from typing import Dict, Any, Optional
 from pathlib import Path
 import asyncio
 
+from src.services.files.chunks import split_into_chunks
 from src.services.files.parsers import get_parser_for_file, is_file_supported
 
 
+# Max characters of extracted text kept per file
+MAX_TEXT_LENGTH = 100000
+
+
+def parse_file(file_path: str, max_text_length: int = MAX_TEXT_LENGTH, chunk: bool = False) -> Dict[str, Any]:
+    """
+    Parse a file synchronously
+    
+    Module-level so it can run in a worker process as well as a thread.
+    
+    Args:
+        file_path: Path to the file (the extension selects the parser)
+        max_text_length: Characters of text to keep
+        chunk: Also split the full, untruncated text into retrieval chunks
+        
+    Returns:
+        Processing result with extracted text and metadata
+    """
+    result = {
+        "success": False,
+        "file_path": file_path,
+        "text": None,
+        "metadata": {},
+        "error": None
+    }
+    
+    # Check if supported
+    if not is_file_supported(file_path):
+        result["error"] = f"Unsupported file type: {Path(file_path).suffix}"
+        return result
+    
+    # Get appropriate parser
+    parser = get_parser_for_file(file_path)
+    if not parser:
+        result["error"] = "No parser available for this file type"
+        return result
+    
+    parse_result = parser.parse(file_path)
+    
+    if parse_result.get("error"):
+        result["error"] = parse_result["error"]
+        return result
+    
+    # Extract and limit text
+    text = parse_result.get("text", "")
+    if chunk:
+        result["chunks"] = [c.to_dict() for c in split_into_chunks(text)]
+    if len(text) > max_text_length:
+        text = text[:max_text_length] + "\n\n[Content truncated due to length]"
+    
+    result["success"] = True
+    result["text"] = text
+    result["metadata"] = parse_result.get("metadata", {})
+    result["word_count"] = parse_result.get("word_count", len(text.split()))
+    return result
+
+
+def parse_and_chunk_file(file_path: str) -> Dict[str, Any]:
+    """parse_file plus retrieval chunks of the full text"""
+    return parse_file(file_path, chunk=True)
+
+
 class FileProcessor:
     """Main file processing orchestrator"""
     
     def __init__(self):
         self.max_file_size = 50 * 1024 * 1024  # 50MB
-        self.max_text_length = 100000  # Max characters to extract
+        self.max_text_length = MAX_TEXT_LENGTH  # Max characters to extract
     
     async def process_file(self, file_path: str) -> Dict[str, Any]:
         """
@@ -48,34 +111,9 @@ class FileProcessor:
                 result["error"] = f"File too large ({file_size} bytes). Max: {self.max_file_size} bytes"
                 return result
             
-            # Check if supported
-            if not is_file_supported(file_path):
-                result["error"] = f"Unsupported file type: {path.suffix}"
-                return result
-            
-            # Get appropriate parser
-            parser = get_parser_for_file(file_path)
-            if not parser:
-                result["error"] = "No parser available for this file type"
-                return result
-            
             # Parse file (run in thread pool to not block)
             loop = asyncio.get_event_loop()
-            parse_result = await loop.run_in_executor(None, parser.parse, file_path)
-            
-            if parse_result.get("error"):
-                result["error"] = parse_result["error"]
-                return result
-            
-            # Extract and limit text
-            text = parse_result.get("text", "")
-            if len(text) > self.max_text_length:
-                text = text[:self.max_text_length] + "\n\n[Content truncated due to length]"
-            
-            result["success"] = True
-            result["text"] = text
-            result["metadata"] = parse_result.get("metadata", {})
-            result["word_count"] = parse_result.get("word_count", len(text.split()))
+            result = await loop.run_in_executor(None, parse_file, file_path, self.max_text_length)
             
         except Exception as e:
             result["error"] = f"Processing failed: {str(e)}"
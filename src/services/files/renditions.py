@@ -0,0 +1,373 @@
+"""
+Preview renditions for GenZ Smart
+Downscaled thumbnails of images and page rasters of PDFs, rendered in
+worker processes and kept in a size-bounded disk cache
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, Callable
+
+from src.api.config import settings
+from src.core.exceptions import FileError
+from src.core.singleflight import SingleFlight
+
+
+# Named sizes (bounding box in pixels); the API only renders these, so
+# the cache cannot be filled with arbitrary dimensions
+RENDITION_PRESETS: Dict[str, Tuple[int, int]] = {
+    "thumb": (256, 256),
+    "preview": (1024, 1024),
+}
+RENDITION_MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+RENDITION_QUALITY = {"webp": 75, "jpeg": 80}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+
+# Executor
+RENDITION_PROCESS_WORKERS = 2
+RENDITION_MAX_CONCURRENCY = 4  # Renders in flight at once
+
+
+@dataclass(frozen=True)
+class RenditionSpec:
+    """Target box, encoding and source page of a rendition"""
+    width: int
+    height: int
+    format: str = "webp"
+    quality: int = RENDITION_QUALITY["webp"]
+    page: int = 1  # 1-based; PDFs only
+    
+    @classmethod
+    def preset(cls, name: str, format: str = "webp", page: int = 1) -> "RenditionSpec":
+        """
+        Build the spec for a named preset
+        
+        Raises:
+            FileError: If the preset, format or page is not supported
+        """
+        if name not in RENDITION_PRESETS:
+            raise FileError(f"Unknown rendition '{name}'. Available: {', '.join(RENDITION_PRESETS)}")
+        if format not in RENDITION_MEDIA_TYPES:
+            raise FileError(f"Unsupported rendition format '{format}'. Available: {', '.join(RENDITION_MEDIA_TYPES)}")
+        if page < 1:
+            raise FileError("Page numbers start at 1")
+        width, height = RENDITION_PRESETS[name]
+        return cls(width=width, height=height, format=format, quality=RENDITION_QUALITY[format], page=page)
+    
+    @property
+    def key(self) -> str:
+        """Filename-safe identity of the spec, used in cache paths and ETags"""
+        return f"{self.width}x{self.height}-p{self.page}-q{self.quality}.{self.extension}"
+    
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.format == "jpeg" else self.format
+    
+    @property
+    def media_type(self) -> str:
+        return RENDITION_MEDIA_TYPES[self.format]
+
+
+def rendition_source_kind(mime_type: Optional[str], filename: str) -> Optional[str]:
+    """'image' or 'pdf' when a file can be previewed, else None"""
+    extension = os.path.splitext(filename)[1].lower()
+    if mime_type == "application/pdf" or extension == ".pdf":
+        return "pdf"
+    if (mime_type or "").startswith("image/") or extension in IMAGE_EXTENSIONS:
+        return "image"
+    return None
+
+
+def _encode(image, spec: RenditionSpec) -> bytes:
+    from PIL import Image
+    
+    if spec.format == "jpeg" and image.mode != "RGB":
+        # JPEG has no alpha channel; flatten onto white like a browser would
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image).convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    
+    output = io.BytesIO()
+    if spec.format == "webp":
+        image.save(output, "WEBP", quality=spec.quality, method=4)
+    else:
+        image.save(output, "JPEG", quality=spec.quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _render_image(source_path: str, spec: RenditionSpec) -> bytes:
+    from PIL import Image, ImageOps
+    
+    with Image.open(source_path) as image:
+        # JPEG only: let the decoder downscale by up to 8x in the DCT domain
+        image.draft("RGB", (spec.width, spec.height))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((spec.width, spec.height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return _encode(image, spec)
+
+
+def _render_pdf_page(source_path: str, spec: RenditionSpec) -> bytes:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise FileError("PDF previews need pypdfium2. Install with: pip install pypdfium2")
+    
+    pdf = pdfium.PdfDocument(source_path)
+    try:
+        if spec.page > len(pdf):
+            raise FileError(f"Page {spec.page} out of range (document has {len(pdf)})")
+        page = pdf[spec.page - 1]
+        try:
+            # Rasterize straight at the target size rather than at full resolution
+            scale = min(spec.width / page.get_width(), spec.height / page.get_height())
+            return _encode(page.render(scale=scale).to_pil(), spec)
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+
+def render_rendition(source_path: str, kind: str, spec: RenditionSpec) -> bytes:
+    """
+    Render one rendition of a file (runs in a worker process)
+    
+    Args:
+        source_path: Original file
+        kind: 'image' or 'pdf'
+        spec: Target box, format and page
+    
+    Returns:
+        Encoded WebP or JPEG bytes
+    
+    Raises:
+        FileError: If the file cannot be decoded or a dependency is missing
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise FileError("Previews need Pillow. Install with: pip install Pillow")
+    
+    try:
+        if kind == "pdf":
+            return _render_pdf_page(source_path, spec)
+        return _render_image(source_path, spec)
+    except FileError:
+        raise
+    except Exception as e:
+        raise FileError(f"Failed to render preview: {str(e)}", os.path.basename(source_path))
+
+
+class RenditionCache:
+    """
+    Size-bounded LRU of rendition files on disk
+    
+    Files live at <directory>/<key[:2]>/<key>-<spec>. Recency is the file
+    mtime, refreshed on every hit, so the order survives restarts; the
+    index is rebuilt by one directory scan on first use. Renditions of
+    deleted blobs are not removed eagerly, they simply age out.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size, oldest first
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+    
+    def path_for(self, source_key: str, spec: RenditionSpec) -> str:
+        return os.path.join(self.directory, source_key[:2], f"{source_key}-{spec.key}")
+    
+    def get(self, source_key: str, spec: RenditionSpec) -> Optional[str]:
+        """Path of a cached rendition, marking it recently used"""
+        path = self.path_for(source_key, spec)
+        with self._lock:
+            self._load()
+            if path not in self._entries:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(path)
+            self._stats["hits"] += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back
+            with self._lock:
+                self._forget(path)
+            return None
+        return path
+    
+    def put(self, source_key: str, spec: RenditionSpec, data: bytes) -> str:
+        """Store a rendition atomically and evict the least recently used"""
+        path = self.path_for(source_key, spec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".rendition-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        with self._lock:
+            self._load()
+            self._forget(path)
+            self._entries[path] = len(data)
+            self._total += len(data)
+            self._evict(keep=path)
+        return path
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                **self._stats
+            }
+    
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.startswith("."):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat_result = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found.append((stat_result.st_mtime, path, stat_result.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total += size
+        self._evict()
+    
+    def _forget(self, path: str) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total -= size
+    
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self._total > self.max_bytes and self._entries:
+            path = next(iter(self._entries))
+            if path == keep:
+                # A single rendition larger than the budget is still served once
+                break
+            self._forget(path)
+            self._stats["evictions"] += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class RenditionService:
+    """
+    Renders previews in a process pool and serves them from the disk cache
+    
+    Concurrent requests for the same rendition share one render, and the
+    number of renders in flight is capped so a conversation with many
+    attachments does not queue unbounded work.
+    """
+    
+    def __init__(
+        self,
+        cache: RenditionCache,
+        process_workers: int = RENDITION_PROCESS_WORKERS,
+        max_concurrency: int = RENDITION_MAX_CONCURRENCY,
+        render_fn: Callable[[str, str, RenditionSpec], bytes] = render_rendition
+    ):
+        self.cache = cache
+        self.process_workers = process_workers
+        self.max_concurrency = max_concurrency
+        self.render_fn = render_fn
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._flight = SingleFlight("renditions")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    async def get(self, source_key: str, source_path: str, kind: str, spec: RenditionSpec) -> str:
+        """
+        Path of a rendition, rendering it on first request
+        
+        Args:
+            source_key: Identity of the source bytes (content hash)
+            source_path: Original file
+            kind: 'image' or 'pdf'
+            spec: Rendition to produce
+        
+        Returns:
+            Path of the cached rendition
+        
+        Raises:
+            FileError: If the file cannot be rendered
+        """
+        cached = self.cache.get(source_key, spec)
+        if cached is not None:
+            return cached
+        return await self._flight.do(
+            f"{source_key}:{spec.key}",
+            lambda: self._render(source_key, source_path, kind, spec)
+        )
+    
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "renders": self._flight.stats()}
+    
+    async def _render(self, source_key: str, source_path: str, kind: str, spec: RenditionSpec) -> str:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self._get_pool(), self.render_fn, source_path, kind, spec)
+        return await asyncio.to_thread(self.cache.put, source_key, spec, data)
+    
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+
+# Global service instance
+_rendition_service: Optional[RenditionService] = None
+_rendition_service_lock = threading.Lock()
+
+
+def get_rendition_service() -> RenditionService:
+    """Get or create global rendition service"""
+    global _rendition_service
+    with _rendition_service_lock:
+        if _rendition_service is None:
+            _rendition_service = RenditionService(
+                RenditionCache(settings.RENDITION_CACHE_DIR, settings.RENDITION_CACHE_MAX_BYTES),
+                process_workers=min(settings.RENDITION_PROCESS_WORKERS, os.cpu_count() or 1)
+            )
+        return _rendition_service
@@ -0,0 +1,150 @@
+"""
+Upload storage for GenZ Smart
+Streams uploads to disk in fixed-size chunks with incremental hashing
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, BinaryIO
+
+from fastapi import UploadFile
+
+from src.core.exceptions import FileError
+
+
+# Bytes read from the upload and written to disk per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+@dataclass
+class StoredUpload:
+    """An upload written to its final location"""
+    path: str
+    size: int
+    sha256: str
+
+
+def _write_chunk(handle: BinaryIO, digest: "hashlib._Hash", chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so both steps run well in a thread
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+def _finalize(handle: BinaryIO, temp_path: str, destination: str) -> None:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    os.replace(temp_path, destination)
+
+
+def _discard(handle: BinaryIO, temp_path: str) -> None:
+    handle.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: str,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StoredUpload:
+    """
+    Stream an upload to disk without holding it in memory
+    
+    The body is copied in chunks to a temporary file in the destination
+    directory while its SHA-256 is computed, then atomically renamed into
+    place. Disk writes run in worker threads. The size limit is checked
+    before reading when the size is known, and again after every chunk.
+    
+    Args:
+        upload: Incoming upload
+        destination: Final file path
+        max_size: Maximum accepted size in bytes
+        chunk_size: Bytes per read/write step
+    
+    Returns:
+        StoredUpload with the final path, size and hex digest
+    
+    Raises:
+        FileError: If the upload exceeds max_size
+    """
+    too_large = f"File too large. Max size: {max_size} bytes"
+    if upload.size is not None and upload.size > max_size:
+        raise FileError(too_large, upload.filename)
+    
+    directory = os.path.dirname(os.path.abspath(destination))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    handle = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileError(too_large, upload.filename)
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+        
+        await asyncio.to_thread(_finalize, handle, temp_path, destination)
+    except BaseException:
+        # Never leave partial files behind, even when the request is cancelled
+        await asyncio.shield(asyncio.to_thread(_discard, handle, temp_path))
+        raise
+    
+    return StoredUpload(path=destination, size=size, sha256=digest.hexdigest())
+
+
+def store_stream(
+    source: BinaryIO,
+    directory: str,
+    max_size: int,
+    name: Optional[str] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StoredUpload:
+    """
+    Copy a readable stream to a new file in directory, hashing as it goes
+    
+    The blocking counterpart of save_upload, for streams such as archive
+    members. The size limit is enforced on the bytes actually read, so a
+    member whose header understates its size is still cut off.
+    
+    Args:
+        source: Stream to copy
+        directory: Directory for the stored file
+        max_size: Maximum accepted size in bytes
+        name: Name used in the error message
+        chunk_size: Bytes per read/write step
+    
+    Returns:
+        StoredUpload for the new file
+    
+    Raises:
+        FileError: If the stream exceeds max_size
+    """
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    handle = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileError(f"File too large. Max size: {max_size} bytes", name)
+            _write_chunk(handle, digest, chunk)
+        destination = temp_path[:-len(".part")]
+        _finalize(handle, temp_path, destination)
+    except BaseException:
+        _discard(handle, temp_path)
+        raise
+    
+    return StoredUpload(path=destination, size=size, sha256=digest.hexdigest())
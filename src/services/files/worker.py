@@ -0,0 +1,488 @@
+"""
+Background file processing for GenZ Smart
+Queue of extraction jobs run on process and thread pools
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from src.api.config import settings
+from src.models.database import File, engine
+from src.services.files.blobs import (
+    BlobStore, apply_blob_parse, file_extension, link_with_extension, matches_blob
+)
+from src.services.files.chunks import ChunkStore, TextChunk
+from src.services.files.processor import parse_and_chunk_file
+
+
+# Parsers that spend their time in Python-level CPU work. Images are not
+# listed: ImageParser hands OCR to its own capped process pool.
+CPU_BOUND_EXTENSIONS = {".pdf", ".docx"}
+
+RETRY_BACKOFF_SECONDS = 1.0  # Multiplied by the attempt number
+MAX_FINISHED_JOBS = 1000  # Finished jobs kept for status lookups
+MAX_BATCHES = 100  # Batches kept for progress lookups
+CLAIM_MARGIN_SECONDS = 60.0  # Added to the longest possible job before its claim counts as abandoned
+RECOVER_INTERVAL_SECONDS = 60.0  # How often abandoned files are looked for
+
+
+@dataclass
+class FileJob:
+    """Progress of one file through the processing queue"""
+    file_id: str
+    path: str
+    status: str = "queued"  # queued, running, done, error
+    stage: str = "queued"  # queued, parsing, saving, reused, claimed (by another worker), done
+    progress: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "file_id": self.file_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "attempts": self.attempts,
+            "error": self.error,
+            "queued_seconds": round((self.started_at or time.time()) - self.enqueued_at, 3),
+            "duration_seconds": round(self.finished_at - self.started_at, 3)
+            if self.started_at and self.finished_at else None,
+        }
+
+
+class FileProcessingQueue:
+    """
+    Runs text extraction for uploaded files in the background
+    
+    Jobs move File.status from processing to ready or error. A job first
+    claims its file with a conditional UPDATE, so with several workers
+    (processes or hosts) each file is parsed once. CPU-bound
+    parsers (PDF, DOCX) run in a process pool so they use every core
+    and never hold the event loop's GIL; text and code files are parsed in
+    threads. Each attempt has a timeout and failed attempts are retried
+    with a linear backoff. A parse that times out in a worker process keeps
+    that worker busy until it returns, since processes cannot be
+    interrupted safely.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        upload_dir: str,
+        process_workers: int = 2,
+        thread_workers: int = 4,
+        concurrency: int = 4,
+        timeout: float = 120.0,
+        retries: int = 2,
+        retry_backoff: float = RETRY_BACKOFF_SECONDS,
+        parse_fn: Callable[[str], Dict[str, Any]] = parse_and_chunk_file,
+        cpu_extensions: Optional[set] = None
+    ):
+        self.session_factory = session_factory
+        self.upload_dir = upload_dir
+        self.process_workers = process_workers
+        self.thread_workers = thread_workers
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.parse_fn = parse_fn
+        self.cpu_extensions = CPU_BOUND_EXTENSIONS if cpu_extensions is None else cpu_extensions
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumers: List[asyncio.Task] = []
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, FileJob]" = OrderedDict()
+        self._batches: "OrderedDict[str, List[str]]" = OrderedDict()  # batch id -> file ids
+        self.worker_id = uuid.uuid4().hex
+        self._stats = {"completed": 0, "failed": 0, "retried": 0, "timeouts": 0, "reused": 0}
+    
+    @property
+    def claim_ttl(self) -> timedelta:
+        """Age after which a claim is abandoned: every attempt timing out, plus backoff and margin"""
+        backoff = self.retry_backoff * self.retries * (self.retries + 1) / 2
+        return timedelta(seconds=self.timeout * (self.retries + 1) + backoff + CLAIM_MARGIN_SECONDS)
+    
+    # ----- lifecycle -----
+    
+    def start(self, recover: bool = True) -> None:
+        """Start the consumers on the running event loop"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=self.thread_workers,
+            thread_name_prefix="file-parse"
+        )
+        if self.process_workers > 0:
+            # spawn: forking a process that runs threads and an event loop is unsafe
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        self._consumers = [
+            asyncio.create_task(self._consume()) for _ in range(self.concurrency)
+        ]
+        if recover:
+            self._consumers.append(asyncio.create_task(self._recover()))
+    
+    async def stop(self) -> None:
+        """Stop the consumers and shut down the pools"""
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self._queue = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+    
+    async def join(self) -> None:
+        """Wait until every queued job has finished"""
+        if self._queue is not None:
+            await self._queue.join()
+    
+    # ----- jobs -----
+    
+    def enqueue(self, file_id: str, path: str) -> FileJob:
+        """
+        Queue a file for extraction
+        
+        Args:
+            file_id: File row id
+            path: Stored file path (its extension selects the parser)
+        
+        Returns:
+            The job, which can be polled with get_job
+        """
+        self.start()
+        job = self._jobs.get(file_id)
+        if job is not None and job.status in ("queued", "running"):
+            return job
+        
+        job = FileJob(file_id=file_id, path=path)
+        self._jobs[file_id] = job
+        self._jobs.move_to_end(file_id)
+        self._trim_jobs()
+        self._queue.put_nowait(job)
+        return job
+    
+    def enqueue_batch(self, files: List[tuple], ready: Optional[List[str]] = None) -> str:
+        """
+        Queue several files and track them as one batch
+        
+        Args:
+            files: (file_id, path) pairs to extract
+            ready: Ids of files in the batch that need no extraction
+        
+        Returns:
+            Batch id for get_batch
+        """
+        batch_id = str(uuid.uuid4())
+        for file_id, path in files:
+            self.enqueue(file_id, path)
+        self._batches[batch_id] = [file_id for file_id, _ in files] + list(ready or [])
+        while len(self._batches) > MAX_BATCHES:
+            self._batches.popitem(last=False)
+        return batch_id
+    
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate progress of a batch
+        
+        Files without a job (ready on upload, or long finished) count as done.
+        
+        Returns:
+            Counts per status, overall progress and per-file jobs, or None
+        """
+        file_ids = self._batches.get(batch_id)
+        if file_ids is None:
+            return None
+        counts = {"queued": 0, "running": 0, "done": 0, "error": 0}
+        progress = 0.0
+        files = []
+        for file_id in file_ids:
+            job = self._jobs.get(file_id)
+            if job is None:
+                counts["done"] += 1
+                progress += 1.0
+                files.append({"file_id": file_id, "status": "done", "stage": "ready", "progress": 1.0})
+                continue
+            counts[job.status] += 1
+            progress += 1.0 if job.status in ("done", "error") else job.progress
+            files.append(job.to_dict())
+        total = len(file_ids)
+        return {
+            "batch_id": batch_id,
+            "total": total,
+            **counts,
+            "progress": round(progress / total, 3) if total else 1.0,
+            "finished": counts["done"] + counts["error"] == total,
+            "files": files
+        }
+    
+    def get_job(self, file_id: str) -> Optional[FileJob]:
+        """Get the latest job for a file"""
+        return self._jobs.get(file_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self._jobs.values() if job.status == "running"),
+            "process_workers": self.process_workers,
+            "thread_workers": self.thread_workers,
+            "concurrency": self.concurrency,
+            **self._stats
+        }
+    
+    # ----- processing -----
+    
+    async def _consume(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                job.status = "error"
+                job.error = str(e)
+                print(f"File job {job.file_id} crashed: {e}")
+            finally:
+                job.finished_at = job.finished_at or time.time()
+                self._queue.task_done()
+    
+    async def _run(self, job: FileJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        
+        state, extension = await asyncio.to_thread(self._begin, job.file_id)
+        if state == "missing":
+            job.status = "error"
+            job.error = "File was deleted"
+            return
+        if state == "reused":
+            self._stats["reused"] += 1
+            self._finish(job, "reused")
+            return
+        if state == "claimed":
+            self._finish(job, "claimed")
+            return
+        
+        error = None
+        while job.attempts <= self.retries:
+            job.attempts += 1
+            job.stage = "parsing"
+            job.progress = 0.1
+            try:
+                result = await asyncio.wait_for(self._parse(job.path, extension), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                error = f"Processing timed out after {self.timeout:.0f}s"
+            except Exception as e:
+                error = f"Processing failed: {e}"
+            else:
+                if result.get("success"):
+                    job.stage = "saving"
+                    job.progress = 0.9
+                    try:
+                        await asyncio.to_thread(self._save_result, job.file_id, result)
+                    except Exception as e:
+                        error = f"Saving failed: {e}"
+                        break
+                    self._stats["completed"] += 1
+                    self._finish(job, "done")
+                    return
+                # The parser rejected the file; retrying will not help
+                error = result.get("error") or "Processing failed"
+                break
+            
+            if job.attempts <= self.retries:
+                self._stats["retried"] += 1
+                await asyncio.sleep(self.retry_backoff * job.attempts)
+        
+        self._stats["failed"] += 1
+        job.status = "error"
+        job.error = error
+        job.finished_at = time.time()
+        try:
+            await asyncio.to_thread(self._save_error, job.file_id, error)
+        except Exception as e:
+            # Left in processing; recovery requeues it once the claim is stale
+            print(f"Failed to record error for file {job.file_id}: {e}")
+    
+    async def _parse(self, path: str, extension: Optional[str] = None) -> Dict[str, Any]:
+        alias = None
+        if extension is not None and Path(path).suffix.lower() != extension:
+            # Shared blob stored under another upload's extension: parse it as this file's type
+            alias = await asyncio.to_thread(link_with_extension, path, extension, self.upload_dir)
+            path = alias
+        executor: Executor = self._thread_pool
+        if self._process_pool is not None and Path(path).suffix.lower() in self.cpu_extensions:
+            executor = self._process_pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, self.parse_fn, path)
+        finally:
+            if alias is not None:
+                try:
+                    os.remove(alias)
+                except OSError:
+                    pass
+    
+    def _finish(self, job: FileJob, stage: str) -> None:
+        job.status = "done"
+        job.stage = stage
+        job.progress = 1.0
+        job.finished_at = time.time()
+    
+    def _trim_jobs(self) -> None:
+        finished = [k for k, j in self._jobs.items() if j.status in ("done", "error")]
+        for file_id in finished[:max(0, len(self._jobs) - MAX_FINISHED_JOBS)]:
+            del self._jobs[file_id]
+    
+    async def _recover(self) -> None:
+        """Requeue files abandoned in processing (by a crashed run or worker), now and periodically"""
+        while True:
+            try:
+                pending = await asyncio.to_thread(self._pending_files)
+            except Exception as e:
+                print(f"File queue recovery failed: {e}")
+            else:
+                for file_id, path in pending:
+                    self.enqueue(file_id, path)
+            await asyncio.sleep(RECOVER_INTERVAL_SECONDS)
+    
+    # ----- database (worker threads, private sessions) -----
+    
+    def _begin(self, file_id: str) -> Tuple[str, Optional[str]]:
+        """Claim a file: (missing | reused | claimed | parsing, extension its parser is chosen by)"""
+        with self.session_factory() as db:
+            file = db.get(File, file_id)
+            if file is None:
+                return "missing", None
+            extension = file_extension(file) or None
+            if file.blob is not None and apply_blob_parse(file, file.blob):
+                file.error_message = None
+                db.commit()
+                return "reused", extension
+            
+            # Only one worker wins; a claim is taken over once abandoned
+            now = datetime.utcnow()
+            result = db.execute(
+                update(File)
+                .where(
+                    File.id == file_id,
+                    File.status == "processing",
+                    or_(File.claimed_at.is_(None), File.claimed_at < now - self.claim_ttl)
+                )
+                .values(claimed_by=self.worker_id, claimed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            if not result.rowcount:
+                return "claimed", extension
+            return "parsing", extension
+    
+    def _save_result(self, file_id: str, result: Dict[str, Any]) -> None:
+        with self.session_factory() as db:
+            file = db.get(File, file_id)
+            if file is None:
+                return
+            file.extracted_text = result["text"]
+            file.word_count = result.get("word_count")
+            file.status = "ready"
+            file.error_message = None
+            file.claimed_by = None
+            file.claimed_at = None
+            db.commit()
+            if file.blob is not None and matches_blob(file, file.blob):
+                # Only a parse made under the blob's own extension is shared
+                BlobStore(db, self.upload_dir).record_parse(
+                    file.content_hash,
+                    result["text"],
+                    word_count=result.get("word_count"),
+                    metadata=result.get("metadata")
+                )
+                self._save_chunks(db, file.content_hash, result)
+    
+    def _save_chunks(self, db: Session, content_hash: str, result: Dict[str, Any]) -> None:
+        """Store retrieval chunks once per blob; a failure leaves the file usable"""
+        store = ChunkStore(db)
+        try:
+            if store.has_chunks(content_hash):
+                return
+            if result.get("chunks") is not None:
+                store.store(content_hash, [TextChunk.from_dict(c) for c in result["chunks"]])
+            else:
+                store.index_text(content_hash, result["text"])
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to store chunks for {content_hash}: {e}")
+    
+    def _save_error(self, file_id: str, error: str) -> None:
+        with self.session_factory() as db:
+            file = db.get(File, file_id)
+            if file is None:
+                return
+            file.status = "error"
+            file.error_message = error
+            file.claimed_by = None
+            file.claimed_at = None
+            db.commit()
+    
+    def _pending_files(self) -> List[tuple]:
+        """Files in processing whose claim went stale, or that nobody claimed within the same time"""
+        cutoff = datetime.utcnow() - self.claim_ttl
+        with self.session_factory() as db:
+            rows = db.query(File.id, File.storage_path).filter(
+                File.status == "processing",
+                or_(
+                    File.claimed_at < cutoff,
+                    and_(File.claimed_at.is_(None), File.created_at < cutoff)
+                )
+            ).all()
+            return [(row.id, row.storage_path) for row in rows]
+
+
+def _default_session_factory() -> Session:
+    """Session on the application database"""
+    return Session(bind=engine)
+
+
+# Global queue instance
+_file_queue: Optional[FileProcessingQueue] = None
+
+
+def get_file_queue() -> FileProcessingQueue:
+    """Get or create global file processing queue"""
+    global _file_queue
+    if _file_queue is None:
+        _file_queue = FileProcessingQueue(
+            session_factory=_default_session_factory,
+            upload_dir=settings.UPLOAD_DIR,
+            process_workers=settings.FILE_PROCESS_WORKERS,
+            thread_workers=settings.FILE_THREAD_WORKERS,
+            concurrency=settings.FILE_JOB_CONCURRENCY,
+            timeout=settings.FILE_JOB_TIMEOUT,
+            retries=settings.FILE_JOB_RETRIES
+        )
+    return _file_queue
@@ -186,7 +186,36 @@ class ConversationMemoryManager:
         
         facts = loop.run_until_complete(extractor.extract_facts(message))
         
-        # Store facts
+        return self._store_facts(facts)
+    
+    async def extract_and_store_async(
+        self,
+        message: str,
+        role: str = "user"
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract facts from message and store them (for use inside a running event loop)
+        
+        Args:
+            message: Message content
+            role: Message role
+            
+        Returns:
+            List of stored facts
+        """
+        from src.services.memory.extractor import get_extractor
+        
+        extractor = get_extractor()
+        
+        if not extractor.should_extract(message, role):
+            return []
+        
+        facts = await extractor.extract_facts(message)
+        
+        return self._store_facts(facts)
+    
+    def _store_facts(self, facts: list) -> List[Dict[str, Any]]:
+        """Persist high-confidence extracted facts"""
         stored = []
         for fact in facts:
             if fact.confidence >= 0.5:  # Only store high-confidence facts
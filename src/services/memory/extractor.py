@@ -132,11 +132,11 @@ Only include high-confidence facts. Return empty array if no clear facts are pre
                     Message(role=MessageRole.USER, content=prompt)
                 ],
                 model=provider.default_model,
-                temperature=0.1,
+                temperature=0,
                 max_tokens=500
             )
             
-            response = await provider.chat_complete(request)
+            response = await provider.chat_complete_coalesced(request)
             
             # Parse JSON response
             import json
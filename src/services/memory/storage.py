@@ -7,6 +7,7 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
+from src.core.ids import new_id
 from src.models.database import MemoryFact
 
 
@@ -35,10 +36,8 @@ class MemoryStorage:
         Returns:
             Created MemoryFact
         """
-        import uuid
-        
         fact = MemoryFact(
-            id=str(uuid.uuid4()),
+            id=new_id(),
             conversation_id=conversation_id,
             category=category,
             content=content,
@@ -3,13 +3,16 @@ Search service module for GenZ Smart
 Provides web search capabilities with multiple provider support
 """
 from typing import Optional, Dict, Type, List, Literal
-from datetime import datetime, timedelta
 import hashlib
 
+from src.core.singleflight import SingleFlight
 from src.services.search.base import BaseSearchProvider, SearchResponse
+from src.services.search.cache import TwoTierSearchCache, get_search_cache
 from src.services.search.serpapi import SerpAPISearchProvider
 from src.services.search.brave import BraveSearchProvider
 from src.services.search.duckduckgo import DuckDuckGoSearchProvider, DuckDuckGoLiteProvider
+from src.services.search.federated import FederatedSearchProvider
+from src.services.search.pages import PageFetcher, FetchedPage, get_page_fetcher
 
 
 # Registry of available search providers
@@ -18,28 +21,40 @@ _SEARCH_PROVIDERS: Dict[str, Type[BaseSearchProvider]] = {
     "brave": BraveSearchProvider,
     "duckduckgo": DuckDuckGoSearchProvider,
     "duckduckgo_lite": DuckDuckGoLiteProvider,
+    "federated": FederatedSearchProvider,
 }
 
-# Cache for search results (simple in-memory cache)
-_search_cache: Dict[str, Dict] = {}
-CACHE_TTL_HOURS = 1
+# Default-configured provider instances, created once and reused
+_provider_instances: Dict[str, BaseSearchProvider] = {}
+_default_provider_id: Optional[str] = None
+
+# Identical concurrent searches share one provider call
+_search_flight = SingleFlight("search")
 
 
 def get_search_provider(provider_id: str, **kwargs) -> Optional[BaseSearchProvider]:
     """
     Get a search provider instance
     
+    Instances without extra configuration are shared, so availability checks
+    and provider setup happen once per process.
+    
     Args:
         provider_id: Provider identifier
         **kwargs: Additional configuration options
-        
+    
     Returns:
         Search provider instance or None if not found
     """
     provider_class = _SEARCH_PROVIDERS.get(provider_id)
-    if provider_class:
+    if not provider_class:
+        return None
+    if kwargs:
         return provider_class(**kwargs)
-    return None
+    
+    if provider_id not in _provider_instances:
+        _provider_instances[provider_id] = provider_class()
+    return _provider_instances[provider_id]
 
 
 def get_available_providers() -> List[str]:
@@ -51,46 +66,30 @@ def get_default_provider() -> BaseSearchProvider:
     """
     Get the default search provider
     Tries providers in order: brave -> serpapi -> duckduckgo
+    The choice is resolved on first use and cached.
     """
-    # Try Brave first
-    brave = BraveSearchProvider()
-    if brave.is_available():
-        return brave
-    
-    # Try SerpAPI
-    serpapi = SerpAPISearchProvider()
-    if serpapi.is_available():
-        return serpapi
-    
-    # Fall back to DuckDuckGo (always available)
-    return DuckDuckGoSearchProvider()
-
-
-def _get_cache_key(query: str, provider: str, search_type: str, **kwargs) -> str:
-    """Generate cache key for search query"""
-    key_data = f"{query}:{provider}:{search_type}:{sorted(kwargs.items())}"
-    return hashlib.md5(key_data.encode()).hexdigest()
+    global _default_provider_id
+    if _default_provider_id is None:
+        _default_provider_id = "duckduckgo"  # Always available
+        for provider_id in ("brave", "serpapi"):
+            if get_search_provider(provider_id).is_available():
+                _default_provider_id = provider_id
+                break
+    return get_search_provider(_default_provider_id)
 
 
-def _get_cached_result(cache_key: str) -> Optional[SearchResponse]:
-    """Get cached search result if valid"""
-    if cache_key in _search_cache:
-        cached = _search_cache[cache_key]
-        if datetime.utcnow() < cached["expires_at"]:
-            response = cached["response"]
-            response.cached = True
-            return response
-        else:
-            del _search_cache[cache_key]
-    return None
+def refresh_search_providers() -> None:
+    """Forget cached provider instances (e.g. after API keys change)"""
+    global _default_provider_id
+    _provider_instances.clear()
+    _default_provider_id = None
 
 
-def _cache_result(cache_key: str, response: SearchResponse) -> None:
-    """Cache search result"""
-    _search_cache[cache_key] = {
-        "response": response,
-        "expires_at": datetime.utcnow() + timedelta(hours=CACHE_TTL_HOURS)
-    }
+def _get_cache_key(query: str, provider: str, search_type: str, num_results: int, **kwargs) -> str:
+    """Generate cache key for search query"""
+    normalized_query = " ".join(query.lower().split())
+    key_data = f"{normalized_query}:{provider}:{search_type}:{num_results}:{sorted(kwargs.items())}"
+    return hashlib.sha256(key_data.encode()).hexdigest()
 
 
 async def search_web(
@@ -111,7 +110,7 @@ async def search_web(
         search_type: Type of search
         use_cache: Whether to use caching
         **kwargs: Additional search parameters
-        
+    
     Returns:
         SearchResponse with results
     """
@@ -123,45 +122,50 @@ async def search_web(
     else:
         provider = get_default_provider()
     
-    # Check cache
-    if use_cache:
-        cache_key = _get_cache_key(query, provider.provider_id, search_type, **kwargs)
-        cached = _get_cached_result(cache_key)
-        if cached:
-            return cached
+    cache_key = _get_cache_key(query, provider.provider_id, search_type, num_results, **kwargs)
+    
+    cache = get_search_cache()
+    
+    async def search() -> SearchResponse:
+        response = await provider.search(
+            query=query,
+            num_results=num_results,
+            search_type=search_type,
+            **kwargs
+        )
+        if use_cache:
+            # Stored once by the shared call, not by every coalesced caller
+            await cache.set(cache_key, response)
+        return response
+    
+    async def fetch() -> SearchResponse:
+        # Concurrent identical searches await the same provider call
+        return await _search_flight.do(cache_key, search)
     
-    # Perform search
-    response = await provider.search(
-        query=query,
-        num_results=num_results,
-        search_type=search_type,
-        **kwargs
-    )
+    if not use_cache:
+        return await fetch()
     
-    # Cache result
-    if use_cache:
-        _cache_result(cache_key, response)
+    # Check cache (stale entries are returned and refreshed in the background)
+    cached = await cache.get(cache_key, revalidate=fetch)
+    if cached:
+        return cached
     
-    return response
+    # Perform search (the shared call caches the result)
+    return await fetch()
 
 
-def clear_search_cache() -> None:
+async def clear_search_cache() -> None:
     """Clear all cached search results"""
-    _search_cache.clear()
+    await get_search_cache().clear()
 
 
 def get_search_cache_stats() -> Dict:
     """Get cache statistics"""
-    now = datetime.utcnow()
-    valid_entries = sum(
-        1 for entry in _search_cache.values()
-        if entry["expires_at"] > now
-    )
-    return {
-        "total_entries": len(_search_cache),
-        "valid_entries": valid_entries,
-        "expired_entries": len(_search_cache) - valid_entries
-    }
+    stats = get_search_cache().stats()
+    flight = _search_flight.stats()
+    stats["coalesced_requests"] = flight["coalesced"]
+    stats["in_flight_searches"] = flight["in_flight"]
+    return stats
 
 
 __all__ = [
@@ -171,9 +175,16 @@ __all__ = [
     "BraveSearchProvider",
     "DuckDuckGoSearchProvider",
     "DuckDuckGoLiteProvider",
+    "FederatedSearchProvider",
+    "TwoTierSearchCache",
+    "get_search_cache",
+    "PageFetcher",
+    "FetchedPage",
+    "get_page_fetcher",
     "get_search_provider",
     "get_available_providers",
     "get_default_provider",
+    "refresh_search_providers",
     "search_web",
     "clear_search_cache",
     "get_search_cache_stats"
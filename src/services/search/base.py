@@ -28,6 +28,18 @@ class SearchResult:
             "published_date": self.published_date,
             "thumbnail": self.thumbnail
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResult":
+        """Create from dictionary"""
+        return cls(
+            title=data.get("title", ""),
+            url=data.get("url", ""),
+            snippet=data.get("snippet", ""),
+            source=data.get("source", "Unknown"),
+            published_date=data.get("published_date"),
+            thumbnail=data.get("thumbnail")
+        )
 
 
 @dataclass
@@ -50,6 +62,18 @@ class SearchResponse:
             "provider": self.provider,
             "cached": self.cached
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResponse":
+        """Create from dictionary"""
+        return cls(
+            results=[SearchResult.from_dict(r) for r in data.get("results", [])],
+            query=data.get("query", ""),
+            total_results=data.get("total_results", 0),
+            search_time=data.get("search_time", 0.0),
+            provider=data.get("provider", ""),
+            cached=data.get("cached", False)
+        )
 
 
 class BaseSearchProvider(ABC):
@@ -5,9 +5,9 @@ Provides web search capabilities using Brave Search API
 import os
 import time
 from typing import Optional, Literal
-import httpx
 
 from src.services.search.base import BaseSearchProvider, SearchResponse, SearchResult
+from src.services.search.http import get_http_client
 
 
 class BraveSearchProvider(BaseSearchProvider):
@@ -80,10 +80,9 @@ class BraveSearchProvider(BaseSearchProvider):
         if "freshness" in kwargs:
             params["freshness"] = kwargs["freshness"]  # pd (past day), pw (past week), pm (past month)
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await get_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
         
         search_time = time.time() - start_time
         
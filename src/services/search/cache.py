@@ -0,0 +1,321 @@
+"""
+Search result cache for GenZ Smart
+Two tiers: a bounded in-process LRU (L1) backed by the search_cache table (L2)
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.database import SearchCache, engine
+from src.services.search.base import SearchResponse
+
+
+# Defaults for the global cache
+CACHE_TTL = timedelta(hours=1)
+STALE_TTL = timedelta(minutes=30)  # Served stale (and refreshed) for this long after expiry
+L1_MAX_ENTRIES = 512
+L1_MAX_BYTES = 16 * 1024 * 1024  # 16MB
+SWEEP_INTERVAL_SECONDS = 60
+
+
+@dataclass
+class CacheEntry:
+    """Cached search response with freshness bounds"""
+    response: SearchResponse
+    expires_at: datetime
+    stale_until: datetime
+    size: int
+    
+    def is_fresh(self, now: datetime) -> bool:
+        return now < self.expires_at
+    
+    def is_usable(self, now: datetime) -> bool:
+        return now < self.stale_until
+
+
+class TwoTierSearchCache:
+    """
+    Search cache with a size-aware LRU in front of the database
+    
+    L1 is per-process and bounded by entry count and approximate payload
+    bytes. L2 is the search_cache table, which survives restarts and is
+    shared between workers. Expired entries are served stale for a grace
+    period while a background refresh runs.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        ttl: timedelta = CACHE_TTL,
+        stale_ttl: timedelta = STALE_TTL,
+        max_entries: int = L1_MAX_ENTRIES,
+        max_bytes: int = L1_MAX_BYTES
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "stale_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "revalidations": 0,
+            "l2_errors": 0,
+        }
+    
+    async def get(
+        self,
+        key: str,
+        revalidate: Optional[Callable[[], Awaitable[SearchResponse]]] = None
+    ) -> Optional[SearchResponse]:
+        """
+        Look up a cached response
+        
+        Args:
+            key: Cache key
+            revalidate: Function that fetches and stores a fresh response, run in
+                the background when the entry is stale
+        
+        Returns:
+            Cached response (marked cached) or None on miss
+        """
+        now = datetime.utcnow()
+        source = "l1"
+        
+        entry = self._entries.get(key)
+        if entry is not None and not entry.is_usable(now):
+            self._remove(key)
+            self._stats["expirations"] += 1
+            entry = None
+        
+        if entry is None and self.session_factory is not None:
+            entry = await asyncio.to_thread(self._load_l2, key)
+            if entry is not None and entry.is_usable(now):
+                self._store_l1(key, entry)
+                source = "l2"
+            else:
+                entry = None
+        
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._stats[f"{source}_hits"] += 1
+        
+        if not entry.is_fresh(now):
+            self._stats["stale_hits"] += 1
+            if revalidate is not None:
+                self._schedule_revalidation(key, revalidate)
+        
+        return replace(entry.response, cached=True)
+    
+    async def set(self, key: str, response: SearchResponse) -> None:
+        """Store a response in both tiers"""
+        payload = response.to_dict()
+        expires_at = datetime.utcnow() + self.ttl
+        entry = CacheEntry(
+            response=response,
+            expires_at=expires_at,
+            stale_until=expires_at + self.stale_ttl,
+            size=len(json.dumps(payload))
+        )
+        self._store_l1(key, entry)
+        
+        if self.session_factory is not None:
+            await asyncio.to_thread(self._save_l2, key, payload, expires_at)
+    
+    async def clear(self) -> None:
+        """Remove all entries from both tiers"""
+        self._entries.clear()
+        self._bytes = 0
+        
+        if self.session_factory is not None:
+            await asyncio.to_thread(self._clear_l2)
+    
+    def sweep(self) -> int:
+        """Drop L1 entries past their stale window; returns the number removed"""
+        now = datetime.utcnow()
+        expired = [key for key, entry in self._entries.items() if not entry.is_usable(now)]
+        for key in expired:
+            self._remove(key)
+        self._stats["expirations"] += len(expired)
+        return len(expired)
+    
+    def start_sweeper(self, interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+        """Start the background expiry sweeper on the running event loop"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop(interval))
+    
+    async def stop_sweeper(self) -> None:
+        """Stop the background expiry sweeper"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        now = datetime.utcnow()
+        valid_entries = sum(1 for entry in self._entries.values() if entry.is_fresh(now))
+        hits = self._stats["l1_hits"] + self._stats["l2_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "total_entries": len(self._entries),
+            "valid_entries": valid_entries,
+            "expired_entries": len(self._entries) - valid_entries,
+            "size_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "persistent": self.session_factory is not None,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            **self._stats
+        }
+    
+    # ----- L1 -----
+    
+    def _store_l1(self, key: str, entry: CacheEntry) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if entry.size > self.max_bytes:
+            return
+        
+        self._entries[key] = entry
+        self._bytes += entry.size
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+    
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+    
+    def _schedule_revalidation(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[SearchResponse]]
+    ) -> None:
+        if key in self._revalidating:
+            return
+        self._revalidating[key] = asyncio.create_task(self._revalidate(key, fetch))
+    
+    async def _revalidate(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[SearchResponse]]
+    ) -> None:
+        try:
+            await fetch()
+            self._stats["revalidations"] += 1
+        except Exception as e:
+            print(f"Search cache revalidation failed: {e}")
+        finally:
+            self._revalidating.pop(key, None)
+    
+    async def _sweep_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+            if self.session_factory is not None:
+                await asyncio.to_thread(self._purge_l2)
+    
+    # ----- L2 -----
+    
+    def _load_l2(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with self.session_factory() as session:
+                row = session.query(SearchCache).filter(
+                    SearchCache.query_hash == key
+                ).first()
+                if row is None:
+                    return None
+                return CacheEntry(
+                    response=SearchResponse.from_dict(row.results),
+                    expires_at=row.expires_at,
+                    stale_until=row.expires_at + self.stale_ttl,
+                    size=len(json.dumps(row.results))
+                )
+        except Exception as e:
+            self._stats["l2_errors"] += 1
+            print(f"Search cache L2 read failed: {e}")
+            return None
+    
+    def _save_l2(self, key: str, payload: Dict[str, Any], expires_at: datetime) -> None:
+        try:
+            with self.session_factory() as session:
+                row = session.query(SearchCache).filter(
+                    SearchCache.query_hash == key
+                ).first()
+                if row is None:
+                    row = SearchCache(query_hash=key)
+                    session.add(row)
+                row.query_text = payload["query"]
+                row.results = payload
+                row.result_count = len(payload["results"])
+                row.expires_at = expires_at
+                try:
+                    session.commit()
+                except IntegrityError:
+                    # Another worker stored the same key first
+                    session.rollback()
+        except Exception as e:
+            self._stats["l2_errors"] += 1
+            print(f"Search cache L2 write failed: {e}")
+    
+    def _clear_l2(self) -> None:
+        try:
+            with self.session_factory() as session:
+                session.query(SearchCache).delete()
+                session.commit()
+        except Exception as e:
+            self._stats["l2_errors"] += 1
+            print(f"Search cache L2 clear failed: {e}")
+    
+    def _purge_l2(self) -> None:
+        try:
+            with self.session_factory() as session:
+                session.query(SearchCache).filter(
+                    SearchCache.expires_at < datetime.utcnow() - self.stale_ttl
+                ).delete()
+                session.commit()
+        except Exception as e:
+            self._stats["l2_errors"] += 1
+            print(f"Search cache L2 purge failed: {e}")
+
+
+def _default_session_factory() -> Session:
+    """Session on the application database"""
+    return Session(bind=engine)
+
+
+# Global cache instance
+_cache: Optional[TwoTierSearchCache] = None
+
+
+def get_search_cache() -> TwoTierSearchCache:
+    """Get or create global search cache"""
+    global _cache
+    if _cache is None:
+        _cache = TwoTierSearchCache(session_factory=_default_session_factory)
+    return _cache
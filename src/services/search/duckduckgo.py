@@ -3,12 +3,11 @@ DuckDuckGo search provider integration
 Provides free web search capabilities using DuckDuckGo
 """
 import time
-import re
-from typing import Optional, Literal, List, Dict, Any
-import httpx
-from urllib.parse import quote_plus
+from typing import Optional, Literal, List
 
 from src.services.search.base import BaseSearchProvider, SearchResponse, SearchResult
+from src.services.search.html_results import parse_duckduckgo_results
+from src.services.search.http import get_http_client
 
 
 class DuckDuckGoSearchProvider(BaseSearchProvider):
@@ -34,31 +33,7 @@ class DuckDuckGoSearchProvider(BaseSearchProvider):
     
     def _parse_html_results(self, html: str) -> List[SearchResult]:
         """Parse HTML search results"""
-        results = []
-        
-        # Simple regex-based parsing (in production, use BeautifulSoup)
-        # Find result blocks
-        result_pattern = r'<div class="result[^"]*"[^>]*>.*?<h[^>]*class="result__a"[^>]*href="([^"]*)">([^<]*)</[^>]*>.*?<a[^>]*class="result__snippet"[^>]*>(.*?)</a>.*?</div>'
-        matches = re.findall(result_pattern, html, re.DOTALL | re.IGNORECASE)
-        
-        for match in matches:
-            url, title, snippet = match
-            # Clean up HTML entities
-            title = re.sub(r'<[^>]+>', '', title)
-            snippet = re.sub(r'<[^>]+>', '', snippet)
-            
-            # Extract domain as source
-            domain_match = re.search(r'https?://(?:www\.)?([^/]+)', url)
-            source = domain_match.group(1) if domain_match else "Unknown"
-            
-            results.append(SearchResult(
-                title=title.strip(),
-                url=url.strip(),
-                snippet=snippet.strip(),
-                source=source
-            ))
-        
-        return results
+        return parse_duckduckgo_results(html)
     
     async def search(
         self,
@@ -90,15 +65,14 @@ class DuckDuckGoSearchProvider(BaseSearchProvider):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                self.API_BASE_URL,
-                params=params,
-                headers=headers,
-                follow_redirects=True
-            )
-            response.raise_for_status()
-            html = response.text
+        response = await get_http_client().get(
+            self.API_BASE_URL,
+            params=params,
+            headers=headers,
+            follow_redirects=True
+        )
+        response.raise_for_status()
+        html = response.text
         
         search_time = time.time() - start_time
         
@@ -154,39 +128,19 @@ class DuckDuckGoLiteProvider(BaseSearchProvider):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                self.API_BASE_URL,
-                data=data,
-                headers=headers,
-                follow_redirects=True
-            )
-            response.raise_for_status()
-            html = response.text
+        response = await get_http_client().post(
+            self.API_BASE_URL,
+            data=data,
+            headers=headers,
+            follow_redirects=True
+        )
+        response.raise_for_status()
+        html = response.text
         
         search_time = time.time() - start_time
         
-        # Parse results from lite interface
-        results = []
-        
-        # Lite interface has simpler structure
-        result_pattern = r'<a[^>]*class="[^"]*result-link[^"]*"[^>]*href="([^"]*)">([^<]*)</a>.*?<td[^>]*class="[^"]*result-snippet[^"]*"[^>]*>(.*?)</td>'
-        matches = re.findall(result_pattern, html, re.DOTALL | re.IGNORECASE)
-        
-        for match in matches[:num_results]:
-            url, title, snippet = match
-            title = re.sub(r'<[^>]+>', '', title)
-            snippet = re.sub(r'<[^>]+>', '', snippet)
-            
-            domain_match = re.search(r'https?://(?:www\.)?([^/]+)', url)
-            source = domain_match.group(1) if domain_match else "Unknown"
-            
-            results.append(SearchResult(
-                title=title.strip(),
-                url=url.strip(),
-                snippet=snippet.strip(),
-                source=source
-            ))
+        # Lite interface uses the same tokenizer with its own class names
+        results = parse_duckduckgo_results(html, limit=num_results)
         
         return SearchResponse(
             results=results,
@@ -0,0 +1,205 @@
+"""
+Federated search provider for GenZ Smart
+Queries every available provider concurrently and fuses the rankings
+"""
+import asyncio
+import time
+from dataclasses import replace
+from typing import Optional, Literal, List, Dict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+from src.services.search.base import BaseSearchProvider, SearchResponse, SearchResult
+from src.services.search.brave import BraveSearchProvider
+from src.services.search.serpapi import SerpAPISearchProvider
+from src.services.search.duckduckgo import DuckDuckGoSearchProvider
+
+
+# Per-provider deadlines in seconds
+PROVIDER_DEADLINES: Dict[str, float] = {
+    "brave": 3.0,
+    "serpapi": 5.0,
+    "duckduckgo": 4.0,
+}
+DEFAULT_DEADLINE = 4.0
+
+# Reciprocal-rank fusion constant (larger values flatten rank differences)
+RRF_K = 60
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "ref", "ref_src"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a result URL so the same page from different providers matches
+    
+    Unwraps DuckDuckGo redirect links, lowercases the host, drops "www.",
+    fragments, tracking parameters and trailing slashes, and sorts the query.
+    """
+    if url.startswith("//"):
+        url = "https:" + url
+    parts = urlsplit(url.strip())
+    
+    if parts.netloc.endswith("duckduckgo.com") and parts.path.startswith("/l/"):
+        target = dict(parse_qsl(parts.query)).get("uddg")
+        if target:
+            return canonicalize_url(unquote(target))
+    
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.startswith("utm_") and k not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def fuse_rankings(
+    rankings: List[List[SearchResult]],
+    k: int = RRF_K
+) -> List[SearchResult]:
+    """
+    Merge ranked result lists with reciprocal-rank fusion
+    
+    Args:
+        rankings: One ranked result list per provider
+        k: RRF constant
+    
+    Returns:
+        Deduplicated results ordered by fused score
+    """
+    scores: Dict[str, float] = {}
+    merged: Dict[str, SearchResult] = {}
+    
+    for results in rankings:
+        for rank, result in enumerate(results, 1):
+            key = canonicalize_url(result.url)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = replace(result)
+            else:
+                # Keep the first copy but fill in anything it is missing
+                if len(result.snippet) > len(existing.snippet):
+                    existing.snippet = result.snippet
+                existing.published_date = existing.published_date or result.published_date
+                existing.thumbnail = existing.thumbnail or result.thumbnail
+    
+    ordered = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [merged[key] for key in ordered]
+
+
+class FederatedSearchProvider(BaseSearchProvider):
+    """Searches all available providers concurrently and fuses their results"""
+    
+    MEMBER_CLASSES = [BraveSearchProvider, SerpAPISearchProvider, DuckDuckGoSearchProvider]
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        providers: Optional[List[BaseSearchProvider]] = None,
+        deadlines: Optional[Dict[str, float]] = None,
+        quorum: int = 2,
+        **kwargs
+    ):
+        super().__init__(None, **kwargs)
+        # Availability is resolved once, when the provider is created
+        if providers is None:
+            providers = [cls() for cls in self.MEMBER_CLASSES]
+        self.providers = [p for p in providers if p.is_available()]
+        self.deadlines = {**PROVIDER_DEADLINES, **(deadlines or {})}
+        self.quorum = quorum
+    
+    @property
+    def provider_id(self) -> str:
+        return "federated"
+    
+    @property
+    def provider_name(self) -> str:
+        return "Federated (all providers)"
+    
+    def is_available(self) -> bool:
+        return len(self.providers) > 0
+    
+    async def _search_one(
+        self,
+        provider: BaseSearchProvider,
+        query: str,
+        num_results: int,
+        search_type: str,
+        **kwargs
+    ) -> SearchResponse:
+        deadline = self.deadlines.get(provider.provider_id, DEFAULT_DEADLINE)
+        return await asyncio.wait_for(
+            provider.search(query=query, num_results=num_results, search_type=search_type, **kwargs),
+            timeout=deadline
+        )
+    
+    async def search(
+        self,
+        query: str,
+        num_results: int = 10,
+        search_type: Literal["general", "news", "images"] = "general",
+        **kwargs
+    ) -> SearchResponse:
+        """
+        Query all available providers and fuse their rankings
+        
+        Returns as soon as a quorum of providers has answered with enough
+        unique results, or when every provider has finished or hit its
+        deadline. Slow and failing providers are skipped.
+        
+        Args:
+            query: Search query
+            num_results: Number of results
+            search_type: Type of search
+        
+        Returns:
+            SearchResponse with fused results
+        """
+        start_time = time.time()
+        
+        tasks = {
+            asyncio.ensure_future(self._search_one(p, query, num_results, search_type, **kwargs)): p
+            for p in self.providers
+        }
+        rankings: List[List[SearchResult]] = []
+        answered = 0
+        pending = set(tasks)
+        quorum = min(self.quorum, len(tasks))
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    try:
+                        response = task.result()
+                    except asyncio.TimeoutError:
+                        print(f"Federated search: {provider.provider_id} missed its deadline")
+                        continue
+                    except Exception as e:
+                        print(f"Federated search: {provider.provider_id} failed: {e}")
+                        continue
+                    answered += 1
+                    if response.results:
+                        rankings.append(response.results)
+                
+                if answered >= quorum and len(fuse_rankings(rankings)) >= num_results:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        results = fuse_rankings(rankings)[:num_results]
+        
+        return SearchResponse(
+            results=results,
+            query=query,
+            total_results=len(results),
+            search_time=time.time() - start_time,
+            provider=self.provider_id
+        )
@@ -0,0 +1,133 @@
+"""
+HTML result extraction for GenZ Smart
+Single-pass, tokenizer-based parsing of DuckDuckGo result pages
+"""
+from html.parser import HTMLParser
+from typing import List, Optional, Dict
+from urllib.parse import urlsplit, parse_qsl
+
+from src.services.search.base import SearchResult
+
+
+# Class names that mark result fields in the HTML and Lite interfaces
+TITLE_CLASSES = {"result__a", "result-link"}
+SNIPPET_CLASSES = {"result__snippet", "result-snippet"}
+
+# Tags that separate words when flattened to text
+BREAK_TAGS = {"br", "p", "div", "li", "td", "tr"}
+
+# Sponsored results link through this endpoint
+AD_REDIRECT_PATH = "/y.js"
+
+
+def resolve_result_url(href: str) -> str:
+    """Unwrap a DuckDuckGo redirect link to the target URL"""
+    if href.startswith("//"):
+        href = "https:" + href
+    parts = urlsplit(href)
+    if parts.netloc.endswith("duckduckgo.com") and parts.path.startswith("/l/"):
+        target = dict(parse_qsl(parts.query)).get("uddg")
+        if target:
+            return target
+    return href
+
+
+def _source_for(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host or "Unknown"
+
+
+class DuckDuckGoResultExtractor(HTMLParser):
+    """
+    Streaming extractor for DuckDuckGo HTML and Lite result pages
+    
+    Walks the token stream once, collecting title links and the snippet
+    that follows each of them. Entities are decoded by the tokenizer and
+    nested markup inside titles and snippets is flattened to text.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._results: List[Dict[str, str]] = []
+        self._current: Optional[Dict[str, str]] = None
+        self._field: Optional[str] = None
+        self._field_tag: Optional[str] = None
+        self._field_depth = 0
+    
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attributes = dict(attrs)
+        classes = set((attributes.get("class") or "").split())
+        is_title = tag == "a" and bool(classes & TITLE_CLASSES)
+        
+        if self._field is not None:
+            if self._field == "snippet" and is_title:
+                # An unclosed snippet must not swallow the next result
+                self._field = None
+                self._field_tag = None
+            else:
+                if tag == self._field_tag:
+                    self._field_depth += 1
+                if tag in BREAK_TAGS:
+                    self.handle_data(" ")
+                return
+        
+        if is_title:
+            href = attributes.get("href") or ""
+            if urlsplit(href).path == AD_REDIRECT_PATH:
+                self._current = None
+                return
+            self._current = {"url": resolve_result_url(href), "title": "", "snippet": ""}
+            self._results.append(self._current)
+            self._start_field("title", tag)
+        elif classes & SNIPPET_CLASSES and self._current is not None and not self._current["snippet"]:
+            self._start_field("snippet", tag)
+    
+    def handle_endtag(self, tag: str) -> None:
+        if self._field is None or tag != self._field_tag:
+            return
+        self._field_depth -= 1
+        if self._field_depth == 0:
+            self._field = None
+            self._field_tag = None
+    
+    def handle_data(self, data: str) -> None:
+        if self._field is not None and self._current is not None:
+            self._current[self._field] += data
+    
+    def _start_field(self, name: str, tag: str) -> None:
+        self._field = name
+        self._field_tag = tag
+        self._field_depth = 1
+    
+    def results(self) -> List[SearchResult]:
+        """Extracted results in page order"""
+        return [
+            SearchResult(
+                title=" ".join(item["title"].split()),
+                url=item["url"],
+                snippet=" ".join(item["snippet"].split()),
+                source=_source_for(item["url"])
+            )
+            for item in self._results
+            if item["url"] and item["title"].strip()
+        ]
+
+
+def parse_duckduckgo_results(html: str, limit: Optional[int] = None) -> List[SearchResult]:
+    """
+    Extract search results from a DuckDuckGo HTML or Lite page
+    
+    Args:
+        html: Page source
+        limit: Maximum number of results to return
+    
+    Returns:
+        List of search results
+    """
+    extractor = DuckDuckGoResultExtractor()
+    extractor.feed(html)
+    extractor.close()
+    results = extractor.results()
+    return results[:limit] if limit is not None else results
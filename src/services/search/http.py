@@ -0,0 +1,50 @@
+"""
+Shared HTTP client for search providers
+Reuses pooled keep-alive connections instead of a new client per search
+"""
+import asyncio
+from typing import Optional
+
+import httpx
+
+
+# Connection pool limits for outbound search requests
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+REQUEST_TIMEOUT = 30.0
+
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the pooled client for the running event loop
+    
+    Connections are bound to the loop that opened them, so a new client is
+    created if the loop has changed or the previous client was closed.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the pooled client (called on application shutdown)"""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
@@ -0,0 +1,409 @@
+"""
+Search result page fetching for GenZ Smart
+Retrieves result pages concurrently, extracts readable text and caches it by URL
+"""
+import asyncio
+import ipaddress
+import re
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Union
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from src.services.search.http import get_http_client
+from src.services.search.readable import extract_readable_text, chunk_text
+
+
+# Fetch limits
+MAX_CONCURRENT_FETCHES = 8
+MAX_FETCHES_PER_HOST = 2
+HOST_INTERVAL_SECONDS = 0.25  # Minimum spacing between requests to one host
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # 2MB
+FETCH_TIMEOUT_SECONDS = 5.0
+MAX_REDIRECTS = 5
+ALLOWED_SCHEMES = ("http", "https")
+
+# Cache limits
+PAGE_CACHE_TTL_SECONDS = 15 * 60  # Served without revalidation for this long
+PAGE_CACHE_MAX_ENTRIES = 256
+
+# Content types worth extracting
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+USER_AGENT = "Mozilla/5.0 (compatible; GenZSmart/1.0; +https://github.com/genzsmart)"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class FetchedPage:
+    """Readable content of a fetched result page"""
+    url: str
+    final_url: str = ""
+    title: str = ""
+    text: str = ""
+    chunks: List[str] = field(default_factory=list)
+    status: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    truncated: bool = False
+    fetched_at: float = 0.0
+    cached: bool = False
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.text)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "url": self.url,
+            "final_url": self.final_url,
+            "title": self.title,
+            "text": self.text,
+            "chunks": self.chunks,
+            "status": self.status,
+            "truncated": self.truncated,
+            "cached": self.cached,
+            "error": self.error,
+        }
+
+
+class PageCache:
+    """
+    LRU of extracted pages keyed by URL
+    
+    Entries younger than the TTL are served directly. Older entries keep
+    their ETag/Last-Modified validators so the next fetch can be a
+    conditional request that reuses the extracted text on 304.
+    """
+    
+    def __init__(self, ttl: float = PAGE_CACHE_TTL_SECONDS, max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, FetchedPage]" = OrderedDict()
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0}
+    
+    def get(self, url: str) -> Optional[FetchedPage]:
+        page = self._entries.get(url)
+        if page is not None:
+            self._entries.move_to_end(url)
+        return page
+    
+    def is_fresh(self, page: FetchedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl
+    
+    def set(self, page: FetchedPage) -> None:
+        self._entries[page.url] = page
+        self._entries.move_to_end(page.url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def record(self, outcome: str) -> None:
+        self._stats[outcome] += 1
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, **self._stats}
+
+
+class PageFetcher:
+    """
+    Fetches result pages concurrently with politeness limits
+    
+    A global semaphore bounds open requests, each host gets its own smaller
+    limit and minimum spacing, and bodies are streamed up to a byte cap.
+    Only http(s) URLs that resolve to global addresses are fetched, checked
+    again on every redirect hop, so result links cannot reach internal
+    services. Failures are reported on the page rather than raised.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENT_FETCHES,
+        per_host: int = MAX_FETCHES_PER_HOST,
+        host_interval: float = HOST_INTERVAL_SECONDS,
+        max_bytes: int = MAX_PAGE_BYTES,
+        timeout: float = FETCH_TIMEOUT_SECONDS,
+        cache: Optional[PageCache] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        allow_private: bool = False
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.host_interval = host_interval
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache = cache if cache is not None else PageCache()
+        self.client = client
+        self.allow_private = allow_private  # Loopback/private/link-local targets, for local fixtures only
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_last_start: Dict[str, float] = {}
+        self._host_users: Dict[str, int] = {}
+    
+    async def fetch_pages(self, urls: List[str]) -> List[FetchedPage]:
+        """
+        Fetch and extract several pages concurrently
+        
+        Args:
+            urls: Page URLs (duplicates are fetched once)
+        
+        Returns:
+            One FetchedPage per unique URL, in input order
+        """
+        unique = list(dict.fromkeys(u for u in urls if u))
+        return list(await asyncio.gather(*(self.fetch_page(u) for u in unique)))
+    
+    async def fetch_page(self, url: str) -> FetchedPage:
+        """Fetch one page, using the cache and conditional requests"""
+        cached = self.cache.get(url)
+        if cached is not None and self.cache.is_fresh(cached):
+            self.cache.record("hits")
+            return _as_cached(cached)
+        
+        headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9"}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        
+        try:
+            page = await asyncio.wait_for(self._download(url, headers), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return FetchedPage(url=url, error="timeout")
+        except Exception as e:
+            return FetchedPage(url=url, error=str(e) or type(e).__name__)
+        
+        if page.status == 304 and cached is not None:
+            self.cache.record("revalidated")
+            cached.fetched_at = time.time()
+            cached.etag = page.etag or cached.etag
+            cached.last_modified = page.last_modified or cached.last_modified
+            self.cache.set(cached)
+            return _as_cached(cached)
+        
+        self.cache.record("misses")
+        if page.ok:
+            self.cache.set(page)
+        return page
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get fetcher and cache statistics"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_host": self.per_host,
+            "max_bytes": self.max_bytes,
+            "cache": self.cache.stats(),
+        }
+    
+    def _slot(self, host: str) -> "_HostSlot":
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            # Semaphores belong to the loop they were first used on
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+            self._host_semaphores.clear()
+            self._host_users.clear()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        return _HostSlot(self, host)
+    
+    def _release_host(self, host: str) -> None:
+        """Forget per-host state once a host has no requests and its spacing has passed"""
+        users = self._host_users.get(host, 0) - 1
+        if users > 0:
+            self._host_users[host] = users
+            return
+        self._host_users.pop(host, None)
+        self._host_semaphores.pop(host, None)
+        expired = time.monotonic() - self.host_interval
+        for name, started in list(self._host_last_start.items()):
+            if started <= expired and name not in self._host_users:
+                del self._host_last_start[name]
+    
+    async def _check_url(self, url: str) -> None:
+        """Reject URLs that are not http(s) or that resolve to a non-global address"""
+        parts = urlsplit(url)
+        if parts.scheme not in ALLOWED_SCHEMES or not parts.hostname:
+            raise ValueError(f"blocked URL: {url}")
+        if self.allow_private:
+            return
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+        for info in infos:
+            if not _is_public_address(ipaddress.ip_address(info[4][0])):
+                raise ValueError(f"blocked address: {parts.hostname}")
+    
+    async def _download(self, url: str, headers: Dict[str, str]) -> FetchedPage:
+        client = self.client or get_http_client()
+        page = FetchedPage(url=url)
+        
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            await self._check_url(target)
+            async with self._slot(urlsplit(target).netloc.lower()), client.stream(
+                "GET", target, headers=headers, follow_redirects=False, timeout=self.timeout
+            ) as response:
+                if response.has_redirect_location:
+                    target = urljoin(str(response.url), response.headers["location"])
+                    continue
+                body = await self._read_response(page, response)
+                if body is None:
+                    return page
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                encoding = response.charset_encoding or "utf-8"
+                break
+        else:
+            raise ValueError("too many redirects")
+        
+        raw = bytes(body).decode(encoding, errors="replace")
+        
+        # Extraction is CPU-bound, so keep it off the event loop
+        if content_type == "text/plain":
+            page.text = "\n\n".join(p.strip() for p in raw.split("\n\n") if p.strip())
+        else:
+            readable = await asyncio.to_thread(extract_readable_text, raw)
+            page.title = readable.title
+            page.text = readable.text
+        page.chunks = chunk_text(page.text)
+        page.fetched_at = time.time()
+        return page
+    
+    async def _read_response(self, page: FetchedPage, response: httpx.Response) -> Optional[bytearray]:
+        """Record the response on the page and read its body, or None when there is nothing to extract"""
+        page.status = response.status_code
+        page.final_url = str(response.url)
+        page.etag = response.headers.get("etag")
+        page.last_modified = response.headers.get("last-modified")
+        
+        if response.status_code == 304:
+            return None
+        if response.status_code >= 400:
+            page.error = f"HTTP {response.status_code}"
+            return None
+        
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in TEXT_CONTENT_TYPES:
+            page.error = f"unsupported content type: {content_type}"
+            return None
+        
+        length = response.headers.get("content-length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            page.truncated = True
+        
+        body = bytearray()
+        async for data in response.aiter_bytes():
+            body.extend(data)
+            if len(body) >= self.max_bytes:
+                del body[self.max_bytes:]
+                page.truncated = True
+                break
+        return body
+
+
+class _HostSlot:
+    """Holds the global and per-host semaphores for one request"""
+    
+    def __init__(self, fetcher: PageFetcher, host: str):
+        self.fetcher = fetcher
+        self.host = host
+    
+    async def __aenter__(self):
+        fetcher = self.fetcher
+        try:
+            await fetcher._semaphore.acquire()
+        except BaseException:
+            fetcher._release_host(self.host)
+            raise
+        try:
+            await fetcher._host_semaphores[self.host].acquire()
+        except BaseException:
+            fetcher._semaphore.release()
+            fetcher._release_host(self.host)
+            raise
+        
+        # Space out request starts to the same host
+        now = time.monotonic()
+        last = fetcher._host_last_start.get(self.host)
+        start = now if last is None else max(now, last + fetcher.host_interval)
+        fetcher._host_last_start[self.host] = start
+        if start > now:
+            await asyncio.sleep(start - now)
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.fetcher._host_semaphores[self.host].release()
+        self.fetcher._semaphore.release()
+        self.fetcher._release_host(self.host)
+
+
+def _is_public_address(address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+    """Whether an address is globally routable (not loopback, private, link-local, ...)"""
+    return address.is_global and not address.is_multicast
+
+
+def _as_cached(page: FetchedPage) -> FetchedPage:
+    return FetchedPage(**{**page.__dict__, "cached": True})
+
+
+def select_passages(
+    pages: List[FetchedPage],
+    query: str,
+    max_chars: int = 6000
+) -> List[Dict[str, str]]:
+    """
+    Pick the chunks that best match the query across fetched pages
+    
+    Chunks are scored by how many distinct query terms they contain, with
+    earlier pages winning ties, and taken until the character budget is used.
+    
+    Args:
+        pages: Fetched pages in result order
+        query: User query
+        max_chars: Total character budget
+    
+    Returns:
+        List of {"url", "title", "text"} passages
+    """
+    terms = {t for t in WORD_PATTERN.findall(query.lower()) if len(t) > 2}
+    candidates = []
+    for page_rank, page in enumerate(pages):
+        if not page.ok:
+            continue
+        for chunk_rank, chunk in enumerate(page.chunks):
+            words = set(WORD_PATTERN.findall(chunk.lower()))
+            score = len(terms & words)
+            candidates.append((-score, page_rank, chunk_rank, page, chunk))
+    candidates.sort(key=lambda c: c[:3])
+    
+    passages = []
+    used = 0
+    for _, _, _, page, chunk in candidates:
+        if used + len(chunk) > max_chars:
+            continue
+        passages.append({"url": page.final_url or page.url, "title": page.title, "text": chunk})
+        used += len(chunk)
+    return passages
+
+
+# Global fetcher instance
+_fetcher: Optional[PageFetcher] = None
+
+
+def get_page_fetcher() -> PageFetcher:
+    """Get or create global page fetcher"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = PageFetcher()
+    return _fetcher
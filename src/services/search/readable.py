@@ -0,0 +1,263 @@
+"""
+Readable text extraction for GenZ Smart
+Strips navigation and other boilerplate from fetched pages and chunks the main content
+"""
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional
+
+
+# Elements whose content is never part of the readable text
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select", "option",
+}
+
+# Elements that start a new text block
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr",
+    "td", "th", "blockquote", "pre", "dd", "dt", "figcaption", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+CONTENT_ROOT_TAGS = {"main", "article"}
+
+# Elements never treated as boilerplate, whatever their class says
+UNSKIPPABLE_TAGS = {"html", "body"} | CONTENT_ROOT_TAGS
+
+# Elements without a closing tag
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+
+# class/id fragments that mark boilerplate containers
+BOILERPLATE_PATTERN = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|sidebar|comments?|share|social|cookie|banner|"
+    r"advert|ads?|promo|related|breadcrumbs?|subscribe|newsletter|popup|modal)($|[\s_-])",
+    re.IGNORECASE
+)
+
+# Block filters
+MIN_BLOCK_CHARS = 40
+MAX_LINK_DENSITY = 0.5
+
+# Chunking defaults
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 150
+
+
+@dataclass
+class ReadablePage:
+    """Main content extracted from an HTML page"""
+    title: str
+    text: str
+
+
+@dataclass
+class _Block:
+    text: str
+    link_chars: int
+    heading: bool
+    in_content_root: bool
+
+
+class ReadableTextExtractor(HTMLParser):
+    """
+    Single-pass boilerplate remover
+    
+    Drops scripts, navigation and containers whose class or id look like
+    page chrome, splits the rest into blocks at block-level elements, and
+    keeps blocks that are long enough and not mostly links. When the page
+    has a <main> or <article> element only blocks inside it are kept.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack: List[str] = []
+        self._skip_depth: Optional[int] = None
+        self._content_root_depth: Optional[int] = None
+        self._in_title = False
+        self._in_link = 0
+        self._heading = False
+        self._buffer: List[str] = []
+        self._link_chars = 0
+        self._blocks: List[_Block] = []
+        self._saw_content_root = False
+        self.title = ""
+    
+    # ----- tokenizer callbacks -----
+    
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS and self._skip_depth is None:
+                self._flush()
+            return
+        
+        self._stack.append(tag)
+        if self._skip_depth is not None:
+            return
+        
+        attributes = dict(attrs)
+        marker = f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+        if tag in SKIP_TAGS or attributes.get("role") == "navigation" or (
+            tag not in UNSKIPPABLE_TAGS and BOILERPLATE_PATTERN.search(marker)
+        ):
+            self._flush()
+            self._skip_depth = len(self._stack)
+            return
+        
+        if tag in CONTENT_ROOT_TAGS and self._content_root_depth is None:
+            self._flush()
+            self._content_root_depth = len(self._stack)
+            self._saw_content_root = True
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._heading = tag in HEADING_TAGS
+        if tag == "a":
+            self._in_link += 1
+    
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag not in self._stack:
+            return
+        
+        # Close everything up to the matching element (tolerates unclosed tags)
+        while self._stack:
+            depth = len(self._stack)
+            open_tag = self._stack.pop()
+            if self._skip_depth is not None and depth <= self._skip_depth:
+                self._skip_depth = None
+            elif self._skip_depth is None:
+                if open_tag in BLOCK_TAGS:
+                    self._flush()
+                if open_tag == "a":
+                    self._in_link = max(0, self._in_link - 1)
+            if self._content_root_depth is not None and depth <= self._content_root_depth:
+                self._flush()
+                self._content_root_depth = None
+            if open_tag == tag:
+                break
+    
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth is not None:
+            return
+        self._buffer.append(data)
+        if self._in_link:
+            self._link_chars += len(data.strip())
+    
+    def close(self) -> None:
+        super().close()
+        self._flush()
+    
+    # ----- blocks -----
+    
+    def _flush(self) -> None:
+        text = " ".join("".join(self._buffer).split())
+        if text:
+            self._blocks.append(_Block(
+                text=text,
+                link_chars=self._link_chars,
+                heading=self._heading,
+                in_content_root=self._content_root_depth is not None
+            ))
+        self._buffer = []
+        self._link_chars = 0
+        self._heading = False
+    
+    def readable_blocks(self) -> List[str]:
+        """Blocks judged to be main content, in document order"""
+        blocks = self._blocks
+        if self._saw_content_root:
+            rooted = [b for b in blocks if b.in_content_root]
+            if any(len(b.text) >= MIN_BLOCK_CHARS for b in rooted):
+                blocks = rooted
+        
+        kept = []
+        for block in blocks:
+            if block.link_chars / len(block.text) > MAX_LINK_DENSITY:
+                continue
+            if block.heading or len(block.text) >= MIN_BLOCK_CHARS:
+                kept.append(block.text)
+        
+        # Headings with no content after them are navigation leftovers
+        while kept and len(kept[-1]) < MIN_BLOCK_CHARS:
+            kept.pop()
+        return kept
+
+
+def extract_readable_text(html: str) -> ReadablePage:
+    """
+    Extract the title and main-content text of an HTML page
+    
+    Args:
+        html: Page source
+    
+    Returns:
+        ReadablePage with blocks separated by blank lines
+    """
+    extractor = ReadableTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return ReadablePage(
+        title=" ".join(extractor.title.split()),
+        text="\n\n".join(extractor.readable_blocks())
+    )
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into overlapping chunks on paragraph boundaries
+    
+    Paragraphs longer than max_chars are split on sentence and then word
+    boundaries. Each chunk repeats the tail of the previous one.
+    
+    Args:
+        text: Text with paragraphs separated by blank lines
+        max_chars: Maximum chunk length
+        overlap: Characters carried over from the previous chunk
+    
+    Returns:
+        List of chunks
+    """
+    pieces: List[str] = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                pieces.append(sentence)
+    
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current}\n\n{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        chunks.append(current)
+        tail = current[-overlap:] if overlap else ""
+        if tail and " " in tail:
+            tail = tail[tail.index(" ") + 1:]
+        current = f"{tail} {piece}".strip() if tail and len(tail) + len(piece) < max_chars else piece
+    if current:
+        chunks.append(current)
+    return chunks
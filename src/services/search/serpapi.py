@@ -5,9 +5,9 @@ Provides web search capabilities using SerpAPI (Google Search API)
 import os
 import time
 from typing import Optional, Literal
-import httpx
 
 from src.services.search.base import BaseSearchProvider, SearchResponse, SearchResult
+from src.services.search.http import get_http_client
 
 
 class SerpAPISearchProvider(BaseSearchProvider):
@@ -71,10 +71,9 @@ class SerpAPISearchProvider(BaseSearchProvider):
         # Add any additional parameters
         params.update(kwargs)
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(self.API_BASE_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await get_http_client().get(self.API_BASE_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
         
         search_time = time.time() - start_time
         
@@ -0,0 +1,36 @@
+"""
+Shared test fixtures
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.models.database import Base
+
+
+@pytest.fixture
+def db_engine():
+    """In-memory SQLite database with every table, one connection shared by all threads"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    """Opens a new session on db_engine"""
+    return lambda: Session(bind=db_engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    """A session on db_engine, closed after the test"""
+    with session_factory() as session:
+        yield session
@@ -0,0 +1,129 @@
+"""
+Tests for concurrent context prefetch in the agent orchestrator
+"""
+
+import asyncio
+import time
+
+from src.services.agent.orchestrator import AgentOrchestrator, AgentContext
+from src.services.ai.base import ChatCompletionResponse
+from src.services.search.pages import FetchedPage
+
+
+class FakeProvider:
+    """Minimal provider that echoes the number of messages it received"""
+
+    default_model = "fake-model"
+
+    def __init__(self):
+        self.requests = []
+
+    async def chat_complete(self, request):
+        self.requests.append(request)
+        return ChatCompletionResponse(
+            content="ok",
+            model=self.default_model,
+            finish_reason="stop",
+            usage={}
+        )
+
+    async def chat_complete_coalesced(self, request):
+        return await self.chat_complete(request)
+
+
+def test_slow_search_is_dropped_after_budget():
+    """A search that misses its deadline should not hold up the model call"""
+    provider = FakeProvider()
+    agent = AgentOrchestrator(provider, enable_tools=False, stage_budgets={"search": 0.05})
+
+    async def slow_search(query):
+        await asyncio.sleep(1)
+        return {"results": [{"title": "late"}]}
+
+    agent._perform_search = slow_search
+    context = AgentContext(user_message="latest news", enable_search=True)
+
+    response = asyncio.run(agent.process_message(context))
+
+    assert response.content == "ok"
+    assert response.search_results is None
+    assert response.metadata["dropped_stages"] == ["search"]
+    assert response.timings["search"] < 500
+    assert "completion" in response.timings
+    assert "total" in response.timings
+
+
+def test_search_results_injected_when_in_time():
+    """Search results that arrive within budget are added to the prompt"""
+    provider = FakeProvider()
+    agent = AgentOrchestrator(provider, enable_tools=False)
+
+    async def fast_search(query):
+        return {"results": [{"title": "Fresh", "source": "example.com", "snippet": "s"}]}
+
+    agent._perform_search = fast_search
+    context = AgentContext(user_message="hello", enable_search=True)
+
+    response = asyncio.run(agent.process_message(context))
+
+    assert response.search_results["results"][0]["title"] == "Fresh"
+    contents = [m.content for m in provider.requests[0].messages]
+    assert any("Recent web search results" in c for c in contents)
+
+
+def test_page_excerpts_injected_after_search():
+    """Fetched page text is added next to the search snippets"""
+    provider = FakeProvider()
+
+    class FakeFetcher:
+        async def fetch_pages(self, urls):
+            self.urls = urls
+            return [FetchedPage(url=urls[0], title="Doc", text="answer text", chunks=["answer text"])]
+
+    fetcher = FakeFetcher()
+    agent = AgentOrchestrator(provider, enable_tools=False, page_fetcher=fetcher)
+
+    async def fast_search(query):
+        return {"results": [{"title": "Doc", "url": "https://a.com", "snippet": "s"}]}
+
+    agent._perform_search = fast_search
+    context = AgentContext(user_message="what is the answer", enable_search=True)
+
+    response = asyncio.run(agent.process_message(context))
+
+    assert fetcher.urls == ["https://a.com"]
+    assert response.search_results["pages"][0]["text"] == "answer text"
+    assert "pages" in response.timings
+    contents = [m.content for m in provider.requests[0].messages]
+    assert any("Excerpts from the top result pages" in c and "answer text" in c for c in contents)
+
+
+def test_page_fetch_shares_the_search_deadline():
+    """Search and page fetching together never exceed the search budget"""
+    provider = FakeProvider()
+
+    class SlowFetcher:
+        async def fetch_pages(self, urls):
+            await asyncio.sleep(1)
+            return []
+
+    agent = AgentOrchestrator(
+        provider,
+        enable_tools=False,
+        page_fetcher=SlowFetcher(),
+        stage_budgets={"search": 0.2, "pages": 1.0}
+    )
+
+    async def slow_search(query):
+        await asyncio.sleep(0.1)
+        return {"results": [{"title": "Doc", "url": "https://a.com", "snippet": "s"}]}
+
+    agent._perform_search = slow_search
+    context = AgentContext(user_message="what is the answer", enable_search=True)
+
+    start = time.perf_counter()
+    response = asyncio.run(agent.process_message(context))
+
+    assert time.perf_counter() - start < 0.5
+    assert response.search_results["results"][0]["title"] == "Doc"
+    assert "pages" not in response.search_results
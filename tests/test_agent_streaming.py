@@ -0,0 +1,101 @@
+"""
+Tests for the streaming agent pipeline with inline tool calls
+"""
+
+import asyncio
+
+from src.services.agent.orchestrator import AgentOrchestrator, AgentContext, _ToolCallScanner
+from src.services.ai.base import StreamChunk
+
+
+class ScriptedStreamProvider:
+    """Provider that streams one scripted reply per request"""
+
+    default_model = "fake-model"
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    async def chat_complete_stream(self, request):
+        self.requests.append(request)
+        reply = self.replies.pop(0)
+        for piece in reply:
+            yield StreamChunk(content=piece)
+        yield StreamChunk(content="", is_finished=True, finish_reason="stop")
+
+
+def collect(agent, context):
+    async def run():
+        return [event async for event in agent.stream_events(context)]
+    return asyncio.run(run())
+
+
+def test_scanner_holds_back_partial_marker():
+    scanner = _ToolCallScanner()
+    assert scanner.feed("Let me check [[to") == ("Let me check ", None)
+    assert scanner.feed('ol:calculate {"expression": "2+2"}]] tail') == ("", 'calculate {"expression": "2+2"}')
+
+
+def test_scanner_releases_text_that_is_not_a_marker():
+    scanner = _ToolCallScanner()
+    assert scanner.feed("a [") == ("a ", None)
+    assert scanner.feed("b]") == ("[b]", None)
+    assert scanner.flush() == ""
+
+
+def test_tool_call_pauses_stream_and_resumes():
+    provider = ScriptedStreamProvider([
+        ["Working ", '[[tool:calculate {"expression": ', '"6*7"}]]', " ignored"],
+        ["The answer ", "is 42."],
+    ])
+    agent = AgentOrchestrator(provider)
+
+    events = collect(agent, AgentContext(user_message="multiply six by seven"))
+    types = [e.type for e in events]
+
+    assert types == ["token", "tool_start", "tool_result", "token", "token", "done"]
+    assert events[1].data == {"tool": "calculate", "arguments": {"expression": "6*7"}}
+    assert events[2].data["result"]["result"] == 42
+    done = events[-1].data
+    assert done["content"] == "Working The answer is 42."
+    assert done["tool_calls"][0]["executed"] is True
+    assert "first_token" in done["timings"]
+    # The second request carries the tool result
+    assert "Result of calculate" in provider.requests[1].messages[-1].content
+
+
+def test_stream_without_tools_emits_plain_tokens():
+    provider = ScriptedStreamProvider([["Hello", " there"]])
+    agent = AgentOrchestrator(provider, enable_tools=False)
+
+    async def run():
+        return [token async for token in agent.stream_message(AgentContext(user_message="hi"))]
+
+    assert asyncio.run(run()) == ["Hello", " there"]
+
+
+def test_failing_tool_call_reports_error_and_continues():
+    provider = ScriptedStreamProvider([
+        ["Let me work it out ", "[[tool:calculate {bad json}]]"],
+        ["I could not calculate that."],
+    ])
+    agent = AgentOrchestrator(provider)
+
+    events = collect(agent, AgentContext(user_message="compute something"))
+    result = next(e for e in events if e.type == "tool_result").data["result"]
+
+    assert result["success"] is False
+    assert "Invalid arguments for calculate" in result["error"]
+    assert events[-1].data["content"] == "Let me work it out I could not calculate that."
+
+
+def test_tool_call_after_the_last_round_is_kept_as_text():
+    call = '[[tool:calculate {"expression": "1+1"}]]'
+    provider = ScriptedStreamProvider([[call]] * 3 + [["Still want ", call, " done"]])
+    agent = AgentOrchestrator(provider)
+
+    events = collect(agent, AgentContext(user_message="add one and one"))
+
+    assert len(provider.requests) == 4
+    assert events[-1].data["content"] == f"Still want {call} done"
@@ -0,0 +1,112 @@
+"""
+Tests for deferred text columns and listing projections
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src.api.dependencies import get_db, get_read_db
+from src.api.routes import chat as chat_routes
+from src.api.routes import files as files_routes
+from src.api.routes import memory as memory_routes
+from src.models.database import Conversation, File, Message
+
+TEXT = "lorem ipsum " * 50_000
+
+
+@pytest.fixture
+def engine(db_engine):
+    with Session(bind=db_engine) as db:
+        conversation = Conversation(id="conv", title="Notes", provider="openai", model="gpt-4o")
+        db.add(conversation)
+        for index in range(5):
+            db.add(Message(id=f"msg-{index}", conversation_id="conv", role="user", content=f"needle {index} " + TEXT))
+            db.add(File(
+                id=f"file-{index}",
+                filename=f"file-{index}.txt",
+                original_name=f"file-{index}.txt",
+                mime_type="text/plain",
+                size=len(TEXT),
+                status="ready",
+                extracted_text=TEXT,
+                storage_path=f"/nonexistent/file-{index}.txt",
+                conversations=[conversation]
+            ))
+        db.commit()
+    return db_engine
+
+
+@pytest.fixture
+def statements(engine):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture
+def client(engine):
+    def override_db():
+        with Session(bind=engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(files_routes.router)
+    app.include_router(chat_routes.router)
+    app.include_router(memory_routes.router)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+    return TestClient(app)
+
+
+def test_heavy_columns_are_not_loaded_with_the_row(engine):
+    with Session(bind=engine) as db:
+        file = db.query(File).first()
+        message = db.query(Message).first()
+        assert "extracted_text" in inspect(file).unloaded
+        assert "content" in inspect(message).unloaded
+        assert file.extracted_text == TEXT
+
+
+def test_file_listing_skips_extracted_text(client, statements):
+    response = client.get("/api/v1/files", params={"conversation_id": "conv"})
+    assert response.status_code == 200
+    files = response.json()["data"]["files"]
+    assert len(files) == 5
+    assert "extracted_text" not in files[0]
+    assert not any("extracted_text" in statement for statement in statements)
+    assert len(response.content) < 10_000
+    statements.clear()
+    response = client.get("/api/v1/files/file-0")
+    assert response.json()["data"]["extracted_text"] == TEXT
+    assert len(statements) == 2  # The file with its text, then its conversations
+
+
+def test_conversation_loads_message_content_in_one_query(client, statements):
+    response = client.get("/api/v1/conversations/conv")
+    assert response.status_code == 200
+    messages = response.json()["data"]["messages"]
+    assert [m["content"][:8] for m in messages] == [f"needle {i}" for i in range(5)]
+    assert len(statements) == 2
+    statements.clear()
+    response = client.patch("/api/v1/conversations/conv", json={"title": "Renamed"})
+    assert response.json()["data"]["messages"][4]["content"].startswith("needle 4")
+    assert not any(statement.startswith("SELECT messages.content") for statement in statements)
+
+
+def test_memory_search_reads_previews_only(client, statements):
+    response = client.post("/api/v1/memory/search", json={"query": "needle 3", "limit": 10})
+    assert response.status_code == 200
+    results = response.json()["data"]["results"]
+    assert len(results) == 1
+    assert results[0]["message_id"] == "msg-3"
+    assert results[0]["conversation_title"] == "Notes"
+    assert len(results[0]["content"]) == memory_routes.SEARCH_PREVIEW_CHARS + 3
+    assert len(statements) == 1
@@ -0,0 +1,129 @@
+"""
+Tests for streaming DOCX extraction
+"""
+
+import zipfile
+
+from src.services.files.parsers.document import DocumentCache
+from src.services.files.parsers.docx import DocxParser, iter_blocks
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+STYLES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:styles xmlns:w="{W_NS}">
+  <w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>
+  <w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/></w:style>
+  <w:style w:type="paragraph" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+</w:styles>"""
+
+NUMBERING = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:numbering xmlns:w="{W_NS}">
+  <w:abstractNum w:abstractNumId="0">
+    <w:lvl w:ilvl="0"><w:numFmt w:val="decimal"/></w:lvl>
+    <w:lvl w:ilvl="1"><w:numFmt w:val="bullet"/></w:lvl>
+  </w:abstractNum>
+  <w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+</w:numbering>"""
+
+CORE = """<?xml version="1.0" encoding="UTF-8"?>
+<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties"
+    xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/">
+  <dc:title>Supply Agreement</dc:title>
+  <dc:creator>Legal</dc:creator>
+</cp:coreProperties>"""
+
+FOOTNOTES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:footnotes xmlns:w="{W_NS}">
+  <w:footnote w:id="2"><w:p><w:r><w:t>As amended in 2024.</w:t></w:r></w:p></w:footnote>
+</w:footnotes>"""
+
+HEADER = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:hdr xmlns:w="{W_NS}"><w:p><w:r><w:t>Confidential</w:t></w:r></w:p></w:hdr>"""
+
+
+def para(text, style=None, num=None):
+    props = ""
+    if style:
+        props += f'<w:pStyle w:val="{style}"/>'
+    if num is not None:
+        props += f'<w:numPr><w:ilvl w:val="{num}"/><w:numId w:val="1"/></w:numPr>'
+    props = f"<w:pPr>{props}</w:pPr>" if props else ""
+    return f"<w:p>{props}<w:r><w:t xml:space=\"preserve\">{text}</w:t></w:r></w:p>"
+
+
+def table(rows):
+    cells = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{para(c)}</w:tc>" for c in row) + "</w:tr>"
+        for row in rows
+    )
+    return f"<w:tbl>{cells}</w:tbl>"
+
+
+def build_docx(path, body, extra_parts=None):
+    document = f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{W_NS}"><w:body>{body}<w:sectPr/></w:body></w:document>'
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", document)
+        archive.writestr("word/styles.xml", STYLES)
+        archive.writestr("word/numbering.xml", NUMBERING)
+        archive.writestr("docProps/core.xml", CORE)
+        for name, content in (extra_parts or {}).items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def test_extracts_headings_lists_tables_and_notes(tmp_path):
+    body = (
+        para("Terms", style="Heading1")
+        + para("The supplier delivers goods.")
+        + para("Delivery", num=0)
+        + para("By truck", num=1)
+        + para("Payment", num=0)
+        + table([["Item", "Price"], ["Widget", "10"]])
+        + '<w:p><w:r><w:t>Prices are fixed</w:t></w:r><w:r><w:footnoteReference w:id="2"/></w:r></w:p>'
+        + '<w:p><w:r><w:delText>removed clause</w:delText></w:r><w:r><w:t>Kept clause</w:t></w:r></w:p>'
+    )
+    path = build_docx(tmp_path / "contract.docx", body, {
+        "word/footnotes.xml": FOOTNOTES,
+        "word/header1.xml": HEADER,
+    })
+
+    parser = DocxParser(cache=DocumentCache())
+    result = parser.parse(path)
+
+    assert result["error"] is None
+    text = result["text"]
+    assert "# Terms" in text
+    assert "1. Delivery\n\n  - By truck\n\n2. Payment" in text
+    assert "Item | Price\nWidget | 10" in text
+    assert "Prices are fixed[1]" in text
+    assert "Notes:\n[1] As amended in 2024." in text
+    assert "Headers and footers:\nConfidential" in text
+    assert "removed clause" not in text
+    assert "Kept clause" in text
+    assert result["metadata"]["title"] == "Supply Agreement"
+    assert result["metadata"]["author"] == "Legal"
+    assert result["metadata"]["tables"] == 1
+    assert parser.extract_headers(path) == ["Terms"]
+
+
+def test_long_document_streams_every_block(tmp_path):
+    """Blocks are yielded one at a time, in order, without reading the whole part first"""
+    body = "".join(para(f"Paragraph {i}") for i in range(2000))
+    path = build_docx(tmp_path / "long.docx", body)
+
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as part:
+        blocks = iter_blocks(part)
+        first = next(blocks)
+        remaining = sum(1 for _ in blocks)
+
+    assert first.text == "Paragraph 0"
+    assert remaining == 1999
+
+
+def test_invalid_archive_reports_error(tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_bytes(b"not a zip")
+
+    result = DocxParser(cache=DocumentCache()).parse(str(path))
+
+    assert result["error"].startswith("Failed to parse DOCX")
@@ -0,0 +1,158 @@
+"""
+Tests for content-addressed upload storage
+"""
+
+import hashlib
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.config import settings
+from src.api.dependencies import get_db
+from src.api.routes import files as files_routes
+from src.models.database import File, FileBlob
+from src.services.files import blobs
+from src.services.files.blobs import BlobStore, apply_blob_parse, blob_path
+from src.services.files.storage import StoredUpload
+
+
+def write_upload(root, name, data):
+    path = os.path.join(root, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return StoredUpload(path=path, size=len(data), sha256=hashlib.sha256(data).hexdigest())
+
+
+def add_file(db, blob, file_id, extension=".pdf"):
+    record = File(
+        id=file_id,
+        filename=f"{file_id}{extension}",
+        original_name="report.pdf",
+        mime_type="application/pdf",
+        size=blob.size,
+        status="processing",
+        storage_path=blob.storage_path,
+        content_hash=blob.content_hash
+    )
+    apply_blob_parse(record, blob)
+    db.add(record)
+    db.commit()
+    return record
+
+
+def test_identical_uploads_share_one_blob(db, tmp_path):
+    store = BlobStore(db, str(tmp_path))
+
+    first = store.add(write_upload(tmp_path, "a.tmp", b"same bytes"), ".pdf")
+    second = store.add(write_upload(tmp_path, "b.tmp", b"same bytes"), ".pdf")
+
+    assert first.content_hash == second.content_hash
+    assert second.ref_count == 2
+    assert second.storage_path == blob_path(str(tmp_path), first.content_hash, ".pdf")
+    assert not (tmp_path / "a.tmp").exists() and not (tmp_path / "b.tmp").exists()
+    assert db.query(FileBlob).count() == 1
+
+
+def test_parse_result_reused_by_later_uploads(db, tmp_path):
+    store = BlobStore(db, str(tmp_path))
+
+    blob = store.add(write_upload(tmp_path, "a.tmp", b"pdf"), ".pdf")
+    first = add_file(db, blob, "f1")
+    assert first.status == "processing"
+
+    store.record_parse(blob.content_hash, "extracted", word_count=1, metadata={"pages": 1})
+    store.record_parse(blob.content_hash, "ignored second parse")
+
+    again = store.add(write_upload(tmp_path, "b.tmp", b"pdf"), ".pdf")
+    second = add_file(db, again, "f2")
+    assert second.status == "ready"
+    assert second.extracted_text == "extracted"
+    assert again.meta_data == {"pages": 1}
+
+
+def test_parse_is_not_shared_across_extensions(db, tmp_path):
+    store = BlobStore(db, str(tmp_path))
+
+    blob = store.add(write_upload(tmp_path, "a.tmp", b"a,b\n1,2\n"), ".txt")
+    add_file(db, blob, "f1", ".txt")
+    store.record_parse(blob.content_hash, "plain text parse")
+
+    again = store.add(write_upload(tmp_path, "b.tmp", b"a,b\n1,2\n"), ".csv")
+    assert again.storage_path.endswith(".txt")
+    assert add_file(db, again, "f2", ".csv").status == "processing"
+
+
+def test_blob_deleted_with_last_reference(db, tmp_path):
+    store = BlobStore(db, str(tmp_path))
+
+    blob = store.add(write_upload(tmp_path, "a.tmp", b"x"), ".txt")
+    store.add(write_upload(tmp_path, "b.tmp", b"x"), ".txt")
+    path = blob.storage_path
+
+    assert store.release(blob.content_hash) is False
+    assert os.path.exists(path)
+    assert store.release(blob.content_hash) is True
+    assert not os.path.exists(path)
+    assert db.query(FileBlob).count() == 0
+
+
+def test_release_never_deletes_a_blob_written_after_its_row_delete(db, tmp_path, monkeypatch):
+    """An upload of the same bytes landing between the delete and the unlink keeps its file"""
+    store = BlobStore(db, str(tmp_path))
+    blob = store.add(write_upload(tmp_path, "a.tmp", b"x"), ".txt")
+    path = blob.storage_path
+    move_aside = blobs._move_aside
+
+    def concurrent_upload(doomed_path):
+        moved = move_aside(doomed_path)
+        with open(path, "wb") as f:
+            f.write(b"x")
+        return moved
+
+    monkeypatch.setattr(blobs, "_move_aside", concurrent_upload)
+
+    assert store.release(blob.content_hash) is True
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def test_collect_garbage_fixes_counts_and_removes_orphans(db, tmp_path):
+    store = BlobStore(db, str(tmp_path))
+
+    kept = store.add(write_upload(tmp_path, "a.tmp", b"kept"), ".txt")
+    store.add(write_upload(tmp_path, "b.tmp", b"kept"), ".txt")  # count drifts to 2
+    add_file(db, kept, "f1")
+    orphan = store.add(write_upload(tmp_path, "c.tmp", b"orphan"), ".txt")
+    stray = tmp_path / "blobs" / "zz" / "stray"
+    stray.parent.mkdir(parents=True)
+    stray.write_bytes(b"?")
+
+    assert store.collect_garbage() == []  # Too new: may belong to an upload still in flight
+    assert os.path.exists(orphan.storage_path) and stray.exists()
+
+    removed = store.collect_garbage(grace_seconds=0)
+
+    assert removed == [orphan.content_hash]
+    assert not os.path.exists(orphan.storage_path)
+    assert not stray.exists()
+    assert os.path.exists(kept.storage_path)
+    assert db.get(FileBlob, kept.content_hash).ref_count == 1
+
+
+def test_failed_upload_leaves_no_file_or_reference(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+
+    def broken_parse(record, blob):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(files_routes, "apply_blob_parse", broken_parse)
+    app = FastAPI()
+    app.include_router(files_routes.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    response = client.post("/api/v1/files/upload", files={"file": ("notes.txt", b"hello", "text/plain")})
+
+    assert response.status_code == 500
+    assert db.query(FileBlob).count() == 0
+    assert [name for _, _, names in os.walk(tmp_path) for name in names] == []
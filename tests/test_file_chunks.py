@@ -0,0 +1,149 @@
+"""
+Tests for chunked retrieval over uploaded file text
+"""
+
+from src.models.database import Conversation, File, FileBlob, FileChunk, Message
+from src.services.files.blobs import BlobStore
+from src.services.files.chunks import (
+    ChunkIndex,
+    ChunkStore,
+    merge_excerpts,
+    rank_chunks,
+    select_within_budget,
+    split_into_chunks,
+)
+
+
+def filler(topic, sentences):
+    return " ".join(f"Sentence {i} talks about {topic} in some detail." for i in range(sentences))
+
+
+def add_file(db, file_id, content_hash, text, name="notes.txt"):
+    if content_hash and db.get(FileBlob, content_hash) is None:
+        db.add(FileBlob(content_hash=content_hash, size=len(text), storage_path=f"/tmp/{content_hash}"))
+    db.add(File(
+        id=file_id,
+        filename=f"{file_id}.txt",
+        original_name=name,
+        mime_type="text/plain",
+        size=len(text),
+        status="ready",
+        storage_path=f"/tmp/{file_id}.txt",
+        content_hash=content_hash,
+        extracted_text=text
+    ))
+    db.commit()
+
+
+def test_chunks_keep_offsets_overlap_and_headings():
+    """Chunks point back into the text, overlap within a section and record their heading"""
+    text = "# Intro\n\n" + filler("apples", 40) + "\n\n# Details\n\n" + filler("pears", 40)
+    chunks = split_into_chunks(text, target_tokens=120, overlap_tokens=30)
+
+    assert len(chunks) > 2
+    for chunk in chunks:
+        assert text[chunk.start:chunk.end] == chunk.text
+        assert chunk.tokens <= 120
+    assert chunks[0].heading == "Intro"
+    assert chunks[-1].heading == "Details"
+    # Consecutive chunks of one section share trailing text
+    same_section = [(a, b) for a, b in zip(chunks, chunks[1:]) if a.heading == b.heading]
+    assert any(b.start < a.end for a, b in same_section)
+    # A new section starts a new chunk without overlap
+    first_details = next(c for c in chunks if c.heading == "Details")
+    assert first_details.text.startswith("# Details")
+
+
+def test_bm25_ranks_relevant_chunk_first_across_files():
+    """The chunk containing the rare query terms wins, whichever file it is in"""
+    first = ChunkIndex(split_into_chunks(filler("apples", 60), target_tokens=100))
+    second_text = filler("pears", 30) + " The warranty expires after 24 months. " + filler("pears", 30)
+    second = ChunkIndex(split_into_chunks(second_text, target_tokens=100))
+
+    ranked = rank_chunks([("a", first), ("b", second)], "When does the warranty expire?")
+
+    assert ranked[0][1] == "b"
+    assert "warranty" in ranked[0][2].text
+
+
+def test_selection_respects_top_k_and_token_budget():
+    chunks = split_into_chunks(filler("apples", 200), target_tokens=100)
+    ranked = [(1.0, "a", chunk) for chunk in chunks]
+
+    assert len(select_within_budget(ranked, top_k=3, token_budget=10_000)) == 3
+    selected = select_within_budget(ranked, top_k=50, token_budget=250)
+    assert sum(item[2].tokens for item in selected) <= 250
+
+
+def test_merge_excerpts_drops_repeated_overlap():
+    text = filler("apples", 60)
+    chunks = split_into_chunks(text, target_tokens=100, overlap_tokens=40)
+    merged = merge_excerpts(chunks[:3])
+
+    assert len(merged) == 1
+    assert merged[0].text == text[chunks[0].start:chunks[2].end]
+
+
+def test_retrieval_is_bounded_by_budget_not_document_size(db):
+    """A large file contributes only the relevant chunks within the budget"""
+    text = filler("apples", 2000) + "\n\nThe launch code is 4711.\n\n" + filler("apples", 2000)
+    add_file(db, "f1", "h1", text)
+    store = ChunkStore(db, embedder=None)
+    store.index_text("h1", text)
+
+    results = store.retrieve(["f1"], "what is the launch code", top_k=4, token_budget=300)
+
+    assert results
+    assert sum(r.chunk.tokens for r in results) <= 300
+    assert "4711" in results[0].chunk.text
+    assert results[0].file_name == "notes.txt"
+
+
+def test_conversation_files_are_in_scope_and_unchunked_blobs_are_indexed_lazily(db):
+    """Files linked to the conversation or its messages are searched, and old parses get chunked on first use"""
+    add_file(db, "f1", "h3", "Quarterly revenue grew to 12 million.")
+    add_file(db, "f2", "h4", "The office cat is called Miso.")
+    conversation = Conversation(id="c1", provider="openai", model="gpt")
+    db.add(conversation)
+    conversation.files.append(db.get(File, "f1"))
+    message = Message(id="m1", conversation_id="c1", role="user", content="hi")
+    message.attachments.append(db.get(File, "f2"))
+    db.add(message)
+    db.commit()
+    store = ChunkStore(db, embedder=None)
+
+    scope = store.resolve_file_ids("c1", ["f2"])
+    assert scope[0] == "f2"
+    assert set(scope) == {"f1", "f2"}
+
+    results = store.retrieve(scope, "what is the cat called?")
+    assert results[0].file_id == "f2"
+    assert db.query(FileChunk).filter(FileChunk.content_hash == "h3").count() == 1
+    assert db.query(FileChunk).filter(FileChunk.content_hash == "h4").count() == 1
+
+
+def test_whitespace_only_text_has_no_index(db):
+    """A blank parse (e.g. an empty scan) yields nothing instead of re-chunking forever"""
+    add_file(db, "f1", "h1", "  \n\n  ")
+    store = ChunkStore(db, embedder=None)
+
+    assert store.retrieve(["f1"], "what is this") == []
+    assert store.retrieve(["f1"], "what is this") == []
+    assert db.query(FileChunk).count() == 0
+
+
+def test_unmatched_question_falls_back_to_opening_chunks(db):
+    add_file(db, "f1", None, "# Title\n\n" + filler("apples", 100))
+    results = ChunkStore(db, embedder=None).retrieve(["f1"], "summarize", top_k=2)
+
+    assert [r.chunk.position for r in results] == [0, 1]
+
+
+def test_releasing_last_reference_deletes_chunks(db, tmp_path):
+    add_file(db, "f1", "h1", filler("apples", 50))
+    ChunkStore(db, embedder=None).index_text("h1", filler("apples", 50))
+    db.delete(db.get(File, "f1"))
+    db.commit()
+
+    assert BlobStore(db, str(tmp_path)).release("h1")
+    assert db.query(FileChunk).count() == 0
@@ -0,0 +1,108 @@
+"""
+Tests for cacheable, range-capable file downloads
+"""
+
+import hashlib
+from email.utils import formatdate
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from src.api.config import settings
+from src.api.dependencies import get_db
+from src.api.routes import files as files_routes
+from src.models.database import File
+
+DATA = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client(db_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    blob_dir = tmp_path / "blobs"
+    blob_dir.mkdir()
+    with Session(bind=db_engine) as db:
+        for file_id, content_hash in (("hashed", hashlib.sha256(DATA).hexdigest()), ("legacy", None)):
+            path = blob_dir / f"{file_id}.pdf"
+            path.write_bytes(DATA)
+            db.add(File(
+                id=file_id,
+                filename=f"{file_id}.pdf",
+                original_name="report.pdf",
+                mime_type="application/pdf",
+                size=len(DATA),
+                status="ready",
+                storage_path=str(path),
+                content_hash=content_hash
+            ))
+        db.commit()
+
+    def override_db():
+        with Session(bind=db_engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(files_routes.router)
+    app.dependency_overrides[get_db] = override_db
+    return TestClient(app)
+
+
+def test_content_addressed_download_is_immutable_and_revalidates(client):
+    response = client.get("/api/v1/files/hashed/download")
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    etag = response.headers["etag"]
+    assert etag == f'"{hashlib.sha256(DATA).hexdigest()}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"].startswith("attachment")
+
+    cached = client.get("/api/v1/files/hashed/download", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    changed = client.get("/api/v1/files/hashed/download", headers={"If-None-Match": '"other"'})
+    assert changed.status_code == 200
+
+
+def test_if_modified_since_uses_file_mtime(client):
+    last_modified = client.head("/api/v1/files/legacy/download").headers["last-modified"]
+
+    assert client.get(
+        "/api/v1/files/legacy/download", headers={"If-Modified-Since": last_modified}
+    ).status_code == 304
+    assert client.get(
+        "/api/v1/files/legacy/download", headers={"If-Modified-Since": formatdate(0, usegmt=True)}
+    ).status_code == 200
+    assert client.get("/api/v1/files/legacy/download").headers["cache-control"] == "private, no-cache"
+
+
+def test_range_requests_return_partial_content(client):
+    etag = client.head("/api/v1/files/hashed/download").headers["etag"]
+
+    partial = client.get("/api/v1/files/hashed/download", headers={"Range": "bytes=9-18"})
+    assert partial.status_code == 206
+    assert partial.content == DATA[9:19]
+    assert partial.headers["content-range"] == f"bytes 9-18/{len(DATA)}"
+
+    stale = client.get("/api/v1/files/hashed/download", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == DATA
+
+    fresh = client.get("/api/v1/files/hashed/download", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert fresh.status_code == 206
+
+
+def test_sendfile_header_hands_body_to_proxy(client, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_SENDFILE_HEADER", "X-Accel-Redirect")
+
+    response = client.get("/api/v1/files/hashed/download?inline=true")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == "/protected-uploads/blobs/hashed.pdf"
+    assert response.headers["content-disposition"].startswith("inline")
+    assert response.headers["etag"]
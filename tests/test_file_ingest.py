@@ -0,0 +1,133 @@
+"""
+Tests for bulk and archive ingestion
+"""
+
+import asyncio
+import io
+import tarfile
+import zipfile
+
+import pytest
+from src.core.exceptions import FileError
+from src.models.database import Conversation, File, FileBlob
+from src.services.files.ingest import register_files, stage_archive
+from src.services.files.worker import FileProcessingQueue
+
+MB = 1024 * 1024
+
+
+def build_zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def build_tar(path, members):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def fake_parse(path):
+    with open(path, encoding="utf-8") as f:
+        return {"success": True, "text": f.read()}
+
+
+def test_zip_members_are_staged_and_junk_skipped(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    path = build_zip(tmp_path / "docs.zip", {
+        "docs/a.txt": b"alpha",
+        "docs/b.md": b"# beta",
+        "__MACOSX/docs/._a.txt": b"junk",
+        "docs/.DS_Store": b"junk",
+        "docs/tool.exe": b"MZ",
+        "docs/big.txt": b"x" * 200,
+    })
+
+    result = stage_archive(path, str(uploads), max_file_size=100, max_members=10, max_total_size=MB)
+
+    assert sorted(f.name for f in result.files) == ["docs/a.txt", "docs/b.md"]
+    assert {s["name"]: s["reason"] for s in result.skipped} == {
+        "docs/tool.exe": "unsupported file type",
+        "docs/big.txt": "larger than 100 bytes",
+    }
+    assert result.total_bytes == len(b"alpha") + len(b"# beta")
+    assert all(not f.stored.path.endswith(".part") for f in result.files)
+
+
+def test_tar_member_limits_are_enforced(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    path = build_tar(tmp_path / "notes.tar.gz", {f"n{i}.txt": b"note %d" % i for i in range(5)})
+
+    result = stage_archive(path, str(uploads), max_file_size=MB, max_members=3, max_total_size=MB)
+
+    assert [f.name for f in result.files] == ["n0.txt", "n1.txt", "n2.txt"]
+    assert [s["name"] for s in result.skipped] == ["n3.txt", "n4.txt"]
+
+
+def test_unreadable_archive_raises_and_leaves_nothing(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    path = tmp_path / "broken.zip"
+    path.write_bytes(b"not a zip")
+
+    with pytest.raises(FileError):
+        stage_archive(str(path), str(uploads), max_file_size=MB, max_members=10, max_total_size=MB)
+    assert list(uploads.iterdir()) == []
+
+
+def test_register_files_shares_blobs_and_links_conversation(session_factory, tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    path = build_zip(tmp_path / "docs.zip", {
+        "a.txt": b"same bytes",
+        "copy/a.txt": b"same bytes",
+        "b.txt": b"other bytes",
+    })
+    staged = stage_archive(path, str(uploads), max_file_size=MB, max_members=10, max_total_size=MB).files
+
+    with session_factory() as db:
+        db.add(Conversation(id="c1", title="Docs", provider="openai", model="gpt-4o"))
+        db.commit()
+        records = register_files(db, str(uploads), staged, conversation_id="c1")
+
+        assert [r.original_name for r in records] == ["a.txt", "copy/a.txt", "b.txt"]
+        assert records[0].content_hash == records[1].content_hash
+        blob = db.get(FileBlob, records[0].content_hash)
+        assert blob.ref_count == 2
+        assert db.query(FileBlob).count() == 2
+        assert len(db.get(Conversation, "c1").files) == 3
+
+
+def test_batch_progress_tracks_every_file(session_factory, tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    path = build_zip(tmp_path / "docs.zip", {"a.txt": b"first", "b.txt": b"second"})
+    staged = stage_archive(path, str(uploads), max_file_size=MB, max_members=10, max_total_size=MB).files
+    with session_factory() as db:
+        records = register_files(db, str(uploads), staged)
+        jobs = [(r.id, r.storage_path) for r in records]
+    # One consumer: the StaticPool test engine shares a single connection across threads
+    queue = FileProcessingQueue(session_factory, str(uploads), process_workers=0, concurrency=1, parse_fn=fake_parse)
+
+    async def run():
+        queue.start(recover=False)
+        batch_id = queue.enqueue_batch(jobs, ready=["already-ready"])
+        before = queue.get_batch(batch_id)
+        await queue.join()
+        await queue.stop()
+        return before, queue.get_batch(batch_id)
+
+    before, after = asyncio.run(run())
+
+    assert before["total"] == 3 and not before["finished"]
+    assert after["finished"] and after["done"] == 3 and after["progress"] == 1.0
+    with session_factory() as db:
+        assert {f.status for f in db.query(File)} == {"ready"}
+    assert queue.get_batch("missing") is None
@@ -0,0 +1,137 @@
+"""
+Tests for preview renditions and their disk cache
+"""
+
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from src.api.config import settings
+from src.api.dependencies import get_db
+from src.api.routes import files as files_routes
+from src.core.exceptions import FileError
+from src.models.database import File
+from src.services.files.renditions import RenditionCache, RenditionService, RenditionSpec
+
+THUMB = RenditionSpec.preset("thumb")
+
+
+def fake_render(source_path, kind, spec):
+    return f"{kind}:{os.path.basename(source_path)}:{spec.key}".encode()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = RenditionCache(str(tmp_path), max_bytes=250)
+    for key in ("aa1", "bb2", "cc3"):
+        cache.put(key, THUMB, b"x" * 100)
+
+    assert cache.get("aa1", THUMB) is None
+    assert cache.get("bb2", THUMB) is not None
+    cache.put("dd4", THUMB, b"x" * 100)
+
+    assert cache.get("cc3", THUMB) is None
+    assert cache.get("bb2", THUMB) is not None
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["bytes"] == 200
+
+
+def test_cache_recency_survives_restart(tmp_path):
+    cache = RenditionCache(str(tmp_path), max_bytes=1000)
+    old = cache.put("aa1", THUMB, b"x" * 100)
+    new = cache.put("bb2", THUMB, b"x" * 100)
+    os.utime(old, (1, 1))
+    os.utime(new, (2, 2))
+
+    reopened = RenditionCache(str(tmp_path), max_bytes=150)
+
+    assert reopened.get("aa1", THUMB) is None
+    assert not os.path.exists(old)
+    assert reopened.get("bb2", THUMB) == new
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    calls = []
+
+    def counting_render(source_path, kind, spec):
+        calls.append(source_path)
+        return fake_render(source_path, kind, spec)
+
+    service = RenditionService(RenditionCache(str(tmp_path), 10_000), process_workers=0, render_fn=counting_render)
+
+    async def run():
+        return await asyncio.gather(*[service.get("abc", "/src/photo.png", "image", THUMB) for _ in range(5)])
+
+    paths = asyncio.run(run())
+
+    assert len(set(paths)) == 1 and len(calls) == 1
+    with open(paths[0], "rb") as f:
+        assert f.read() == b"image:photo.png:256x256-p1-q75.webp"
+    assert asyncio.run(service.get("abc", "/src/photo.png", "image", THUMB)) == paths[0]
+    assert len(calls) == 1
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(FileError):
+        RenditionSpec.preset("poster")
+    assert RenditionSpec.preset("preview", "jpeg").key == "1024x1024-p1-q80.jpg"
+
+
+@pytest.fixture
+def client(db_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    service = RenditionService(RenditionCache(str(tmp_path / "renditions"), 10_000), process_workers=0, render_fn=fake_render)
+    monkeypatch.setattr(files_routes, "get_rendition_service", lambda: service)
+    with Session(bind=db_engine) as db:
+        for file_id, name, mime_type in (("img", "photo.png", "image/png"), ("txt", "notes.txt", "text/plain")):
+            path = tmp_path / f"{file_id}{os.path.splitext(name)[1]}"
+            path.write_bytes(b"original")
+            db.add(File(
+                id=file_id,
+                filename=path.name,
+                original_name=name,
+                mime_type=mime_type,
+                size=8,
+                status="ready",
+                storage_path=str(path),
+                content_hash=f"{file_id}hash"
+            ))
+        db.commit()
+
+    def override_db():
+        with Session(bind=db_engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(files_routes.router)
+    app.dependency_overrides[get_db] = override_db
+    return TestClient(app)
+
+
+def test_rendition_endpoint_negotiates_format_and_revalidates(client):
+    response = client.get("/api/v1/files/img/renditions/thumb", headers={"Accept": "image/webp,*/*"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.content == b"image:img.png:256x256-p1-q75.webp"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept"
+
+    cached = client.get(
+        "/api/v1/files/img/renditions/thumb",
+        headers={"Accept": "image/webp", "If-None-Match": response.headers["etag"]}
+    )
+    assert cached.status_code == 304
+
+    jpeg = client.get("/api/v1/files/img/renditions/thumb", headers={"Accept": "image/*"})
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert jpeg.headers["etag"] != response.headers["etag"]
+
+
+def test_rendition_endpoint_rejects_unsupported_requests(client):
+    assert client.get("/api/v1/files/txt/renditions/thumb").status_code == 415
+    assert client.get("/api/v1/files/img/renditions/poster").status_code == 400
+    assert client.get("/api/v1/files/missing/renditions/thumb").status_code == 404
@@ -0,0 +1,63 @@
+"""
+Tests for streaming upload storage
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from src.core.exceptions import FileError
+from src.services.files.storage import save_upload
+
+
+class TrackingStream(io.BytesIO):
+    """BytesIO that records requested read sizes"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+def test_upload_streamed_in_chunks_with_hash(tmp_path):
+    data = os.urandom(300_000)
+    stream = TrackingStream(data)
+    upload = UploadFile(file=stream, filename="a.bin")
+    destination = tmp_path / "a.bin"
+
+    stored = asyncio.run(save_upload(upload, str(destination), max_size=1_000_000, chunk_size=64 * 1024))
+
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert destination.read_bytes() == data
+    assert max(stream.read_sizes) == 64 * 1024
+    assert os.listdir(tmp_path) == ["a.bin"]
+
+
+def test_oversized_upload_rejected_without_leftovers(tmp_path):
+    stream = TrackingStream(b"x" * 500_000)
+    upload = UploadFile(file=stream, filename="big.bin")
+
+    with pytest.raises(FileError):
+        asyncio.run(save_upload(upload, str(tmp_path / "big.bin"), max_size=100_000, chunk_size=32 * 1024))
+
+    # Reading stops at the first chunk past the limit
+    assert len(stream.read_sizes) <= 100_000 // (32 * 1024) + 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_size_rejected_before_reading(tmp_path):
+    stream = TrackingStream(b"x" * 10)
+    upload = UploadFile(file=stream, filename="big.bin", size=10_000)
+
+    with pytest.raises(FileError):
+        asyncio.run(save_upload(upload, str(tmp_path / "big.bin"), max_size=100))
+
+    assert stream.read_sizes == []
@@ -0,0 +1,205 @@
+"""
+Tests for the background file processing queue
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+from src.models.database import File, FileBlob
+from src.services.files.worker import FileProcessingQueue
+
+
+def add_file(session_factory, tmp_path, name, data, parsed_text=None):
+    path = tmp_path / name
+    path.write_bytes(data)
+    content_hash = hashlib.sha256(data).hexdigest()
+    with session_factory() as db:
+        db.add(FileBlob(
+            content_hash=content_hash,
+            size=len(data),
+            storage_path=str(path),
+            extracted_text=parsed_text,
+            word_count=len(parsed_text.split()) if parsed_text else None,
+            parsed_at=datetime.utcnow() if parsed_text is not None else None
+        ))
+        db.add(File(
+            id=name,
+            filename=name,
+            original_name=name,
+            mime_type="text/plain",
+            size=len(data),
+            status="processing",
+            storage_path=str(path),
+            content_hash=content_hash
+        ))
+        db.commit()
+    return str(path)
+
+
+def slow_parse(path):
+    time.sleep(1)
+    return {"success": True, "text": "late"}
+
+
+def run_jobs(queue, jobs):
+    async def run():
+        queue.start(recover=False)
+        handles = [queue.enqueue(file_id, path) for file_id, path in jobs]
+        await queue.join()
+        await queue.stop()
+        return handles
+    return asyncio.run(run())
+
+
+def test_text_file_parsed_in_thread_and_result_stored_on_blob(session_factory, tmp_path):
+    path = add_file(session_factory, tmp_path, "notes.txt", b"hello background world")
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=0)
+
+    [job] = run_jobs(queue, [("notes.txt", path)])
+
+    assert job.status == "done" and job.progress == 1.0
+    with session_factory() as db:
+        file = db.get(File, "notes.txt")
+        assert file.status == "ready"
+        assert "hello background world" in file.extracted_text
+        assert db.get(FileBlob, file.content_hash).parsed_at is not None
+
+
+def test_cpu_bound_files_run_in_process_pool(session_factory, tmp_path):
+    path = add_file(session_factory, tmp_path, "report.txt", b"parsed in a worker process")
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=1, cpu_extensions={".txt"})
+
+    [job] = run_jobs(queue, [("report.txt", path)])
+
+    assert job.status == "done"
+    with session_factory() as db:
+        assert "worker process" in db.get(File, "report.txt").extracted_text
+
+
+def test_timeouts_are_retried_then_marked_error(session_factory, tmp_path):
+    path = add_file(session_factory, tmp_path, "slow.txt", b"x")
+    queue = FileProcessingQueue(
+        session_factory, str(tmp_path), process_workers=0,
+        timeout=0.05, retries=1, retry_backoff=0, parse_fn=slow_parse
+    )
+
+    [job] = run_jobs(queue, [("slow.txt", path)])
+
+    assert job.status == "error" and job.attempts == 2
+    assert queue.stats()["timeouts"] == 2
+    with session_factory() as db:
+        file = db.get(File, "slow.txt")
+        assert file.status == "error"
+        assert "timed out" in file.error_message
+
+
+def test_save_failure_is_recorded_on_the_file(session_factory, tmp_path, monkeypatch):
+    path = add_file(session_factory, tmp_path, "locked.txt", b"parsed but not saved")
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=0)
+
+    def locked(file_id, result):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(queue, "_save_result", locked)
+    [job] = run_jobs(queue, [("locked.txt", path)])
+
+    assert job.status == "error"
+    with session_factory() as db:
+        file = db.get(File, "locked.txt")
+        assert file.status == "error"
+        assert file.error_message == "Saving failed: database is locked"
+
+
+def test_parser_rejection_is_not_retried(session_factory, tmp_path):
+    path = add_file(session_factory, tmp_path, "data.xyz", b"?")
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=0, retries=3)
+
+    [job] = run_jobs(queue, [("data.xyz", path)])
+
+    assert job.status == "error" and job.attempts == 1
+    assert "Unsupported file type" in job.error
+
+
+def test_shared_blob_is_parsed_by_the_files_own_extension(session_factory, tmp_path):
+    path = add_file(session_factory, tmp_path, "numbers.txt", b"a,b\n1,2\n", parsed_text="parsed as text")
+    with session_factory() as db:
+        db.add(File(
+            id="numbers.csv", filename="numbers.csv", original_name="numbers.csv", mime_type="text/csv",
+            size=8, status="processing", storage_path=path, content_hash=db.get(File, "numbers.txt").content_hash
+        ))
+        db.commit()
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=0)
+
+    [job] = run_jobs(queue, [("numbers.csv", path)])
+
+    assert job.stage == "done"
+    with session_factory() as db:
+        assert db.get(File, "numbers.csv").extracted_text.startswith("CSV data: 1 rows x 2 columns")
+        assert db.get(FileBlob, db.get(File, "numbers.csv").content_hash).extracted_text == "parsed as text"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["numbers.txt"]
+
+
+def test_previous_parse_of_same_bytes_is_reused(session_factory, tmp_path):
+    path = add_file(session_factory, tmp_path, "copy.txt", b"same", parsed_text="already extracted")
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=0, parse_fn=slow_parse)
+
+    [job] = run_jobs(queue, [("copy.txt", path)])
+
+    assert job.stage == "reused"
+    with session_factory() as db:
+        assert db.get(File, "copy.txt").extracted_text == "already extracted"
+
+
+def test_each_file_is_parsed_by_one_worker(session_factory, tmp_path):
+    """Two queues (as in two server processes) race for the same file; one parses it"""
+    path = add_file(session_factory, tmp_path, "shared.txt", b"claim me")
+    parsed = []
+
+    def counting_parse(path):
+        parsed.append(path)
+        time.sleep(0.2)
+        return {"success": True, "text": "parsed once"}
+
+    first, second = (
+        FileProcessingQueue(session_factory, str(tmp_path), process_workers=0, parse_fn=counting_parse)
+        for _ in range(2)
+    )
+
+    async def run():
+        first.start(recover=False)
+        second.start(recover=False)
+        jobs = [first.enqueue("shared.txt", path), second.enqueue("shared.txt", path)]
+        await asyncio.gather(first.join(), second.join())
+        await asyncio.gather(first.stop(), second.stop())
+        return jobs
+
+    jobs = asyncio.run(run())
+
+    assert len(parsed) == 1
+    assert sorted(job.stage for job in jobs) == ["claimed", "done"]
+    with session_factory() as db:
+        file = db.get(File, "shared.txt")
+        assert file.status == "ready"
+        assert file.claimed_by is None
+
+
+def test_recovery_only_takes_over_stale_claims(session_factory, tmp_path):
+    queue = FileProcessingQueue(session_factory, str(tmp_path), process_workers=0)
+    old = datetime.utcnow() - queue.claim_ttl - timedelta(seconds=1)
+    for name, claimed_at, created_at in (
+        ("busy.txt", datetime.utcnow(), old),
+        ("abandoned.txt", old, old),
+        ("unclaimed.txt", None, old),
+        ("just-uploaded.txt", None, datetime.utcnow()),
+    ):
+        add_file(session_factory, tmp_path, name, name.encode())
+        with session_factory() as db:
+            file = db.get(File, name)
+            file.claimed_by = "other-worker" if claimed_at else None
+            file.claimed_at = claimed_at
+            file.created_at = created_at
+            db.commit()
+
+    assert sorted(file_id for file_id, _ in queue._pending_files()) == ["abandoned.txt", "unclaimed.txt"]
@@ -0,0 +1,103 @@
+"""
+Tests for time-ordered ids and (created_at, id) message ordering
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_mock_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.api.dependencies import get_db, get_read_db
+from src.api.routes import chat as chat_routes
+from src.core import ids
+from src.core.ids import id_timestamp, new_id, uuid7
+from src.models.database import Conversation, IdType, Message
+
+
+def test_uuid7_layout():
+    value = uuid7()
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs(id_timestamp(str(value)) - datetime.utcnow()) < timedelta(seconds=5)
+
+
+def test_ids_sort_in_creation_order():
+    values = [new_id() for _ in range(10_000)]
+    assert len(set(values)) == len(values)
+    assert values == sorted(values)
+
+
+def test_ids_stay_ordered_within_a_millisecond_and_when_the_clock_steps_back(monkeypatch):
+    clock = iter([2_000_000_000_000_000_000] * 100 + [1_999_000_000_000_000_000] * 100)
+    monkeypatch.setattr(ids.time, "time_ns", lambda: next(clock))
+    values = [new_id() for _ in range(200)]
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+    assert {id_timestamp(value) for value in values} == {datetime(2033, 5, 18, 3, 33, 20)}
+
+
+def test_id_timestamp_ignores_other_ids():
+    assert id_timestamp(str(uuid.uuid4())) is None
+    assert id_timestamp("conv-1") is None
+
+
+def test_postgres_ids_must_be_uuids():
+    dialect = postgresql.dialect()
+    value = new_id()
+    assert IdType().process_bind_param(value.upper(), dialect) == value
+    assert IdType().process_bind_param("conv-1", sqlite.dialect()) == "conv-1"
+    with pytest.raises(ValueError):
+        IdType().process_bind_param("conv-1", dialect)
+
+
+def test_postgres_routes_answer_404_for_ids_that_are_not_uuids():
+    """Such ids never reach a query, where binding them would fail"""
+    def override_db():
+        yield Session(bind=create_mock_engine("postgresql://", executor=None))
+
+    app = FastAPI()
+    app.include_router(chat_routes.router)
+    app.dependency_overrides[get_read_db] = override_db
+    response = TestClient(app).get("/api/v1/conversations/missing")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Conversation not found: missing"
+
+
+@pytest.fixture
+def engine(db_engine):
+    now = datetime.utcnow()
+    with Session(bind=db_engine) as db:
+        db.add(Conversation(id="conv", title="Same instant", provider="openai", model="gpt-4o"))
+        for index in range(6):
+            db.add(Message(id=new_id(), conversation_id="conv", role="user", content=f"message {index}", created_at=now))
+        db.commit()
+    return db_engine
+
+
+def test_messages_sharing_a_timestamp_keep_insert_order(engine):
+    with Session(bind=engine) as db:
+        conversation = db.get(Conversation, "conv")
+        assert [m.content for m in conversation.messages] == [f"message {i}" for i in range(6)]
+
+
+def test_delete_message_keeps_earlier_messages_with_the_same_timestamp(engine):
+    def override_db():
+        with Session(bind=engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(chat_routes.router)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+    client = TestClient(app)
+    with Session(bind=engine) as db:
+        target = db.query(Message).filter(Message.content == "message 3").one().id
+    response = client.delete(f"/api/v1/conversations/conv/messages/{target}")
+    assert response.status_code == 200
+    messages = client.get("/api/v1/conversations/conv").json()["data"]["messages"]
+    assert [m["content"] for m in messages] == ["message 0", "message 1", "message 2"]
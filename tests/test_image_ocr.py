@@ -0,0 +1,134 @@
+"""
+Tests for the image OCR pipeline
+"""
+
+import threading
+import time
+
+from src.services.files.parsers.image import (
+    ImageParser, OCRCache, OCRExecutor, assemble_ocr_data, otsu_threshold
+)
+
+
+def tesseract_data(rows):
+    columns = ["text", "conf", "block_num", "par_num", "line_num", "left", "top", "width", "height"]
+    return {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+
+
+def fake_result(text="hello"):
+    return {
+        "metadata": {"format": "PNG", "width": 640, "height": 480},
+        "text": text,
+        "regions": [{"text": text, "x": 1, "y": 2, "width": 3, "height": 4, "confidence": 95.0}],
+        "error": None,
+    }
+
+
+def test_otsu_threshold_separates_two_levels():
+    histogram = [0] * 256
+    histogram[30] = 500
+    histogram[220] = 1500
+    assert 30 <= otsu_threshold(histogram) < 220
+    assert otsu_threshold([0] * 256) == 127
+
+
+def test_assemble_ocr_data_builds_text_and_scaled_regions():
+    data = tesseract_data([
+        ("", -1, 1, 0, 0, 0, 0, 100, 100),
+        ("Hello", 96, 1, 1, 1, 10, 20, 50, 10),
+        ("world", 40, 1, 1, 1, 70, 20, 50, 10),
+        ("Next", 90, 1, 1, 2, 10, 40, 40, 10),
+        ("Block", 91, 2, 1, 1, 10, 80, 40, 10),
+    ])
+    
+    text, regions = assemble_ocr_data(data, scale=0.5)
+    
+    assert text == "Hello world\nNext\n\nBlock"
+    assert [r["text"] for r in regions] == ["Hello", "Next", "Block"]
+    assert regions[0]["x"] == 20 and regions[0]["width"] == 100
+
+
+def test_identical_images_are_recognized_once(tmp_path):
+    calls = []
+    
+    def ocr(content, language):
+        calls.append(content)
+        return fake_result()
+    
+    executor = OCRExecutor(process_workers=0, ocr_fn=ocr)
+    for name in ("a.png", "b.png"):
+        (tmp_path / name).write_bytes(b"same pixels")
+    
+    assert executor.recognize_file(str(tmp_path / "a.png"))["text"] == "hello"
+    assert executor.recognize_file(str(tmp_path / "b.png"))["text"] == "hello"
+    assert len(calls) == 1
+    assert executor.cache.stats()["hits"] == 1
+
+
+def test_failed_ocr_is_not_cached():
+    executor = OCRExecutor(process_workers=0, ocr_fn=lambda c, l: {**fake_result(), "error": "boom"})
+    executor.recognize(b"x")
+    executor.recognize(b"x")
+    assert executor.cache.stats()["entries"] == 0
+
+
+def test_concurrency_is_capped():
+    active = []
+    peak = []
+    lock = threading.Lock()
+    
+    def ocr(content, language):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return fake_result()
+    
+    executor = OCRExecutor(process_workers=0, max_concurrency=2, ocr_fn=ocr)
+    threads = [threading.Thread(target=executor.recognize, args=(bytes([i]),)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert max(peak) == 2
+
+
+def test_parse_and_regions_share_one_ocr_pass(tmp_path):
+    calls = []
+    
+    def ocr(content, language):
+        calls.append(content)
+        return fake_result("Invoice total 42")
+    
+    path = tmp_path / "shot.png"
+    path.write_bytes(b"screenshot")
+    parser = ImageParser(executor=OCRExecutor(process_workers=0, ocr_fn=ocr))
+    
+    result = parser.parse(str(path))
+    regions = parser.extract_text_regions(str(path))
+    
+    assert result["text"] == "Invoice total 42" and result["word_count"] == 3
+    assert regions[0]["confidence"] == 95.0
+    assert len(calls) == 1
+
+
+def test_image_without_text_gets_placeholder(tmp_path):
+    path = tmp_path / "photo.png"
+    path.write_bytes(b"photo")
+    parser = ImageParser(executor=OCRExecutor(process_workers=0, ocr_fn=lambda c, l: fake_result("")))
+    
+    assert parser.parse(str(path))["text"] == "[Image: PNG 640x480]"
+
+
+def test_undecodable_image_reports_error(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+    parser = ImageParser(executor=OCRExecutor(process_workers=0, cache=OCRCache()))
+    
+    result = parser.parse(str(path))
+    
+    assert result["error"]
+    assert result["text"] == ""
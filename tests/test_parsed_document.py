@@ -0,0 +1,129 @@
+"""
+Tests for the parse-once document cache
+"""
+
+import os
+
+from src.services.files.parsers.code import CodeParser
+from src.services.files.parsers.document import DocumentCache, ParsedDocument
+
+
+SOURCE = """import os
+from typing import List
+
+
+class Loader:
+    pass
+
+
+async def load(path):
+    return path
+
+
+def main():
+    pass
+"""
+
+
+def counting_parser(cache):
+    parser = CodeParser(cache=cache)
+    calls = []
+    original = parser._parse
+    
+    def parse(file_path):
+        calls.append(file_path)
+        return original(file_path)
+    
+    parser._parse = parse
+    return parser, calls
+
+
+def test_views_share_one_parse(tmp_path):
+    path = tmp_path / "app.py"
+    path.write_text(SOURCE)
+    parser, calls = counting_parser(DocumentCache())
+    
+    result = parser.parse(str(path))
+    imports = parser.extract_imports(str(path))
+    functions = parser.extract_functions(str(path))
+    preview = parser.get_preview(str(path), max_lines=2)
+    
+    assert result["metadata"]["lines"] == SOURCE.count("\n") + 1
+    assert imports == ["import os", "from typing import List"]
+    assert functions == ["Loader", "load", "main"]
+    assert preview.startswith("import os\nfrom typing import List\n\n...")
+    assert len(calls) == 1
+    
+    document = parser.document(str(path))
+    assert document.view("imports", list) is document.view("imports", list)
+
+
+def test_returned_values_do_not_leak_into_cache(tmp_path):
+    path = tmp_path / "app.py"
+    path.write_text(SOURCE)
+    parser = CodeParser(cache=DocumentCache())
+    
+    parser.parse(str(path))["metadata"]["lines"] = -1
+    parser.extract_imports(str(path)).clear()
+    
+    assert parser.parse(str(path))["metadata"]["lines"] > 0
+    assert parser.extract_imports(str(path))
+
+
+def test_changed_file_is_reparsed(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("first version")
+    cache = DocumentCache()
+    parser, calls = counting_parser(cache)
+    
+    assert parser.parse(str(path))["text"] == "first version"
+    path.write_text("second version, longer")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    
+    assert parser.parse(str(path))["text"] == "second version, longer"
+    assert len(calls) == 2
+    assert len(cache) == 1
+
+
+def test_identical_bytes_at_another_path_reuse_the_parse(tmp_path):
+    for name in ("a.md", "b.md"):
+        (tmp_path / name).write_text("# Same content")
+    cache = DocumentCache()
+    parser, calls = counting_parser(cache)
+    
+    parser.parse(str(tmp_path / "a.md"))
+    parser.parse(str(tmp_path / "b.md"))
+    parser.parse(str(tmp_path / "b.md"))
+    
+    assert len(calls) == 1
+    assert cache.stats()["hash_hits"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_failed_parses_are_not_cached(tmp_path):
+    cache = DocumentCache()
+    parser = CodeParser(cache=cache)
+    
+    assert parser.parse(str(tmp_path / "missing.py"))["error"]
+    assert len(cache) == 0
+
+
+def test_eviction_by_entries_and_text_size(tmp_path):
+    cache = DocumentCache(max_entries=2, max_chars=25)
+    parser = CodeParser(cache=cache)
+    for i, body in enumerate(["a" * 10, "b" * 10, "c" * 10]):
+        path = tmp_path / f"{i}.txt"
+        path.write_text(body)
+        parser.parse(str(path))
+    
+    assert len(cache) == 2
+    assert cache.stats()["chars"] == 20
+    
+    (tmp_path / "big.txt").write_text("d" * 30)
+    parser.parse(str(tmp_path / "big.txt"))
+    assert len(cache) == 0
+
+
+def test_preview_is_memoized_per_length():
+    document = ParsedDocument("x.txt", {"text": "abcdef", "error": None})
+    assert document.preview(3) == "abc..."
+    assert document.preview(10) == "abcdef"
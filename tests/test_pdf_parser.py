@@ -0,0 +1,143 @@
+"""
+Tests for page-level PDF extraction
+"""
+
+import struct
+import zlib
+
+import pytest
+from fpdf import FPDF
+
+from src.services.files.parsers import pdf as pdf_module
+from src.services.files.parsers.document import DocumentCache
+from src.services.files.parsers.pdf import (
+    PDFParser, PageCache, parse_page_spec, range_size, split_ranges
+)
+
+
+def write_png(path, size=8):
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+    rows = b"".join(b"\x00" + b"\x80" * size for _ in range(size))
+    png = b"\x89PNG\r\n\x1a\n"
+    png += chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0))
+    png += chunk(b"IDAT", zlib.compress(rows))
+    png += chunk(b"IEND", b"")
+    path.write_bytes(png)
+    return str(path)
+
+
+def make_pdf(tmp_path, page_count, scanned=(), blank=()):
+    image = write_png(tmp_path / "scan.png")
+    doc = FPDF()
+    doc.set_font("Arial", size=12)
+    for number in range(1, page_count + 1):
+        doc.add_page()
+        if number in scanned:
+            doc.image(image, x=10, y=10, w=50)
+        elif number not in blank:
+            doc.cell(0, 10, txt=f"This is the text layer of page number {number}")
+    path = tmp_path / "doc.pdf"
+    doc.output(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def counting_extract(monkeypatch):
+    calls = []
+    original = pdf_module.extract_page_range
+    
+    def extract(file_path, first, last, ocr=False):
+        calls.append((first, last))
+        return original(file_path, first, last, ocr)
+    
+    monkeypatch.setattr(pdf_module, "extract_page_range", extract)
+    return calls
+
+
+def test_parse_page_spec():
+    assert parse_page_spec("40", 50) == [40]
+    assert parse_page_spec("1-3, 9,2", 10) == [1, 2, 3, 9]
+    assert parse_page_spec("8-", 10) == [8, 9, 10]
+    for bad in ["0", "11", "5-3", "a", ""]:
+        with pytest.raises(ValueError):
+            parse_page_spec(bad, 10)
+
+
+def test_split_ranges_keeps_pages_contiguous():
+    assert split_ranges([1, 2, 3, 7, 8], 32) == [(1, 3), (7, 8)]
+    ranges = split_ranges(list(range(1, 101)), range_size(100, 4))
+    assert ranges[0] == (1, 13) and ranges[-1] == (92, 100)
+    assert sum(last - first + 1 for first, last in ranges) == 100
+
+
+def test_parse_whole_document(tmp_path):
+    path = make_pdf(tmp_path, 3)
+    result = PDFParser(cache=PageCache()).parse(path)
+    
+    assert result["error"] is None
+    assert result["pages"] == 3
+    assert result["parsed_pages"] == [1, 2, 3]
+    assert "--- Page 2 ---\nThis is the text layer of page number 2" in result["text"]
+
+
+def test_single_page_is_parsed_on_demand(tmp_path, counting_extract):
+    path = make_pdf(tmp_path, 60)
+    cache = PageCache()
+    
+    result = PDFParser(cache=cache).parse(path, pages="40")
+    
+    assert result["parsed_pages"] == [40]
+    assert "page number 40" in result["text"] and "page number 41" not in result["text"]
+    assert counting_extract == [(40, 40)]
+    assert len(cache) == 1
+
+
+def test_pages_without_text_layer_are_detected(tmp_path):
+    path = make_pdf(tmp_path, 4, scanned={2}, blank={3})
+    pages = PDFParser(cache=PageCache(), ocr=False).parse_pages(path, "1-4")
+    
+    assert [p.has_text_layer for p in pages] == [True, False, False, True]
+    assert [p.needs_ocr for p in pages] == [False, True, False, False]
+    assert PDFParser(cache=PageCache(), ocr=False).parse(path)["scanned_pages"] == [2]
+
+
+def test_cached_pages_serve_later_calls(tmp_path, counting_extract):
+    path = make_pdf(tmp_path, 5)
+    parser = PDFParser(cache=PageCache())
+    
+    parser.parse(path)
+    parser.extract_tables(path)
+    parser.get_preview(path, max_chars=20)
+    parser.parse(path, pages="2-3")
+    
+    assert counting_extract == [(1, 5)]
+
+
+def test_parallel_ranges_match_serial_and_stream_in_order(tmp_path):
+    path = make_pdf(tmp_path, 12)
+    serial = PDFParser(max_workers=1, cache=PageCache(), documents=DocumentCache()).parse(path)
+    
+    parser = PDFParser(max_workers=2, parallel_min_pages=2, cache=PageCache(), documents=DocumentCache())
+    numbers = [page.number for page in parser.iter_pages(path)]
+    parallel = parser.parse(path)
+    
+    assert numbers == list(range(1, 13))
+    assert parallel["text"] == serial["text"]
+
+
+def test_pages_run_in_process_inside_a_worker_process(tmp_path, counting_extract, monkeypatch):
+    path = make_pdf(tmp_path, 12)
+    monkeypatch.setattr(pdf_module.multiprocessing, "parent_process", lambda: object())
+    monkeypatch.setattr(pdf_module, "_get_page_pool", lambda workers: pytest.fail("nested page pool"))
+    
+    parser = PDFParser(max_workers=2, parallel_min_pages=2, cache=PageCache(), documents=DocumentCache())
+    assert parser.parse(path)["parsed_pages"] == list(range(1, 13))
+    assert counting_extract == [(1, 12)]
+
+
+def test_invalid_selection_is_reported(tmp_path):
+    path = make_pdf(tmp_path, 2)
+    result = PDFParser(cache=PageCache()).parse(path, pages="5")
+    assert "outside 1-2" in result["error"]
@@ -0,0 +1,196 @@
+"""
+Query-plan regression guard
+
+Seeds a SQLite database, runs the hot endpoints and service queries while
+capturing the SQL they emit, and runs EXPLAIN QUERY PLAN on every SELECT.
+A full table scan fails the test unless the query is listed in
+EXPECTED_SCANS with the reason it cannot use an index.
+
+No ANALYZE is run: without statistics SQLite assumes large tables, which
+is the plan production databases converge to.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from src.api.dependencies import get_db, get_read_db
+from src.api.routes import chat as chat_routes
+from src.api.routes import files as files_routes
+from src.api.routes import memory as memory_routes
+from src.core.database import add_missing_indexes
+from src.models.database import (
+    Base, Conversation, File, FileBlob, FileChunk, MemoryFact, Message, SearchCache, conversation_files
+)
+from src.services.files.chunks import ChunkStore
+from src.services.memory.storage import MemoryStorage
+
+# Full scans that are inherent to the query, keyed by a fragment of its SQL
+EXPECTED_SCANS = {
+    "lower(messages.content) LIKE lower(": "substring search over message text needs a full-text index",
+    "lower(conversations.title) LIKE lower(": "counting title substring matches reads every title",
+}
+
+HOT_REQUESTS = [
+    ("GET", "/api/v1/conversations", None),
+    ("GET", "/api/v1/conversations?search=Conversation%201", None),
+    ("GET", "/api/v1/conversations/conv-3", None),
+    ("GET", "/api/v1/conversations/conv-3/export", None),
+    ("PATCH", "/api/v1/conversations/conv-3", {"is_pinned": True}),
+    ("DELETE", "/api/v1/conversations/conv-3/messages/conv-3-msg-15", None),
+    ("GET", "/api/v1/files", None),
+    ("GET", "/api/v1/files?status=ready", None),
+    ("GET", "/api/v1/files?conversation_id=conv-2", None),
+    ("GET", "/api/v1/files/file-7", None),
+    ("GET", "/api/v1/files/file-7/status", None),
+    ("GET", "/api/v1/memory/facts", None),
+    ("GET", "/api/v1/memory/facts?category=preference", None),
+    ("POST", "/api/v1/memory/search", {"query": "needle", "limit": 10}),
+    ("DELETE", "/api/v1/conversations/conv-4", None),
+]
+
+
+def seed(db):
+    now = datetime.utcnow()
+    for c in range(20):
+        conversation = Conversation(
+            id=f"conv-{c}", title=f"Conversation {c}", provider="openai", model="gpt-4o",
+            updated_at=now - timedelta(minutes=c)
+        )
+        db.add(conversation)
+        for m in range(20):
+            db.add(Message(
+                id=f"conv-{c}-msg-{m}", conversation_id=conversation.id, role="user",
+                content=f"message {m}", created_at=now + timedelta(seconds=m)
+            ))
+    for f in range(20):
+        content_hash = f"{f:064x}"
+        db.add(FileBlob(content_hash=content_hash, size=10, storage_path=f"/nonexistent/{f}", ref_count=1))
+        db.add(File(
+            id=f"file-{f}", filename=f"{f}.txt", original_name=f"{f}.txt", mime_type="text/plain", size=10,
+            status="ready" if f % 2 else "processing", storage_path=f"/nonexistent/{f}", content_hash=content_hash
+        ))
+        db.add(FileChunk(
+            content_hash=content_hash, position=0, start_offset=0, end_offset=10, text="chunk", token_count=1
+        ))
+        db.execute(conversation_files.insert().values(conversation_id=f"conv-{f % 5}", file_id=f"file-{f}"))
+    for i in range(20):
+        db.add(MemoryFact(
+            category="preference" if i % 2 else "fact", content=f"fact {i}", confidence=i / 20,
+            conversation_id=f"conv-{i % 5}"
+        ))
+        db.add(SearchCache(
+            query_hash=f"{i:064x}", query_text=f"query {i}", results={}, expires_at=now + timedelta(hours=i)
+        ))
+    db.commit()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(bind=engine) as db:
+        seed(db)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def captured(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def full_scans(engine, statement, parameters):
+    """
+    Plan steps that read a whole table
+
+    A plain SCAN always counts. Walking a whole non-covering index is the
+    same cost plus lookups, and only counts as fine when a LIMIT stops it
+    early (newest-first listings); covering-index scans read the index
+    alone and are allowed.
+    """
+    tables = set(Base.metadata.tables)
+    limited = " LIMIT " in statement
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    scans = []
+    for row in rows:
+        match = re.match(r"SCAN (\w+)(?: USING (COVERING )?INDEX \w+)?$", row[-1])
+        if not match or re.sub(r"_\d+$", "", match.group(1)) not in tables:
+            continue
+        if "USING" not in row[-1] or (not match.group(2) and not limited):
+            scans.append(row[-1])
+    return scans
+
+
+def assert_no_full_scans(engine, statements):
+    failures = []
+    for statement, parameters in statements:
+        scans = full_scans(engine, statement, parameters)
+        if scans and not any(fragment in statement for fragment in EXPECTED_SCANS):
+            failures.append(f"{', '.join(scans)}\n{statement}")
+    assert not failures, "Full table scans:\n\n" + "\n\n".join(failures)
+
+
+def test_hot_endpoints_use_indexes(engine, captured):
+    def override_db():
+        with Session(bind=engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(chat_routes.router)
+    app.include_router(files_routes.router)
+    app.include_router(memory_routes.router)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+    client = TestClient(app)
+    for method, url, body in HOT_REQUESTS:
+        response = client.request(method, url, json=body)
+        assert response.status_code == 200, (url, response.text)
+    assert len(captured) > len(HOT_REQUESTS)
+    assert_no_full_scans(engine, captured)
+
+
+def test_hot_service_queries_use_indexes(engine, captured):
+    with Session(bind=engine) as db:
+        storage = MemoryStorage(db)
+        storage.list_facts(limit=10)
+        storage.list_facts(category="fact", min_confidence=0.5)
+        storage.get_facts_for_context("fact", max_facts=5)
+        storage.get_stats()
+        chunks = ChunkStore(db)
+        chunks.has_chunks(f"{3:064x}")
+        chunks.resolve_file_ids("conv-1", ["file-1"])
+        db.query(File.id, File.storage_path).filter(File.status == "processing").all()
+        db.query(File).filter(File.content_hash == f"{5:064x}").count()
+        db.query(SearchCache).filter(SearchCache.query_hash == f"{5:064x}").first()
+        db.query(SearchCache.id).filter(SearchCache.expires_at < datetime.utcnow()).all()
+    assert_no_full_scans(engine, captured)
+
+
+def test_indexes_are_added_to_existing_tables(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE messages (id VARCHAR(36) PRIMARY KEY, conversation_id VARCHAR(36), created_at DATETIME)"))
+        conn.execute(text("CREATE INDEX ix_messages_created_at ON messages (created_at)"))
+    monkeypatch.setattr("src.core.database.engine", engine)
+    add_missing_indexes()
+    add_missing_indexes()  # Idempotent
+    with engine.connect() as conn:
+        names = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    assert "idx_messages_conversation" in names
+    assert "idx_messages_created" not in names  # Same columns as the existing index
+    engine.dispose()
@@ -0,0 +1,143 @@
+"""
+Tests for the two-tier search result cache
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+
+from src.models.database import SearchCache
+from src.services import search
+from src.services.search import _get_cache_key
+from src.services.search.base import SearchResponse, SearchResult
+from src.services.search.cache import TwoTierSearchCache
+
+
+def make_response(query: str, count: int = 3) -> SearchResponse:
+    return SearchResponse(
+        results=[
+            SearchResult(title=f"r{i}", url=f"https://example.com/{i}", snippet="s", source="example.com")
+            for i in range(count)
+        ],
+        query=query,
+        total_results=count,
+        search_time=0.1,
+        provider="test"
+    )
+
+
+def test_cache_key_includes_num_results_and_normalizes_query():
+    assert _get_cache_key("Python  News", "brave", "general", 5) == _get_cache_key("python news", "brave", "general", 5)
+    assert _get_cache_key("python news", "brave", "general", 5) != _get_cache_key("python news", "brave", "general", 10)
+
+
+def test_l1_evicts_least_recently_used():
+    cache = TwoTierSearchCache(max_entries=2)
+
+    async def run():
+        await cache.set("a", make_response("a"))
+        await cache.set("b", make_response("b"))
+        assert await cache.get("a") is not None  # a is now most recent
+        await cache.set("c", make_response("c"))
+        return await cache.get("b"), await cache.get("a")
+
+    evicted, kept = asyncio.run(run())
+    assert evicted is None
+    assert kept.cached is True
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["total_entries"] == 2
+
+
+def test_l1_respects_byte_budget():
+    one_entry = len(json.dumps(make_response("q").to_dict()))
+    cache = TwoTierSearchCache(max_bytes=one_entry * 2 + 10)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await cache.set(key, make_response("q"))
+
+    asyncio.run(run())
+    assert cache.stats()["total_entries"] == 2
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+
+
+def test_l2_survives_new_process_cache(session_factory):
+
+    async def run():
+        await TwoTierSearchCache(session_factory=session_factory).set("k", make_response("persisted"))
+        restarted = TwoTierSearchCache(session_factory=session_factory)
+        return restarted, await restarted.get("k")
+
+    restarted, response = asyncio.run(run())
+    assert response.query == "persisted"
+    assert len(response.results) == 3
+    assert restarted.stats()["l2_hits"] == 1
+
+
+def test_stale_entry_is_served_and_revalidated():
+    cache = TwoTierSearchCache(ttl=timedelta(seconds=-1), stale_ttl=timedelta(minutes=5))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        response = make_response("fresh")
+        await cache.set("k", response)
+        return response
+
+    async def run():
+        await cache.set("k", make_response("old"))
+        served = await cache.get("k", revalidate=fetch)
+        await asyncio.sleep(0.01)
+        return served, await cache.get("k")
+
+    served, refreshed = asyncio.run(run())
+    assert served.query == "old"
+    assert refreshed.query == "fresh"
+    assert calls == [1]
+    stats = cache.stats()
+    assert stats["stale_hits"] == 2  # The refreshed entry is also past its (negative) ttl
+    assert stats["revalidations"] == 1
+
+
+def test_sweep_removes_entries_past_stale_window():
+    cache = TwoTierSearchCache(ttl=timedelta(seconds=-10), stale_ttl=timedelta(seconds=1))
+    asyncio.run(cache.set("k", make_response("q")))
+
+    assert cache.sweep() == 1
+    assert cache.stats()["total_entries"] == 0
+
+
+def test_coalesced_searches_store_the_result_once(session_factory, monkeypatch):
+    """Only the shared provider call writes the cache, and clearing empties both tiers"""
+    cache = TwoTierSearchCache(session_factory=session_factory)
+    monkeypatch.setattr(search, "get_search_cache", lambda: cache)
+    stores = []
+    original_set = cache.set
+
+    async def counting_set(key, response):
+        stores.append(key)
+        await original_set(key, response)
+
+    monkeypatch.setattr(cache, "set", counting_set)
+
+    class SlowProvider:
+        provider_id = "slow"
+
+        async def search(self, query, num_results, search_type, **kwargs):
+            await asyncio.sleep(0.05)
+            return make_response(query)
+
+    monkeypatch.setattr(search, "get_default_provider", lambda: SlowProvider())
+
+    async def run():
+        responses = await asyncio.gather(*(search.search_web("same query") for _ in range(3)))
+        await search.clear_search_cache()
+        return responses
+
+    responses = asyncio.run(run())
+    assert [r.query for r in responses] == ["same query"] * 3
+    assert len(stores) == 1
+    assert cache.stats()["total_entries"] == 0
+    with session_factory() as session:
+        assert session.query(SearchCache).count() == 0
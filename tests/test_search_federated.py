@@ -0,0 +1,98 @@
+"""
+Tests for federated search and reciprocal-rank fusion
+"""
+
+import asyncio
+
+from src.services.search.base import BaseSearchProvider, SearchResponse, SearchResult
+from src.services.search.federated import FederatedSearchProvider, canonicalize_url, fuse_rankings
+
+
+def result(url: str, snippet: str = "s") -> SearchResult:
+    return SearchResult(title=url, url=url, snippet=snippet, source="test")
+
+
+class FakeProvider(BaseSearchProvider):
+    """Provider returning fixed results after an optional delay"""
+
+    def __init__(self, name, urls, delay=0.0, error=None, available=True):
+        super().__init__()
+        self.name = name
+        self.urls = urls
+        self.delay = delay
+        self.error = error
+        self.available = available
+
+    @property
+    def provider_id(self):
+        return self.name
+
+    @property
+    def provider_name(self):
+        return self.name
+
+    def is_available(self):
+        return self.available
+
+    async def search(self, query, num_results=10, search_type="general", **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SearchResponse(
+            results=[result(u) for u in self.urls[:num_results]],
+            query=query,
+            total_results=len(self.urls),
+            search_time=self.delay,
+            provider=self.name
+        )
+
+
+def test_canonicalize_url_matches_equivalent_urls():
+    assert canonicalize_url("http://www.Example.com/page/?utm_source=x&b=2&a=1#top") == \
+        canonicalize_url("https://example.com/page?a=1&b=2")
+    ddg = "//duckduckgo.com/l/?uddg=https%3A%2F%2Fexample.com%2Fpage&rut=abc"
+    assert canonicalize_url(ddg) == canonicalize_url("https://example.com/page")
+
+
+def test_fuse_rankings_rewards_agreement():
+    fused = fuse_rankings([
+        [result("https://a.com"), result("https://b.com")],
+        [result("https://www.b.com/", snippet="longer snippet"), result("https://c.com")],
+    ])
+    assert [r.url for r in fused] == ["https://b.com", "https://a.com", "https://c.com"]
+    assert fused[0].snippet == "longer snippet"
+
+
+def test_slow_and_failing_providers_do_not_stall_results():
+    federated = FederatedSearchProvider(
+        providers=[
+            FakeProvider("fast", ["https://a.com", "https://b.com"]),
+            FakeProvider("slow", ["https://slow.com"], delay=5),
+            FakeProvider("broken", [], error=RuntimeError("down")),
+            FakeProvider("unconfigured", ["https://x.com"], available=False),
+        ],
+        deadlines={"slow": 0.05}
+    )
+
+    response = asyncio.run(federated.search("q", num_results=5))
+
+    assert [p.provider_id for p in federated.providers] == ["fast", "slow", "broken"]
+    assert [r.url for r in response.results] == ["https://a.com", "https://b.com"]
+    assert response.search_time < 1
+    assert response.provider == "federated"
+
+
+def test_returns_early_once_quorum_has_enough_results():
+    federated = FederatedSearchProvider(
+        providers=[
+            FakeProvider("one", ["https://a.com", "https://b.com"]),
+            FakeProvider("two", ["https://c.com"], delay=0.01),
+            FakeProvider("lagging", ["https://d.com"], delay=2),
+        ],
+        quorum=2
+    )
+
+    response = asyncio.run(federated.search("q", num_results=3))
+
+    assert len(response.results) == 3
+    assert response.search_time < 1
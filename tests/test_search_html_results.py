@@ -0,0 +1,49 @@
+"""
+Tests for DuckDuckGo result page extraction
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.services.search.duckduckgo import DuckDuckGoSearchProvider
+from src.services.search.html_results import parse_duckduckgo_results, resolve_result_url
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "duckduckgo"
+EXPECTED = json.loads((FIXTURES / "expected.json").read_text())
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_fixture_pages_extract_every_result(name):
+    results = parse_duckduckgo_results((FIXTURES / name).read_text())
+    assert [r.url for r in results] == EXPECTED[name]
+    assert all(r.title for r in results)
+
+
+def test_html_page_decodes_entities_and_skips_ads():
+    results = DuckDuckGoSearchProvider()._parse_html_results(
+        (FIXTURES / "html_results.html").read_text()
+    )
+    assert results[0].title == "Coroutines and Tasks — Python 3.12 documentation"
+    assert results[0].source == "docs.python.org"
+    assert results[0].snippet.startswith("awaitable asyncio.gather(*aws")
+    assert "Python's approach" in results[2].snippet
+    assert not any("example-ads.com" in r.url for r in results)
+
+
+def test_odd_markup_is_flattened_and_contained():
+    results = parse_duckduckgo_results((FIXTURES / "odd_results.html").read_text())
+    assert results[0].title == "std::vector<T,Allocator> - cppreference.com"
+    assert results[1].title == "vector class | Microsoft Learn"
+    assert results[1].snippet.endswith("in a linear arrangement")
+    assert results[2].snippet == "In the introduction to this chapter, we introduced containers, arrays and std::vector."
+    assert results[3].snippet == ""
+
+
+def test_limit_and_redirect_unwrapping():
+    results = parse_duckduckgo_results((FIXTURES / "lite_results.html").read_text(), limit=2)
+    assert len(results) == 2
+    assert resolve_result_url("//duckduckgo.com/l/?uddg=https%3A%2F%2Fa.com%2Fx%3Fy%3D1&rut=z") == "https://a.com/x?y=1"
+    assert resolve_result_url("https://a.com/") == "https://a.com/"
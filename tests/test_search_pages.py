@@ -0,0 +1,166 @@
+"""
+Tests for result page fetching and readable-text extraction
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.services.search import pages as pages_module
+from src.services.search.pages import PageFetcher, PageCache, select_passages
+from src.services.search.readable import extract_readable_text, chunk_text
+
+
+ARTICLE = """<!DOCTYPE html>
+<html><head><title>Tuning SQLite &amp; WAL</title><script>var x = "<p>not text</p>";</script></head>
+<body>
+<header><nav><a href="/">Home</a> <a href="/blog">Blog</a></nav></header>
+<div class="sidebar-left"><p>Popular posts you should definitely read next week.</p></div>
+<main>
+  <h1>Write-ahead logging</h1>
+  <p>In WAL mode readers do not block writers and writers do not block readers, so concurrency improves.</p>
+  <p>Checkpoints copy pages from the WAL file back into the database file at regular intervals.</p>
+  <p><a href="/a">Related</a> <a href="/b">links</a> <a href="/c">everywhere</a></p>
+</main>
+<div class="cookie-banner"><p>We use cookies to improve your experience on this website.</p></div>
+<footer><p>Copyright 2024 Example Corp. All rights reserved worldwide.</p></footer>
+</body></html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        FixtureHandler.hits[self.path] = FixtureHandler.hits.get(self.path, 0) + 1
+        if self.path == "/article":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            body = ARTICLE.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+        elif self.path == "/big":
+            body = b"<html><body>" + b"<p>" + b"word " * 200_000 + b"</p></body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+        elif self.path == "/slow":
+            time.sleep(1)
+            body = b"<p>too late to matter for anyone waiting on this page</p>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+        elif self.path in ("/redirect", "/redirect-metadata"):
+            body = b""
+            self.send_response(302)
+            target = "/article" if self.path == "/redirect" else "http://169.254.169.254/latest/meta-data/"
+            self.send_header("Location", target)
+        elif self.path == "/image":
+            body = b"\x89PNG\r\n"
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+        else:
+            body = b"missing"
+            self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    FixtureHandler.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_extract_readable_text_drops_boilerplate():
+    page = extract_readable_text(ARTICLE)
+    assert page.title == "Tuning SQLite & WAL"
+    assert page.text.startswith("Write-ahead logging\n\nIn WAL mode readers")
+    for boilerplate in ("Home", "Popular posts", "cookies", "Copyright", "not text", "Related"):
+        assert boilerplate not in page.text
+
+
+def test_chunk_text_respects_limit_and_overlaps():
+    text = "\n\n".join(f"Paragraph {i} " + "filler words here. " * 10 for i in range(10))
+    chunks = chunk_text(text, max_chars=400, overlap=60)
+    assert len(chunks) > 1
+    assert all(len(c) <= 400 for c in chunks)
+    assert chunks[1].split()[0] in chunks[0]
+
+
+def test_fetch_pages_concurrently_with_limits(server):
+    fetcher = PageFetcher(max_bytes=64 * 1024, timeout=0.5, host_interval=0, allow_private=True)
+
+    async def run():
+        return await fetcher.fetch_pages([
+            f"{server}/article", f"{server}/big", f"{server}/slow",
+            f"{server}/image", f"{server}/missing", f"{server}/article",
+        ])
+
+    start = time.perf_counter()
+    article, big, slow, image, missing = asyncio.run(run())
+
+    assert time.perf_counter() - start < 1.5
+    assert article.ok and article.etag == '"v1"' and article.chunks
+    assert big.truncated and len(big.text) <= 64 * 1024
+    assert slow.error == "timeout"
+    assert image.error == "unsupported content type: image/png"
+    assert missing.error == "HTTP 404"
+    assert FixtureHandler.hits["/article"] == 1
+    assert fetcher._host_semaphores == {} and fetcher._host_last_start == {}
+
+
+def test_internal_addresses_are_blocked_on_every_hop(server, monkeypatch):
+    fetcher = PageFetcher(host_interval=0)
+
+    async def run(*urls):
+        return await fetcher.fetch_pages(list(urls))
+
+    local, scheme = asyncio.run(run(f"{server}/article", "file:///etc/passwd"))
+    assert local.error == "blocked address: 127.0.0.1"
+    assert scheme.error == "blocked URL: file:///etc/passwd"
+    assert FixtureHandler.hits == {}
+
+    # Let the fixture server through; the redirect targets are still checked
+    monkeypatch.setattr(pages_module, "_is_public_address", lambda address: address.is_loopback or address.is_global)
+    followed, metadata = asyncio.run(run(f"{server}/redirect", f"{server}/redirect-metadata"))
+    assert followed.ok and followed.final_url == f"{server}/article"
+    assert metadata.error == "blocked address: 169.254.169.254"
+
+
+def test_cache_serves_fresh_pages_and_revalidates_with_etag(server):
+    cache = PageCache(ttl=60)
+    fetcher = PageFetcher(cache=cache, host_interval=0, allow_private=True)
+    url = f"{server}/article"
+
+    first = asyncio.run(fetcher.fetch_page(url))
+    second = asyncio.run(fetcher.fetch_page(url))
+    assert not first.cached and second.cached
+    assert FixtureHandler.hits["/article"] == 1
+
+    cache.ttl = 0
+    third = asyncio.run(fetcher.fetch_page(url))
+    assert third.cached and third.text == first.text
+    assert FixtureHandler.hits["/article"] == 2
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_select_passages_prefers_query_terms(server):
+    fetcher = PageFetcher(host_interval=0, allow_private=True)
+    pages = asyncio.run(fetcher.fetch_pages([f"{server}/article"]))
+    passages = select_passages(pages, "how do wal checkpoints work", max_chars=2000)
+    assert passages[0]["url"] == f"{server}/article"
+    assert "Checkpoints" in passages[0]["text"]
@@ -0,0 +1,86 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from src.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    async def work():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert executions == [1]
+    stats = flight.stats()
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_exception_is_shared_and_key_released():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            flight.do("k", fail), flight.do("k", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.in_flight() == 0
+    assert flight.stats()["errors"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_last_waiter_cancellation_cancels_shared_work():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def run():
+        caller = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.08)
+
+    asyncio.run(run())
+    assert finished == []
+    assert flight.in_flight() == 0
@@ -0,0 +1,87 @@
+"""
+Tests for SQLite storage profiles and WAL maintenance
+"""
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.core.sqlite import (
+    SQLITE_PROFILES, WALCheckpointer, checkpoint, configure_sqlite, get_sqlite_profile, optimize, wal_size
+)
+
+
+def file_engine(tmp_path, profile):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine, get_sqlite_profile(profile))
+    return engine
+
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_balanced_profile_is_applied_on_connect(tmp_path):
+    engine = file_engine(tmp_path, "balanced")
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # NORMAL
+    assert pragma(engine, "busy_timeout") == 5000
+    assert pragma(engine, "cache_size") == -64000
+    assert pragma(engine, "temp_store") == 2  # MEMORY
+    engine.dispose()
+
+
+def test_legacy_profile_keeps_rollback_journal(tmp_path):
+    engine = file_engine(tmp_path, "legacy")
+    assert pragma(engine, "journal_mode") == "delete"
+    assert checkpoint(engine) is None
+    engine.dispose()
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match="balanced"):
+        get_sqlite_profile("fastest")
+    assert all(profile.name == name for name, profile in SQLITE_PROFILES.items())
+
+
+def test_checkpointer_truncates_a_large_wal(tmp_path):
+    engine = file_engine(tmp_path, "balanced")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE notes (body TEXT)"))
+        conn.execute(text("INSERT INTO notes VALUES (:body)"), [{"body": "x" * 4000} for _ in range(200)])
+    assert wal_size(engine) > 0
+    checkpointer = WALCheckpointer(engine, interval=0.01, truncate_bytes=0)
+    result = checkpointer.run_once()
+    assert result is not None and result[0] == 0
+    assert wal_size(engine) == 0
+    assert checkpointer.stats()["truncate"] == 1
+    optimize(engine)
+    engine.dispose()
+
+
+def test_checkpointer_task_starts_and_stops(tmp_path):
+    engine = file_engine(tmp_path, "balanced")
+    pragma(engine, "journal_mode")
+    checkpointer = WALCheckpointer(engine, interval=0.01, truncate_bytes=1 << 30)
+
+    async def run():
+        checkpointer.start()
+        await asyncio.sleep(0.1)
+        await checkpointer.stop()
+
+    asyncio.run(run())
+    assert checkpointer.stats()["passive"] >= 1
+    assert os.path.exists(tmp_path / "app.db")
+    engine.dispose()
+
+
+def test_in_memory_databases_are_left_alone():
+    engine = create_engine("sqlite://")
+    configure_sqlite(engine, get_sqlite_profile("balanced"))
+    assert checkpoint(engine) is None
+    checkpointer = WALCheckpointer(engine)
+    checkpointer.start()  # No running loop needed: nothing to do
+    assert checkpointer._task is None
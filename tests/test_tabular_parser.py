@@ -0,0 +1,177 @@
+"""
+Tests for streaming CSV, JSON and log analysis
+"""
+
+import json
+
+from src.services.files.parsers import get_parser_for_file
+from src.services.files.parsers.document import DocumentCache
+from src.services.files.parsers.tabular import (
+    ColumnStats, RowSampler, TabularParser, analyze_csv, analyze_log, scan_json
+)
+
+
+def parser():
+    return TabularParser(cache=DocumentCache())
+
+
+def test_csv_dialect_types_and_stats():
+    data = (
+        "id;price;city;active;joined\n"
+        "1;9.5;Paris;yes;2024-01-02\n"
+        "2;10.5;Berlin;no;2024-02-03\n"
+        "3;;Paris;yes;2024-03-04\n"
+        '4;12;"Paris; Centre";no;2024-04-05\n'
+    ).encode()
+    
+    analysis = analyze_csv(data)
+    columns = {c["name"]: c for c in analysis["columns"]}
+    
+    assert analysis["dialect"]["delimiter"] == ";"
+    assert analysis["dialect"]["has_header"] is True
+    assert analysis["rows"] == 4
+    assert columns["id"]["type"] == "integer" and columns["id"]["mean"] == 2.5
+    assert columns["price"]["type"] == "float" and columns["price"]["missing"] == 1
+    assert columns["price"]["min"] == 9.5 and columns["price"]["max"] == 12
+    assert columns["city"]["type"] == "string"
+    assert columns["city"]["top_values"][0] == {"value": "Paris", "count": 2}
+    assert columns["active"]["type"] == "boolean"
+    assert columns["joined"]["type"] == "date"
+
+
+def test_column_stats_across_batches_match_direct_computation(monkeypatch):
+    monkeypatch.setattr("src.services.files.parsers.tabular.NUMERIC_BATCH_SIZE", 7)
+    stats = ColumnStats("n")
+    values = [str(i) for i in range(100)] + ["oops"]
+    for value in values:
+        stats.add(value)
+    
+    data = stats.to_dict()
+    
+    assert data["type"] == "mixed"
+    assert data["type_counts"] == {"integer": 100, "string": 1}
+    assert data["min"] == 0 and data["max"] == 99 and data["mean"] == 49.5
+    assert round(data["std"], 3) == 28.866
+
+
+def test_sampler_is_bounded_and_in_file_order():
+    sampler = RowSampler(head=3, size=10, seed=1)
+    for i in range(10000):
+        sampler.add(i)
+    
+    rows = sampler.rows()
+    
+    assert [index for index, _ in rows[:3]] == [0, 1, 2]
+    assert len(rows) == 13
+    assert [index for index, _ in rows] == sorted(index for index, _ in rows)
+    assert max(index for index, _ in rows) > 1000
+
+
+def test_json_object_keys_without_loading_values():
+    data = json.dumps({
+        "name": "report",
+        "rows": [{"a": [1, 2, {"b": "}"}]}],
+        "meta": {"nested": {"deep": True}},
+        "count": 3,
+        "ok": False
+    }).encode()
+    
+    analysis = scan_json(data)
+    
+    assert analysis["type"] == "object"
+    assert [(k["key"], k["type"]) for k in analysis["keys"]] == [
+        ("name", "string"), ("rows", "array"), ("meta", "object"), ("count", "number"), ("ok", "boolean")
+    ]
+
+
+def test_json_array_of_records_gets_field_stats():
+    records = [{"user": f"u{i}", "score": i} for i in range(50)]
+    records.append({"user": "late", "score": 1, "extra": "x"})
+    
+    analysis = scan_json(json.dumps(records).encode())
+    fields = {c["name"]: c for c in analysis["columns"]}
+    
+    assert analysis["items"] == 51
+    assert analysis["item_types"] == {"object": 51}
+    assert fields["score"]["type"] == "integer" and fields["score"]["max"] == 49
+    assert fields["extra"]["missing"] == 50
+
+
+def test_json_lines_in_json_extension_fall_back(tmp_path):
+    path = tmp_path / "events.json"
+    path.write_text('{"event": "a"}\n{"event": "b"}\n')
+    
+    result = parser().parse(str(path))
+    
+    assert result["metadata"]["analysis"]["format"] == "jsonl"
+    assert result["metadata"]["analysis"]["items"] == 2
+
+
+def test_log_levels_span_and_templates():
+    lines = []
+    for i in range(30):
+        lines.append(f"2024-05-01 10:00:{i:02d} INFO request {i} took {i * 3}ms")
+    lines.append("2024-05-01 10:01:00 ERROR database connection lost")
+    
+    analysis = analyze_log("\n".join(lines).encode())
+    
+    assert analysis["lines"] == 31
+    assert analysis["levels"] == {"INFO": 30, "ERROR": 1}
+    assert analysis["first_timestamp"] == "2024-05-01 10:00:00"
+    assert analysis["last_timestamp"] == "2024-05-01 10:01:00"
+    assert analysis["top_messages"][0] == {"template": "INFO request # took #ms", "count": 30}
+    assert any("ERROR" in line for _, line in analysis["problems"])
+
+
+def test_large_csv_is_summarized_with_bounded_sample(tmp_path):
+    path = tmp_path / "big.csv"
+    with open(path, "w") as f:
+        f.write("id,value,label\n")
+        for i in range(20000):
+            f.write(f"{i},{i % 100}.5,label-{i % 7}\n")
+    
+    result = get_parser_for_file(str(path)).parse(str(path))
+    text = result["text"]
+    
+    assert result["error"] is None
+    assert text.startswith("CSV data: 20,000 rows x 3 columns (comma-delimited, header row)")
+    assert "- value (float): 20,000 values; min 0.5, max 99.5" in text
+    assert "Sample rows (25 of 20,000" in text
+    assert len(text) < 5000
+    assert result["metadata"]["analysis"]["rows"] == 20000
+
+
+def test_small_file_is_included_after_summary(tmp_path):
+    path = tmp_path / "small.tsv"
+    path.write_text("a\tb\n1\tx\n2\ty\n")
+    
+    text = parser().parse(str(path))["text"]
+    
+    assert text.startswith("CSV data: 2 rows x 2 columns (tab-delimited")
+    assert text.endswith("Content:\na\tb\n1\tx\n2\ty\n")
+
+
+def test_latin1_and_empty_files(tmp_path):
+    latin = tmp_path / "latin.csv"
+    latin.write_bytes("name,city\nJosé,Zürich\n".encode("latin-1"))
+    empty = tmp_path / "empty.log"
+    empty.write_bytes(b"")
+    
+    columns = parser().parse(str(latin))["metadata"]["analysis"]["columns"]
+    assert columns[1]["top_values"][0]["value"] == "Zürich"
+    assert parser().parse(str(empty))["metadata"]["analysis"]["lines"] == 0
+
+
+def test_long_cells_and_analysis_failures(tmp_path, monkeypatch):
+    path = tmp_path / "notes.csv"
+    path.write_text("id,body\n1," + "x" * 200_000 + "\n2,short\n")
+    
+    result = parser().parse(str(path))
+    assert result["error"] is None
+    assert result["metadata"]["analysis"]["rows"] == 2
+    
+    def fail(self, file_path):
+        raise ValueError("unreadable")
+    
+    monkeypatch.setattr(TabularParser, "analyze", fail)
+    assert parser().parse(str(path))["error"] == "Failed to analyze file: unreadable"
@@ -0,0 +1,101 @@
+"""
+Tests for image inputs to vision models
+"""
+
+import asyncio
+
+from src.services.ai import ChatCompletionRequest, ClaudeProvider, DeepSeekProvider, OpenAIProvider
+from src.services.ai import Message, MessageRole
+from src.services.ai import vision
+from src.services.ai.vision import (
+    CLAUDE_VISION, OPENAI_VISION, ImageAttachment, ImagePart, ImagePartCache, fit_dimensions
+)
+
+
+def make_part(digest="d1", size=12):
+    return ImagePart(media_type="image/webp", data="A" * (size * 4 // 3), width=10, height=10, digest=digest)
+
+
+def test_dimensions_follow_each_provider_limit():
+    # OpenAI: within 2048x2048, then shortest side 768
+    assert fit_dimensions(4032, 3024, OPENAI_VISION) == (1024, 768)
+    # Claude: long edge 1568 and about 1.15 megapixels
+    width, height = fit_dimensions(4032, 3024, CLAUDE_VISION)
+    assert width * height <= 1_150_000 and max(width, height) <= 1568
+    assert round(width / height, 2) == round(4032 / 3024, 2)
+    # Small images are never upscaled
+    assert fit_dimensions(600, 400, CLAUDE_VISION) == (600, 400)
+
+
+def test_cache_is_bounded_in_bytes():
+    cache = ImagePartCache(max_bytes=30)
+    cache.set("a", make_part(size=12))
+    cache.set("b", make_part(size=12))
+    cache.get("a")
+    cache.set("c", make_part(size=12))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 24
+
+
+def test_images_are_encoded_once_per_profile(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_encode(path, profile):
+        calls.append((path, profile.name))
+        return make_part(digest=f"{profile.name}-{path}")
+
+    monkeypatch.setattr(vision, "encode_image", fake_encode)
+    cache = ImagePartCache()
+    photo = ImageAttachment(path=str(tmp_path / "photo.jpg"), mime_type="image/jpeg", content_hash="abc")
+
+    async def run():
+        first = await vision.prepare_image_parts([photo], CLAUDE_VISION, cache)
+        again = await vision.prepare_image_parts([photo], CLAUDE_VISION, cache)
+        other = await vision.prepare_image_parts([photo], OPENAI_VISION, cache)
+        return first, again, other
+
+    first, again, other = asyncio.run(run())
+
+    assert first[0] is again[0]
+    assert other[0].digest.startswith("openai")
+    assert [name for _, name in calls] == ["claude", "openai"]
+
+
+def test_only_vision_models_receive_images(monkeypatch):
+    monkeypatch.setattr(vision, "encode_image", lambda path, profile: make_part())
+    photo = ImageAttachment(path="photo.jpg", mime_type="image/jpeg", content_hash="abc")
+
+    async def run(provider, model):
+        return await provider.prepare_images([photo], model)
+
+    assert len(asyncio.run(run(ClaudeProvider("key"), "claude-3-haiku-20240307"))) == 1
+    assert asyncio.run(run(OpenAIProvider("key"), "gpt-3.5-turbo")) == []
+    assert asyncio.run(run(DeepSeekProvider("key"), None)) == []
+
+
+def test_image_parts_use_each_provider_format():
+    message = Message(role=MessageRole.USER, content="What is this?", images=[make_part()])
+
+    [openai_message] = OpenAIProvider("key").format_messages([message])
+    assert openai_message["content"][0] == {"type": "text", "text": "What is this?"}
+    assert openai_message["content"][1]["image_url"]["url"].startswith("data:image/webp;base64,")
+
+    _, [claude_message] = ClaudeProvider("key")._convert_messages([message])
+    assert claude_message["content"][0]["source"]["type"] == "base64"
+    assert claude_message["content"][-1] == {"type": "text", "text": "What is this?"}
+
+    plain = Message(role=MessageRole.USER, content="Hi")
+    assert OpenAIProvider("key").format_messages([plain])[0]["content"] == "Hi"
+
+
+def test_coalescing_key_distinguishes_images():
+    provider = OpenAIProvider("key")
+
+    def key(digest):
+        message = Message(role=MessageRole.USER, content="Describe", images=[make_part(digest=digest)])
+        return provider._completion_key(ChatCompletionRequest(messages=[message], model="gpt-4", temperature=0))
+
+    assert key("one") != key("two")
+    assert key("one") == key("one")